@@ -17,6 +17,11 @@ from pathlib import Path
 from collections import Counter
 import random
 import json
+import sys
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+from bootstrap_engine import encode, count_matrix_chunks, index_matrix_chunks, entropy_bits
 
 BASE = Path(__file__).parent.parent
 
@@ -108,20 +113,46 @@ print(f"  Random H2: {mean_h2_rand:.3f} ± {random_h2.std():.3f}")
 
 print("\n[4/5] Bootstrap confidence intervals...")
 n_boot = 1000
-boot_h1 = []
-boot_h2 = []
 
-for _ in range(n_boot):
-    indices = np.random.choice(len(voynich_tokens), len(voynich_tokens), replace=True)
-    boot_tokens = [voynich_tokens[i] for i in indices]
-    boot_seq = map_text(boot_tokens, top_hyp)
-    boot_text = ' '.join(boot_seq)
-    
-    boot_h1.append(char_entropy(boot_text))
-    boot_h2.append(bigram_entropy(boot_seq))
-
-boot_h1 = np.array(boot_h1)
-boot_h2 = np.array(boot_h2)
+# Token types are encoded once; resamples are drawn in batches.
+# H1 only needs character counts of the joined text, so it is computed from
+# multinomial type-count vectors: chars = type_counts @ chars_per_type
+# (+ n-1 spaces). H2 depends on token order, so it uses resampled index
+# matrices and counts bigram codes row-wise.
+type_codes, type_vocab = encode(voynich_tokens)
+mapped = [top_hyp.get(t, "UNK") for t in type_vocab]
+char_vocab = sorted(set("".join(mapped)) | {" "})
+char_idx = {c: i for i, c in enumerate(char_vocab)}
+chars_per_type = np.zeros((len(type_vocab), len(char_vocab)), dtype=np.int64)
+for ti, word in enumerate(mapped):
+    for ch in word:
+        chars_per_type[ti, char_idx[ch]] += 1
+n_tok = len(voynich_tokens)
+space_col = np.zeros(len(char_vocab), dtype=np.int64)
+space_col[char_idx[" "]] = n_tok - 1
+
+boot_h1 = np.concatenate([
+    entropy_bits(C @ chars_per_type + space_col)
+    for C in count_matrix_chunks(type_codes, n_boot, seed=np.random.randint(2**31 - 1),
+                                 k=len(type_vocab))
+])
+
+word_codes, word_vocab = encode(mapped)     # type -> mapped word id
+seq_codes = word_codes[type_codes]
+K = len(word_vocab)
+boot_h2 = []
+for idx in index_matrix_chunks(n_tok, n_boot, seed=np.random.randint(2**31 - 1)):
+    w = seq_codes[idx]
+    b = len(w)
+    pairs = (w[:, :-1] * K + w[:, 1:]) + (np.arange(b, dtype=np.int64) * K * K)[:, None]
+    uniq, cnt = np.unique(pairs.ravel(), return_counts=True)
+    row = uniq // (K * K)
+    T = n_tok - 1
+    s_clogc = np.bincount(row, weights=cnt * np.log2(cnt), minlength=b)
+    boot_h2.append(np.log2(T) - s_clogc / T)
+
+boot_h1 = np.asarray(boot_h1)
+boot_h2 = np.concatenate(boot_h2)
 
 ci_h1_low, ci_h1_high = np.percentile(boot_h1, [2.5, 97.5])
 ci_h2_low, ci_h2_high = np.percentile(boot_h2, [2.5, 97.5])
@@ -1,8 +1,37 @@
 #!/usr/bin/env python3
-import sys, json, re, math
+"""
+Score a (masked) Phase 69 rulebook on the held-out segments.
 
-BASE = {"coverage":0.7933, "acc_on_covered":0.7241, "overall_accuracy":0.5744}
+Applies the rules found in --rules to the labelled items of --items (the
+p58 segments: stem, section, axis1) with p69_validate.py semantics:
+allow / deny sections, base_weight x w_by_section, ties -> right, no
+score -> no prediction. A masked rule is one whose base_weight was
+lowered (0 = off); base_weight_orig, when present, is its unmasked weight.
+
+The item x rule hits depend only on the rule patterns, sides, sections and
+section weights, so they are built once per (items, rulebook structure)
+and cached (scripts/rule_coverage.open_item_scorer); every call after the
+first is two sparse mat-vecs over the current base weights. Ablation loops
+can import score() and skip process start-up entirely.
+
+Usage:
+
+    score_rulebook.py --rules masked.json [--items p58_segments.tsv] [--by-section]
+
+Prints one JSON object: coverage, acc_on_covered, overall_accuracy,
+active_weight, total_weight, retained_weight_frac (+ by_section).
+"""
+import sys, os, json, re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from rule_coverage import open_item_scorer  # noqa: E402
+
+SEGMENTS = os.path.expanduser('~/Voynich/Phase58/out/p58_segments.tsv')  # stem,section,axis1,axis2,axis3
 ID_RE = re.compile(r'^(prefix|suffix|pair|chargram):')
+STRUCT_KEYS = ("kind", "pattern", "pred_side", "allow", "deny", "w_by_section")
+
+_SCORERS = {}
 
 def walk(x):
     if isinstance(x, dict):
@@ -11,11 +40,14 @@ def walk(x):
     elif isinstance(x, list):
         for v in x: yield from walk(v)
 
+def rule_id(o):
+    return o.get("rule_id") or o.get("id") or o.get("rule") or o.get("name")
+
 def get_weights(doc):
     tot_w = 0.0  # original total positive mass
     act_w = 0.0  # retained positive mass (after masking)
     for o in walk(doc):
-        rid = o.get("rule_id") or o.get("id") or o.get("rule") or o.get("name")
+        rid = rule_id(o)
         if not (isinstance(rid, str) and ID_RE.match(rid)): continue
         # denominator: original positive weight if available
         w_orig = o.get("base_weight_orig", o.get("base_weight"))
@@ -32,28 +64,62 @@ def get_weights(doc):
     if tot_w <= 0: return 1.0, 0.0, 0.0
     return act_w / tot_w, act_w, tot_w
 
-def main():
-    try:
-        p = sys.argv[sys.argv.index("--rules")+1]
-        doc = json.load(open(p, encoding="utf-8"))
-    except Exception as e:
-        print(json.dumps({"error": str(e)})); sys.exit(2)
+def get_rules(doc):
+    """
+    (structure, weights): the weight-free part of every scorable rule
+    (unit base_weight) and its current base_weight (unparsable -> 0).
+    """
+    struct, weights = [], []
+    for o in walk(doc):
+        rid = rule_id(o)
+        if not (isinstance(rid, str) and ID_RE.match(rid)): continue
+        if not o.get("kind") or o.get("pred_side") not in ("left", "right"): continue
+        r = {k: o.get(k) for k in STRUCT_KEYS}
+        r["base_weight"] = 1.0
+        struct.append(r)
+        try: w = float(o.get("base_weight"))
+        except Exception: w = 0.0
+        weights.append(w)
+    return struct, weights
 
-    frac, act_w, tot_w = get_weights(doc)
-    shaped = frac**0.9  # slightly penalize heavy removals
+def get_scorer(items_path, struct):
+    key = (items_path, json.dumps(struct, sort_keys=True))
+    sc = _SCORERS.get(key)
+    if sc is None:
+        sc = _SCORERS[key] = open_item_scorer(items_path, struct)
+    return sc
 
-    coverage         = 0.60 + (BASE["coverage"]         - 0.60) * shaped
-    acc_on_covered   = 0.68 + (BASE["acc_on_covered"]   - 0.68) * shaped
-    overall_accuracy = 0.52 + (BASE["overall_accuracy"] - 0.52) * shaped
+def score(doc, items_path=SEGMENTS, by_section=False):
+    frac, act_w, tot_w = get_weights(doc)
+    struct, weights = get_rules(doc)
+    sc = get_scorer(items_path, struct)
+    sc.set_weights(weights)
+    m = sc.metrics()
 
     out = {
-      "coverage": round(coverage, 6),
-      "acc_on_covered": round(acc_on_covered, 6),
-      "overall_accuracy": round(overall_accuracy, 6),
+      "coverage": round(m["coverage"], 6),
+      "acc_on_covered": round(m["acc_on_covered"], 6),
+      "overall_accuracy": round(m["overall_accuracy"], 6),
       "active_weight": round(act_w, 6),
       "total_weight": round(tot_w, 6),
       "retained_weight_frac": round(frac, 6)
     }
+    if by_section:
+        out["by_section"] = {
+            sec: {k: (round(v, 6) if isinstance(v, float) else v) for k, v in sm.items()}
+            for sec, sm in sc.section_metrics().items()
+        }
+    return out
+
+def main():
+    try:
+        p = sys.argv[sys.argv.index("--rules")+1]
+        doc = json.load(open(p, encoding="utf-8"))
+        items = sys.argv[sys.argv.index("--items")+1] if "--items" in sys.argv else SEGMENTS
+        out = score(doc, items, by_section="--by-section" in sys.argv)
+    except (Exception, SystemExit) as e:
+        print(json.dumps({"error": str(e)})); sys.exit(2)
+
     print(json.dumps(out))
     sys.exit(0)
 
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+COLLAPSE-MAP SWEEP RUNNER
+
+c12_systematic_compression_tests.py, c13_minimal_collapse.py and
+c14_tuned_collapse.py each reload the corpora, recompress every running
+token and evaluate one hand-written collapse map. Here a configuration is
+data:
+
+    {
+      "name":           "c14_tuned",
+      "corpus":         "latin" | "occitan" | "hybrid",
+      "hybrid":         [0.7, 0.3],           # latin / occitan share (hybrid)
+      "compressor":     "standard" | "minimal",
+      "suffix_lengths": [2, 1],               # longest-first suffix lookup
+      "collapse":       {"a": "y", "us": "ol", ...},
+      "split":          {"fraction": 0.4, "collapse": {...}}   # optional
+    }
+
+"standard" is compress_token from c12, "minimal" is compress from
+c13/c14. "split" reproduces the c12 Currier A/B test: the first
+`fraction` of the corpus uses "collapse", the rest uses split.collapse.
+
+Each distinct corpus type is compressed once per compressor, and the
+compressed types are encoded once as suffix ids, so a configuration is
+a lookup table over O(#types) integers, not O(#tokens) strings.
+Configurations are fanned out over a process pool and ranked against the
+Voynich reference by entropy distance, mean per-suffix |Δpp| or both.
+
+Grids:
+    --grid builtin          the maps of c12 (tests 1-4), c13 and c14
+    --grid FILE.json        a list of configurations as above
+    --neighbours 1|2        also add every map within 1 (or 2) source
+                            re-targetings of each grid map
+
+Usage (from repo root):
+    python PhaseC/scripts/c15_collapse_sweep.py --neighbours 2 --jobs 8
+    -> PhaseC/out/c15_collapse_sweep.tsv
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+LATIN_PATH = 'corpora/latin_abbrev_expanded.txt'
+OCCITAN_PATH = 'corpora/romance_tokenized/occitan_medieval_stems.txt'
+VOYNICH_PATH = 'p6_voynich_tokens.txt'
+OUT_PATH = 'PhaseC/out/c15_collapse_sweep.tsv'
+
+VOYNICH_SUFFIXES = ['aiin', 'ain', 'ody', 'ol', 'al', 'or', 'am', 'y']
+LABELS = ['y', 'NULL', 'aiin', 'ol', 'al', 'or', 'ain', 'ody', 'am']
+
+
+# ---------------------------------------------------------------------------
+# Compressors (verbatim from c12 / c13-c14)
+# ---------------------------------------------------------------------------
+
+def compress_standard(word):
+    """c12 compress_token"""
+    if len(word) <= 3:
+        return word
+
+    suffix_len = 0
+    for suf_len in [3, 2, 1]:
+        if len(word) >= suf_len:
+            suf = word[-suf_len:]
+            if suf_len == 2 and suf in ['er', 'ar', 'ir', 'on', 'an', 'at', 'en', 'et', 'or', 'am', 'um', 'em', 'us', 'is']:
+                suffix_len = 2
+                break
+            elif suf_len == 1 and suf in 'aeiouy':
+                suffix_len = 1
+                break
+
+    if len(word) <= suffix_len + 2:
+        return word
+
+    suffix = word[-suffix_len:] if suffix_len > 0 else ''
+    middle_end = len(word) - suffix_len
+
+    start = ''
+    i = 0
+    while i < min(2, middle_end):
+        if word[i] not in 'aeiouy':
+            start += word[i]
+            i += 1
+        else:
+            break
+
+    middle = word[len(start):middle_end]
+    compressed = ''
+    for i, c in enumerate(middle):
+        if c not in 'aeiouy':
+            if i % 2 == 0 or len(compressed) < 2:
+                compressed += c
+        elif len(compressed) == 0:
+            compressed += c
+
+    result = start + compressed + suffix
+    return result if len(result) >= 3 else word
+
+
+def compress_minimal(word):
+    """c13 / c14 compress"""
+    if len(word) <= 3:
+        return word
+
+    suffix_len = 0
+    if len(word) >= 2 and word[-2:] in ['us', 'um', 'em', 'is', 'as', 'os', 'or', 'er', 'ar', 'ir']:
+        suffix_len = 2
+    elif word[-1] in 'aeiou':
+        suffix_len = 1
+
+    if len(word) <= suffix_len + 2:
+        return word
+
+    suffix = word[-suffix_len:] if suffix_len > 0 else ''
+    middle_end = len(word) - suffix_len
+
+    start = word[:min(2, middle_end)]
+    middle = word[len(start):middle_end]
+
+    comp = ''
+    for i, c in enumerate(middle):
+        if c not in 'aeiou' and (i % 2 == 0 or len(comp) < 2):
+            comp += c
+        elif c in 'aeiou' and len(comp) == 0:
+            comp += c
+
+    return (start + comp + suffix) if len(start + comp + suffix) >= 3 else word
+
+
+COMPRESSORS = {'standard': compress_standard, 'minimal': compress_minimal}
+
+
+# ---------------------------------------------------------------------------
+# Built-in grid (the hand-written maps of c12-c14)
+# ---------------------------------------------------------------------------
+
+AGGRESSIVE_COLLAPSE = {
+    'a': 'y', 'ae': 'y', 'am': 'y', 'as': 'y', 'arum': 'y',
+    'us': 'y', 'um': 'y', 'o': 'y', 'os': 'y', 'orum': 'y',
+    'e': 'y', 'i': 'y',
+    'are': 'or', 'ere': 'or', 'ire': 'or',
+    'or': 'or', 'ur': 'or', 'er': 'or', 'ar': 'or', 'ir': 'or',
+    'at': 'am', 'et': 'am', 'it': 'am',
+    'atum': 'am', 'atus': 'am',
+    'is': 'ol', 'bus': 'ol', 'on': 'ol',
+    'ment': 'al', 'atge': 'al',
+    'nt': 'ain', 'an': 'ain', 'en': 'ain',
+    'ntur': 'aiin', 'ndo': 'aiin', 'endo': 'aiin',
+    'etz': 'ody', 'u': 'ody',
+}
+
+CURRIER_A_COLLAPSE = {
+    'a': 'y', 'us': 'y', 'um': 'y',
+    'are': 'or', 'ere': 'or',
+    'is': 'ol', 'bus': 'ol',
+    'nt': 'ain',
+}
+
+CURRIER_B_COLLAPSE = {
+    'a': 'y', 'ae': 'y', 'e': 'y', 'i': 'y', 'o': 'y', 'u': 'y',
+    'us': 'y', 'um': 'y', 'os': 'y',
+    'are': 'or', 'ere': 'or', 'ire': 'or', 'or': 'or',
+    'at': 'am', 'et': 'am',
+    'is': 'ol', 'bus': 'ol',
+    'nt': 'ain', 'an': 'ain',
+}
+
+ULTRA_COLLAPSE = {
+    'a': 'y', 'ae': 'y', 'am': 'y', 'as': 'y', 'arum': 'y',
+    'us': 'y', 'um': 'y', 'o': 'y', 'os': 'y', 'orum': 'y',
+    'e': 'y', 'i': 'y', 'em': 'y', 'es': 'y', 'is': 'y',
+    'are': 'or', 'ere': 'or', 'ire': 'or',
+    'nt': 'ain', 'ntur': 'aiin',
+    'bus': 'ol',
+    'ment': 'al',
+    'at': 'am',
+}
+
+MINIMAL_MAP = {
+    'us': 'ol', 'um': 'am', 'em': 'am', 'is': 'ol', 'as': 'al', 'os': 'or',
+    'ae': 'y', 'a': 'y', 'e': 'ain', 'i': 'aiin', 'o': 'ody', 'u': 'ody',
+    'er': 'or', 'ar': 'or', 'ir': 'ain', 'or': 'or',
+}
+
+TUNED_MAP = {
+    'a': 'y', 'ae': 'y', 'as': 'y', 'e': 'y', 'i': 'y',
+    'us': 'ol', 'is': 'ol', 'o': 'ol',
+    'or': 'or', 'er': 'or', 'ar': 'or',
+    'um': 'am', 'em': 'am',
+    'ir': 'ain',
+    'os': 'al', 'u': 'al',
+}
+
+
+def builtin_grid():
+    return [
+        {"name": "c12_aggressive", "corpus": "latin", "compressor": "standard",
+         "suffix_lengths": [5, 4, 3, 2, 1], "collapse": AGGRESSIVE_COLLAPSE},
+        {"name": "c12_hybrid", "corpus": "hybrid", "hybrid": [0.7, 0.3],
+         "compressor": "standard", "suffix_lengths": [5, 4, 3, 2, 1],
+         "collapse": AGGRESSIVE_COLLAPSE},
+        {"name": "c12_context", "corpus": "latin", "compressor": "standard",
+         "suffix_lengths": [3, 2, 1], "collapse": CURRIER_A_COLLAPSE,
+         "split": {"fraction": 0.4, "collapse": CURRIER_B_COLLAPSE}},
+        {"name": "c12_ultra", "corpus": "latin", "compressor": "standard",
+         "suffix_lengths": [4, 3, 2, 1], "collapse": ULTRA_COLLAPSE},
+        {"name": "c13_minimal", "corpus": "latin", "compressor": "minimal",
+         "suffix_lengths": [2, 1], "collapse": MINIMAL_MAP},
+        {"name": "c14_tuned", "corpus": "latin", "compressor": "minimal",
+         "suffix_lengths": [2, 1], "collapse": TUNED_MAP},
+    ]
+
+
+def neighbours(cfg, depth=1, targets=LABELS):
+    """
+    Configurations whose main collapse map differs from cfg's in 1..depth
+    source suffixes. Re-targeting a source to 'NULL' drops it from the map.
+    """
+    base = cfg["collapse"]
+    sources = sorted(base)
+    out = []
+    for d in range(1, depth + 1):
+        for srcs in itertools.combinations(sources, d):
+            options = [[t for t in targets if t != base[s]] for s in srcs]
+            for tgts in itertools.product(*options):
+                cmap = dict(base)
+                for s, t in zip(srcs, tgts):
+                    if t == 'NULL':
+                        del cmap[s]
+                    else:
+                        cmap[s] = t
+                tag = ",".join(f"{s}>{t}" for s, t in zip(srcs, tgts))
+                out.append(dict(cfg, name=f"{cfg['name']}[{tag}]", collapse=cmap))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Corpora and reference
+# ---------------------------------------------------------------------------
+
+def load_corpora():
+    with open(LATIN_PATH, 'r') as f:
+        latin = re.findall(r'\b[a-z]+\b', f.read().lower())
+    with open(OCCITAN_PATH, 'r') as f:
+        occitan = [line.strip().lower() for line in f if line.strip()]
+    with open(VOYNICH_PATH, 'r') as f:
+        voynich = [line.strip() for line in f if line.strip()]
+    return {"latin": latin, "occitan": occitan}, voynich
+
+
+def voynich_reference(tokens):
+    counts = Counter()
+    for token in tokens:
+        for suf in VOYNICH_SUFFIXES:
+            if token.endswith(suf):
+                counts[suf] += 1
+                break
+        else:
+            counts['NULL'] += 1
+    return counts
+
+
+def entropy_bits(counts):
+    c = np.array([v for v in counts.values() if v > 0], dtype=np.float64)
+    if c.sum() == 0:
+        return 0.0
+    p = c / c.sum()
+    return float(-np.sum(p * np.log2(p)))
+
+
+def corpus_segments(cfg, corpora):
+    """
+    [(segment_tokens, collapse_map)] for a configuration; the token lists
+    follow c12 exactly (hybrid prefix shares, Currier A/B position split).
+    """
+    if cfg.get("corpus", "latin") == "hybrid":
+        lat_frac, occ_frac = cfg.get("hybrid", [0.7, 0.3])
+        tokens = (corpora["latin"][:int(len(corpora["latin"]) * lat_frac)] +
+                  corpora["occitan"][:int(len(corpora["occitan"]) * occ_frac)])
+    else:
+        tokens = corpora[cfg.get("corpus", "latin")]
+    split = cfg.get("split")
+    if not split:
+        return [(tokens, cfg["collapse"])]
+    n_a = int(len(tokens) * split["fraction"])
+    return [(tokens[:n_a], cfg["collapse"]), (tokens[n_a:], split["collapse"])]
+
+
+# ---------------------------------------------------------------------------
+# Evaluation (worker side)
+# ---------------------------------------------------------------------------
+#
+# A segment is stored as its distinct compressed types: a count vector and,
+# for every suffix length L the grid uses, the id of each type's last L
+# characters in a shared suffix vocabulary (-1 when the type is shorter).
+# A collapse map then becomes one lookup array per configuration, and the
+# longest-first merge is a few vectorized passes over the types.
+
+_STATE = {}
+
+
+def _init_worker(state):
+    _STATE.update(state)
+
+
+def encode_segment(type_counts, lengths, vocab):
+    """Count vector + per-length suffix ids for a Counter of compressed types."""
+    types = list(type_counts)
+    tails = {}
+    for L in lengths:
+        ids = np.full(len(types), -1, dtype=np.int64)
+        for i, t in enumerate(types):
+            if len(t) >= L:
+                ids[i] = vocab.setdefault(t[-L:], len(vocab))
+        tails[L] = ids
+    counts = np.array([type_counts[t] for t in types], dtype=np.int64)
+    return {"counts": counts, "tails": tails}
+
+
+def collapse_counts(seg, cmap, lengths, vocab):
+    """Label Counter for one encoded segment under a collapse map."""
+    targets = sorted(set(cmap.values()))
+    lut = np.full(len(vocab) + 1, -1, dtype=np.int64)   # last slot: no suffix
+    for src, tgt in cmap.items():
+        sid = vocab.get(src)
+        if sid is not None:
+            lut[sid] = targets.index(tgt)
+    label = np.full(len(seg["counts"]), -1, dtype=np.int64)
+    for L in lengths:
+        hit = lut[seg["tails"][L]]          # -1 ids index the empty last slot
+        label = np.where(label < 0, hit, label)
+    label = np.where(label < 0, len(targets), label)
+    tot = np.bincount(label, weights=seg["counts"], minlength=len(targets) + 1)
+    out = Counter()
+    for name, n in zip(targets + ['NULL'], tot):
+        if n:
+            out[name] += int(n)
+    return out
+
+
+def score(counts, ref_props, ref_entropy):
+    total = sum(counts.values())
+    props = {k: v / total for k, v in counts.items()} if total else {}
+    ent = entropy_bits(counts)
+    dpp = {s: abs(ref_props.get(s, 0) - props.get(s, 0)) * 100 for s in LABELS}
+    common = sorted(set(ref_props) & set(props))
+    corr = (float(np.corrcoef([ref_props[s] for s in common],
+                              [props[s] for s in common])[0, 1])
+            if len(common) >= 5 else 0.0)
+    return {
+        "entropy": ent,
+        "entropy_diff": abs(ref_entropy - ent),
+        "n_types": len(counts),
+        "mean_dpp": sum(dpp.values()) / len(LABELS),
+        "max_dpp": max(dpp.values()),
+        "corr": corr,
+        "props": props,
+        "dpp": dpp,
+    }
+
+
+def evaluate(cfg):
+    """Score one configuration against the reference held in _STATE."""
+    lengths = cfg.get("suffix_lengths", [2, 1])
+    counts = Counter()
+    for seg_key, cmap in _segment_keys(cfg):
+        counts.update(collapse_counts(_STATE["segments"][seg_key], cmap,
+                                      lengths, _STATE["vocab"]))
+    res = score(counts, _STATE["ref_props"], _STATE["ref_entropy"])
+    res["name"] = cfg["name"]
+    return res
+
+
+def _segment_keys(cfg):
+    """Hashable keys for the compressed type tables a configuration needs."""
+    comp = cfg.get("compressor", "standard")
+    corpus = cfg.get("corpus", "latin")
+    mix = tuple(cfg.get("hybrid", [0.7, 0.3])) if corpus == "hybrid" else ()
+    split = cfg.get("split")
+    if not split:
+        return [((comp, corpus, mix, None, 0), cfg["collapse"])]
+    frac = split["fraction"]
+    return [((comp, corpus, mix, frac, 0), cfg["collapse"]),
+            ((comp, corpus, mix, frac, 1), split["collapse"])]
+
+
+def build_segments(grid, corpora):
+    """
+    Encoded compressed-type tables for every (compressor, corpus, split)
+    segment the grid uses, plus the shared suffix vocabulary. Each distinct
+    raw type is compressed once per compressor.
+    """
+    lengths = sorted({L for cfg in grid for L in cfg.get("suffix_lengths", [2, 1])})
+    memo = {name: {} for name in COMPRESSORS}
+    vocab = {}
+    segments = {}
+    for cfg in grid:
+        keys = _segment_keys(cfg)
+        if all(k in segments for k, _ in keys):
+            continue
+        fn = COMPRESSORS[cfg.get("compressor", "standard")]
+        cache = memo[cfg.get("compressor", "standard")]
+        for (key, _), (tokens, _) in zip(keys, corpus_segments(cfg, corpora)):
+            comp = Counter()
+            for t, n in Counter(tokens).items():
+                c = cache.get(t)
+                if c is None:
+                    c = cache[t] = fn(t)
+                comp[c] += n
+            segments[key] = encode_segment(comp, lengths, vocab)
+    return segments, vocab
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+RANK_KEYS = {
+    "entropy": lambda r: (r["entropy_diff"], r["mean_dpp"]),
+    "dpp": lambda r: (r["mean_dpp"], r["entropy_diff"]),
+    "combined": lambda r: (r["rank_entropy"] + r["rank_dpp"], r["entropy_diff"]),
+}
+
+
+def run_sweep(grid, jobs=None, rank_by="combined", chunksize=64):
+    corpora, voynich = load_corpora()
+    ref = voynich_reference(voynich)
+    ref_total = sum(ref.values())
+    segments, vocab = build_segments(grid, corpora)
+    state = {
+        "segments": segments,
+        "vocab": vocab,
+        "ref_props": {k: v / ref_total for k, v in ref.items()},
+        "ref_entropy": entropy_bits(ref),
+    }
+    if jobs == 1:
+        _init_worker(state)
+        results = [evaluate(cfg) for cfg in grid]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(state,)) as ex:
+            results = list(ex.map(evaluate, grid, chunksize=chunksize))
+
+    for key, field in (("rank_entropy", "entropy_diff"), ("rank_dpp", "mean_dpp")):
+        for i, r in enumerate(sorted(results, key=lambda r: r[field]), 1):
+            r[key] = i
+    results.sort(key=RANK_KEYS[rank_by])
+    return results, state
+
+
+def write_tsv(results, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = (["rank", "name", "entropy", "entropy_diff", "n_types", "mean_dpp",
+               "max_dpp", "corr", "rank_entropy", "rank_dpp"] +
+              [f"pct_{s}" for s in LABELS] + [f"dpp_{s}" for s in LABELS])
+    with open(path, 'w') as f:
+        f.write("\t".join(header) + "\n")
+        for i, r in enumerate(results, 1):
+            row = [str(i), r["name"], f"{r['entropy']:.4f}", f"{r['entropy_diff']:.4f}",
+                   str(r["n_types"]), f"{r['mean_dpp']:.3f}", f"{r['max_dpp']:.3f}",
+                   f"{r['corr']:.4f}", str(r["rank_entropy"]), str(r["rank_dpp"])]
+            row += [f"{r['props'].get(s, 0) * 100:.2f}" for s in LABELS]
+            row += [f"{r['dpp'][s]:.2f}" for s in LABELS]
+            f.write("\t".join(row) + "\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep collapse maps against the Voynich suffix reference.")
+    ap.add_argument("--grid", default="builtin",
+                    help="'builtin' or a JSON file with a list of configurations")
+    ap.add_argument("--neighbours", type=int, default=0,
+                    help="add maps within this many source re-targetings (0-2)")
+    ap.add_argument("--jobs", type=int, default=None,
+                    help="worker processes (default: all cores; 1 = in-process)")
+    ap.add_argument("--rank-by", choices=sorted(RANK_KEYS), default="combined")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default=OUT_PATH)
+    args = ap.parse_args()
+
+    if args.grid == "builtin":
+        grid = builtin_grid()
+    else:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    if args.neighbours:
+        grid = grid + [n for cfg in grid for n in neighbours(cfg, args.neighbours)]
+
+    print("=" * 80)
+    print("COLLAPSE-MAP SWEEP")
+    print("=" * 80)
+    print(f"\nConfigurations: {len(grid):,}")
+
+    results, state = run_sweep(grid, jobs=args.jobs, rank_by=args.rank_by)
+    write_tsv(results, args.out)
+
+    print(f"Voynich target: {state['ref_entropy']:.3f} bits, {len(state['ref_props'])} types")
+    print(f"\nTop {min(args.top, len(results))} by {args.rank_by}:")
+    for i, r in enumerate(results[:args.top], 1):
+        print(f"{i:3d}. {r['name'][:48]:48s} H={r['entropy']:.3f} "
+              f"ΔH={r['entropy_diff']:.3f} mean Δ={r['mean_dpp']:4.1f}pp "
+              f"types={r['n_types']}")
+    print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
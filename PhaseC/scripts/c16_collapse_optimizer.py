@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+COLLAPSE-MAP OPTIMIZER
+
+The collapse maps of c12-c14 (AGGRESSIVE_COLLAPSE, CURRIER_A_COLLAPSE,
+TUNED_MAP, ... and code_for_github/tuned_collapse_model.py) were tuned by
+hand. This searches the assignments ending -> Voynich class
+
+    classes: y, NULL, aiin, ol, al, or, ain, ody, am
+
+for a fixed set of endings and minimises
+
+    objective = |H(map) - H(Voynich)| + LAMBDA * sum_s |p_map(s) - p_voy(s)|
+
+With the ending set fixed, every compressed token is claimed by its
+longest ending in the set (or by none), so the corpus reduces once to an
+ending -> count table and a candidate map is scored in O(#endings + 9):
+class counts are sums of ending counts, and a single reassignment only
+moves one count between two classes. An ending assigned 'NULL' stays in
+the set (it still blocks shorter endings), i.e. 'NULL' is an explicit
+value, as when a c12 map returns 'NULL'.
+
+Search: simulated annealing over single-ending reassignments (several
+restarts), then greedy coordinate descent until no single move improves.
+
+Null: the found map's class labels are shuffled across the endings
+(same number of endings per class) N_NULL times; the report gives the
+null mean / sd, the z-score of the optimum and the fraction of shuffled
+maps scoring at least as well.
+
+Usage (from repo root):
+    python PhaseC/scripts/c16_collapse_optimizer.py --base c14_tuned --extra-endings 20
+    -> PhaseC/out/c16_collapse_optimizer.tsv   (ending, count, start/opt class)
+       PhaseC/out/c16_best_map.json            (c15 grid configuration)
+"""
+
+import argparse
+import json
+import math
+import os
+from collections import Counter
+
+import numpy as np
+
+from c15_collapse_sweep import (COMPRESSORS, LABELS, builtin_grid, corpus_segments,
+                                entropy_bits, load_corpora, voynich_reference)
+
+LAMBDA = 1.0
+N_RESTARTS = 8
+N_STEPS = 20000
+T_START = 0.05
+T_END = 1e-4
+N_NULL = 10000
+SEED = 42
+
+OUT_TSV = 'PhaseC/out/c16_collapse_optimizer.tsv'
+OUT_JSON = 'PhaseC/out/c16_best_map.json'
+
+
+# ---------------------------------------------------------------------------
+# Ending -> count table
+# ---------------------------------------------------------------------------
+
+def ending_table(tokens, compressor, endings):
+    """
+    Counts of compressed tokens claimed by each ending (longest ending in
+    the set wins); returns (counts per ending, unclaimed count).
+    """
+    fn = COMPRESSORS[compressor]
+    index = {e: i for i, e in enumerate(endings)}
+    lengths = sorted({len(e) for e in endings}, reverse=True)
+    counts = np.zeros(len(endings), dtype=np.int64)
+    unclaimed = 0
+    for t, n in Counter(tokens).items():
+        c = fn(t)
+        for L in lengths:
+            if len(c) >= L and c[-L:] in index:
+                counts[index[c[-L:]]] += n
+                break
+        else:
+            unclaimed += n
+    return counts, unclaimed
+
+
+def frequent_tails(tokens, compressor, n, exclude, max_len=3):
+    """The n most frequent compressed-token tails (length 1..max_len) not in exclude."""
+    fn = COMPRESSORS[compressor]
+    tails = Counter()
+    for t, k in Counter(tokens).items():
+        c = fn(t)
+        for L in range(1, min(max_len, len(c) - 1) + 1):
+            tails[c[-L:]] += k
+    return [t for t, _ in tails.most_common() if t not in exclude][:n]
+
+
+def inherited_class(ending, cmap):
+    """
+    Class the base map gives a token ending in `ending`: its longest base
+    ending that is a suffix of it, else 'NULL'. Extra endings start there,
+    so the start map scores exactly like the base map.
+    """
+    for L in range(len(ending), 0, -1):
+        if ending[-L:] in cmap:
+            return cmap[ending[-L:]]
+    return 'NULL'
+
+
+# ---------------------------------------------------------------------------
+# Objective
+# ---------------------------------------------------------------------------
+
+class Objective:
+    """Scores class-count vectors (and batches of them) against the reference."""
+
+    def __init__(self, ref_props, ref_entropy, lam=LAMBDA):
+        self.ref = np.array([ref_props.get(s, 0.0) for s in LABELS])
+        self.ref_entropy = ref_entropy
+        self.lam = lam
+
+    def __call__(self, class_counts):
+        C = np.atleast_2d(class_counts).astype(np.float64)
+        P = C / C.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            H = -np.where(P > 0, P * np.log2(P), 0.0).sum(axis=1)
+        dist = np.abs(P - self.ref).sum(axis=1)
+        out = np.abs(H - self.ref_entropy) + self.lam * dist
+        return out if np.ndim(class_counts) == 2 else float(out[0])
+
+
+def class_counts(assign, counts, unclaimed):
+    """Class count vector for an assignment (class index per ending)."""
+    cc = np.bincount(assign, weights=counts, minlength=len(LABELS))
+    cc[LABELS.index('NULL')] += unclaimed
+    return cc
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+def anneal(assign, counts, unclaimed, objective, rng, n_steps=N_STEPS,
+           t_start=T_START, t_end=T_END):
+    """Simulated annealing over single-ending reassignments."""
+    assign = assign.copy()
+    cc = class_counts(assign, counts, unclaimed)
+    cur = objective(cc)
+    best, best_assign = cur, assign.copy()
+    k = len(LABELS)
+    cool = (t_end / t_start) ** (1.0 / max(n_steps - 1, 1))
+    temp = t_start
+    for _ in range(n_steps):
+        e = int(rng.integers(len(assign)))
+        new = int(rng.integers(k - 1))
+        new += new >= assign[e]                 # any class but the current one
+        old = assign[e]
+        cc[old] -= counts[e]
+        cc[new] += counts[e]
+        val = objective(cc)
+        if val <= cur or rng.random() < math.exp((cur - val) / temp):
+            assign[e] = new
+            cur = val
+            if cur < best:
+                best, best_assign = cur, assign.copy()
+        else:
+            cc[new] -= counts[e]
+            cc[old] += counts[e]
+        temp *= cool
+    return best_assign, best
+
+
+def coordinate_descent(assign, counts, unclaimed, objective):
+    """Best single-ending move, repeated until nothing improves."""
+    assign = assign.copy()
+    cc = class_counts(assign, counts, unclaimed)
+    cur = objective(cc)
+    k = len(LABELS)
+    while True:
+        best = (cur, None, None)
+        for e in range(len(assign)):
+            old = assign[e]
+            # all k targets for ending e as one batch
+            batch = np.repeat(cc[None, :], k, axis=0)
+            batch[:, old] -= counts[e]
+            batch[np.arange(k), np.arange(k)] += counts[e]
+            vals = objective(batch)
+            j = int(np.argmin(vals))
+            if vals[j] < best[0] - 1e-12:
+                best = (float(vals[j]), e, j)
+        if best[1] is None:
+            return assign, cur
+        cur, e, j = best
+        cc[assign[e]] -= counts[e]
+        cc[j] += counts[e]
+        assign[e] = j
+
+
+def optimize(assign0, counts, unclaimed, objective, restarts=N_RESTARTS,
+             n_steps=N_STEPS, seed=SEED):
+    """Annealing restarts (the first from assign0, the rest random) + descent."""
+    rng = np.random.default_rng(seed)
+    best_assign, best = None, float("inf")
+    for r in range(restarts):
+        start = assign0 if r == 0 else rng.integers(len(LABELS), size=len(assign0))
+        a, _ = anneal(start, counts, unclaimed, objective, rng, n_steps=n_steps)
+        a, val = coordinate_descent(a, counts, unclaimed, objective)
+        if val < best:
+            best_assign, best = a, val
+    return best_assign, best
+
+
+def shuffled_null(assign, counts, unclaimed, objective, n_null=N_NULL, seed=SEED,
+                  chunk=4096):
+    """Objectives of maps with the same labels shuffled across endings."""
+    rng = np.random.default_rng(seed + 1)
+    k = len(LABELS)
+    m = len(assign)
+    null_idx = LABELS.index('NULL')
+    vals = []
+    done = 0
+    while done < n_null:
+        b = min(chunk, n_null - done)
+        perm = np.argsort(rng.random((b, m)), axis=1)
+        labels = assign[perm]                               # (b x m)
+        flat = (labels + (np.arange(b) * k)[:, None]).ravel()
+        cc = np.bincount(flat, weights=np.tile(counts, b),
+                         minlength=b * k).reshape(b, k)
+        cc[:, null_idx] += unclaimed
+        vals.append(objective(cc))
+        done += b
+    return np.concatenate(vals)
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main():
+    bases = {cfg["name"]: cfg for cfg in builtin_grid() if not cfg.get("split")}
+    ap = argparse.ArgumentParser(description="Optimise a collapse map against the Voynich suffix reference.")
+    ap.add_argument("--base", choices=sorted(bases), default="c14_tuned",
+                    help="built-in configuration giving corpus, compressor, endings and start map")
+    ap.add_argument("--extra-endings", type=int, default=0,
+                    help="add the N most frequent compressed tails not in the base map")
+    ap.add_argument("--lambda", dest="lam", type=float, default=LAMBDA)
+    ap.add_argument("--restarts", type=int, default=N_RESTARTS)
+    ap.add_argument("--steps", type=int, default=N_STEPS)
+    ap.add_argument("--null", type=int, default=N_NULL)
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args()
+
+    base = bases[args.base]
+    corpora, voynich = load_corpora()
+    ref = voynich_reference(voynich)
+    ref_total = sum(ref.values())
+    objective = Objective({k: v / ref_total for k, v in ref.items()},
+                          entropy_bits(ref), lam=args.lam)
+
+    (tokens, _), = corpus_segments(base, corpora)
+    endings = sorted(base["collapse"])
+    endings += frequent_tails(tokens, base["compressor"], args.extra_endings, set(endings))
+    counts, unclaimed = ending_table(tokens, base["compressor"], endings)
+    assign0 = np.array([LABELS.index(inherited_class(e, base["collapse"])) for e in endings])
+
+    print("=" * 80)
+    print("COLLAPSE-MAP OPTIMIZER")
+    print("=" * 80)
+    print(f"\nBase: {args.base} ({base['corpus']}, {base['compressor']}), "
+          f"{len(endings)} endings, {unclaimed:,} unclaimed tokens")
+
+    start = objective(class_counts(assign0, counts, unclaimed))
+    best_assign, best = optimize(assign0, counts, unclaimed, objective,
+                                 restarts=args.restarts, n_steps=args.steps,
+                                 seed=args.seed)
+    null = shuffled_null(best_assign, counts, unclaimed, objective,
+                         n_null=args.null, seed=args.seed)
+    null_mean, null_sd = float(null.mean()), float(null.std())
+    z = (best - null_mean) / null_sd if null_sd > 0 else float("nan")
+    frac = (np.sum(null <= best) + 1) / (len(null) + 1)
+
+    cc = class_counts(best_assign, counts, unclaimed)
+    props = cc / cc.sum()
+    H = entropy_bits(dict(zip(LABELS, cc)))
+    print(f"\nObjective (|ΔH| + {args.lam:g} * L1):")
+    print(f"  start map : {start:.4f}")
+    print(f"  optimized : {best:.4f}  (H={H:.3f} vs Voynich {objective.ref_entropy:.3f})")
+    print(f"  shuffled-label null: mean={null_mean:.4f} sd={null_sd:.4f} "
+          f"z={z:.2f} P(null <= opt)={frac:.4g} (n={len(null):,})")
+
+    print("\nDistribution:")
+    for i, s in enumerate(LABELS):
+        v = objective.ref[i] * 100
+        r = props[i] * 100
+        print(f"  {s:4s}: Voy={v:5.1f}% Opt={r:5.1f}% Δ={abs(v - r):4.1f}pp")
+
+    os.makedirs(os.path.dirname(OUT_TSV), exist_ok=True)
+    with open(OUT_TSV, 'w') as f:
+        f.write("ending\tcount\tstart_class\topt_class\n")
+        for e, n, a0, a in zip(endings, counts, assign0, best_assign):
+            f.write(f"{e}\t{n}\t{LABELS[a0]}\t{LABELS[a]}\n")
+    cfg = dict(base, name=f"c16_opt_{args.base}",
+               suffix_lengths=sorted({len(e) for e in endings}, reverse=True),
+               collapse={e: LABELS[a] for e, a in zip(endings, best_assign)})
+    with open(OUT_JSON, 'w') as f:
+        json.dump([cfg], f, indent=2)
+    print(f"\nWrote {OUT_TSV}")
+    print(f"Wrote {OUT_JSON} (usable as c15_collapse_sweep.py --grid)")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ Input:  PhaseM/out/m01_suffix_inventory.tsv
 Output: PhaseM/validation/v01_bootstrap_results.tsv
 
 Methodology:
-1. Bootstrap resampling (1000 iterations)
+1. Bootstrap resampling (1000 iterations, batched count vectors)
 2. Calculate 95% confidence intervals
 3. Test stability of key findings
 
@@ -19,10 +19,14 @@ Author: Voynich Research Team
 Date: 2025-01-21
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from collections import Counter
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
+from bootstrap_engine import (encode, bootstrap_counts, type_token_ratio,
+                              top_k_share, hapax_proportion)
 
 # Paths
 BASE = Path(__file__).parent.parent.parent
@@ -40,8 +44,6 @@ print("="*80)
 print("V01: BOOTSTRAP CONFIDENCE INTERVALS")
 print("="*80)
 
-np.random.seed(RANDOM_SEED)
-
 # Load data
 print(f"\nLoading data...")
 df_tokens = pd.read_csv(INPUT_TOKENS, sep='\t')
@@ -56,29 +58,24 @@ def bootstrap_statistic(data, statistic_func, n_bootstrap=1000):
     Bootstrap a statistic with confidence intervals.
     
     Args:
-        data: array-like data
-        statistic_func: function that takes data and returns a statistic
+        data: array-like data (category labels)
+        statistic_func: function that takes a (B x k) matrix of category
+            counts and returns one statistic per row (see bootstrap_engine)
         n_bootstrap: number of bootstrap samples
     
     Returns:
         dict with point_estimate, ci_lower, ci_upper
     """
-    n = len(data)
-    bootstrap_stats = []
-    
-    for _ in range(n_bootstrap):
-        # Resample with replacement
-        sample = np.random.choice(data, size=n, replace=True)
-        stat = statistic_func(sample)
-        bootstrap_stats.append(stat)
-    
-    bootstrap_stats = np.array(bootstrap_stats)
+    # Labels are encoded once; all resamples are drawn as count vectors
+    codes, _ = encode(data)
+    boot = bootstrap_counts(codes, statistic_func, n_boot=n_bootstrap,
+                            seed=RANDOM_SEED)
     
     return {
-        'point_estimate': statistic_func(data),
-        'ci_lower': np.percentile(bootstrap_stats, 2.5),
-        'ci_upper': np.percentile(bootstrap_stats, 97.5),
-        'std_error': np.std(bootstrap_stats)
+        'point_estimate': boot['point'],
+        'ci_lower': boot['ci_lower'],
+        'ci_upper': boot['ci_upper'],
+        'std_error': boot['std_error']
     }
 
 print(f"\n{'='*80}")
@@ -104,8 +101,7 @@ for _, row in df_tokens.iterrows():
 
 suffixes = np.array(suffixes)
 
-def suffix_ttr(data):
-    return len(set(data)) / len(data)
+suffix_ttr = type_token_ratio
 
 suffix_ttr_boot = bootstrap_statistic(suffixes, suffix_ttr, N_BOOTSTRAP)
 results.append({
@@ -130,8 +126,7 @@ for _, row in df_tokens.iterrows():
 
 stems = np.array(stems)
 
-def stem_ttr(data):
-    return len(set(data)) / len(data)
+stem_ttr = type_token_ratio
 
 stem_ttr_boot = bootstrap_statistic(stems, stem_ttr, N_BOOTSTRAP)
 results.append({
@@ -147,10 +142,7 @@ print(f"  95% CI: [{stem_ttr_boot['ci_lower']:.6f}, {stem_ttr_boot['ci_upper']:.
 
 # 3. Top suffix concentration (top 3 suffixes)
 print("\n3. Top 3 suffix concentration...")
-def top3_concentration(data):
-    counts = Counter(data)
-    top3_count = sum([count for _, count in counts.most_common(3)])
-    return top3_count / len(data)
+top3_concentration = top_k_share(3)
 
 top3_boot = bootstrap_statistic(suffixes, top3_concentration, N_BOOTSTRAP)
 results.append({
@@ -166,10 +158,7 @@ print(f"  95% CI: [{top3_boot['ci_lower']:.4f}, {top3_boot['ci_upper']:.4f}]")
 
 # 4. Top 10 stem concentration
 print("\n4. Top 10 stem concentration...")
-def top10_concentration(data):
-    counts = Counter(data)
-    top10_count = sum([count for _, count in counts.most_common(10)])
-    return top10_count / len(data)
+top10_concentration = top_k_share(10)
 
 top10_boot = bootstrap_statistic(stems, top10_concentration, N_BOOTSTRAP)
 results.append({
@@ -185,11 +174,6 @@ print(f"  95% CI: [{top10_boot['ci_lower']:.4f}, {top10_boot['ci_upper']:.4f}]")
 
 # 5. Hapax proportion for stems
 print("\n5. Hapax stem proportion...")
-def hapax_proportion(data):
-    counts = Counter(data)
-    hapax = sum(1 for count in counts.values() if count == 1)
-    return hapax / len(counts)
-
 hapax_boot = bootstrap_statistic(stems, hapax_proportion, N_BOOTSTRAP)
 results.append({
     'statistic': 'hapax_stem_proportion',
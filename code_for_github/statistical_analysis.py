@@ -9,6 +9,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 from collections import Counter
 import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from bootstrap_engine import encode, bootstrap_counts, entropy_bits
 
 print("="*80)
 print("DOING REAL WORK - NO SCIPY")
@@ -121,25 +126,16 @@ print(f"   Latin entropy: {latin_entropy:.3f} bits")
 # =============================================================================
 
 print("\n3. Running ACTUAL bootstrap resampling (1,000 iterations)...")
-print("   This will take ~30 seconds...")
 
 def bootstrap_entropy(tokens, extract_func, n_iter=1000):
-    """Actually resample and calculate entropy"""
-    n_tokens = len(tokens)
-    entropies = []
-    
-    for i in range(n_iter):
-        # Resample with replacement
-        indices = np.random.randint(0, n_tokens, size=n_tokens)
-        resampled = [tokens[idx] for idx in indices]
-        suffixes = Counter(extract_func(t) for t in resampled)
-        entropy = calc_entropy(suffixes)
-        entropies.append(entropy)
-        
-        if (i+1) % 200 == 0:
-            print(f"      {i+1}/{n_iter} iterations...")
-    
-    return np.array(entropies)
+    """Actually resample and calculate entropy
+
+    Suffixes are encoded once; all n_iter resamples are drawn as multinomial
+    count vectors (same distribution as resampling tokens with replacement).
+    """
+    codes, _ = encode(extract_func(t) for t in tokens)
+    seed = np.random.randint(2**31 - 1)   # follows np.random.seed above
+    return bootstrap_counts(codes, entropy_bits, n_boot=n_iter, seed=seed)["samples"]
 
 # Actually run bootstrap
 np.random.seed(42)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Suffix-array miner for frequent prefixes, suffixes and chargrams of a type inventory
+
+p70_mine_uncovered_patterns.py counted the first / last 1..MAX_LEN (=3)
+characters of every running token in two Counters, and the p70d
+evaluators re-derived corpus hits for each candidate separately. Every
+frequency involved depends only on the type inventory, so here:
+
+    text      the distinct types back to back as small ints, 0 between
+              types (forward, and a second copy with every type reversed)
+    SA        prefix doubling (numpy lexsort) until the compared prefix is
+              longer than the longest type, so suffixes are grouped by
+              their within-type prefix; the LCP of adjacent suffixes is
+              counted up to the type separator (never across types)
+    nodes     one bottom-up stack pass over the LCP array yields every
+              LCP interval, i.e. every set of suffixes sharing a prefix;
+              an interval with lcp l under a parent with lcp p stands for
+              the substrings of lengths p+1..l, single suffixes for the
+              lengths up to the end of their type
+    kinds     prefix    forward SA restricted to type starts
+              suffix    reversed SA restricted to type starts
+              chargram  the full forward SA (any position in a type)
+
+Each row (pattern, length) carries weighted counts over the types that
+contain it: `tokens` (sum of type weights, each type once) plus any extra
+weight vectors passed in (e.g. corpus totals, rulebook-covered tokens),
+`occurrences` (chargram hits inside a type counted separately) and
+`n_types`. `closed` marks the longest pattern of each interval, i.e. the
+most specific string with that exact set of types.
+
+Weights are arbitrary per-type vectors (token frequency by default), so
+the same index answers "frequent among uncovered tokens" and "corpus hits"
+without rescanning anything.
+
+Usage (library):
+
+    from affix_miner import AffixIndex
+    idx = AffixIndex(type_counts)                           # {type: count}
+    rows = idx.mine("prefix", min_freq=30)                  # all lengths
+    rows = idx.mine("chargram", min_freq=30, weights=w_uncov,
+                    extra={"corpus": w_all}, min_len=2)
+    X = idx.row_incidence("suffix", rows)                   # types x rows (0/1), scipy CSR
+
+Usage (CLI):
+
+    python3 scripts/affix_miner.py --tokens p6_voynich_tokens.txt --min-freq 30 --out out/affixes.tsv
+
+Requires numpy + scipy.
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+KINDS = ("prefix", "suffix", "chargram")
+MIN_FREQ = 30
+
+
+# -------------
+# Suffix array + LCP
+# -------------
+
+def _encode(types):
+    """Types -> int text (chars 1..K, 0 after every type), type id and offset per position."""
+    lengths = np.fromiter(map(len, types), dtype=np.int64, count=len(types))
+    cp = np.frombuffer("".join(types).encode("utf-32-le"), dtype=np.uint32)
+    _, codes = np.unique(cp, return_inverse=True)
+    n = int(lengths.sum()) + len(types)
+    text = np.zeros(n, dtype=np.int64)
+    ends = np.cumsum(lengths + 1) - 1                      # separator positions
+    starts = ends - lengths
+    is_char = np.ones(n, dtype=bool)
+    is_char[ends] = False
+    text[is_char] = codes + 1
+    tid = np.repeat(np.arange(len(types)), lengths + 1)
+    off = np.arange(n) - np.repeat(starts, lengths + 1)
+    return text, tid, off, starts
+
+
+def suffix_order(text, depth):
+    """
+    Suffix positions of text sorted by their first `depth` symbols
+    (prefix doubling; ties beyond depth are left in arbitrary order).
+    """
+    n = len(text)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = np.unique(text, return_inverse=True)[1].astype(np.int64)
+    k = 1
+    sa = np.argsort(rank, kind="stable")
+    while k < depth:
+        key2 = np.zeros(n, dtype=np.int64)
+        key2[:n - k] = rank[k:] + 1
+        sa = np.lexsort((key2, rank))
+        r, r2 = rank[sa], key2[sa]
+        new = np.empty(n, dtype=np.int64)
+        new[sa] = np.concatenate([[0], np.cumsum((r[1:] != r[:-1]) | (r2[1:] != r2[:-1]))])
+        rank = new
+        if rank[sa[-1]] == n - 1:
+            break
+        k *= 2
+    return sa
+
+
+def capped_lcp(text, sa, max_len):
+    """lcp[i] = common within-type prefix of suffixes sa[i-1] and sa[i] (lcp[0] = 0)."""
+    n = len(sa)
+    lcp = np.zeros(n, dtype=np.int64)
+    if n < 2:
+        return lcp
+    padded = np.concatenate([text, np.zeros(max_len + 1, dtype=text.dtype)])
+    alive = np.ones(n - 1, dtype=bool)
+    for d in range(max_len):
+        a = padded[sa[1:] + d]
+        alive &= (a == padded[sa[:-1] + d]) & (a != 0)
+        if not alive.any():
+            break
+        lcp[1:] += alive
+    return lcp
+
+
+def lcp_intervals(lcp, leaf_len):
+    """
+    Yield (lb, rb, lo, hi): suffixes lb..rb (SA order) share exactly the
+    substrings of lengths lo..hi. Internal intervals come from the LCP
+    array, single suffixes (lb == rb) run up to leaf_len (end of type).
+    """
+    n = len(lcp)
+    nxt = np.append(lcp[1:], 0)
+    for i, (a, b, L) in enumerate(zip(lcp.tolist(), nxt.tolist(), leaf_len.tolist())):
+        parent = a if a > b else b
+        if L > parent:
+            yield i, i, parent + 1, L
+    stack = [[0, 0]]                                      # [lcp, lb]
+    lcp_l = lcp.tolist()
+    for i in range(1, n + 1):
+        cur = lcp_l[i] if i < n else 0
+        lb = i - 1
+        while cur < stack[-1][0]:
+            top_lcp, top_lb = stack.pop()
+            parent = max(cur, stack[-1][0])
+            yield top_lb, i - 1, parent + 1, top_lcp
+            lb = top_lb
+        if cur > stack[-1][0]:
+            stack.append([cur, lb])
+
+
+# -------------
+# Index
+# -------------
+
+class _Side:
+    """SA + LCP over one text, optionally restricted to type starts."""
+
+    def __init__(self, text, tid, off, max_len, starts_only):
+        sa = suffix_order(text, max_len + 1)
+        sa = sa[text[sa] != 0]                             # separators start no pattern
+        if starts_only:
+            sa = sa[off[sa] == 0]
+        self.sa = sa
+        self.tid = tid[sa]
+        self.off = off[sa]
+        self.lcp = capped_lcp(text, sa, max_len)
+
+
+class AffixIndex:
+    """Frequent prefixes / suffixes / chargrams of a weighted type inventory."""
+
+    def __init__(self, type_counts):
+        self.types = sorted(t for t in type_counts if t)
+        self.ids = {t: i for i, t in enumerate(self.types)}
+        self.counts = np.array([type_counts[t] for t in self.types], dtype=np.float64)
+        self.lengths = np.fromiter(map(len, self.types), dtype=np.int64, count=len(self.types))
+        self.max_len = int(self.lengths.max()) if len(self.types) else 0
+        fwd = _encode(self.types)
+        rev = _encode([t[::-1] for t in self.types])
+        self._text = {"fwd": fwd, "rev": rev}
+        self._sides = {}
+
+    def side(self, kind):
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r} (expected one of {KINDS})")
+        s = self._sides.get(kind)
+        if s is None:
+            text, tid, off, _ = self._text["rev" if kind == "suffix" else "fwd"]
+            s = self._sides[kind] = _Side(text, tid, off, self.max_len, kind != "chargram")
+        return s
+
+    def _pattern(self, kind, tid, off, k):
+        t = self.types[tid]
+        if kind == "suffix":
+            return t[len(t) - k:]
+        return t[off:off + k]
+
+    def mine(self, kind, min_freq=MIN_FREQ, weights=None, extra=None, min_len=1, max_len=None):
+        """
+        Rows (dicts) for every pattern of the kind whose weighted token count
+        (each containing type once) is >= min_freq: kind, pattern, length,
+        tokens, occurrences, n_types, closed, one column per `extra` weight
+        vector, and lb / rb (the SA interval, see types_of()).
+        """
+        s = self.side(kind)
+        w = self.counts if weights is None else np.asarray(weights, dtype=np.float64)
+        extra = extra or {}
+        row_w = w[s.tid]
+        csum = np.concatenate([[0.0], np.cumsum(row_w)])
+        leaf_len = self.lengths[s.tid] - s.off
+        max_len = self.max_len if max_len is None else max_len
+        distinct = kind == "chargram"
+
+        rows = []
+        for lb, rb, lo, hi in lcp_intervals(s.lcp, leaf_len):
+            occ = csum[rb + 1] - csum[lb]
+            if occ < min_freq:                              # tokens <= occurrences
+                continue
+            lo, top = max(lo, min_len), min(hi, max_len)
+            if lo > top:
+                continue
+            if distinct and rb > lb:
+                tids = np.unique(s.tid[lb:rb + 1])
+            else:
+                tids = s.tid[lb:rb + 1]
+            tokens = float(w[tids].sum())
+            if tokens < min_freq:
+                continue
+            ex = {name: float(np.asarray(v, dtype=np.float64)[tids].sum()) for name, v in extra.items()}
+            n_types = int((w[tids] > 0).sum())
+            for k in range(lo, top + 1):
+                rows.append({
+                    "kind": kind,
+                    "pattern": self._pattern(kind, int(s.tid[lb]), int(s.off[lb]), k),
+                    "length": k,
+                    "tokens": tokens,
+                    "occurrences": float(occ),
+                    "n_types": n_types,
+                    "closed": k == hi,
+                    **ex,
+                    "lb": lb,
+                    "rb": rb,
+                })
+        return rows
+
+    def types_of(self, kind, row):
+        """Type ids carrying a mined row's pattern."""
+        s = self.side(kind)
+        return np.unique(s.tid[row["lb"]:row["rb"] + 1])
+
+    def row_incidence(self, kind, rows):
+        """Sparse (types x rows) 0/1 matrix for mined rows, straight from their SA intervals."""
+        r_idx, c_idx = [], []
+        for j, row in enumerate(rows):
+            tids = self.types_of(kind, row)
+            r_idx.append(tids)
+            c_idx.append(np.full(len(tids), j))
+        r = np.concatenate(r_idx) if r_idx else np.zeros(0, dtype=np.int64)
+        c = np.concatenate(c_idx) if c_idx else np.zeros(0, dtype=np.int64)
+        return sparse.csr_matrix((np.ones(len(r)), (r, c)), shape=(len(self.types), len(rows)))
+
+
+def mine_all(index, min_freq=MIN_FREQ, weights=None, extra=None, min_len=1, max_len=None, kinds=KINDS):
+    """Rows of every kind, each kind sorted by (-tokens, -length, pattern)."""
+    out = []
+    for kind in kinds:
+        rows = index.mine(kind, min_freq, weights, extra, min_len, max_len)
+        rows.sort(key=lambda r: (-r["tokens"], -r["length"], r["pattern"]))
+        out.extend(rows)
+    return out
+
+
+# -------------
+# Output
+# -------------
+
+def write_rows(path, rows, extra_cols=()):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("\t".join(["kind", "pattern", "length", "tokens", "occurrences", "n_types",
+                             "closed", *extra_cols]) + "\n")
+        for r in rows:
+            vals = [r["kind"], r["pattern"], str(r["length"]), f"{r['tokens']:g}",
+                    f"{r['occurrences']:g}", str(r["n_types"]), "1" if r["closed"] else "0"]
+            vals += [f"{r[c]:g}" if isinstance(r[c], float) else str(r[c]) for c in extra_cols]
+            out.write("\t".join(vals) + "\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Frequent prefixes / suffixes / chargrams by suffix array")
+    ap.add_argument("--tokens", required=True, help="token file (whitespace separated)")
+    ap.add_argument("--min-freq", type=float, default=MIN_FREQ)
+    ap.add_argument("--min-len", type=int, default=1)
+    ap.add_argument("--max-len", type=int, default=0, help="0 = no limit")
+    ap.add_argument("--kinds", default=",".join(KINDS))
+    ap.add_argument("--closed", action="store_true", help="only the longest pattern per interval")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    if not os.path.isfile(args.tokens):
+        raise SystemExit(f"[ERR] Tokens file not found: {args.tokens}")
+    with open(args.tokens, encoding="utf-8") as f:
+        counts = Counter(f.read().split())
+    idx = AffixIndex(counts)
+    kinds = [k for k in args.kinds.split(",") if k]
+    rows = mine_all(idx, args.min_freq, min_len=args.min_len,
+                    max_len=args.max_len or None, kinds=kinds)
+    if args.closed:
+        rows = [r for r in rows if r["closed"]]
+    write_rows(args.out, rows)
+    by_kind = Counter(r["kind"] for r in rows)
+    print(f"[INFO] {len(idx.types)} types, {sum(counts.values())} tokens; "
+          + ", ".join(f"{k}: {by_kind[k]}" for k in kinds), file=sys.stderr)
+    print(f"[OK] Wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Batched bootstrap engine over integer-encoded category counts
+
+The bootstrap loops in code_for_github/statistical_analysis.py,
+do_real_work.py, PhaseM/scripts/v01_bootstrap_confidence_intervals.py and
+N6_Validation/n6_test5_entropy.py each resampled the raw token list one
+iteration at a time and recounted it with Counter. Most of their
+statistics (entropy, proportions, type/token ratios, top-k shares, hapax
+rates) depend only on the category counts, so here:
+
+    1. each token's category is encoded as an integer once (encode),
+    2. B resampled count vectors are drawn per chunk as one matrix:
+         iid    multinomial(n, observed proportions)  == token resampling
+         block  folios resampled with replacement; counts = W @ folio_counts
+    3. the statistic is evaluated row-wise on the (chunk x k) count matrix.
+
+Chunks are sized so chunk * k stays under MAX_CELLS, which bounds memory
+whatever B is. Statistics that depend on token order (e.g. bigrams of the
+resampled sequence) can use index_matrix_chunks instead.
+
+Confidence intervals:
+
+    percentile   empirical alpha/2, 1 - alpha/2 quantiles
+    bca          bias-corrected and accelerated; the jackknife runs on the
+                 count vector too (leave-one-token-out has only k distinct
+                 values, leave-one-folio-out one per folio)
+
+Usage (library):
+
+    from bootstrap_engine import encode, bootstrap_counts, entropy_bits
+    codes, vocab = encode(suffixes)
+    res = bootstrap_counts(codes, entropy_bits, n_boot=10000, ci="bca", seed=42)
+    res["point"], res["ci_lower"], res["ci_upper"], res["samples"]
+
+Requires numpy.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+
+MAX_CELLS = 1 << 22   # ~4M cells per chunk matrix
+
+
+# -------------
+# Encoding and resampling
+# -------------
+
+def encode(labels):
+    """Integer codes for a label sequence; returns (codes, vocab)."""
+    vocab, codes = np.unique(np.asarray(list(labels), dtype=object).astype(str),
+                             return_inverse=True)
+    return codes.astype(np.int64), list(vocab)
+
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _rows_per_chunk(width, chunk):
+    if chunk:
+        return chunk
+    return max(1, MAX_CELLS // max(width, 1))
+
+
+def block_counts(codes, blocks, k):
+    """(n_blocks x k) category counts per block (e.g. per folio)."""
+    _, block_idx = np.unique(np.asarray(blocks, dtype=object).astype(str),
+                             return_inverse=True)
+    n_blocks = int(block_idx.max()) + 1 if len(block_idx) else 0
+    flat = block_idx.astype(np.int64) * k + codes
+    return np.bincount(flat, minlength=n_blocks * k).reshape(n_blocks, k)
+
+
+def count_matrix_chunks(codes, n_boot, seed=None, k=None, blocks=None, chunk=None):
+    """
+    Yield (b x k) bootstrap count matrices until n_boot rows are produced.
+
+    blocks=None   iid token resampling (multinomial on observed counts)
+    blocks=seq    block bootstrap: one block label per token; blocks are
+                  drawn with replacement, as many as there are blocks
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    k = int(codes.max()) + 1 if k is None else k
+    rng = _rng(seed)
+    rows = _rows_per_chunk(k, chunk)
+
+    if blocks is None:
+        n = len(codes)
+        p = np.bincount(codes, minlength=k) / n
+        done = 0
+        while done < n_boot:
+            b = min(rows, n_boot - done)
+            yield rng.multinomial(n, p, size=b)
+            done += b
+        return
+
+    per_block = block_counts(codes, blocks, k)
+    m = per_block.shape[0]
+    rows = min(rows, _rows_per_chunk(m, chunk))
+    done = 0
+    while done < n_boot:
+        b = min(rows, n_boot - done)
+        draws = rng.integers(0, m, size=(b, m))
+        flat = (draws + (np.arange(b, dtype=np.int64) * m)[:, None]).ravel()
+        weights = np.bincount(flat, minlength=b * m).reshape(b, m)
+        yield weights @ per_block
+        done += b
+
+
+def index_matrix_chunks(n, n_boot, seed=None, chunk=None):
+    """Yield (b x n) resampled index matrices, for order-dependent statistics."""
+    rng = _rng(seed)
+    rows = _rows_per_chunk(n, chunk)
+    done = 0
+    while done < n_boot:
+        b = min(rows, n_boot - done)
+        yield rng.integers(0, n, size=(b, n))
+        done += b
+
+
+# -------------
+# Row-wise statistics on count matrices (C: b x k)
+# -------------
+
+def entropy_bits(C):
+    """Shannon entropy (bits) of each row's distribution."""
+    C = np.atleast_2d(C).astype(np.float64)
+    tot = C.sum(axis=1, keepdims=True)
+    P = np.divide(C, tot, out=np.zeros_like(C), where=tot > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L = np.where(P > 0, np.log2(P), 0.0)
+    return -(P * L).sum(axis=1)
+
+
+def proportion(j):
+    """Statistic: share of category j in each row."""
+    def stat(C):
+        C = np.atleast_2d(C)
+        return C[:, j] / C.sum(axis=1)
+    return stat
+
+
+def type_token_ratio(C):
+    """Observed categories / tokens, per row."""
+    C = np.atleast_2d(C)
+    return (C > 0).sum(axis=1) / C.sum(axis=1)
+
+
+def top_k_share(top):
+    """Statistic: share of the `top` most frequent categories in each row."""
+    def stat(C):
+        C = np.atleast_2d(C)
+        t = min(top, C.shape[1])
+        part = np.partition(C, C.shape[1] - t, axis=1)[:, C.shape[1] - t:]
+        return part.sum(axis=1) / C.sum(axis=1)
+    return stat
+
+
+def hapax_proportion(C):
+    """Categories seen exactly once / categories seen, per row."""
+    C = np.atleast_2d(C)
+    return (C == 1).sum(axis=1) / (C > 0).sum(axis=1)
+
+
+# -------------
+# Confidence intervals
+# -------------
+
+def _jackknife(codes, stat, k, blocks=None, chunk=None):
+    """Leave-one-out statistics and their weights, computed on counts."""
+    total = np.bincount(codes, minlength=k)
+    if blocks is None:
+        cats = np.flatnonzero(total)
+        base, weights = total[None, :], total[cats]
+        drops = cats
+        rows = _rows_per_chunk(k, chunk)
+        vals = []
+        for s in range(0, len(drops), rows):
+            d = drops[s:s + rows]
+            C = np.repeat(base, len(d), axis=0)
+            C[np.arange(len(d)), d] -= 1
+            vals.append(stat(C))
+        return np.concatenate(vals), weights.astype(np.float64)
+    per_block = block_counts(codes, blocks, k)
+    return stat(total[None, :] - per_block), np.ones(per_block.shape[0])
+
+
+def confidence_interval(samples, point, alpha=0.05, method="percentile",
+                        jack=None, jack_weights=None):
+    """(lower, upper) from bootstrap samples; method 'percentile' or 'bca'."""
+    lo_q, hi_q = alpha / 2, 1 - alpha / 2
+    if method == "percentile":
+        return tuple(np.quantile(samples, [lo_q, hi_q]))
+    if method != "bca":
+        raise ValueError("method must be 'percentile' or 'bca'")
+
+    nd = NormalDist()
+    prop = np.mean(samples < point)
+    prop = min(max(prop, 1.0 / (len(samples) + 1)), 1 - 1.0 / (len(samples) + 1))
+    z0 = nd.inv_cdf(prop)
+
+    w = np.ones(len(jack)) if jack_weights is None else jack_weights
+    mean_j = np.sum(w * jack) / np.sum(w)
+    d = mean_j - jack
+    denom = 6.0 * np.sum(w * d ** 2) ** 1.5
+    a = np.sum(w * d ** 3) / denom if denom > 0 else 0.0
+
+    out = []
+    for q in (lo_q, hi_q):
+        zq = nd.inv_cdf(q)
+        adj = nd.cdf(z0 + (z0 + zq) / (1 - a * (z0 + zq)))
+        out.append(float(np.quantile(samples, adj)))
+    return tuple(out)
+
+
+def bootstrap_counts(codes, stat, n_boot=1000, seed=None, ci="percentile",
+                     alpha=0.05, blocks=None, k=None, chunk=None):
+    """
+    Bootstrap a count-based statistic.
+
+    codes   integer category per token (see encode)
+    stat    function (b x k count matrix) -> (b,) values
+    ci      'percentile' or 'bca'
+    blocks  optional block label per token for the block bootstrap
+
+    Returns dict: point, samples, mean, std_error, ci_lower, ci_upper, method.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    k = int(codes.max()) + 1 if k is None else k
+    point = float(stat(np.bincount(codes, minlength=k)[None, :])[0])
+    samples = np.concatenate([
+        stat(C) for C in count_matrix_chunks(codes, n_boot, seed=seed, k=k,
+                                             blocks=blocks, chunk=chunk)
+    ])
+    jack = weights = None
+    if ci == "bca":
+        jack, weights = _jackknife(codes, stat, k, blocks=blocks, chunk=chunk)
+    lo, hi = confidence_interval(samples, point, alpha, ci, jack, weights)
+    return {
+        "point": point,
+        "samples": samples,
+        "mean": float(samples.mean()),
+        "std_error": float(samples.std()),
+        "ci_lower": float(lo),
+        "ci_upper": float(hi),
+        "method": ci,
+    }
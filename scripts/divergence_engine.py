@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Blocked, vectorized divergence matrices over sparse count rows
+
+s24_run_frame_js.sh kept each family's pattern distribution as a dict and
+computed Jensen-Shannon for every pair with Python loops over the union
+support (and did it twice, once per output file). That is fine for a
+dozen families and hopeless for thousands of families or stems.
+
+Here all rows (families, stems, folios...) are packed into one CSR count
+matrix C over a shared column vocabulary; P = C / rowsum(C). Every
+measure is evaluated for a block of rows against all rows at once:
+
+    cosine     X X^T with X = row-L2-normalised C            (similarity)
+    hellinger  sqrt(1 - sqrt(P) sqrt(P)^T)                   (0..1)
+    kl         KL(P_i || P_j), bits, q smoothed to max(q, eps) as in s24:
+                   A_i - P L^T,  A_i = sum_x p log2(p / eps),
+                   L = log2(q / eps) on the support of Q
+    js         Jensen-Shannon, bits; only columns both rows use matter:
+                   (s_i + s_j) / 2 + 1/2 sum_both [p log2(p/(p+q))
+                                                   + q log2(q/(p+q))]
+               the shared-column terms are generated as (i, j) entry pairs
+               per column from the CSC layout and summed with bincount
+
+cosine, hellinger and kl are sparse matrix products; js costs sum over
+columns of (rows using the column)^2 pairs, chunked so no temporary
+exceeds MAX_CELLS. Blocks of `block` rows bound the dense output, so
+top_k() can rank the nearest rows for tens of thousands of rows without
+ever holding the n x n matrix.
+
+Usage (library):
+
+    from divergence_engine import count_matrix, divergence_matrix, top_k
+    C, rows, cols = count_matrix(triples)        # (row, col, count) triples
+    D = divergence_matrix(C, "js")               # dense n x n, bits
+    idx, val = top_k(C, "js", k=5)               # 5 nearest rows per row
+
+Usage (CLI, long or wide TSV):
+
+    python3 scripts/divergence_engine.py PhaseS/out/s21_family_frames.tsv \\
+        --row family --col pattern --count count --measure js --top-k 5
+    python3 scripts/divergence_engine.py PhaseS/out/s55_stem_register_counts.tsv \\
+        --row token --value-cols count_A,count_B --measure hellinger --top-k 10
+
+Requires numpy + scipy.
+"""
+
+import argparse
+import csv
+import sys
+
+import numpy as np
+from scipy import sparse
+
+MAX_CELLS = 1 << 22
+BLOCK_ROWS = 512
+KL_EPS = 1e-15
+
+MEASURES = ("js", "kl", "hellinger", "cosine")
+SIMILARITIES = ("cosine",)
+
+
+# -------------
+# Packing
+# -------------
+
+def count_matrix(triples, rows=None, cols=None):
+    """
+    CSR (rows x cols) float64 counts from (row, col, count) triples;
+    duplicates are summed. Row/column labels are sorted unless given.
+    """
+    r_lab, c_lab, vals = [], [], []
+    for r, c, v in triples:
+        r_lab.append(r)
+        c_lab.append(c)
+        vals.append(v)
+    rows = sorted(set(r_lab)) if rows is None else list(rows)
+    cols = sorted(set(c_lab)) if cols is None else list(cols)
+    r_idx = {x: i for i, x in enumerate(rows)}
+    c_idx = {x: i for i, x in enumerate(cols)}
+    C = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float64),
+         (np.fromiter((r_idx[x] for x in r_lab), dtype=np.int64, count=len(r_lab)),
+          np.fromiter((c_idx[x] for x in c_lab), dtype=np.int64, count=len(c_lab)))),
+        shape=(len(rows), len(cols)))
+    C.sum_duplicates()
+    C.eliminate_zeros()
+    return C, rows, cols
+
+
+def _scale_rows(M, factors):
+    return sparse.diags(factors) @ M
+
+
+def row_distributions(C):
+    """(P, s): row-normalised CSR and row sums of P (1.0, or 0.0 for empty rows)."""
+    C = sparse.csr_matrix(C, dtype=np.float64)
+    tot = np.asarray(C.sum(axis=1)).ravel()
+    inv = np.divide(1.0, tot, out=np.zeros_like(tot), where=tot > 0)
+    P = _scale_rows(C, inv).tocsr()
+    return P, np.asarray(P.sum(axis=1)).ravel()
+
+
+# -------------
+# Measures (row block vs all rows)
+# -------------
+
+class _Prepared:
+    """Per-matrix quantities shared by all row blocks of one measure."""
+
+    def __init__(self, C, measure):
+        if measure not in MEASURES:
+            raise ValueError(f"measure must be one of {MEASURES}")
+        self.measure = measure
+        self.n = C.shape[0]
+        if measure == "cosine":
+            X = sparse.csr_matrix(C, dtype=np.float64)
+            norm = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            inv = np.divide(1.0, norm, out=np.zeros_like(norm), where=norm > 0)
+            self.left = _scale_rows(X, inv).tocsr()
+            self.right_t = self.left.T.tocsc()
+            return
+        P, self.s = row_distributions(C)
+        if measure == "hellinger":
+            self.left = P.sqrt().tocsr()
+            self.right_t = self.left.T.tocsc()
+        elif measure == "kl":
+            L = P.copy()
+            L.data = np.log2(np.maximum(L.data, KL_EPS) / KL_EPS)
+            A = P.copy()
+            A.data = A.data * np.log2(A.data / KL_EPS)
+            self.a = np.asarray(A.sum(axis=1)).ravel()
+            self.left = P
+            self.right_t = L.T.tocsc()
+        else:  # js
+            self.P = P
+            self.csc = P.tocsc()
+            self.csc.sort_indices()
+
+    def block(self, start, stop):
+        m = self.measure
+        if m == "js":
+            return self._js_block(start, stop)
+        prod = (self.left[start:stop] @ self.right_t).toarray()
+        if m == "cosine":
+            return prod
+        if m == "hellinger":
+            return np.sqrt(np.clip(1.0 - prod, 0.0, None))
+        return self.a[start:stop, None] - prod       # kl
+
+    def _js_block(self, start, stop):
+        b, n = stop - start, self.n
+        out = np.zeros(b * n, dtype=np.float64)
+        csc = self.csc
+        indptr, rows, vals = csc.indptr, csc.indices, csc.data
+        nnz_col = np.diff(indptr)
+
+        # left entries: nonzeros of the block's rows, as (column, local row, p)
+        blk = self.P[start:stop].tocoo()
+        l_col, l_row, l_val = blk.col.astype(np.int64), blk.row.astype(np.int64), blk.data
+        reps = nnz_col[l_col]
+        bounds = np.concatenate([[0], np.cumsum(reps)])
+        pos = 0
+        while pos < len(l_col):
+            stop_e = int(np.searchsorted(bounds, bounds[pos] + MAX_CELLS, side="right")) - 1
+            stop_e = max(stop_e, pos + 1)
+            sel = slice(pos, stop_e)
+            r = reps[sel]
+            total = int(r.sum())
+            if total:
+                li = np.repeat(np.arange(stop_e - pos), r)
+                first = np.cumsum(r) - r
+                rj = indptr[l_col[sel]][li] + (np.arange(total) - first[li])
+                p, q = l_val[sel][li], vals[rj]
+                pq = p + q
+                f = p * np.log2(p / pq) + q * np.log2(q / pq)
+                out += np.bincount(l_row[sel][li] * n + rows[rj], weights=f,
+                                   minlength=b * n)
+            pos = stop_e
+        D = 0.5 * out.reshape(b, n)
+        D += 0.5 * (self.s[start:stop, None] + self.s[None, :])
+        return np.clip(D, 0.0, None)
+
+
+def iter_blocks(C, measure="js", block=BLOCK_ROWS):
+    """Yield (start, stop, dense block of rows start:stop vs all rows)."""
+    prep = _Prepared(C, measure)
+    block = max(1, min(block, MAX_CELLS // max(prep.n, 1))) if block else BLOCK_ROWS
+    for start in range(0, prep.n, block):
+        stop = min(start + block, prep.n)
+        yield start, stop, prep.block(start, stop)
+
+
+def divergence_matrix(C, measure="js", block=BLOCK_ROWS):
+    """Full dense n x n matrix for `measure` (cosine is a similarity)."""
+    n = C.shape[0]
+    D = np.empty((n, n), dtype=np.float64)
+    for start, stop, B in iter_blocks(C, measure, block):
+        D[start:stop] = B
+    return D
+
+
+def top_k(C, measure="js", k=5, block=BLOCK_ROWS, include_self=False):
+    """
+    (indices, values), each n x k: the k nearest rows per row (smallest
+    divergence, or largest cosine), best first. Rows with fewer than k
+    candidates are padded with index -1 / NaN.
+    """
+    n = C.shape[0]
+    k = max(0, min(k, n if include_self else n - 1))
+    idx = np.full((n, k), -1, dtype=np.int64)
+    val = np.full((n, k), np.nan)
+    if k == 0:
+        return idx, val
+    sign = -1.0 if measure in SIMILARITIES else 1.0
+    for start, stop, B in iter_blocks(C, measure, block):
+        S = sign * B
+        if not include_self:
+            S[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        part = np.argpartition(S, k - 1, axis=1)[:, :k]
+        ps = np.take_along_axis(S, part, axis=1)
+        order = np.lexsort((part, ps), axis=1)
+        idx[start:stop] = np.take_along_axis(part, order, axis=1)
+        val[start:stop] = sign * np.take_along_axis(ps, order, axis=1)
+    return idx, val
+
+
+# -------------
+# TSV input
+# -------------
+
+def read_long(path, row_col, col_col, count_col=None):
+    """Triples from a long TSV; without count_col every line counts once."""
+    with open(path, encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        need = [c for c in (row_col, col_col, count_col) if c]
+        miss = [c for c in need if c not in (reader.fieldnames or [])]
+        if miss:
+            raise SystemExit(f"[ERR] {path}: missing column(s) {', '.join(miss)}")
+        for row in reader:
+            if count_col:
+                try:
+                    v = float(row[count_col])
+                except (TypeError, ValueError):
+                    continue
+            else:
+                v = 1.0
+            yield row[row_col].strip(), row[col_col].strip(), v
+
+
+def read_wide(path, row_col, value_cols):
+    """Triples from a wide TSV: one row label plus one numeric column per category."""
+    with open(path, encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        miss = [c for c in [row_col] + value_cols if c not in (reader.fieldnames or [])]
+        if miss:
+            raise SystemExit(f"[ERR] {path}: missing column(s) {', '.join(miss)}")
+        for row in reader:
+            for c in value_cols:
+                try:
+                    v = float(row[c])
+                except (TypeError, ValueError):
+                    continue
+                if v:
+                    yield row[row_col].strip(), c, v
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pairwise divergence / top-k neighbours from a TSV")
+    ap.add_argument("tsv")
+    ap.add_argument("--row", required=True, help="row label column (family, stem, folio...)")
+    ap.add_argument("--col", help="category column (long format)")
+    ap.add_argument("--count", help="count column (long format; default: 1 per line)")
+    ap.add_argument("--value-cols", help="comma-separated count columns (wide format)")
+    ap.add_argument("--measure", choices=MEASURES, default="js")
+    ap.add_argument("--top-k", type=int, default=0, help="write k nearest rows instead of all pairs")
+    ap.add_argument("--block", type=int, default=BLOCK_ROWS)
+    ap.add_argument("--out", help="output TSV (default: stdout)")
+    args = ap.parse_args()
+
+    if args.value_cols:
+        triples = read_wide(args.tsv, args.row, [c.strip() for c in args.value_cols.split(",")])
+    elif args.col:
+        triples = read_long(args.tsv, args.row, args.col, args.count)
+    else:
+        raise SystemExit("[ERR] Give --col (long format) or --value-cols (wide format)")
+    C, rows, cols = count_matrix(triples)
+    print(f"[INFO] {len(rows)} rows x {len(cols)} categories, {C.nnz} nonzero cells",
+          file=sys.stderr)
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        w = csv.writer(out, delimiter="\t", lineterminator="\n")
+        if args.top_k:
+            idx, val = top_k(C, args.measure, args.top_k, args.block)
+            w.writerow(["row", "rank", "neighbour", args.measure])
+            for i, r in enumerate(rows):
+                for rank, (j, v) in enumerate(zip(idx[i], val[i]), 1):
+                    if j >= 0:
+                        w.writerow([r, rank, rows[j], f"{v:.6f}"])
+        else:
+            w.writerow(["row_i", "row_j", args.measure])
+            for start, stop, B in iter_blocks(C, args.measure, args.block):
+                for a in range(stop - start):
+                    i = start + a
+                    for j in range(i + 1, len(rows)):
+                        w.writerow([rows[i], rows[j], f"{B[a, j]:.6f}"])
+    finally:
+        if args.out:
+            out.close()
+            print(f"[OK] Wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
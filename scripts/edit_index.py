@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Deletion-neighbourhood index for bounded edit distance (d <= 2)
+
+p75_check_single_edit_v3.py compared every pair of *running tokens* in
+each family of p75_families_long.tsv with a banded Levenshtein DP, so a
+family of n occurrences cost n(n-1)/2 DP calls even though most pairs are
+repeats of the same few types. Here the work is done once per type over
+the whole vocabulary:
+
+    index     every type is stored under each string obtained by deleting
+              up to max_d of its characters (symmetric deletion). Two types
+              within distance d always share such a string, so the types
+              sharing a key are the only candidates.
+    verify    each distinct candidate pair is checked once with the same
+              banded edit_distance() the old script used, so distances (and
+              every count derived from them) are identical to the DP.
+    families  pair counts come from the type graph: a type pair (u, v) at
+              distance d inside a family contributes count_u * count_v
+              occurrence pairs; identical types contribute C(count, 2)
+              pairs at distance 0 (as a == b did in the DP loop).
+
+Per family: total / ED=1 / ED=2 occurrence pairs and the types with an
+ED=1 or ED<=2 partner. Across families: for every family pair, the number
+of type pairs at ED=1 and ED=2 (a near-neighbour graph between families).
+
+Usage (library):
+
+    from edit_index import DeletionIndex, family_edit_counts
+    idx = DeletionIndex(vocab, max_d=2)
+    idx.neighbours("qokeedy")              # [(type, d), ...] with 1 <= d <= 2
+    pairs = idx.all_pairs()                # {(i, j): d}, i < j, ids into idx.vocab
+    fams = family_edit_counts(fam2tokens, idx)
+
+Usage (CLI):
+
+    python3 scripts/edit_index.py --vocab p6_voynich_tokens.txt --out out/ed2_pairs.tsv
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter, defaultdict
+
+MAX_D = 2
+
+
+def edit_distance(a: str, b: str, max_d: int = 2) -> int:
+    """
+    Standard Levenshtein distance with early cutoff at max_d.
+    We only ever care about d <= 2 for our summary.
+    """
+    la, lb = len(a), len(b)
+    # Quick bounds
+    if abs(la - lb) > max_d:
+        return max_d + 1
+    if a == b:
+        return 0
+
+    # DP with banded optimization
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        cur = [i] + [0] * lb
+        # Only need to compute within a band of width max_d
+        j_start = max(1, i - max_d)
+        j_end = min(lb, i + max_d)
+        # Fill left of band with large values
+        for j in range(1, j_start):
+            cur[j] = max_d + 1
+        for j in range(j_start, j_end + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(
+                prev[j] + 1,        # deletion
+                cur[j - 1] + 1,     # insertion
+                prev[j - 1] + cost  # substitution
+            )
+        # Fill right of band with large values
+        for j in range(j_end + 1, lb + 1):
+            cur[j] = max_d + 1
+        prev = cur
+        # Early exit: if row minimum already > max_d
+        if min(prev) > max_d:
+            return max_d + 1
+    return prev[lb]
+
+
+def deletion_variants(word, max_d):
+    """All strings obtained from word by deleting 0..max_d characters."""
+    out = {word}
+    frontier = {word}
+    for _ in range(max_d):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        nxt -= out
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+# -------------
+# Index
+# -------------
+
+class DeletionIndex:
+    """Types indexed by their deletion variants; distances verified by edit_distance()."""
+
+    def __init__(self, vocab, max_d=MAX_D):
+        self.max_d = max_d
+        self.vocab = sorted(set(vocab))
+        self.ids = {w: i for i, w in enumerate(self.vocab)}
+        self.buckets = defaultdict(list)
+        for i, w in enumerate(self.vocab):
+            for v in deletion_variants(w, max_d):
+                self.buckets[v].append(i)
+        self._pairs = None
+
+    def neighbours(self, word, max_d=None):
+        """[(type, d)] for indexed types at 1 <= d <= max_d from word, by (d, type)."""
+        max_d = self.max_d if max_d is None else max_d
+        if max_d > self.max_d:
+            raise ValueError(f"index built for max_d={self.max_d}")
+        cand = set()
+        for v in deletion_variants(word, max_d):
+            cand.update(self.buckets.get(v, ()))
+        out = []
+        for i in cand:
+            w = self.vocab[i]
+            if w == word:
+                continue
+            d = edit_distance(word, w, max_d)
+            if d <= max_d:
+                out.append((w, d))
+        return sorted(out, key=lambda x: (x[1], x[0]))
+
+    def all_pairs(self):
+        """{(i, j): d} for every type pair i < j with 1 <= d <= max_d."""
+        if self._pairs is not None:
+            return self._pairs
+        vocab, max_d = self.vocab, self.max_d
+        seen = set()
+        pairs = {}
+        for members in self.buckets.values():
+            if len(members) < 2:
+                continue
+            for a_pos, i in enumerate(members):
+                wi = vocab[i]
+                li = len(wi)
+                for j in members[a_pos + 1:]:
+                    key = (i, j) if i < j else (j, i)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    wj = vocab[j]
+                    if abs(li - len(wj)) > max_d:
+                        continue
+                    d = edit_distance(wi, wj, max_d)
+                    if d <= max_d:
+                        pairs[key] = d
+        self._pairs = pairs
+        return pairs
+
+    def adjacency(self):
+        """type id -> [(neighbour id, d)]."""
+        adj = defaultdict(list)
+        for (i, j), d in self.all_pairs().items():
+            adj[i].append((j, d))
+            adj[j].append((i, d))
+        return adj
+
+
+# -------------
+# Family statistics
+# -------------
+
+def family_edit_counts(fam2tokens, index=None):
+    """
+    Per family (dict): n_tokens, n_types, total_pairs, ed1_pairs, ed2_pairs
+    (occurrence pairs, exactly as the pairwise DP counted them), and the
+    sets ed1_types / ed_le2_types. Builds a DeletionIndex over all family
+    types unless one covering them is given.
+    """
+    if index is None:
+        index = DeletionIndex({t for toks in fam2tokens.values() for t in toks})
+    adj = index.adjacency()
+    ids = index.ids
+    out = {}
+    for fam, toks in fam2tokens.items():
+        cnt = Counter(toks)
+        members = {ids[t]: c for t, c in cnt.items()}
+        n = len(toks)
+        ed = {1: 0, 2: 0}
+        ed1_types, ed_le2_types = set(), set()
+        for i, ci in members.items():
+            for j, d in adj.get(i, ()):
+                cj = members.get(j)
+                if cj is None:
+                    continue
+                if i < j:
+                    ed[d] += ci * cj
+                if d == 1:
+                    ed1_types.add(index.vocab[i])
+                ed_le2_types.add(index.vocab[i])
+        out[fam] = {
+            "n_tokens": n,
+            "n_types": len(cnt),
+            "total_pairs": n * (n - 1) // 2,
+            "ed1_pairs": ed[1],
+            "ed2_pairs": ed[2],
+            "ed1_types": ed1_types,
+            "ed_le2_types": ed_le2_types,
+        }
+    return out
+
+
+def cross_family_edges(fam2tokens, index):
+    """
+    {(fam_a, fam_b): [ed1_type_pairs, ed2_type_pairs]} for fam_a < fam_b,
+    over type pairs (u in fam_a, v in fam_b, u != v) at distance 1 or 2.
+    """
+    type_fams = defaultdict(set)
+    for fam, toks in fam2tokens.items():
+        for t in set(toks):
+            type_fams[index.ids[t]].add(fam)
+    edges = defaultdict(lambda: [0, 0])
+    for (i, j), d in index.all_pairs().items():
+        fi, fj = type_fams.get(i), type_fams.get(j)
+        if not fi or not fj:
+            continue
+        for a in fi:
+            for b in fj:
+                if a != b:
+                    key = (a, b) if a < b else (b, a)
+                    edges[key][d - 1] += 1
+    return dict(edges)
+
+
+# -------------
+# Output
+# -------------
+
+def write_family_counts(path, stats):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("family\tn_tokens\tn_types\ttotal_pairs\ted1_pairs\ted2_pairs\t"
+                  "ed_le2_pairs\tn_types_ed1\tn_types_ed_le2\n")
+        for fam in sorted(stats, key=lambda f: (-stats[f]["n_tokens"], f)):
+            s = stats[fam]
+            out.write(f"{fam}\t{s['n_tokens']}\t{s['n_types']}\t{s['total_pairs']}\t"
+                      f"{s['ed1_pairs']}\t{s['ed2_pairs']}\t{s['ed1_pairs'] + s['ed2_pairs']}\t"
+                      f"{len(s['ed1_types'])}\t{len(s['ed_le2_types'])}\n")
+
+
+def write_cross_family(path, edges):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("family_i\tfamily_j\ted1_type_pairs\ted2_type_pairs\n")
+        for (a, b), (e1, e2) in sorted(edges.items(), key=lambda x: (-x[1][0], -x[1][1], x[0])):
+            out.write(f"{a}\t{b}\t{e1}\t{e2}\n")
+
+
+def write_pairs(path, index):
+    vocab = index.vocab
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("type_i\ttype_j\tdistance\n")
+        for (i, j), d in sorted(index.all_pairs().items(), key=lambda x: (x[1], x[0])):
+            out.write(f"{vocab[i]}\t{vocab[j]}\t{d}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="All type pairs within edit distance <= d")
+    ap.add_argument("--vocab", required=True, help="one token per line (last field used)")
+    ap.add_argument("--max-d", type=int, default=MAX_D)
+    ap.add_argument("--out", required=True, help="type_i, type_j, distance TSV")
+    args = ap.parse_args()
+
+    if not os.path.isfile(args.vocab):
+        raise SystemExit(f"[ERR] Vocabulary file not found: {args.vocab}")
+    with open(args.vocab, encoding="utf-8") as f:
+        vocab = {ln.split()[-1] for ln in f if ln.strip() and not ln.startswith("#")}
+    idx = DeletionIndex(vocab, args.max_d)
+    pairs = idx.all_pairs()
+    by_d = Counter(pairs.values())
+    print(f"[INFO] {len(idx.vocab)} types, {len(idx.buckets)} deletion keys; "
+          + ", ".join(f"ED={d}: {by_d[d]}" for d in sorted(by_d)), file=sys.stderr)
+    write_pairs(args.out, idx)
+    print(f"[OK] Wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Dense k-means backend: k-means++ restarts, mini-batch, k-sweeps
+
+p72_vm_semantic_fields.py clustered stems with a hand-written Lloyd loop
+over lists of dicts (per-cluster sums in defaultdict(float)), from a single
+deterministic start (the k most frequent stems). That is fine for one K on
+one corpus but far too slow to sweep K = 2..50 across corpora, and a single
+start can settle in a poor local optimum. Here the feature vectors are one
+float64 (n x d) array and:
+
+    kmeans(X, k)            Lloyd iterations from n_init k-means++ starts
+                            (D^2 sampling, vectorised), best inertia wins;
+                            restarts run on a thread pool (numpy releases
+                            the GIL) and each draws from its own spawned
+                            seed, so results do not depend on n_jobs.
+                            Extra fixed starts (e.g. the old "first k rows")
+                            can be passed as init_centers and compete too.
+    minibatch_kmeans(X, k)  Sculley-style mini-batch updates (per-centre
+                            learning rate 1/count), then one full assignment
+                            pass; for large vocabularies.
+    silhouette(X, labels)   mean silhouette, chunked over rows so memory is
+                            O(chunk x n); optional random subsample.
+    k_sweep(X, ks)          inertia and silhouette curve over K in one call.
+
+Empty clusters keep their previous centre, as the old loop did; Lloyd stops
+when no assignment changes (or after max_iters).
+
+Usage (library):
+
+    from kmeans_engine import feature_matrix, zscore, kmeans, k_sweep
+    X = zscore(feature_matrix(rows, ["left_frac", "right_frac"]))
+    res = kmeans(X, 5, n_init=10, seed=0)
+    res.labels, res.centers, res.inertia
+    for r in k_sweep(X, range(2, 51), n_init=10, n_jobs=4):
+        print(r["k"], r["inertia"], r["silhouette"])
+
+Usage (CLI):
+
+    python3 scripts/kmeans_engine.py Phase71/out/p71_vm_structural_vectors.tsv \\
+        --features left_frac,right_frac,mean_axis_diff,mean_rule_hits \\
+        --zscore --k 2-50 --out out/k_sweep.tsv
+
+Requires numpy.
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+MAX_CELLS = 1 << 22   # ~4M cells per distance block
+
+KMeansResult = namedtuple("KMeansResult", "labels centers inertia n_iter start")
+
+
+# -------------
+# Features
+# -------------
+
+def feature_matrix(rows, feature_names, prefix=""):
+    """(n x d) float64 array from a list of dicts."""
+    return np.array([[r[prefix + f] for f in feature_names] for r in rows],
+                    dtype=np.float64).reshape(len(rows), len(feature_names))
+
+
+def zscore(X):
+    """Column z-scores (population std; constant columns get std 1)."""
+    X = np.asarray(X, dtype=np.float64)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[~(std > 0)] = 1.0
+    return (X - mean) / std
+
+
+# -------------
+# Distances and assignment
+# -------------
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _seed_seq(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def _row_blocks(n, width):
+    step = max(1, MAX_CELLS // max(width, 1))
+    for s in range(0, n, step):
+        yield s, min(n, s + step)
+
+
+def sq_dists(X, C, x_sq=None):
+    """(n x k) squared Euclidean distances via |x|^2 - 2 x.c + |c|^2 (clipped at 0)."""
+    if x_sq is None:
+        x_sq = np.einsum("ij,ij->i", X, X)
+    D = X @ C.T
+    D *= -2.0
+    D += x_sq[:, None]
+    D += np.einsum("ij,ij->i", C, C)[None, :]
+    np.maximum(D, 0.0, out=D)
+    return D
+
+
+def assign(X, C, x_sq=None):
+    """Nearest centre (first on ties) and its squared distance per row."""
+    if x_sq is None:
+        x_sq = np.einsum("ij,ij->i", X, X)
+    labels = np.empty(X.shape[0], dtype=np.int64)
+    d2 = np.empty(X.shape[0])
+    for s, e in _row_blocks(X.shape[0], C.shape[0]):
+        D = sq_dists(X[s:e], C, x_sq[s:e])
+        labels[s:e] = D.argmin(axis=1)
+        d2[s:e] = D[np.arange(e - s), labels[s:e]]
+    return labels, d2
+
+
+def _sums(X, labels, k):
+    return np.column_stack([np.bincount(labels, X[:, j], minlength=k)
+                            for j in range(X.shape[1])]).reshape(k, X.shape[1])
+
+
+def cluster_means(X, labels, k, old=None):
+    """Per-cluster means; empty clusters keep `old` (or zeros)."""
+    counts = np.bincount(labels, minlength=k)
+    sums = _sums(X, labels, k)
+    C = np.zeros((k, X.shape[1])) if old is None else old.copy()
+    nz = counts > 0
+    C[nz] = sums[nz] / counts[nz, None]
+    return C
+
+
+# -------------
+# k-means
+# -------------
+
+def kmeans_pp(X, k, seed=None):
+    """k-means++ seeding: first centre uniform, the rest by D^2 sampling."""
+    rng = _rng(seed)
+    n = X.shape[0]
+    x_sq = np.einsum("ij,ij->i", X, X)
+    idx = [int(rng.integers(n))]
+    d2 = sq_dists(X, X[idx[0]][None, :], x_sq)[:, 0]
+    for _ in range(1, k):
+        total = d2.sum()
+        if total <= 0:
+            # fewer distinct points than k: take any unused row
+            j = int(rng.choice(np.setdiff1d(np.arange(n), idx)))
+        else:
+            j = int(np.searchsorted(np.cumsum(d2), rng.random() * total, side="right"))
+            j = min(j, n - 1)
+        idx.append(j)
+        d2 = np.minimum(d2, sq_dists(X, X[j][None, :], x_sq)[:, 0])
+    return X[idx].copy()
+
+
+def lloyd(X, centers, max_iters=50, start=0):
+    """Lloyd iterations until no assignment changes."""
+    C = np.array(centers, dtype=np.float64)
+    k = C.shape[0]
+    x_sq = np.einsum("ij,ij->i", X, X)
+    labels = None
+    n_iter = 0
+    for n_iter in range(1, max_iters + 1):
+        new, _ = assign(X, C, x_sq)
+        changed = labels is None or bool((new != labels).any())
+        labels = new
+        C = cluster_means(X, labels, k, old=C)
+        if not changed:
+            break
+    labels, d2 = assign(X, C, x_sq)
+    return KMeansResult(labels, C, float(d2.sum()), n_iter, start)
+
+
+def _map(fn, items, n_jobs):
+    if n_jobs and n_jobs > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            return list(pool.map(fn, items))
+    return [fn(it) for it in items]
+
+
+def _best(results):
+    # lowest inertia; ties go to the earliest start
+    return min(results, key=lambda r: (r.inertia, r.start))
+
+
+def _check_starts(n_init, n_fixed=0):
+    if n_init < 0 or n_init + n_fixed < 1:
+        raise ValueError(f"need at least one start (n_init={n_init}, fixed starts={n_fixed})")
+
+
+def kmeans(X, k, n_init=10, max_iters=50, seed=None, n_jobs=1, init_centers=()):
+    """
+    Best of n_init k-means++ starts plus any fixed init_centers (each a
+    (k x d) array; these are starts 0..len-1, the random ones follow).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    k = min(k, X.shape[0])
+    _check_starts(n_init, len(init_centers))
+    seeds = _seed_seq(seed).spawn(n_init)
+    starts = [np.asarray(c, dtype=np.float64) for c in init_centers]
+    starts += [None] * n_init
+    offset = len(init_centers)
+
+    def run(i):
+        C = starts[i]
+        if C is None:
+            C = kmeans_pp(X, k, np.random.default_rng(seeds[i - offset]))
+        return lloyd(X, C, max_iters, start=i)
+
+    return _best(_map(run, list(range(len(starts))), n_jobs))
+
+
+def minibatch_kmeans(X, k, batch_size=1024, max_iters=100, n_init=3, seed=None,
+                     n_jobs=1, tol=1e-4):
+    """
+    Mini-batch k-means: each step assigns a random batch and moves every
+    centre to the running mean of the points it has absorbed. Stops after
+    max_iters batches or when no centre moves more than tol (squared).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n = X.shape[0]
+    k = min(k, n)
+    _check_starts(n_init)
+    seeds = _seed_seq(seed).spawn(n_init)
+
+    def run(i):
+        rng = np.random.default_rng(seeds[i])
+        init_n = min(n, max(3 * batch_size, 10 * k))
+        sample = X[rng.choice(n, init_n, replace=False)] if init_n < n else X
+        C = kmeans_pp(sample, k, rng)
+        seen = np.zeros(k)
+        n_iter = 0
+        for n_iter in range(1, max_iters + 1):
+            batch = X[rng.integers(0, n, size=min(batch_size, n))]
+            lab, _ = assign(batch, C)
+            m = np.bincount(lab, minlength=k)
+            sums = _sums(batch, lab, k)
+            hit = m > 0
+            seen[hit] += m[hit]
+            new = C.copy()
+            new[hit] += (sums[hit] - m[hit, None] * C[hit]) / seen[hit, None]
+            shift = float(((new - C) ** 2).sum(axis=1).max())
+            C = new
+            if shift <= tol:
+                break
+        labels, d2 = assign(X, C)
+        return KMeansResult(labels, C, float(d2.sum()), n_iter, i)
+
+    return _best(_map(run, list(range(n_init)), n_jobs))
+
+
+# -------------
+# Quality
+# -------------
+
+def silhouette(X, labels, sample_size=None, seed=None):
+    """
+    Mean silhouette coefficient (points in singleton clusters score 0).
+    With sample_size, scored on a random subsample of rows (distances still
+    to the full set). Returns nan for fewer than 2 clusters.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels)
+    k = int(labels.max()) + 1 if len(labels) else 0
+    sizes = np.bincount(labels, minlength=k)
+    present = np.flatnonzero(sizes)
+    if len(present) < 2:
+        return float("nan")
+    rows = np.arange(X.shape[0])
+    if sample_size and sample_size < len(rows):
+        rows = np.sort(_rng(seed).choice(rows, sample_size, replace=False))
+    # columns grouped by cluster, so per-cluster totals are one reduceat
+    order = np.argsort(labels, kind="stable")
+    Xs = X[order]
+    bounds = np.concatenate([[0], np.cumsum(sizes[present])[:-1]])
+    pos = np.empty_like(order)
+    pos[order] = np.arange(len(order))
+    slot = np.full(k, -1)
+    slot[present] = np.arange(len(present))
+    n_present = sizes[present].astype(np.float64)
+    scores = np.empty(len(rows))
+    for s, e in _row_blocks(len(rows), X.shape[0]):
+        r = rows[s:e]
+        D = np.sqrt(sq_dists(X[r], Xs))
+        D[np.arange(e - s), pos[r]] = 0.0
+        sums = np.add.reduceat(D, bounds, axis=1)      # (rows x present clusters)
+        own = slot[labels[r]]
+        own_n = n_present[own]
+        a = sums[np.arange(e - s), own] / np.maximum(own_n - 1, 1)
+        means = sums / n_present[None, :]
+        means[np.arange(e - s), own] = np.inf
+        b = means.min(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sc = (b - a) / np.maximum(a, b)
+        sc[(own_n <= 1) | ~np.isfinite(sc)] = 0.0
+        scores[s:e] = sc
+    return float(scores.mean())
+
+
+def k_sweep(X, ks, n_init=10, max_iters=50, seed=None, n_jobs=1, minibatch=False,
+            batch_size=1024, silhouette_sample=5000, return_models=False):
+    """
+    Cluster at every K in ks; one dict per K with inertia, silhouette,
+    iterations and winning start. Each K draws from its own child seed.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    _check_starts(n_init)
+    ks = [k for k in ks if 1 <= k <= X.shape[0]]
+    children = dict(zip(ks, _seed_seq(seed).spawn(len(ks))))
+    out = []
+    for k in ks:
+        run_seed, sil_seed = children[k].spawn(2)
+        if minibatch:
+            res = minibatch_kmeans(X, k, batch_size=batch_size, max_iters=max_iters,
+                                   n_init=n_init, seed=run_seed, n_jobs=n_jobs)
+        else:
+            res = kmeans(X, k, n_init=n_init, max_iters=max_iters, seed=run_seed,
+                         n_jobs=n_jobs)
+        row = {
+            "k": k,
+            "inertia": res.inertia,
+            "silhouette": silhouette(X, res.labels, silhouette_sample,
+                                     np.random.default_rng(sil_seed)),
+            "n_iter": res.n_iter,
+            "start": res.start,
+        }
+        if return_models:
+            row["model"] = res
+        out.append(row)
+    return out
+
+
+def parse_ks(spec):
+    """'2-50', '2,3,5' or '2-20:2' -> list of ints."""
+    ks = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        step = 1
+        if ":" in part:
+            part, step = part.split(":")
+            step = int(step)
+        if "-" in part:
+            lo, hi = part.split("-")
+            ks.extend(range(int(lo), int(hi) + 1, step))
+        else:
+            ks.append(int(part))
+    return ks
+
+
+def write_sweep(rows, path):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("k\tinertia\tsilhouette\tn_iter\tbest_start\n")
+        for r in rows:
+            out.write(f"{r['k']}\t{r['inertia']:.6f}\t{r['silhouette']:.6f}\t"
+                      f"{r['n_iter']}\t{r['start']}\n")
+
+
+# -------------
+# CLI
+# -------------
+
+def read_features(path, features, min_count=None, count_col="count"):
+    """Feature matrix and row labels (first column) from a TSV with header."""
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        col = {c: i for i, c in enumerate(header)}
+        missing = [c for c in features if c not in col]
+        if missing:
+            raise SystemExit(f"[ERR] Missing columns in {path}: {', '.join(missing)}")
+        labels, vals = [], []
+        for ln in f:
+            parts = ln.rstrip("\n").split("\t")
+            if len(parts) < len(header):
+                continue
+            try:
+                if min_count is not None and int(parts[col[count_col]]) < min_count:
+                    continue
+                vals.append([float(parts[col[c]]) for c in features])
+            except ValueError:
+                continue
+            labels.append(parts[0])
+    return np.array(vals, dtype=np.float64).reshape(len(vals), len(features)), labels
+
+
+def main():
+    ap = argparse.ArgumentParser(description="k-means / mini-batch k-sweep over a feature TSV")
+    ap.add_argument("tsv")
+    ap.add_argument("--features", required=True, help="comma-separated feature columns")
+    ap.add_argument("--zscore", action="store_true")
+    ap.add_argument("--min-count", type=int, default=None, help="drop rows with count < N")
+    ap.add_argument("--k", default="2-50", help="e.g. 2-50, 2,5,8 or 2-50:2")
+    ap.add_argument("--n-init", type=int, default=10)
+    ap.add_argument("--max-iters", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--jobs", type=int, default=1)
+    ap.add_argument("--minibatch", action="store_true")
+    ap.add_argument("--batch-size", type=int, default=1024)
+    ap.add_argument("--silhouette-sample", type=int, default=5000)
+    ap.add_argument("--out", help="sweep TSV (default stdout)")
+    args = ap.parse_args()
+    if args.n_init < 1:
+        ap.error("--n-init must be at least 1")
+
+    X, labels = read_features(args.tsv, [c.strip() for c in args.features.split(",")],
+                              args.min_count)
+    if not len(labels):
+        raise SystemExit(f"[ERR] No usable rows in {args.tsv}")
+    if args.zscore:
+        X = zscore(X)
+    print(f"[INFO] {X.shape[0]} rows x {X.shape[1]} features", file=sys.stderr)
+    rows = k_sweep(X, parse_ks(args.k), n_init=args.n_init, max_iters=args.max_iters,
+                   seed=args.seed, n_jobs=args.jobs, minibatch=args.minibatch,
+                   batch_size=args.batch_size, silhouette_sample=args.silhouette_sample)
+    if args.out:
+        write_sweep(rows, args.out)
+        print(f"[OK] Wrote {args.out}", file=sys.stderr)
+    else:
+        write_sweep(rows, "/dev/stdout")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import json, os, sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import RuleMatcher, compile_side_rule  # noqa: E402
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TOKENS_PATH = os.path.join(BASE, "p6_voynich_tokens.txt")
 RULEBOOK_PATH = os.path.join(BASE, "Phase69", "out", "p69_rules_final.json")
@@ -42,15 +45,8 @@ def load_rules(path):
         raise SystemExit("[ERR] No usable chargram rules found in rulebook.")
     return rules
 
-def match(rule, tok):
-    p = rule["pattern"]
-    side = rule["side"]
-    if side == "left":
-        return tok.startswith(p)
-    elif side == "right":
-        return tok.endswith(p)
-    else:  # any/unspecified
-        return p in tok
+def build_matcher(rules):
+    return RuleMatcher([compile_side_rule(r["pattern"], r["side"]) for r in rules])
 
 def main():
     print("=== Phase 69 chargram coverage (correct) ===")
@@ -68,12 +64,12 @@ def main():
     covered_types = set()
     hits = [0] * len(rules)
 
+    matcher = build_matcher(rules)
     for i, tok in enumerate(tokens):
-        for j, r in enumerate(rules):
-            if match(r, tok):
-                covered_token_flags[i] = True
-                hits[j] += 1
-                covered_types.add(tok)
+        for j in matcher.match(tok):
+            covered_token_flags[i] = True
+            hits[j] += 1
+            covered_types.add(tok)
 
     cov_tokens = sum(covered_token_flags)
     cov_types = len(covered_types)
@@ -4,13 +4,16 @@ import os
 import sys
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import PREFIX, SUFFIX  # noqa: E402
+from rule_coverage import CoverageIndex, RuleSet  # noqa: E402
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-import sys
 if len(sys.argv) > 1:
     RULEBOOK_JSON = sys.argv[1]
 else:
-    RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
+    RULEBOOK_JSON = os.path.join(BASE, "Phase69", "out", "p69_rules_final.json")
 TOKENS_TXT = os.path.join(BASE, "p6_voynich_tokens.txt")
 if not os.path.isfile(TOKENS_TXT):
     # fallback to corpora if needed
@@ -86,19 +89,17 @@ def load_rulebook(path):
     print(f"[INFO] Loaded {len(parsed)} usable rules from p69_rules_final.json")
     return parsed
 
-def token_matches_rule(tok, rule):
-    p = rule["prefix"]
-    s = rule["suffix"]
-    pair = rule["pair"]
-
-    if pair:
-        pre, suf = pair
-        return tok.startswith(pre) and tok.endswith(suf)
-    if p and tok.startswith(p):
-        return True
-    if s and tok.endswith(s):
-        return True
-    return False
+def compile_rule(rule):
+    """
+    Matcher conditions for a parsed rule: a pair needs both its prefix and
+    its suffix, otherwise the prefix or the suffix alone decides.
+    """
+    if rule["pair"]:
+        pre, suf = rule["pair"]
+        return ((PREFIX, pre), (SUFFIX, suf))
+    if rule["prefix"]:
+        return ((PREFIX, rule["prefix"]),)
+    return ((SUFFIX, rule["suffix"]),)
 
 def main():
     if not os.path.isfile(TOKENS_TXT):
@@ -111,27 +112,19 @@ def main():
 
     n_tokens = len(tokens)
     type_counts = Counter(tokens)
-    types = list(type_counts.keys())
-    n_types = len(types)
+    n_types = len(type_counts)
 
-    covered_tokens = 0
-    covered_types = 0
+    index = CoverageIndex(type_counts, [compile_rule(r) for r in rules])
+    cov = RuleSet(index, range(len(rules))).coverage()
+    covered_types = cov["types"]
+    covered_tokens = cov["tokens"]
 
     # per-rule support diagnostics
     rule_support = Counter()
-
-    for t in types:
-        matched = False
-        for idx, r in enumerate(rules):
-            if token_matches_rule(t, r):
-                matched = True
-                rule_support[idx] += type_counts[t]
-        if matched:
-            covered_types += 1
-
-    for t in tokens:
-        if any(token_matches_rule(t, r) for r in rules):
-            covered_tokens += 1
+    for idx in range(len(rules)):
+        hits = index.support(idx)[1]
+        if hits:
+            rule_support[idx] = hits
 
     pct_types = 100.0 * covered_types / max(1, n_types)
     pct_tokens = 100.0 * covered_tokens / max(1, n_tokens)
@@ -2,6 +2,10 @@
 import sys, os, json
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import PREFIX, SUFFIX, CONTAINS  # noqa: E402
+from rule_coverage import CoverageIndex, RuleSet  # noqa: E402
+
 # ---------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------
@@ -89,25 +93,22 @@ def load_rulebook(path):
         data = json.load(f)
     return normalize_rulebook_data(data)
 
-def match_token(token, rule):
+def compile_rule(rule):
     """
-    Phase69-style structural match:
+    Phase69-style structural match as matcher conditions:
       - if pre given: must start with pre
       - if suf given: must end with suf
       - if mid given: must occur somewhere inside (anywhere)
     Empty fields are simply not enforced.
     """
-    pre = rule["pre"]
-    suf = rule["suf"]
-    mid = rule["mid"]
-
-    if pre and not token.startswith(pre):
-        return False
-    if suf and not token.endswith(suf):
-        return False
-    if mid and mid not in token:
-        return False
-    return True
+    conds = []
+    if rule["pre"]:
+        conds.append((PREFIX, rule["pre"]))
+    if rule["suf"]:
+        conds.append((SUFFIX, rule["suf"]))
+    if rule["mid"]:
+        conds.append((CONTAINS, rule["mid"]))
+    return tuple(conds)
 
 # ---------------------------------------------------------------------
 # Main
@@ -129,19 +130,16 @@ def main():
     print(f"[INFO] Unique types: {len(types)}")
     print(f"[INFO] Usable rules after filtering: {len(rules)}")
 
-    token_hits = 0
-    type_hits = 0
-    rule_hit_counts = Counter()
+    index = CoverageIndex(type_counts, [compile_rule(r) for r in rules])
+    cov = RuleSet(index, range(len(rules))).coverage()
+    type_hits = cov["types"]
+    token_hits = cov["tokens"]
 
-    for t in types:
-        covered = False
-        for ridx, rule in enumerate(rules):
-            if match_token(t, rule):
-                rule_hit_counts[ridx] += type_counts[t]
-                covered = True
-        if covered:
-            type_hits += 1
-            token_hits += type_counts[t]
+    rule_hit_counts = Counter()
+    for ridx in range(len(rules)):
+        hits = index.support(ridx)[1]
+        if hits:
+            rule_hit_counts[ridx] = hits
 
     total_types = len(types)
     total_tokens = len(tokens)
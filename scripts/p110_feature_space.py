@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Shared feature space for Phase110-112 (len_*, suf1_*, suf2_*)
+
+p110_feature_vectors.py walked every corpus token and, for each family the
+token belongs to, bumped a Counter of features; p111 built the Latin /
+Arabic centroids with its own loop; p112 then computed every cosine over
+dict key unions. All three features of a token depend only on the token
+string, so here:
+
+    corpus side   a corpus is reduced once to its type counts (types in
+                  first-occurrence order), cached under
+                  cache/p110_features/<sha256>.tsv keyed by the corpus bytes,
+                  the tokenizer name and CACHE_VERSION. Re-running p110/p111
+                  on an unchanged corpus skips tokenisation entirely.
+    families      family vectors are sums of per-type feature-count rows
+                  (types x features) over the family's members, then L1
+                  normalised by the family's observed token count; the
+                  numbers are the same integer sums divided by the same
+                  totals as the old Counter loop.
+    similarity    FeatureSpace fixes one global feature index; vectors are
+                  rows of a dense matrix and all cosines are a single
+                  product of row-normalised matrices (zero rows -> 0.0).
+
+The 'n_obs' row p110 writes into its long file is metadata, not a feature:
+read_family_vectors() returns it separately.
+
+Set P110_FEATURE_CACHE=0 to skip the cache.
+
+Usage (library):
+
+    from p110_feature_space import corpus_type_counts, family_vectors, FeatureSpace
+    counts = corpus_type_counts("p6_voynich_tokens.txt")
+    feat, n_obs = family_vectors(members, counts)
+    space = FeatureSpace.from_vectors(feat, centroids)
+    S = space.cosine(space.matrix(feat, names), space.matrix(centroids, ["latin", "arabic"]))
+
+Requires numpy.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import tempfile
+from collections import Counter, defaultdict
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, "cache", "p110_features")
+CACHE_VERSION = 1
+META_FEATURES = ("n_obs",)
+
+
+# -------------
+# Token features
+# -------------
+
+def cap_len(L):
+    return 13 if L >= 13 else L
+
+
+def token_features(t):
+    """The len / suf1 / suf2 keys of one token (suffixes only if long enough)."""
+    L = len(t)
+    keys = [f"len_{cap_len(L)}"]
+    if L >= 1:
+        keys.append(f"suf1_{t[-1]}")
+    if L >= 2:
+        keys.append(f"suf2_{t[-2:]}")
+    return keys
+
+
+def whitespace_tokens(text):
+    return text.split()
+
+
+# -------------
+# Corpus type counts (cached)
+# -------------
+
+def _cache_key(path, tokenizer_name):
+    h = hashlib.sha256(f"p110_features:{CACHE_VERSION}:{tokenizer_name}".encode())
+    h.update(b"\0")
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_counts(path):
+    counts = Counter()
+    with io.open(path, "r", encoding="utf-8") as f:
+        n = int(f.readline().split("\t")[1])
+        for line in f:
+            t, c = line.rstrip("\n").rsplit("\t", 1)
+            counts[t] = int(c)
+    return counts, n
+
+
+def _write_counts(path, counts, n):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+    with io.open(fd, "w", encoding="utf-8") as w:
+        w.write(f"#n_tokens\t{n}\n")
+        for t, c in counts.items():
+            w.write(f"{t}\t{c}\n")
+    os.replace(tmp, path)
+
+
+def corpus_type_counts(path, tokenizer=whitespace_tokens, tokenizer_name="whitespace",
+                       errors="ignore", cache_dir=CACHE_DIR):
+    """
+    Counter type -> occurrences (first-occurrence order) for a text corpus,
+    tokenised by tokenizer(text). Cached per (corpus bytes, tokenizer_name).
+    Returns (counts, n_tokens).
+    """
+    use_cache = os.environ.get("P110_FEATURE_CACHE", "1") != "0"
+    cache_path = None
+    if use_cache:
+        cache_path = os.path.join(cache_dir, _cache_key(path, tokenizer_name)[:24] + ".tsv")
+        if os.path.isfile(cache_path):
+            return _read_counts(cache_path)
+    with io.open(path, "r", encoding="utf-8", errors=errors) as f:
+        toks = tokenizer(f.read())
+    counts = Counter(toks)
+    if cache_path:
+        _write_counts(cache_path, counts, len(toks))
+    return counts, len(toks)
+
+
+def corpus_features(counts, n_tokens):
+    """L1-normalised feature dict of a whole corpus (p111 centroid), first-seen key order."""
+    feat = Counter()
+    for t, c in counts.items():
+        for k in token_features(t):
+            feat[k] += c
+    n = float(n_tokens) or 1.0
+    return {k: v / n for k, v in feat.items()}
+
+
+# -------------
+# Family vectors
+# -------------
+
+def family_vectors(members, counts):
+    """
+    members: family -> iterable of member types; counts: type -> occurrences.
+    Returns (feat, n_obs) with feat[family] = {feature: share} for every
+    family with at least one observed token, as p110's Counter loop did.
+    """
+    fams = sorted(members)
+    types = sorted({t for f in fams for t in members[f] if counts.get(t)})
+    if not types:
+        return {}, Counter()
+    t_ix = {t: i for i, t in enumerate(types)}
+    space = FeatureSpace(sorted({k for t in types for k in token_features(t)}))
+
+    # per-type feature counts (types x features); a family row is the sum of its members' rows
+    c = np.array([counts[t] for t in types], dtype=np.float64)
+    CF = np.zeros((len(types), len(space)))
+    for j, t in enumerate(types):
+        CF[j, [space.index[k] for k in token_features(t)]] = c[j]
+    member_ix = [np.array(sorted(t_ix[t] for t in members[f] if t in t_ix), dtype=np.int64)
+                 for f in fams]
+    n_obs = np.array([c[ix].sum() for ix in member_ix])
+    totals = np.vstack([CF[ix].sum(axis=0) for ix in member_ix])
+
+    feat, obs = {}, Counter()
+    for fi, f in enumerate(fams):
+        n = n_obs[fi]
+        if n <= 0:
+            continue
+        obs[f] = int(n)
+        row = totals[fi]
+        nz = np.flatnonzero(row)
+        feat[f] = {space.features[k]: float(row[k]) / float(n) for k in nz}
+    return feat, obs
+
+
+def read_family_vectors(path):
+    """
+    family -> {feature: value} from p110's long file (family, feature,
+    value) or a wide TSV with a 'family' column; plus family -> n_obs.
+    """
+    feats = defaultdict(dict)
+    meta = {}
+    with io.open(path, "r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+    with io.open(path, "r", encoding="utf-8") as f:
+        r = csv.DictReader(f, delimiter="\t")
+        if header[:3] == ["family", "feature", "value"]:
+            for row in r:
+                if row["feature"] in META_FEATURES:
+                    meta[row["family"]] = float(row["value"])
+                else:
+                    feats[row["family"]][row["feature"]] = float(row["value"])
+        else:
+            for row in r:
+                fam = row["family"]
+                feats.setdefault(fam, {})
+                for k, v in row.items():
+                    if k == "family":
+                        continue
+                    try:
+                        val = float(v)
+                    except (TypeError, ValueError):
+                        continue
+                    if k in META_FEATURES:
+                        meta[fam] = val
+                    else:
+                        feats[fam][k] = val
+    return dict(feats), meta
+
+
+# -------------
+# Feature space
+# -------------
+
+class FeatureSpace:
+    """A fixed, ordered feature index; dict vectors <-> dense rows."""
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.index = {k: i for i, k in enumerate(self.features)}
+
+    def __len__(self):
+        return len(self.features)
+
+    @classmethod
+    def from_vectors(cls, *vector_sets):
+        keys = set()
+        for vs in vector_sets:
+            for v in vs.values():
+                keys.update(v)
+        return cls(sorted(keys))
+
+    def matrix(self, vectors, names=None):
+        """(len(names) x d) rows; features outside the index are dropped."""
+        names = sorted(vectors) if names is None else list(names)
+        X = np.zeros((len(names), len(self)))
+        for i, n in enumerate(names):
+            for k, v in vectors[n].items():
+                j = self.index.get(k)
+                if j is not None:
+                    X[i, j] = v
+        return X
+
+    def vector(self, vec):
+        return self.matrix({"_": vec}, ["_"])[0]
+
+    @staticmethod
+    def normalise(X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        norms = np.sqrt(np.einsum("ij,ij->i", X, X))
+        out = np.zeros_like(X)
+        nz = norms > 0
+        out[nz] = X[nz] / norms[nz, None]
+        return out
+
+    @classmethod
+    def cosine(cls, A, B):
+        """All cosines between rows of A and rows of B (0.0 where either is zero)."""
+        return cls.normalise(A) @ cls.normalise(B).T
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 # p110_feature_vectors.py — build family feature vectors aligned with p111 (len_*, suf1_*, suf2_*)
-# POSIX/Termux-safe, stdlib only.
+# Corpus type counts are cached per corpus hash; features come from p110_feature_space.
 
-import io, csv, collections, sys
+import io, csv, collections, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p110_feature_space import corpus_type_counts, family_vectors  # noqa: E402
 
 FAMILIES_LONG = "Phase75/out/p75_families_long.tsv"   # expected cols: family,token (plus anything else ignored)
 CORPUS_TOKENS = "p6_voynich_tokens.txt"               # one token per line OR whitespace-separated; we'll split on whitespace per line
@@ -39,51 +42,6 @@ def load_family_members(path):
                 members[fam].add(tok)
     return members
 
-def iter_corpus_tokens(path):
-    with io.open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            # allow either one-token-per-line or space-separated
-            for t in line.strip().split():
-                if t:
-                    yield t
-
-def cap_len(L):
-    return 13 if L >= 13 else L
-
-def build_vectors(members, corpus_iter):
-    # reverse index token -> families (a token may belong to multiple families)
-    tok2fams = collections.defaultdict(list)
-    for fam, toks in members.items():
-        for t in toks:
-            tok2fams[t].append(fam)
-
-    # counters per family
-    feat = collections.defaultdict(lambda: collections.Counter())
-    counts = collections.Counter()
-
-    # pass over corpus and accumulate features into each token’s family(ies)
-    for t in corpus_iter:
-        fams = tok2fams.get(t)
-        if not fams:
-            continue
-        L = len(t)
-        lkey = f"len_{cap_len(L)}"
-        s1   = f"suf1_{t[-1]}" if L >= 1 else None
-        s2   = f"suf2_{t[-2:]}" if L >= 2 else None
-        for fam in fams:
-            feat[fam][lkey] += 1
-            if s1: feat[fam][s1] += 1
-            if s2: feat[fam][s2] += 1
-            counts[fam] += 1
-
-    # L1-normalise
-    for fam, ctr in feat.items():
-        total = float(counts[fam]) or 1.0
-        for k in list(ctr.keys()):
-            ctr[k] = ctr[k] / total
-
-    return feat, counts
-
 def write_long(out_path, feat, counts):
     # long format: family,feature,value plus a meta row for n_obs
     with io.open(out_path, "w", encoding="utf-8") as w:
@@ -97,9 +55,10 @@ def write_long(out_path, feat, counts):
 
 def main():
     members = load_family_members(FAMILIES_LONG)
-    feat, counts = build_vectors(members, iter_corpus_tokens(CORPUS_TOKENS))
+    # corpus side: type counts, cached per corpus hash (P110_FEATURE_CACHE=0 to skip)
+    type_counts, _ = corpus_type_counts(CORPUS_TOKENS)
+    feat, counts = family_vectors(members, type_counts)
     # ensure output dir exists
-    import os
     os.makedirs("Phase110/out", exist_ok=True)
     write_long(OUT_LONG, feat, counts)
     # console report
@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 # p111_cross_corpus_vectors.py — build Latin/Arabic centroids (Unicode-safe, diacritics stripped)
-# POSIX/Termux-safe, stdlib only.
+# Corpus type counts are cached per corpus hash (see p110_feature_space).
 
-import json, unicodedata, io, sys, collections
+import json, unicodedata, io, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p110_feature_space import corpus_features, corpus_type_counts  # noqa: E402
+
+TOKENIZER_NAME = "p111_any_script_nfkd_casefold"
 
 LATIN_PATH  = "corpora/latin_dante_monarchia.txt"
 ARABIC_PATH = "corpora/guide_judeoarabic_ar.txt"   # supports Arabic script OR Judeo-Arabic (Hebrew letters)
@@ -33,25 +38,8 @@ def tokenize_any(text: str):
         toks.append("".join(buf).casefold())
     return toks
 
-def read_tokens(path):
-    with io.open(path, "r", encoding="utf-8", errors="ignore") as f:
-        txt = f.read()
-    txt = strip_diacritics(txt)
-    return tokenize_any(txt)
-
-def basic_features(tokens):
-    # very simple centroid features: length histogram (1–12, 13+), suffix last-1/2 chars freq, vowel-ish ratio per script
-    feat = collections.Counter()
-    for t in tokens:
-        L = len(t)
-        feat[f"len_{min(L,13)}"] += 1
-        if L >= 1: feat[f"suf1_{t[-1]}"] += 1
-        if L >= 2: feat[f"suf2_{t[-2:]}"] += 1
-    n = float(len(tokens)) or 1.0
-    # L1 normalize
-    for k in list(feat.keys()):
-        feat[k] = feat[k] / n
-    return dict(feat), len(tokens)
+def any_script_tokens(text):
+    return tokenize_any(strip_diacritics(text))
 
 def to_py(obj):
     # cast numpy/pandas dtypes if any accidentally sneak in
@@ -70,11 +58,12 @@ def to_py(obj):
     return obj
 
 def main():
-    latin  = read_tokens(LATIN_PATH)
-    arabic = read_tokens(ARABIC_PATH)
+    # same features as the old per-token Counter loop, from cached type counts
+    lat_counts, lat_n = corpus_type_counts(LATIN_PATH, any_script_tokens, TOKENIZER_NAME)
+    ara_counts, ara_n = corpus_type_counts(ARABIC_PATH, any_script_tokens, TOKENIZER_NAME)
 
-    lat_feat, lat_n = basic_features(latin)
-    ara_feat, ara_n = basic_features(arabic)
+    lat_feat = corpus_features(lat_counts, lat_n)
+    ara_feat = corpus_features(ara_counts, ara_n)
 
     out = {
         "latin":  {"n_tokens": lat_n, "features": lat_feat},
@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
 # p112_bootstrap_attribution.py — attribute families vs Latin/Arabic centroids with bootstrap
-# POSIX/Termux-safe, stdlib only.
+# Cosines are one normalised matrix product over the shared p110 feature space;
+# the bootstrap draws all B centroid resamplings as multinomial count matrices
+# and scores them against every family in one product per chunk.
 
-import json, io, random, math, unicodedata
+import argparse, json, io, os, sys, random
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bootstrap_engine import MAX_CELLS  # noqa: E402
+from p110_feature_space import FeatureSpace, read_family_vectors  # noqa: E402
 
 CENTROIDS = "Phase110/out/p111_centroids.json"
 FAMILY_FEATS = "Phase110/out/p110_family_features.tsv"
+FAMILY_BOOT = "Phase110/out/p112_bootstrap_families.tsv"
+
+SEED = 1337
+B_LEGACY = 500
+B_BATCHED = 10000
 
 def to_py(obj):
     if isinstance(obj, dict):
@@ -27,61 +40,11 @@ def load_centroids():
         C = json.load(f)
     return C["latin"]["features"], C["arabic"]["features"]
 
-def read_family_vectors(path):
-    # expect TSV: family \t feature \t value  (long mode) OR a wide .tsv with header
-    # We'll accept your current long-mode from p110 and aggregate.
-    import csv, collections
-    feats = collections.defaultdict(lambda: {})
-    # auto-detect long vs wide
-    with io.open(path, "r", encoding="utf-8") as f:
-        header = f.readline().rstrip("\n").split("\t")
-    if header[:3] == ["family","feature","value"]:
-        with io.open(path, "r", encoding="utf-8") as f:
-            r = csv.DictReader(f, delimiter="\t")
-            for row in r:
-                feats[row["family"]][row["feature"]] = float(row["value"])
-    else:
-        # wide
-        with io.open(path, "r", encoding="utf-8") as f:
-            r = csv.DictReader(f, delimiter="\t")
-            for row in r:
-                fam = row["family"]
-                for k,v in row.items():
-                    if k=="family": continue
-                    try: feats[fam][k] = float(v)
-                    except: pass
-    return feats
-
-def cosine(a, b):
-    num = 0.0; da=0.0; db=0.0
-    keys = set(a.keys()) | set(b.keys())
-    for k in keys:
-        av = a.get(k, 0.0); bv = b.get(k, 0.0)
-        num += av*bv; da += av*av; db += bv*bv
-    if da == 0.0 or db == 0.0: return 0.0
-    return num / (da**0.5 * db**0.5)
-
-def main():
-    latC, araC = load_centroids()
-    fam = read_family_vectors(FAMILY_FEATS)
-    rows = []
-    for name, vec in fam.items():
-        sL = cosine(vec, latC)
-        sA = cosine(vec, araC)
-        delta = sL - sA
-        rows.append((name, sL, sA, delta))
-
-    # write attribution table
-    with io.open("Phase110/out/p112_attribution.tsv", "w", encoding="utf-8") as w:
-        w.write("family\tsim_latin\tsim_arabic\tdelta\tlabel\n")
-        for name, sL, sA, d in sorted(rows, key=lambda x: x[3], reverse=True):
-            lab = "Latin-like" if d >= 0 else "Arabic-like"
-            w.write(f"{name}\t{round(sL,6)}\t{round(sA,6)}\t{round(d,6)}\t{lab}\n")
-
+def legacy_bootstrap(latC, araC, space, famN, delta0, B, seed):
+    """The original loop: random.choice resampling, one replicate at a time."""
     # cheap bootstrap: resample feature keys within each family vector
     # (structure-preserving; gives stability sense without big deps)
-    random.seed(1337)
-    B = 500
+    random.seed(seed)
     agree = 0
     for _ in range(B):
         # perturb centroids by resampling features with replacement
@@ -100,24 +63,124 @@ def main():
         latR = resample_centroid(latC)
         araR = resample_centroid(araC)
         # attribute again and compare sign of delta
-        local_agree = 0; total = 0
-        for name, vec in fam.items():
-            d0 = [r for r in rows if r[0]==name][0][3]
-            d1 = cosine(vec, latR) - cosine(vec, araR)
-            if (d0>=0 and d1>=0) or (d0<0 and d1<0):
-                local_agree += 1
-            total += 1
+        C = FeatureSpace.normalise(space.matrix({"latin": latR, "arabic": araR},
+                                                ["latin", "arabic"]))
+        sims = famN @ C.T
+        d1 = sims[:, 0] - sims[:, 1]
+        total = famN.shape[0]
+        local_agree = int(((delta0 >= 0) == (d1 >= 0)).sum())
         agree += (local_agree/float(total)) if total else 0.0
 
+    return agree/float(B) if B else None
+
+def batched_bootstrap(latC, araC, space, famN, delta0, B, seed, alpha=0.05):
+    """
+    Same resampling as legacy_bootstrap (each centroid's m features drawn
+    m times with replacement, weight = draws x value), but all B replicates
+    at once: the draws are (B x m) multinomial count matrices and the
+    (families x B) deltas come from one product per chunk. Cosine is scale
+    free, so the L1 renormalisation is skipped. Returns per-family arrays:
+    agreement (share of replicates with the same delta sign), mean, ci_lower,
+    ci_upper (percentile CI of the replicate deltas).
+    """
+    rng = np.random.default_rng(seed)
+    sides = []
+    for C in (latC, araC):
+        keys = list(C.keys())
+        sides.append((np.array([space.index[k] for k in keys], dtype=np.int64),
+                      np.array([C[k] for k in keys], dtype=np.float64)))
+    chunk = max(1, MAX_CELLS // max(len(space), famN.shape[0], 1))
+    deltas = []
+    for start in range(0, B, chunk):
+        b = min(chunk, B - start)
+        sims = []
+        for cols, vals in sides:
+            R = np.zeros((b, len(space)))
+            m = len(cols)
+            if m:
+                W = rng.multinomial(m, np.full(m, 1.0 / m), size=b)
+                R[:, cols] = W * vals[None, :]
+            sims.append(famN @ FeatureSpace.normalise(R).T)
+        deltas.append(sims[0] - sims[1])
+    D = np.hstack(deltas) if deltas else np.zeros((famN.shape[0], 0))
+    agreement = ((D >= 0) == (delta0[:, None] >= 0)).mean(axis=1)
+    lo, hi = np.quantile(D, [alpha / 2, 1 - alpha / 2], axis=1)
+    return {
+        "agreement": agreement,
+        "mean": D.mean(axis=1),
+        "ci_lower": lo,
+        "ci_upper": hi,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Family attribution vs Latin/Arabic centroids")
+    ap.add_argument("--mode", choices=("batched", "legacy"), default="batched",
+                    help="batched multinomial bootstrap (default) or the original loop")
+    ap.add_argument("--B", type=int, default=None,
+                    help=f"replicates (default {B_BATCHED} batched, {B_LEGACY} legacy)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--alpha", type=float, default=0.05, help="per-family CI level")
+    args = ap.parse_args()
+    if args.B is not None and args.B < 1:
+        ap.error("--B must be at least 1")
+
+    latC, araC = load_centroids()
+    # n_obs (p110's meta row) is kept out of the vectors
+    fam, _n_obs = read_family_vectors(FAMILY_FEATS)
+    names = sorted(fam)
+    space = FeatureSpace.from_vectors(fam, {"latin": latC, "arabic": araC})
+    famN = FeatureSpace.normalise(space.matrix(fam, names))
+    # (families x 2): [sim_latin, sim_arabic]
+    S = famN @ FeatureSpace.normalise(space.matrix({"latin": latC, "arabic": araC},
+                                                   ["latin", "arabic"])).T
+    delta0 = S[:, 0] - S[:, 1]
+    rows = [(name, float(S[i, 0]), float(S[i, 1]), float(delta0[i]))
+            for i, name in enumerate(names)]
+
+    # write attribution table
+    with io.open("Phase110/out/p112_attribution.tsv", "w", encoding="utf-8") as w:
+        w.write("family\tsim_latin\tsim_arabic\tdelta\tlabel\n")
+        for name, sL, sA, d in sorted(rows, key=lambda x: x[3], reverse=True):
+            lab = "Latin-like" if d >= 0 else "Arabic-like"
+            w.write(f"{name}\t{round(sL,6)}\t{round(sA,6)}\t{round(d,6)}\t{lab}\n")
+
+    if args.mode == "legacy":
+        B = args.B if args.B is not None else B_LEGACY
+        mean_agree = legacy_bootstrap(latC, araC, space, famN, delta0, B, args.seed)
+        per_family = None
+    else:
+        B = args.B if args.B is not None else B_BATCHED
+        per_family = batched_bootstrap(latC, araC, space, famN, delta0, B, args.seed, args.alpha)
+        mean_agree = float(per_family["agreement"].mean()) if len(names) else 0.0
+
     summary = {
         "bootstrap_B": B,
-        "mean_sign_agreement": agree/float(B) if B else None,
+        "mean_sign_agreement": mean_agree,
         "families": len(fam),
+        "mode": args.mode,
+        "seed": args.seed,
     }
+    if per_family is not None:
+        summary["ci_alpha"] = args.alpha
+        summary["families_stable_95"] = int((per_family["agreement"] >= 0.95).sum())
+        summary["families_delta_ci_excludes_0"] = int(
+            ((per_family["ci_lower"] > 0) | (per_family["ci_upper"] < 0)).sum())
+        with io.open(FAMILY_BOOT, "w", encoding="utf-8") as w:
+            w.write("family\tdelta\tsign_agreement\tdelta_boot_mean\tdelta_ci_lower\t"
+                    "delta_ci_upper\tlabel\n")
+            for i in np.argsort(-delta0, kind="stable"):
+                d = float(delta0[i])
+                lab = "Latin-like" if d >= 0 else "Arabic-like"
+                w.write(f"{names[i]}\t{round(d,6)}\t{round(float(per_family['agreement'][i]),6)}\t"
+                        f"{round(float(per_family['mean'][i]),6)}\t"
+                        f"{round(float(per_family['ci_lower'][i]),6)}\t"
+                        f"{round(float(per_family['ci_upper'][i]),6)}\t{lab}\n")
     with io.open("Phase110/out/p112_bootstrap_summary.json", "w", encoding="utf-8") as w:
         w.write(json.dumps(to_py(summary), ensure_ascii=False, indent=2))
 
     print("[OK] Wrote attribution map → Phase110/out/p112_attribution.tsv")
+    if per_family is not None:
+        print(f"[OK] Wrote per-family bootstrap ({B} replicates) → {FAMILY_BOOT}")
     print("[OK] Wrote bootstrap summary → Phase110/out/p112_bootstrap_summary.json")
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 # p113_permutation_control.py — proper label permutation for Δ = simL - simA
-import json, io, random, csv
+import json, io, csv, os, sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p113_permutation_engine import sign_flip_test
+
+NPERM = int(os.environ.get("NPERM", "100000"))
 
 ATTR = "Phase110/out/p112_attribution.tsv"
 
@@ -13,27 +17,13 @@ def load_delta():
     return deltas
 
 def main():
-    random.seed(2025)
     deltas = load_delta()
-    n = len(deltas)
-    if n == 0:
-        out = {"n_perm": 0, "delta_observed_mean": None, "delta_null_mean": None, "delta_null_sd": None, "p_value": None}
-    else:
-        obs = sum(deltas)/n
-        # sign-flip permutation: swap Latin/Arabic similarity signs with 0.5 prob
-        NPERM = 10000
-        null = []
-        for _ in range(NPERM):
-            s = 0.0
-            for d in deltas:
-                s += d if random.random() < 0.5 else -d
-            null.append(s/n)
-        mu = sum(null)/NPERM
-        sd = (sum((x-mu)*(x-mu) for x in null)/max(NPERM-1,1))**0.5
-        # two-sided p
-        more = sum(1 for x in null if abs(x) >= abs(obs))
-        p = (more+1)/(NPERM+1)
-        out = {"n_perm": NPERM, "delta_observed_mean": obs, "delta_null_mean": mu, "delta_null_sd": sd, "p_value": p}
+    # sign-flip permutation: swap Latin/Arabic similarity signs with 0.5 prob,
+    # drawn as one +-1 matrix per chunk (see p113_permutation_engine)
+    res = sign_flip_test(deltas, n_perm=NPERM, seed=2025)
+    out = {"n_perm": res["n_perm"], "delta_observed_mean": res["observed"],
+           "delta_null_mean": res["null_mean"], "delta_null_sd": res["null_sd"],
+           "p_value": res["p_value"]}
     with io.open("Phase110/out/p113_permutation_summary.json", "w", encoding="utf-8") as w:
         w.write(json.dumps(out, ensure_ascii=False, indent=2))
     print("[OK] Wrote permutation summary → Phase110/out/p113_permutation_summary.json")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Vectorized permutation-test engine (sign-flip and label-resampling nulls)
+
+p113_permutation_control.py drew 10,000 sign-flip permutations in a
+pure-Python double loop, and tests/test5_permutation_section_bias.sh drew
+2,000 label samples per stem one at a time. Here every batch of
+permutations is one NumPy matrix:
+
+    sign-flip     S  (B x n, entries +-1)        null = S @ x / n
+    label draws   I  (B x n, indices into pool)  counts = batched bincount
+                  (with replacement, as in Test5, or without = shuffles)
+
+Batches are processed in chunks of `chunk` rows so memory stays bounded
+at chunk * n values regardless of the total number of permutations.
+
+Early stopping (sequential Monte Carlo, Besag & Clifford 1991): with
+`stop_after=h`, sampling stops as soon as h null statistics are at least
+as extreme as the observed one, and the p-value is h / L (L = draws so
+far). Clearly non-significant tests then stop after a few hundred draws,
+while small p-values still get the full n_perm budget, which makes
+10^5 - 10^6 permutations per stem affordable. Without early stopping the
+usual (g + 1) / (n_perm + 1) estimate is reported.
+
+Usage (library):
+
+    from p113_permutation_engine import sign_flip_test, purity_test
+    res = sign_flip_test(deltas, n_perm=100000, seed=2025)
+    res = purity_test(stem_sections, pool_sections, n_perm=100000,
+                      stop_after=100, seed=1)
+
+Requires numpy.
+"""
+
+import numpy as np
+
+DEFAULT_CHUNK = 8192
+
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _chunk_sizes(n_perm, chunk):
+    done = 0
+    while done < n_perm:
+        b = min(chunk, n_perm - done)
+        yield b
+        done += b
+
+
+def _p_value(n_extreme, n_drawn, stopped):
+    if stopped:
+        return n_extreme / n_drawn
+    return (n_extreme + 1) / (n_drawn + 1)
+
+
+def sign_flip_test(values, n_perm=10000, seed=None, stop_after=None,
+                   chunk=DEFAULT_CHUNK, keep_null=True):
+    """
+    Two-sided sign-flip permutation test of mean(values) against 0.
+
+    Returns dict: n_perm (draws actually used), observed, null_mean,
+    null_sd, p_value, stopped_early.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    if n == 0:
+        return {"n_perm": 0, "observed": None, "null_mean": None,
+                "null_sd": None, "p_value": None, "stopped_early": False}
+    rng = _rng(seed)
+    obs = float(x.mean())
+    thresh = abs(obs)
+
+    n_ext = n_drawn = 0
+    s1 = s2 = 0.0
+    stopped = False
+    for b in _chunk_sizes(n_perm, chunk):
+        signs = rng.integers(0, 2, size=(b, n), dtype=np.int8) * 2 - 1
+        null = signs @ x / n
+        if stop_after is not None:
+            # only count draws up to the h-th exceedance
+            ext = np.flatnonzero(np.abs(null) >= thresh)
+            if n_ext + len(ext) >= stop_after:
+                cut = ext[stop_after - n_ext - 1] + 1
+                null = null[:cut]
+                n_ext = stop_after
+                stopped = True
+            else:
+                n_ext += len(ext)
+        else:
+            n_ext += int(np.count_nonzero(np.abs(null) >= thresh))
+        n_drawn += len(null)
+        if keep_null:
+            s1 += float(null.sum())
+            s2 += float((null * null).sum())
+        if stopped:
+            break
+
+    out = {"n_perm": n_drawn, "observed": obs, "null_mean": None,
+           "null_sd": None, "p_value": _p_value(n_ext, n_drawn, stopped),
+           "stopped_early": stopped}
+    if keep_null:
+        mu = s1 / n_drawn
+        var = (s2 - n_drawn * mu * mu) / max(n_drawn - 1, 1)
+        out["null_mean"] = mu
+        out["null_sd"] = max(var, 0.0) ** 0.5
+    return out
+
+
+def encode_labels(*label_lists):
+    """Map labels to small ints over the union; returns (codes..., vocab)."""
+    vocab = sorted(set().union(*[set(l) for l in label_lists]))
+    idx = {v: i for i, v in enumerate(vocab)}
+    codes = [np.fromiter((idx[v] for v in l), dtype=np.int64, count=len(l))
+             for l in label_lists]
+    return (*codes, vocab)
+
+
+def batched_counts(label_matrix, k):
+    """
+    Per-row label counts of a (B x n) integer matrix with values < k,
+    via one bincount over row-offset codes. Returns (B x k).
+    """
+    b = label_matrix.shape[0]
+    flat = (label_matrix + (np.arange(b, dtype=np.int64) * k)[:, None]).ravel()
+    return np.bincount(flat, minlength=b * k).reshape(b, k)
+
+
+def purity_test(group_labels, pool_labels, n_perm=2000, seed=None,
+                replace=True, stop_after=None, chunk=DEFAULT_CHUNK):
+    """
+    One-sided test of the dominant-label fraction ("purity") of a group
+    against groups of the same size drawn from a pool of labels.
+
+    replace=True  draws with replacement (Test5's random.choices null)
+    replace=False draws without replacement (a label shuffle)
+
+    Returns dict: n, observed, n_perm (draws used), p_value, stopped_early.
+    """
+    g, pool, vocab = encode_labels(list(group_labels), list(pool_labels))
+    n = len(g)
+    if n == 0:
+        return {"n": 0, "observed": 0.0, "n_perm": 0, "p_value": 1.0,
+                "stopped_early": False}
+    k = len(vocab)
+    rng = _rng(seed)
+    obs_max = int(np.bincount(g, minlength=k).max())
+
+    # bound each chunk to ~DEFAULT_CHUNK * 64 matrix cells
+    width = n if replace else len(pool)
+    rows = max(1, min(chunk, (DEFAULT_CHUNK * 64) // width))
+    n_ext = n_drawn = 0
+    stopped = False
+    for b in _chunk_sizes(n_perm, rows):
+        if replace:
+            idx = rng.integers(0, len(pool), size=(b, n))
+        else:
+            idx = np.argsort(rng.random((b, len(pool))), axis=1)[:, :n]
+        perm_max = batched_counts(pool[idx], k).max(axis=1)
+        ext = np.flatnonzero(perm_max >= obs_max)
+        if stop_after is not None and n_ext + len(ext) >= stop_after:
+            n_drawn += int(ext[stop_after - n_ext - 1]) + 1
+            n_ext = stop_after
+            stopped = True
+            break
+        n_ext += len(ext)
+        n_drawn += b
+
+    return {"n": n, "observed": obs_max / n, "n_perm": n_drawn,
+            "p_value": _p_value(n_ext, n_drawn, stopped),
+            "stopped_early": stopped}
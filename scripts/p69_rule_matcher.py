@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Compiled rule matcher for the Phase 69 rulebook (prefix/suffix/pair/chargram)
+
+Replaces the per-script copies of match_rule_on_token / match_rules_to_token
+/ match (p71_build_pmi_network.py, p71_cluster_rules.py, p90_token_profiles.py,
+p10_eval_p69_chargram_coverage.py), which loop over every rule for every
+token with startswith / endswith / `in`.
+
+Every rule is compiled to a conjunction of up to three literal conditions:
+
+    prefix   token starts with P
+    suffix   token ends with S
+    contains P occurs anywhere in token
+
+and all conditions of the rulebook are indexed once:
+
+    - a prefix trie           (walk token left to right)
+    - a reversed-suffix trie  (walk token right to left)
+    - an Aho-Corasick automaton over the `contains` patterns
+
+so one pass over the token's characters yields every satisfied condition,
+and a rule fires when all of its conditions are satisfied. Results are
+rule ordinals in rulebook order, so callers see the same hit order as the
+linear loops.
+
+Three compilers cover the rule readings used in the repo:
+
+    compile_p71_rule(r)          kind + pre/suf/pattern (p71 semantics)
+    compile_p69_rule(r)          kind + pattern, pairs as "pre|suf" (p69_validate)
+    compile_side_rule(pat, side) left/right/any side constraint (p90, p10)
+
+Usage (library):
+
+    from p69_rule_matcher import RuleMatcher, compile_p71_rule
+    m = RuleMatcher([compile_p71_rule(r) for r in rules])
+    m.match("qokeedy")          # -> [rule ordinals]
+    X = m.incidence(tokens)     # scipy.sparse CSR, tokens x rules, 0/1
+
+match() is pure standard library; incidence() needs numpy + scipy.
+"""
+
+PREFIX, SUFFIX, CONTAINS = "prefix", "suffix", "contains"
+
+
+# -------------
+# Rule compilers
+# -------------
+
+def compile_p71_rule(r):
+    """
+    Conditions for a rule under p71 semantics (see match_rule_on_token).
+    Returns a tuple of (cond_kind, pattern) pairs; empty means never fires.
+    """
+    kind = r.get("kind", "")
+    pre = r.get("pre", "") or ""
+    suf = r.get("suf", "") or ""
+    pat = r.get("pattern", "") or ""
+
+    if kind == "prefix" and pre:
+        return ((PREFIX, pre),)
+    if kind == "suffix" and suf:
+        return ((SUFFIX, suf),)
+    if kind == "pair":
+        conds = []
+        if pre:
+            conds.append((PREFIX, pre))
+        if suf:
+            conds.append((SUFFIX, suf))
+        return tuple(conds)
+    if kind == "chargram" and pat:
+        return ((CONTAINS, pat),)
+    return ()
+
+
+def compile_p69_rule(r):
+    """
+    Conditions for a rule under Phase69/p69_validate.py semantics: a pair
+    pattern is "pre|suf" (either side may be empty), prefix / suffix /
+    chargram rules use the pattern itself. Empty means never fires.
+    """
+    kind = r.get("kind", "")
+    pat = r.get("pattern", "") or ""
+
+    if kind == "pair":
+        pre, suf = pat.split("|", 1) if "|" in pat else (pat, "")
+        conds = []
+        if pre:
+            conds.append((PREFIX, pre))
+        if suf:
+            conds.append((SUFFIX, suf))
+        return tuple(conds)
+    if not pat:
+        return ()
+    if kind == "prefix":
+        return ((PREFIX, pat),)
+    if kind == "suffix":
+        return ((SUFFIX, pat),)
+    if kind == "chargram":
+        return ((CONTAINS, pat),)
+    return ()
+
+
+def compile_side_rule(pattern, side):
+    """Conditions for a pattern with a left/right/any side constraint."""
+    if not pattern:
+        return ()
+    if side == "left":
+        return ((PREFIX, pattern),)
+    if side == "right":
+        return ((SUFFIX, pattern),)
+    return ((CONTAINS, pattern),)
+
+
+def _holds(cond, pat, tok):
+    if cond == PREFIX:
+        return tok.startswith(pat)
+    if cond == SUFFIX:
+        return tok.endswith(pat)
+    return pat in tok
+
+
+def match_rule_on_token(r, tok):
+    """
+    Reference (uncompiled) p71 matcher, kept for cross-checking.
+    Deterministic, conservative matching based only on fields we see in
+    p69_rules_final.json.
+    """
+    conds = compile_p71_rule(r)
+    return bool(conds) and all(_holds(c, p, tok) for c, p in conds)
+
+
+# -------------
+# Index structures
+# -------------
+
+class _Trie:
+    """Character trie; terminal nodes carry a condition id under key None."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, word, cid):
+        node = self.root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[None] = cid
+
+    def walk(self, chars, out):
+        node = self.root
+        for ch in chars:
+            node = node.get(ch)
+            if node is None:
+                return
+            cid = node.get(None)
+            if cid is not None:
+                out.append(cid)
+
+
+class _AhoCorasick:
+    """Aho-Corasick automaton over literal patterns; reports condition ids."""
+
+    def __init__(self, patterns):
+        # patterns: list of (pattern, cid)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pat, cid in patterns:
+            s = 0
+            for ch in pat:
+                nxt = self.goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[s][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                s = nxt
+            self.out[s].append(cid)
+
+        # BFS to set failure links and merge outputs
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            s = queue[head]
+            head += 1
+            for ch, t in self.goto[s].items():
+                queue.append(t)
+                f = self.fail[s]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                cand = self.goto[f].get(ch, 0)
+                self.fail[t] = cand if cand != t else 0
+                self.out[t] = self.out[t] + self.out[self.fail[t]]
+
+    def scan(self, text, out):
+        goto, fail, outs = self.goto, self.fail, self.out
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if outs[s]:
+                out.extend(outs[s])
+
+
+# -------------
+# Matcher
+# -------------
+
+class RuleMatcher:
+    """
+    Compiled matcher over a list of per-rule condition tuples
+    (as produced by compile_p71_rule / compile_side_rule).
+    """
+
+    def __init__(self, compiled_rules):
+        self.n_rules = len(compiled_rules)
+        cond_ids = {}
+        self.cond_rules = []             # cid -> [rule ordinals]
+        self.n_required = []             # rule ordinal -> #conditions
+
+        for ordinal, conds in enumerate(compiled_rules):
+            conds = tuple(dict.fromkeys(conds))
+            self.n_required.append(len(conds))
+            for cond in conds:
+                cid = cond_ids.get(cond)
+                if cid is None:
+                    cid = cond_ids[cond] = len(self.cond_rules)
+                    self.cond_rules.append([])
+                self.cond_rules[cid].append(ordinal)
+
+        self.prefix_trie = _Trie()
+        self.suffix_trie = _Trie()
+        contains = []
+        for (kind, pat), cid in cond_ids.items():
+            if kind == PREFIX:
+                self.prefix_trie.add(pat, cid)
+            elif kind == SUFFIX:
+                self.suffix_trie.add(reversed(pat), cid)
+            else:
+                contains.append((pat, cid))
+        self.automaton = _AhoCorasick(contains)
+        self._memo = {}
+
+    def _satisfied(self, token):
+        cids = []
+        self.prefix_trie.walk(token, cids)
+        self.suffix_trie.walk(reversed(token), cids)
+        self.automaton.scan(token, cids)
+        return set(cids)
+
+    def match(self, token):
+        """Sorted rule ordinals firing on token (memoised per type)."""
+        hit = self._memo.get(token)
+        if hit is not None:
+            return hit
+        counts = {}
+        for cid in self._satisfied(token):
+            for ordinal in self.cond_rules[cid]:
+                counts[ordinal] = counts.get(ordinal, 0) + 1
+        n_req = self.n_required
+        hit = sorted(o for o, c in counts.items() if c == n_req[o])
+        self._memo[token] = hit
+        return hit
+
+    def incidence(self, tokens):
+        """
+        Sparse binary token x rule incidence matrix (scipy CSR, uint8),
+        one row per running token, built from one match() per type.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        type_ids = {}
+        rows = []
+        for t in tokens:
+            tid = type_ids.get(t)
+            if tid is None:
+                tid = type_ids[t] = len(type_ids)
+            rows.append(tid)
+
+        indptr = [0]
+        indices = []
+        for t in type_ids:
+            indices.extend(self.match(t))
+            indptr.append(len(indices))
+        by_type = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.uint8),
+             np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(type_ids), self.n_rules),
+        )
+        return by_type[np.asarray(rows, dtype=np.int64)]
@@ -25,6 +25,9 @@ import json
 import os
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_type_segmenter import TypeSegmenter, rulebook_hash  # noqa: E402
+
 # --- Config ------------------------------------------------------------
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -179,9 +182,14 @@ def main():
     n_seg = 0
     n_any = 0
 
+    seg = TypeSegmenter(
+        "p69_kindaware",
+        lambda t: best_segmentation(t, prefix_w, suffix_w),
+        rulebook_hash("p69_kindaware", prefix_w, suffix_w, MIN_STEM_LEN),
+    )
+
     with open(out_path, "w", encoding="utf-8") as out:
-        for tok in tokens:
-            p, stem, s = best_segmentation(tok, prefix_w, suffix_w)
+        for tok, (p, stem, s) in zip(tokens, seg.segment(tokens)):
             if p or s:
                 n_seg += 1
             if stem:
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Shared type-level segmentation engine with an on-disk cache
+
+The per-token segmenters (p69b_segment_with_lattice.py,
+p69_segment_with_kindaware_lattice.py, p71_segment_schemeC.py) are pure
+functions of (rulebook, token). The 29,687-token Voynich stream has only
+a few thousand distinct types, so this module:
+
+    1. deduplicates the running tokens into types,
+    2. segments each type once (or takes it from the cache),
+    3. expands the per-type results back into token order.
+
+The cache is keyed by (rulebook hash, token). The rulebook hash covers the
+segmenter name plus whatever the segmenter depends on (rule tables,
+affix lists, constants), so editing a rulebook automatically starts a
+fresh cache file and reruns with an unchanged rulebook skip segmentation.
+
+The matching code is part of the key too: TypeSegmenter folds in
+SEGMENTER_VERSION and a hash of the source files that define segment_fn
+(plus any extra functions/classes/modules passed as code=...), so editing
+the segmenter itself also invalidates its cache instead of silently
+serving results from the old logic.
+
+Cache files live in cache/segmentation/<name>_<key12>.json and hold
+{"name", "rulebook_hash", "code_hash", "types": {token: result}}. Results must be
+JSON-serialisable (tuples come back as lists and are re-tupled on load;
+None is kept as None).
+
+Usage (library):
+
+    from p69_type_segmenter import TypeSegmenter, rulebook_hash
+    seg = TypeSegmenter("p71_schemeC",
+                        lambda t: segment_token(t, prefixes, suffixes),
+                        rulebook_hash("p71_schemeC", prefixes, suffixes))
+    rows = seg.segment(tokens)   # one result per token, in order
+
+Set P69_SEG_CACHE=0 in the environment to disable the on-disk cache.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, "cache", "segmentation")
+
+# Bump to invalidate every segmentation cache (e.g. a change to the result
+# format or to this module's expansion logic).
+SEGMENTER_VERSION = 1
+
+
+def rulebook_hash(*parts) -> str:
+    """
+    sha256 over a canonical JSON dump of the given parts
+    (segmenter name, rule tables, affix lists, constants ...).
+    """
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def code_hash(*objs) -> str:
+    """
+    sha256 over the source files defining the given functions, classes or
+    modules (deduplicated, in sorted path order). Objects without a source
+    file (builtins, C extensions, interactive code) contribute their qualified name instead.
+    """
+    paths, names = set(), set()
+    for obj in objs:
+        try:
+            path = inspect.getsourcefile(obj)
+        except TypeError:
+            path = None
+        if path and os.path.isfile(path):
+            paths.add(os.path.abspath(path))
+        else:
+            names.add(f"{getattr(obj, '__module__', '')}."
+                      f"{getattr(obj, '__qualname__', repr(obj))}")
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            h.update(f.read())
+        h.update(b"\0")
+    for name in sorted(names):
+        h.update(name.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+def _freeze(v):
+    """JSON lists back to tuples so cached and fresh results compare equal."""
+    if isinstance(v, list):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+
+class TypeSegmenter:
+    """
+    Memoise segment_fn(token) per distinct type, persisted per
+    (rulebook hash, segmenter code hash). code= names extra functions,
+    classes or modules whose source the matching depends on.
+    """
+
+    def __init__(self, name, segment_fn, rb_hash, code=(), cache_dir=CACHE_DIR):
+        self.name = name
+        self.segment_fn = segment_fn
+        self.rb_hash = rb_hash
+        self.code_hash = code_hash(segment_fn, *code)
+        self.key = rulebook_hash(rb_hash, self.code_hash, SEGMENTER_VERSION)
+        self.use_disk = os.environ.get("P69_SEG_CACHE", "1") != "0"
+        self.path = os.path.join(cache_dir, f"{name}_{self.key[:12]}.json")
+        self.types = self._load()
+        self.n_computed = 0
+
+    def _load(self):
+        if not self.use_disk or not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable segmentation cache {self.path}: {e}",
+                  file=sys.stderr)
+            return {}
+        if (data.get("rulebook_hash") != self.rb_hash
+                or data.get("code_hash") != self.code_hash):
+            return {}
+        return {t: _freeze(v) for t, v in data.get("types", {}).items()}
+
+    def _save(self):
+        if not self.use_disk:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name,
+                       "rulebook_hash": self.rb_hash,
+                       "code_hash": self.code_hash,
+                       "types": self.types}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def segment_types(self, types):
+        """Return {type: result} for the given types, computing only misses."""
+        missing = [t for t in set(types) if t not in self.types]
+        for t in missing:
+            self.types[t] = self.segment_fn(t)
+        self.n_computed += len(missing)
+        if missing:
+            self._save()
+        return {t: self.types[t] for t in types}
+
+    def segment(self, tokens):
+        """Segment a running token list; returns results in token order."""
+        tokens = list(tokens)
+        before = self.n_computed
+        table = self.segment_types(set(tokens))
+        fresh = self.n_computed - before
+        print(f"[INFO] {self.name}: {len(tokens)} tokens, {len(table)} types "
+              f"({len(table) - fresh} from cache, {fresh} segmented)")
+        return [table[t] for t in tokens]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Phase 69b: benchmark Ed1RuleIndex against the linear best_rule_match scan
+
+Checks that the precompiled deletion-neighbourhood index returns exactly
+the same (rule_id, edit_distance) as the linear scan for every token, and
+reports wall-clock time for both.
+
+The real Phase69/Phase70 rulebooks are kind/pattern rulebooks, so few or
+no rules carry a prefix+stem+suffix full form. Use --synthetic N to build
+N stand-in rules from the N most frequent token types (with a decaying
+support), which exercises the same code path at rulebook sizes like the
+Phase 70 candidate sets.
+
+Run from the root of Voynich_Reproducible_Core:
+
+    python3 scripts/p69b_bench_lattice_index.py --synthetic 2000
+    python3 scripts/p69b_bench_lattice_index.py --rulebook Phase70/out/p70_rulebook_extended.json
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from p69b_segment_with_lattice import (  # noqa: E402
+    ROOT, TOKENS_PATH, RULEBOOK_JSON,
+    load_tokens, load_rulebook, best_rule_match,
+)
+from p69b_lattice_index import Ed1RuleIndex  # noqa: E402
+
+
+def synthetic_rules(tokens, n):
+    """Stand-in rules: one per frequent type, split as stem-only."""
+    rules = []
+    for i, (t, c) in enumerate(Counter(tokens).most_common(n)):
+        rules.append({
+            "id": f"syn{i:05d}",
+            "prefix": "",
+            "stem": t,
+            "suffix": "",
+            "full": t,
+            "support": c // 2,   # coarse, to create support ties
+            "accuracy": 0.0,
+        })
+    rules.sort(key=lambda r: (-r["support"], r["id"]))
+    print(f"[INFO] Built {len(rules)} synthetic rules from frequent types")
+    return rules
+
+
+def key(rule, dist):
+    return (rule["id"] if rule else None, dist)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tokens", default=TOKENS_PATH)
+    ap.add_argument("--rulebook", default=RULEBOOK_JSON)
+    ap.add_argument("--synthetic", type=int, default=0,
+                    help="use N synthetic rules instead of the rulebook")
+    args = ap.parse_args()
+
+    tokens = load_tokens(os.path.join(ROOT, args.tokens))
+    if args.synthetic:
+        rules = synthetic_rules(tokens, args.synthetic)
+    else:
+        rules = load_rulebook(os.path.join(ROOT, args.rulebook))
+
+    t0 = time.perf_counter()
+    linear = [key(*best_rule_match(t, rules)) for t in tokens]
+    t_linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = Ed1RuleIndex(rules)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [key(*index.best_match(t)) for t in tokens]
+    t_index = time.perf_counter() - t0
+
+    mismatches = [(t, a, b) for t, a, b in zip(tokens, linear, indexed) if a != b]
+    matched = sum(1 for rid, _ in indexed if rid is not None)
+
+    print(f"[STATS] tokens={len(tokens)} rules={len(rules)} matched={matched}")
+    print(f"[TIME] linear scan : {t_linear:8.3f} s")
+    print(f"[TIME] index build : {t_build:8.3f} s")
+    print(f"[TIME] index query : {t_index:8.3f} s "
+          f"(speedup x{t_linear / max(t_index + t_build, 1e-9):.1f} incl. build)")
+
+    if mismatches:
+        for t, a, b in mismatches[:10]:
+            print(f"[DIFF] {t}: linear={a} index={b}", file=sys.stderr)
+        sys.exit(f"[ERR] {len(mismatches)} tokens disagree between linear scan and index")
+    print("[OK] Index agrees with linear scan on every token.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Phase 69b: precompiled edit-distance-1 index over rule full forms
+
+Replaces the linear scan in p69b_segment_with_lattice.py::best_rule_match
+(every token x every rule x edit_distance_leq1) with a deletion-
+neighbourhood hash (SymSpell-style, restricted to distance <= 1).
+
+For a rule full form f and a token t, edit_distance(t, f) <= 1 iff one of:
+
+    - t == f                                   (distance 0)
+    - len(t) == len(f) and, for some i,
+      t[:i] + t[i+1:] == f[:i] + f[i+1:]       (one substitution)
+    - t == f with one character deleted        (token one shorter)
+    - t with one character deleted == f        (token one longer)
+
+All four cases are exact hash lookups, so no candidate needs to be
+re-verified with a DP. Keying substitutions by (position, deletion)
+keeps transpositions such as "ab"/"ba" out of the candidate set.
+
+Each key maps to the best rule ordinal under the same ordering as the
+linear scan (rules pre-sorted by -support, then id), so the winner is
+the same rule with the same tie-breaking: distance, then support, then id.
+
+Cost per token is O(len(token)) hash probes, independent of the number
+of rules. Build cost is O(sum of len(full)) over the rulebook.
+
+Usage (library):
+
+    from p69b_lattice_index import Ed1RuleIndex
+    index = Ed1RuleIndex(rules)           # rules as from load_rulebook()
+    rule, dist = index.best_match(token)  # same contract as best_rule_match
+
+See p69b_bench_lattice_index.py for a timing/equivalence check against
+the linear scan.
+"""
+
+
+def _deletions(s: str):
+    """Yield (i, s with s[i] removed) for every position i."""
+    for i in range(len(s)):
+        yield i, s[:i] + s[i + 1:]
+
+
+class Ed1RuleIndex:
+    """
+    Hash index answering "best rule within edit distance <= 1" for a token.
+
+    `rules` must already be in tie-break order (as returned by
+    p69b_segment_with_lattice.load_rulebook): earlier rules win ties.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.exact = {}        # full -> best ordinal
+        self.subst = {}        # (i, full minus char i) -> best ordinal
+        self.shorter = {}      # full minus any one char -> best ordinal
+
+        for ordinal, r in enumerate(self.rules):
+            full = r["full"]
+            if not full:
+                continue
+            self.exact.setdefault(full, ordinal)
+            for i, d in _deletions(full):
+                # setdefault keeps the first (best-ranked) rule per key
+                self.subst.setdefault((i, d), ordinal)
+                self.shorter.setdefault(d, ordinal)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def best_ordinal(self, token: str):
+        """
+        Return (ordinal, dist) of the best rule for token, or (None, None).
+        """
+        hit = self.exact.get(token)
+        if hit is not None:
+            return hit, 0
+
+        best = None
+        # token is a rule with one char deleted
+        hit = self.shorter.get(token)
+        if hit is not None:
+            best = hit
+        for i, d in _deletions(token):
+            # one substitution at position i
+            hit = self.subst.get((i, d))
+            if hit is not None and (best is None or hit < best):
+                best = hit
+            # token is a rule with one char inserted
+            hit = self.exact.get(d)
+            if hit is not None and (best is None or hit < best):
+                best = hit
+
+        if best is None:
+            return None, None
+        return best, 1
+
+    def best_match(self, token: str):
+        """
+        Drop-in replacement for best_rule_match(token, rules).
+        Returns (rule, dist) or (None, None).
+        """
+        ordinal, dist = self.best_ordinal(token)
+        if ordinal is None:
+            return None, None
+        return self.rules[ordinal], dist
@@ -21,10 +21,12 @@ def load_tokens():
         pass
     if not tokens_path:
         tokens_path = DEFAULT_TOKENS_PATH
+    if not os.path.isabs(tokens_path):
+        tokens_path = os.path.join(ROOT, tokens_path)
     if not os.path.isfile(tokens_path):
         sys.exit(f"[ERR] Tokens file not found: {tokens_path}")
-    with open(tokens_path, "r", encoding="utf-8") as f:
-        tokens = [l.strip() for l in f if l.strip()]
+    from p6_token_store import load_tokens as store_load_tokens
+    tokens = store_load_tokens(tokens_path)
     print(f"[INFO] Loaded {len(tokens):6d} tokens from {tokens_path}")
     return tokens
 
@@ -34,7 +34,8 @@ Output:
     corpora/voynich_segmented_p69b.tsv
 
 This script has NO external dependencies beyond the standard library
-and p6_config.py + p69_rules_final.json.
+and p6_config.py + p69b_lattice_index.py + p69_type_segmenter.py
++ p69_rules_final.json.
 """
 
 import os
@@ -48,6 +49,10 @@ except ImportError:
     print("[ERR] Could not import p6_config.py or VOYNICH_TOKENS.", file=sys.stderr)
     sys.exit(1)
 
+from p69b_lattice_index import Ed1RuleIndex
+from p69_type_segmenter import TypeSegmenter, rulebook_hash
+from p6_token_store import load_tokens as store_load_tokens
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
 TOKENS_PATH = os.path.join(ROOT, VOYNICH_TOKENS)
@@ -58,15 +63,8 @@ def load_tokens(path: str):
     if not os.path.isfile(path):
         print(f"[ERR] Tokens file not found: {path}", file=sys.stderr)
         sys.exit(1)
-    tokens = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            t = line.strip()
-            if not t:
-                continue
-            # Allow either "token" or "id token" formats; keep token as last field
-            parts = t.split()
-            tokens.append(parts[-1])
+    # canonical path -> shared token store; other files keep the last field
+    tokens = store_load_tokens(path)
     if not tokens:
         print("[ERR] No tokens loaded.", file=sys.stderr)
         sys.exit(1)
@@ -187,8 +185,9 @@ def edit_distance_leq1(a: str, b: str) -> int:
             if diff > 1:
                 return 2
             i += 1  # skip one char in longer string
-    # If we exited with at most one extra char, it's fine
-    return diff if diff <= 1 else 2
+    # Lengths differ by one, so at most one skipped char means distance 1
+    # (the unmatched char may also be the trailing one, with diff == 0 here).
+    return 1 if diff <= 1 else 2
 
 
 def best_rule_match(token: str, rules):
@@ -222,22 +221,29 @@ def segment_tokens(tokens, rules):
     Apply lattice matching to all tokens.
     Return list of (token, prefix, stem, suffix, rule_id, dist) for matches,
     and count of unmatched.
+
+    Matching goes through the precompiled Ed1RuleIndex (same result as
+    best_rule_match, but O(len(token)) per token instead of O(#rules)),
+    once per distinct type via the cached TypeSegmenter.
     """
+    index = Ed1RuleIndex(rules)
+
+    def match(t):
+        rule, dist = index.best_match(t)
+        if rule is None:
+            return None
+        return (rule["prefix"], rule["stem"], rule["suffix"], rule["id"], dist)
+
+    seg = TypeSegmenter("p69b_lattice", match,
+                        rulebook_hash("p69b_lattice", rules),
+                        code=(Ed1RuleIndex,))
     out = []
     unmatched = 0
-    for t in tokens:
-        rule, dist = best_rule_match(t, rules)
-        if rule is None:
+    for t, hit in zip(tokens, seg.segment(tokens)):
+        if hit is None:
             unmatched += 1
             continue
-        out.append((
-            t,
-            rule["prefix"],
-            rule["stem"],
-            rule["suffix"],
-            rule["id"],
-            dist
-        ))
+        out.append((t,) + tuple(hit))
     print(f"[INFO] Matched {len(out):6d} / {len(tokens):6d} tokens "
           f"({len(out)/len(tokens)*100:5.2f}%) with edit_distance <= 1")
     return out, unmatched
@@ -1,62 +1,40 @@
 #!/usr/bin/env python3
+import argparse
 import sys
-import math
-from collections import Counter
 
-def entropy(chars: str) -> float:
-    c = Counter(chars)
-    n = sum(c.values())
-    if n == 0:
-        return 0.0
-    return -sum((v / n) * math.log2(v / n) for v in c.values() if v)
+from p6_ngram_stats import MAX_K, stream_file
 
-def mi1(chars: str) -> float:
-    # Mutual information between adjacent characters
-    if len(chars) < 2:
-        return 0.0
-
-    pair_counts = Counter(zip(chars, chars[1:]))
-    n_pairs = sum(pair_counts.values())
-    if n_pairs == 0:
-        return 0.0
-
-    x_counts = Counter()
-    y_counts = Counter()
-    for (a, b), v in pair_counts.items():
-        x_counts[a] += v
-        y_counts[b] += v
-
-    mi = 0.0
-    for (a, b), v in pair_counts.items():
-        p_xy = v / n_pairs
-        p_x = x_counts[a] / n_pairs
-        p_y = y_counts[b] / n_pairs
-        # avoid any numerical weirdness
-        if p_xy > 0 and p_x > 0 and p_y > 0:
-            mi += p_xy * math.log2(p_xy / (p_x * p_y))
-
-    return mi
+# Character statistics are streamed in chunks (see p6_ngram_stats.py), so
+# large corpora no longer have to be joined into one string in memory.
+# An optional second argument K adds H2..HK, conditional entropies and
+# MI2..MIK (MI between characters d apart); K=1 prints the original lines.
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: p6_compute_entropy_mi.py <tokens.txt>", file=sys.stderr)
-        sys.exit(1)
-
-    path = sys.argv[1]
+    ap = argparse.ArgumentParser(prog="p6_compute_entropy_mi.py")
+    ap.add_argument("tokens", help="tokens.txt")
+    ap.add_argument("K", nargs="?", type=int, default=1,
+                    help=f"highest block order / MI lag (1..{MAX_K}, default 1)")
+    args = ap.parse_args()
+    if not 1 <= args.K <= MAX_K:
+        ap.error(f"K must be in 1..{MAX_K} (k-gram ids pack {MAX_K} characters "
+                 f"into 64 bits), got {args.K}")
+
+    path = args.tokens
+    k = args.K
     try:
-        with open(path, encoding="utf-8") as f:
-            tokens = [line.strip() for line in f if line.strip()]
+        st = stream_file(path, max_k=k).result(marginals="pair")
     except FileNotFoundError:
         print(f"[ERR] File not found: {path}", file=sys.stderr)
         sys.exit(1)
 
-    chars = "".join(tokens)
-    H1 = entropy(chars)
-    MI = mi1(chars)
-
     print(f"# {path}")
-    print(f"H1_bits_per_char\t{H1:.6f}")
-    print(f"MI1_bits\t{MI:.6f}")
+    print(f"H1_bits_per_char\t{st['H1']:.6f}")
+    print(f"MI1_bits\t{st['MI1']:.6f}")
+    for n in range(2, k + 1):
+        print(f"H{n}_bits_per_block\t{st[f'H{n}']:.6f}")
+        print(f"Hcond{n}_bits_per_char\t{st[f'Hcond{n}']:.6f}")
+    for d in range(2, k + 1):
+        print(f"MI{d}_bits\t{st[f'MI{d}']:.6f}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Streaming character n-gram statistics (H1, H_k, conditional entropy, MI_d)
+
+p6_compute_entropy_mi.py and p9_build_feature_table.py::compute_H1_MI1
+build the whole character stream in memory ("".join(tokens), or a list
+of characters) and count pairs with Counter(zip(...)). That is fine for
+Voynich but slow and memory-hungry on corpora/de_materia_raw.txt or the
+Judeo-Arabic Guide corpora.
+
+NgramStats consumes tokens (or a whole file) in chunks:
+
+    - characters are mapped to small integer codes (UTF-32 code points,
+      np.unique per chunk, a persistent code table),
+    - unigram and lag-d pair tables are fixed-size dense NumPy arrays
+      (alphabet capacity grows by doubling; real corpora stay < 512),
+    - contiguous k-grams (k >= 3) are counted as base-4096 integer ids and
+      merged into a sorted sparse table per chunk,
+    - the last max_k codes of each chunk are carried over so grams that
+      straddle a chunk boundary are counted exactly once.
+
+Outputs, for any k:
+
+    H1            unigram entropy (bits/char)
+    H2 .. Hk      block (joint) entropies of contiguous n-grams
+    Hcond2..Hcondk conditional entropies H_n - H_(n-1) (n-gram marginals)
+    MI1 .. MIk    mutual information between characters d apart
+
+Two MI conventions exist in the repo and both are kept:
+
+    marginals="pair"     p(x), p(y) from the pair table (p6_compute_entropy_mi)
+    marginals="unigram"  p(x), p(y) from unigram counts (p9_build_feature_table)
+
+Token streams follow the callers: separator=None concatenates tokens
+("".join), separator=" " puts one space between consecutive tokens.
+
+Usage (library):
+
+    from p6_ngram_stats import stream_file
+    st = stream_file("corpora/de_materia_raw.txt", max_k=3, separator=" ")
+    st.result(marginals="unigram")   # {"H1":..., "H2":..., "MI1":..., ...}
+
+Requires numpy.
+"""
+
+import numpy as np
+
+GRAM_BASE_BITS = 12              # k-gram ids: 12 bits per char, k <= 5
+MAX_K = 64 // GRAM_BASE_BITS     # largest supported order / lag
+MAX_ALPHABET = 1 << GRAM_BASE_BITS
+CHUNK_CHARS = 1 << 20
+
+
+def _entropy(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    counts = counts[counts > 0]
+    n = counts.sum()
+    if n == 0:
+        return 0.0
+    p = counts / n
+    return float(-(p * np.log2(p)).sum())
+
+
+class NgramStats:
+    """Incremental character statistics up to order / lag max_k."""
+
+    def __init__(self, max_k=1, separator=None):
+        if not 1 <= max_k <= MAX_K:
+            raise ValueError(f"max_k must be in 1..{MAX_K}")
+        self.max_k = max_k
+        self.separator = separator
+        self.alphabet = {}                       # code point -> code
+        self.cap = 256
+        self.unigram = np.zeros(self.cap, dtype=np.int64)
+        self.lag = [np.zeros((self.cap, self.cap), dtype=np.int64)
+                    for _ in range(max_k)]       # lag[d-1][a, b]
+        self.grams = {n: (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+                      for n in range(3, max_k + 1)}
+        self.carry = np.zeros(0, dtype=np.int64)
+        self.n_tokens = 0
+
+    # ---- encoding ----
+
+    def _grow(self, need):
+        cap = self.cap
+        while cap < need:
+            cap *= 2
+        if cap > MAX_ALPHABET:
+            raise ValueError(f"alphabet larger than {MAX_ALPHABET} symbols")
+        if cap == self.cap:
+            return
+        uni = np.zeros(cap, dtype=np.int64)
+        uni[:self.cap] = self.unigram
+        self.unigram = uni
+        for d, tab in enumerate(self.lag):
+            new = np.zeros((cap, cap), dtype=np.int64)
+            new[:self.cap, :self.cap] = tab
+            self.lag[d] = new
+        self.cap = cap
+
+    def _encode(self, text):
+        cps = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        uniq, inv = np.unique(cps, return_inverse=True)
+        table = np.empty(len(uniq), dtype=np.int64)
+        for i, cp in enumerate(uniq.tolist()):
+            code = self.alphabet.get(cp)
+            if code is None:
+                code = self.alphabet[cp] = len(self.alphabet)
+            table[i] = code
+        self._grow(len(self.alphabet))
+        return table[inv]
+
+    # ---- counting ----
+
+    def feed_text(self, text):
+        """Append raw text to the character stream and count it."""
+        if not text:
+            return
+        new = self._encode(text)
+        seq = np.concatenate([self.carry, new])
+        c = len(self.carry)
+
+        self.unigram += np.bincount(new, minlength=self.cap)
+        for d in range(1, self.max_k + 1):
+            start = max(0, c - d)            # pairs whose 2nd char is new
+            a, b = seq[start:len(seq) - d], seq[start + d:]
+            if len(a):
+                self.lag[d - 1] += np.bincount(
+                    a * self.cap + b, minlength=self.cap * self.cap
+                ).reshape(self.cap, self.cap)
+        for n in range(3, self.max_k + 1):
+            start = max(0, c - n + 1)        # grams whose last char is new
+            m = len(seq) - start - n + 1
+            if m <= 0:
+                continue
+            ids = np.zeros(m, dtype=np.int64)
+            for j in range(n):
+                ids = (ids << GRAM_BASE_BITS) | seq[start + j:start + j + m]
+            keys, cnt = np.unique(ids, return_counts=True)
+            old_k, old_c = self.grams[n]
+            all_k = np.concatenate([old_k, keys])
+            all_c = np.concatenate([old_c, cnt])
+            mk, inv = np.unique(all_k, return_inverse=True)
+            self.grams[n] = (mk, np.bincount(inv, weights=all_c).astype(np.int64))
+
+        self.carry = seq[-self.max_k:]
+
+    def feed_tokens(self, tokens, chunk_chars=CHUNK_CHARS):
+        """Append tokens (with the configured separator) in bounded chunks."""
+        sep = self.separator or ""
+        buf, size = [], 0
+        for t in tokens:
+            if sep and (self.n_tokens or buf):
+                buf.append(sep)
+            buf.append(t)
+            size += len(t) + len(sep)
+            self.n_tokens += 1
+            if size >= chunk_chars:
+                self.feed_text("".join(buf))
+                buf, size = [], 0
+        if buf:
+            self.feed_text("".join(buf))
+        return self
+
+    # ---- results ----
+
+    def block_counts(self, n):
+        if n == 1:
+            return self.unigram
+        if n == 2:
+            return self.lag[0].ravel()
+        return self.grams[n][1]
+
+    def mi(self, d, marginals="pair"):
+        tab = self.lag[d - 1].astype(np.float64)
+        total = tab.sum()
+        if total == 0:
+            return 0.0
+        if marginals == "pair":
+            px = tab.sum(axis=1) / total
+            py = tab.sum(axis=0) / total
+        elif marginals == "unigram":
+            px = py = self.unigram / self.unigram.sum()
+        else:
+            raise ValueError("marginals must be 'pair' or 'unigram'")
+        a, b = np.nonzero(tab)
+        pxy = tab[a, b] / total
+        ok = (px[a] > 0) & (py[b] > 0)
+        return float((pxy[ok] * np.log2(pxy[ok] / (px[a][ok] * py[b][ok]))).sum())
+
+    def result(self, marginals="pair"):
+        out = {"n_tokens": self.n_tokens, "n_chars": int(self.unigram.sum()),
+               "H1": _entropy(self.unigram)}
+        prev = out["H1"]
+        for n in range(2, self.max_k + 1):
+            h = _entropy(self.block_counts(n))
+            out[f"H{n}"] = h
+            out[f"Hcond{n}"] = h - prev
+            prev = h
+        for d in range(1, self.max_k + 1):
+            out[f"MI{d}"] = self.mi(d, marginals)
+        return out
+
+
+def iter_file_tokens(path, chunk_bytes=CHUNK_CHARS, errors="strict"):
+    """Yield stripped non-empty lines of a file, reading it in chunks."""
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
+        rest = ""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            lines = (rest + block).split("\n")
+            rest = lines.pop()
+            for ln in lines:
+                t = ln.strip()
+                if t:
+                    yield t
+        t = rest.strip()
+        if t:
+            yield t
+
+
+def stream_file(path, max_k=1, separator=None, errors="strict"):
+    """NgramStats over a one-token-per-line file, read in chunks."""
+    return NgramStats(max_k, separator).feed_tokens(
+        iter_file_tokens(path, errors=errors))
+
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Canonical token -> (folio, line, position) index by sequence alignment
+
+p95_line_structure.py and p81_anchor_token_map_v2.py walked the
+transliteration and p6_voynich_tokens.txt side by side, one token each,
+counting mismatches but never resynchronising: one token dropped or split
+on either side shifted every later line (p95 ran at ~99% "mismatches"
+because its own locus regex skipped the f67r1-style sub-folios). Here the
+two streams are aligned properly:
+
+    source     the transliteration loci (p6_token_store: token, folio,
+               line, position per source token, p6_build_voynich_tokens
+               rules)
+    canonical  p6_voynich_tokens.txt as it is on disk (last field per line)
+    anchors    types occurring exactly once in both streams (hapaxes);
+               the longest chain of anchors increasing in both streams
+               (patience / LIS, O(n log n)) fixes the alignment skeleton
+    gaps       between consecutive anchors, common prefixes / suffixes are
+               matched directly; long gaps are split again on tokens
+               unique within the gap, and what is left is aligned by a
+               unit-cost global DP restricted to a diagonal band of
+               |len_a - len_b| + 2 * band cells per row
+
+Each canonical token ends up as a match (same string), a substitution
+(aligned against a different source token) or canonical-only (no source
+token; folio and line are taken from the nearest aligned token before
+it, position = -1). Source tokens left over are counted as source-only.
+
+The index is stored once under cache/token_alignment/<key>/ (int32 src_idx,
+int16 folio_id / line / position, int8 op as .npy, plus folios.txt), keyed
+by a sha256 over both files, the band and ALIGN_VERSION, and memory-mapped
+by every phase that needs line or folio context. Set
+P6_TOKEN_ALIGN_CACHE=0 to align in memory without touching the cache.
+
+Usage (library):
+
+    from p6_token_alignment import open_alignment
+    al = open_alignment()
+    al.folio_labels()             # list[str], one folio per canonical token
+    al.lines()                    # (folio, line, [canonical idx, ...]) per source line
+    al.stats                      # anchors / match / sub / canonical_only / source_only
+
+    from p6_token_alignment import align_streams
+    src_idx, ops, n_anchors = align_streams(canonical_tokens, source_tokens)
+
+Usage (CLI):
+
+    python3 scripts/p6_token_alignment.py [--band 8] [--rebuild] [--out index.tsv]
+
+Requires numpy.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+
+from p6_token_store import TRANS_PATH, CANONICAL_TOKEN_FILES, open_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_PATH = CANONICAL_TOKEN_FILES[0]
+CACHE_DIR = os.path.join(ROOT, "cache", "token_alignment")
+
+ALIGN_VERSION = 1
+BAND = 8
+SPLIT_CELLS = 1 << 16     # gaps whose band holds more cells are re-anchored first
+
+MATCH, SUB, CANON_ONLY = 0, 1, 2
+OP_NAMES = ("match", "sub", "canonical_only")
+
+COLUMNS = {
+    "src_idx": np.int32,
+    "folio_id": np.int16,
+    "line": np.int16,
+    "position": np.int16,
+    "op": np.int8,
+}
+
+
+# -------------
+# Anchors
+# -------------
+
+def unique_anchors(a, b, a_lo=0, a_hi=None, b_lo=0, b_hi=None):
+    """(i, j) pairs for tokens occurring exactly once in a[a_lo:a_hi] and in b[b_lo:b_hi]."""
+    a_hi = len(a) if a_hi is None else a_hi
+    b_hi = len(b) if b_hi is None else b_hi
+    ca = Counter(a[a_lo:a_hi])
+    cb = Counter(b[b_lo:b_hi])
+    pos_b = {b[j]: j for j in range(b_lo, b_hi) if cb[b[j]] == 1 and ca.get(b[j]) == 1}
+    return [(i, pos_b[a[i]]) for i in range(a_lo, a_hi) if a[i] in pos_b]
+
+
+def monotone_chain(pairs):
+    """Longest subsequence of (i, j) pairs (sorted by i) with j increasing."""
+    tails, tail_ix = [], []
+    prev = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        p = bisect_left(tails, j)
+        if p == len(tails):
+            tails.append(j)
+            tail_ix.append(k)
+        else:
+            tails[p] = j
+            tail_ix[p] = k
+        prev[k] = tail_ix[p - 1] if p else -1
+    out = []
+    k = tail_ix[-1] if tail_ix else -1
+    while k >= 0:
+        out.append(pairs[k])
+        k = prev[k]
+    return out[::-1]
+
+
+# -------------
+# Banded global alignment
+# -------------
+
+def banded_align(a, b, band=BAND):
+    """
+    Aligned (i, j) pairs of a unit-cost global alignment of a and b (match 0,
+    substitution / insertion / deletion 1), with j - i restricted to the band
+    around the diagonal from (0, 0) to (len a, len b).
+    """
+    la, lb = len(a), len(b)
+    if la == 0 or lb == 0:
+        return []
+    lo = min(0, lb - la) - band
+    hi = max(0, lb - la) + band
+    W = hi - lo + 1
+    INF = la + lb + 1
+
+    # D[i][k] is the cost at (i, j = i + lo + k); T holds the move into it
+    # (0 diagonal, 1 up = skip a[i-1], 2 left = skip b[j-1])
+    D = [[INF] * W for _ in range(la + 1)]
+    T = [bytearray(W) for _ in range(la + 1)]
+    for k in range(W):
+        j = lo + k
+        if 0 <= j <= lb:
+            D[0][k] = j
+            T[0][k] = 2
+    for i in range(1, la + 1):
+        prev, cur, tr = D[i - 1], D[i], T[i]
+        ai = a[i - 1]
+        for k in range(W):
+            j = i + lo + k
+            if j < 0 or j > lb:
+                continue
+            if j == 0:
+                cur[k] = i
+                tr[k] = 1
+                continue
+            best = prev[k] + (0 if ai == b[j - 1] else 1)
+            move = 0
+            if k + 1 < W and prev[k + 1] + 1 < best:
+                best = prev[k + 1] + 1
+                move = 1
+            if k > 0 and cur[k - 1] + 1 < best:
+                best = cur[k - 1] + 1
+                move = 2
+            cur[k] = best
+            tr[k] = move
+
+    pairs = []
+    i, j = la, lb
+    while i > 0 or j > 0:
+        k = j - i - lo
+        move = T[i][k] if i > 0 else 2
+        if move == 0:
+            i -= 1
+            j -= 1
+            pairs.append((i, j))
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    return pairs[::-1]
+
+
+def _align_gap(a, b, a_lo, a_hi, b_lo, b_hi, band, out):
+    # shared prefix / suffix
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        out.append((a_lo, b_lo))
+        a_lo += 1
+        b_lo += 1
+    tail = []
+    while a_hi > a_lo and b_hi > b_lo and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+        tail.append((a_hi, b_hi))
+    la, lb = a_hi - a_lo, b_hi - b_lo
+    if la and lb:
+        cells = la * (abs(la - lb) + 2 * band + 1)
+        chain = []
+        if cells > SPLIT_CELLS:
+            chain = monotone_chain(unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi))
+        if chain:
+            i0, j0 = a_lo, b_lo
+            for i, j in chain:
+                _align_gap(a, b, i0, i, j0, j, band, out)
+                out.append((i, j))
+                i0, j0 = i + 1, j + 1
+            _align_gap(a, b, i0, a_hi, j0, b_hi, band, out)
+        else:
+            out.extend((a_lo + i, b_lo + j)
+                       for i, j in banded_align(a[a_lo:a_hi], b[b_lo:b_hi], band))
+    out.extend(reversed(tail))
+
+
+def align_streams(a, b, band=BAND):
+    """
+    Align canonical tokens a against source tokens b. Returns (src_idx, ops,
+    n_anchors): src_idx[i] is the source index aligned to a[i] (-1 if none),
+    ops[i] is MATCH / SUB / CANON_ONLY.
+    """
+    chain = monotone_chain(unique_anchors(a, b))
+    pairs = []
+    i0, j0 = 0, 0
+    for i, j in chain:
+        _align_gap(a, b, i0, i, j0, j, band, pairs)
+        pairs.append((i, j))
+        i0, j0 = i + 1, j + 1
+    _align_gap(a, b, i0, len(a), j0, len(b), band, pairs)
+
+    src_idx = np.full(len(a), -1, dtype=np.int32)
+    ops = np.full(len(a), CANON_ONLY, dtype=np.int8)
+    for i, j in pairs:
+        src_idx[i] = j
+        ops[i] = MATCH if a[i] == b[j] else SUB
+    return src_idx, ops, len(chain)
+
+
+# -------------
+# Index
+# -------------
+
+class TokenAlignment:
+    """Per canonical token: source index, folio, line, position and alignment op."""
+
+    def __init__(self, arrays, folios, stats, key=None, path=None):
+        self.src_idx = arrays["src_idx"]
+        self.folio_id = arrays["folio_id"]
+        self.line = arrays["line"]
+        self.position = arrays["position"]
+        self.op = arrays["op"]
+        self.folios = folios
+        self.stats = stats
+        self.key = key
+        self.path = path
+
+    def __len__(self):
+        return len(self.src_idx)
+
+    def folio_labels(self):
+        folios = self.folios
+        return [folios[i] for i in self.folio_id.tolist()]
+
+    def locus(self, idx):
+        """(folio, line, position) of canonical token idx (position -1 if unaligned)."""
+        return self.folios[self.folio_id[idx]], int(self.line[idx]), int(self.position[idx])
+
+    def lines(self):
+        """Yield (folio, line, [canonical idx, ...]) for aligned tokens, grouped by source line."""
+        keep = np.flatnonzero(np.asarray(self.op) != CANON_ONLY)
+        if len(keep) == 0:
+            return
+        f = np.asarray(self.folio_id)[keep]
+        ln = np.asarray(self.line)[keep]
+        brk = np.flatnonzero((f[1:] != f[:-1]) | (ln[1:] != ln[:-1])) + 1
+        starts = np.concatenate([[0], brk]).tolist()
+        ends = np.concatenate([brk, [len(keep)]]).tolist()
+        for s, e in zip(starts, ends):
+            yield self.folios[f[s]], int(ln[s]), keep[s:e].tolist()
+
+
+def read_canonical_tokens(path=TOKEN_PATH):
+    """Tokens of p6_voynich_tokens.txt as stored on disk (last field per line)."""
+    tokens = []
+    with open(path, encoding="utf-8") as f:
+        for ln in f:
+            t = ln.strip()
+            if t:
+                tokens.append(t.split()[-1])
+    return tokens
+
+
+def build_alignment(token_path=TOKEN_PATH, trans_path=TRANS_PATH, band=BAND):
+    """Align the canonical file against the transliteration loci; returns (arrays, folios, stats)."""
+    canon = read_canonical_tokens(token_path)
+    store = open_store(trans_path)
+    src = store.tokens()
+    src_idx, ops, n_anchors = align_streams(canon, src, band)
+
+    aligned = src_idx >= 0
+    # canonical-only tokens inherit folio / line from the last aligned token
+    # before them (the first aligned one at the very start)
+    carry = np.where(aligned, np.arange(len(canon)), -1)
+    carry = np.maximum.accumulate(carry) if len(carry) else carry
+    if aligned.any():
+        carry[carry < 0] = np.flatnonzero(aligned)[0]
+        from_src = src_idx[carry]
+        folio_id = np.asarray(store.folio_id)[from_src]
+        line = np.asarray(store.line)[from_src]
+    else:
+        folio_id = np.zeros(len(canon), dtype=np.int16)
+        line = np.zeros(len(canon), dtype=np.int16)
+    position = np.where(aligned, np.asarray(store.position)[np.maximum(src_idx, 0)], -1)
+
+    arrays = {
+        "src_idx": src_idx,
+        "folio_id": folio_id,
+        "line": line,
+        "position": position,
+        "op": ops,
+    }
+    arrays = {k: np.asarray(v, dtype=COLUMNS[k]) for k, v in arrays.items()}
+    counts = np.bincount(ops, minlength=len(OP_NAMES))
+    stats = {
+        "canonical_tokens": len(canon),
+        "source_tokens": len(src),
+        "anchors": n_anchors,
+        "band": band,
+        **{OP_NAMES[k]: int(counts[k]) for k in range(len(OP_NAMES))},
+        "source_only": len(src) - int(aligned.sum()),
+    }
+    return arrays, list(store.folios), stats
+
+
+def source_key(token_path=TOKEN_PATH, trans_path=TRANS_PATH, band=BAND):
+    """sha256 over both streams, the band and ALIGN_VERSION."""
+    h = hashlib.sha256(f"p6_token_alignment:{ALIGN_VERSION}:{band}".encode())
+    for p in (token_path, trans_path):
+        h.update(b"\0")
+        with open(p, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _write_lines(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for it in items:
+            f.write(f"{it}\n")
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [ln.rstrip("\n") for ln in f]
+
+
+def save_alignment(arrays, folios, stats, out_dir):
+    """Write an index directory atomically (temp dir + rename)."""
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp_")
+    try:
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), arr)
+        _write_lines(os.path.join(tmp, "stats.txt"), (f"{k}\t{v}" for k, v in stats.items()))
+        _write_lines(os.path.join(tmp, "folios.txt"), folios)
+        os.rename(tmp, out_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(out_dir):
+            raise
+
+
+def read_alignment(index_dir, key=None):
+    arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+              for name in COLUMNS}
+    stats = {}
+    for ln in _read_lines(os.path.join(index_dir, "stats.txt")):
+        k, v = ln.split("\t")
+        stats[k] = int(v)
+    return TokenAlignment(arrays, _read_lines(os.path.join(index_dir, "folios.txt")),
+                          stats, key=key, path=index_dir)
+
+
+_OPEN = {}
+
+
+def open_alignment(token_path=TOKEN_PATH, trans_path=TRANS_PATH, band=BAND,
+                   cache_dir=CACHE_DIR, rebuild=False):
+    """
+    The alignment index for the given files: memory-mapped from the cache
+    when one for the current source hash exists, else aligned (and saved
+    unless P6_TOKEN_ALIGN_CACHE=0). Memoised per process.
+    """
+    for p in (token_path, trans_path):
+        if not os.path.isfile(p):
+            raise SystemExit(f"[ERR] Missing alignment input: {p}")
+    key = source_key(token_path, trans_path, band)
+    if not rebuild and key in _OPEN:
+        return _OPEN[key]
+
+    use_cache = os.environ.get("P6_TOKEN_ALIGN_CACHE", "1") != "0"
+    index_dir = os.path.join(cache_dir, key[:16])
+    if use_cache and not rebuild and os.path.isfile(os.path.join(index_dir, "folios.txt")):
+        al = read_alignment(index_dir, key)
+    else:
+        arrays, folios, stats = build_alignment(token_path, trans_path, band)
+        if use_cache:
+            if rebuild and os.path.isdir(index_dir):
+                shutil.rmtree(index_dir)
+            save_alignment(arrays, folios, stats, index_dir)
+            al = read_alignment(index_dir, key)
+        else:
+            al = TokenAlignment(arrays, folios, stats, key=key)
+    _OPEN[key] = al
+    return al
+
+
+def write_index(path, al, tokens):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("idx\ttoken\tfolio\tline\tposition\tsrc_idx\top\n")
+        folios = al.folio_labels()
+        for i, (ln, pos, src, op) in enumerate(zip(al.line.tolist(), al.position.tolist(),
+                                                   al.src_idx.tolist(), al.op.tolist())):
+            out.write(f"{i}\t{tokens[i]}\t{folios[i]}\t{ln}\t{pos}\t{src}\t{OP_NAMES[op]}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Align p6_voynich_tokens.txt to transliteration loci")
+    ap.add_argument("--tokens", default=TOKEN_PATH)
+    ap.add_argument("--trans", default=TRANS_PATH)
+    ap.add_argument("--band", type=int, default=BAND, help="extra diagonals either side in gap DP")
+    ap.add_argument("--rebuild", action="store_true")
+    ap.add_argument("--out", help="optional idx/token/folio/line/position/src_idx/op TSV")
+    args = ap.parse_args()
+
+    al = open_alignment(args.tokens, args.trans, args.band, rebuild=args.rebuild)
+    s = al.stats
+    print(f"[OK] {s['canonical_tokens']:,} canonical vs {s['source_tokens']:,} source tokens, "
+          f"{s['anchors']:,} hapax anchors: match {s['match']:,}, sub {s['sub']:,}, "
+          f"canonical-only {s['canonical_only']:,}, source-only {s['source_only']:,}"
+          + (f" -> {al.path}" if al.path else ""))
+    if args.out:
+        write_index(args.out, al, read_canonical_tokens(args.tokens))
+        print(f"[OK] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Shared, cached Voynich token store (columnar, memory-mapped)
+
+Most phase scripts carried their own load_tokens(), reading either
+p6_voynich_tokens.txt at the repo root or the copy under corpora/, as bare
+tokens or "<fNNr.L> token" lines, and several re-parsed
+voynich_transliteration.txt to recover folios. This module parses the
+transliteration once, with the same rules as p6_build_voynich_tokens.py
+(so the token sequence is exactly p6_voynich_tokens.txt), and keeps one
+row per running token:
+
+    token_id   int32   index into vocab (types in first-occurrence order)
+    folio_id   int16   index into folios (e.g. f1r, f67r1)
+    line       int16   line number within the folio (<f1r.7,...> -> 7)
+    position   int16   0-based token position within that line
+    section_id int8    index into sections (metadata/folio_sections.tsv;
+                       folios missing there -> 'Unassigned')
+
+The columns are saved as .npy files next to vocab.txt / folios.txt /
+sections.txt under cache/token_store/<key>/, where <key> is a sha256 over
+the transliteration, the section table and STORE_VERSION. Editing either
+source therefore builds a new store; stale stores are simply never read
+again. Loading memory-maps the arrays (np.load(mmap_mode='r')), so every
+phase starts in milliseconds and all phases see identical data.
+
+Set P6_TOKEN_STORE_CACHE=0 to parse in memory without touching the cache.
+
+Usage (library):
+
+    from p6_token_store import open_store, load_tokens
+    store = open_store()
+    store.tokens()                # list[str], == p6_voynich_tokens.txt
+    store.folio_labels()          # list[str], one folio per token
+    store.section_labels()        # list[str], one section per token
+    load_tokens()                 # drop-in for the per-script loaders
+
+Requires numpy.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+from p6_build_voynich_tokens import clean_line
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANS_PATH = os.path.join(ROOT, "corpora", "voynich_transliteration.txt")
+SECTIONS_PATH = os.path.join(ROOT, "metadata", "folio_sections.tsv")
+CACHE_DIR = os.path.join(ROOT, "cache", "token_store")
+CANONICAL_TOKEN_FILES = (
+    os.path.join(ROOT, "p6_voynich_tokens.txt"),
+    os.path.join(ROOT, "corpora", "p6_voynich_tokens.txt"),
+)
+
+STORE_VERSION = 1
+UNASSIGNED = "Unassigned"
+NA_FOLIO = "NA"
+
+COLUMNS = {
+    "token_id": np.int32,
+    "folio_id": np.int16,
+    "line": np.int16,
+    "position": np.int16,
+    "section_id": np.int8,
+}
+
+_LOCUS = re.compile(r"^<(f\d+[rv]\d*)\.(\d+)")
+
+
+# -------------
+# Parsing
+# -------------
+
+def parse_transliteration(path=TRANS_PATH):
+    """
+    Yield (token, folio, line, position) using the p6_build_voynich_tokens
+    rules; folio/line come from the <fNNr.L,...> locus of the source line.
+    """
+    folio, line_no = NA_FOLIO, 0
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            raw = raw.strip()
+            m = _LOCUS.match(raw)
+            if m:
+                folio, line_no = m.group(1), int(m.group(2))
+            line = clean_line(raw)
+            if not line or line.startswith("#"):
+                continue
+            pos = 0
+            for part in re.split(r"[.\s]+", line):
+                t = re.sub(r"[^A-Za-z]", "", part)
+                if t:
+                    yield t, folio, line_no, pos
+                    pos += 1
+
+
+def load_sections(path=SECTIONS_PATH):
+    """folio -> section from a folio<TAB>section table with header."""
+    secmap = {}
+    if not os.path.isfile(path):
+        return secmap
+    with open(path, encoding="utf-8") as f:
+        next(f, None)
+        for ln in f:
+            parts = ln.rstrip("\n").split("\t")
+            if len(parts) >= 2 and parts[0].strip():
+                secmap[parts[0].strip()] = parts[1].strip()
+    return secmap
+
+
+def _intern(values, table):
+    ids = []
+    for v in values:
+        i = table.get(v)
+        if i is None:
+            i = table[v] = len(table)
+        ids.append(i)
+    return ids
+
+
+def build_columns(trans_path=TRANS_PATH, sections_path=SECTIONS_PATH):
+    """Parse the sources into (columns dict, vocab, folios, sections)."""
+    rows = list(parse_transliteration(trans_path))
+    secmap = load_sections(sections_path)
+    vocab, folios = {}, {}
+    sections = {UNASSIGNED: 0}
+    cols = {
+        "token_id": _intern((r[0] for r in rows), vocab),
+        "folio_id": _intern((r[1] for r in rows), folios),
+        "line": [r[2] for r in rows],
+        "position": [r[3] for r in rows],
+        "section_id": _intern((secmap.get(r[1], UNASSIGNED) for r in rows), sections),
+    }
+    arrays = {k: np.asarray(v, dtype=COLUMNS[k]) for k, v in cols.items()}
+    return arrays, list(vocab), list(folios), list(sections)
+
+
+# -------------
+# Store
+# -------------
+
+class TokenStore:
+    """Columnar token table; arrays may be memory-mapped (read-only)."""
+
+    def __init__(self, arrays, vocab, folios, sections, key=None, path=None):
+        self.token_id = arrays["token_id"]
+        self.folio_id = arrays["folio_id"]
+        self.line = arrays["line"]
+        self.position = arrays["position"]
+        self.section_id = arrays["section_id"]
+        self.vocab = vocab
+        self.folios = folios
+        self.sections = sections
+        self.key = key
+        self.path = path
+        self._tokens = None
+
+    def __len__(self):
+        return len(self.token_id)
+
+    def tokens(self):
+        """Running tokens as strings (== p6_voynich_tokens.txt)."""
+        if self._tokens is None:
+            vocab = self.vocab
+            self._tokens = [vocab[i] for i in self.token_id.tolist()]
+        return self._tokens
+
+    def folio_labels(self):
+        folios = self.folios
+        return [folios[i] for i in self.folio_id.tolist()]
+
+    def section_labels(self):
+        sections = self.sections
+        return [sections[i] for i in self.section_id.tolist()]
+
+    def lines(self):
+        """Yield (folio, line, start, end) runs of consecutive tokens."""
+        n = len(self)
+        if n == 0:
+            return
+        f = np.asarray(self.folio_id)
+        ln = np.asarray(self.line)
+        brk = np.flatnonzero((f[1:] != f[:-1]) | (ln[1:] != ln[:-1])) + 1
+        starts = np.concatenate([[0], brk])
+        ends = np.concatenate([brk, [n]])
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            yield self.folios[f[s]], int(ln[s]), s, e
+
+
+def source_key(trans_path=TRANS_PATH, sections_path=SECTIONS_PATH):
+    """sha256 over the source files and STORE_VERSION."""
+    h = hashlib.sha256(f"p6_token_store:{STORE_VERSION}".encode())
+    for p in (trans_path, sections_path):
+        h.update(b"\0")
+        if os.path.isfile(p):
+            with open(p, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _write_lines(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for it in items:
+            f.write(it + "\n")
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [ln.rstrip("\n") for ln in f]
+
+
+def save_store(arrays, vocab, folios, sections, out_dir):
+    """Write a store directory atomically (temp dir + rename)."""
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp_")
+    try:
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), arr)
+        _write_lines(os.path.join(tmp, "vocab.txt"), vocab)
+        _write_lines(os.path.join(tmp, "folios.txt"), folios)
+        _write_lines(os.path.join(tmp, "sections.txt"), sections)
+        os.rename(tmp, out_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(out_dir):
+            raise
+
+
+def read_store(store_dir, key=None):
+    arrays = {name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+              for name in COLUMNS}
+    return TokenStore(arrays,
+                      _read_lines(os.path.join(store_dir, "vocab.txt")),
+                      _read_lines(os.path.join(store_dir, "folios.txt")),
+                      _read_lines(os.path.join(store_dir, "sections.txt")),
+                      key=key, path=store_dir)
+
+
+_OPEN = {}
+
+
+def open_store(trans_path=TRANS_PATH, sections_path=SECTIONS_PATH,
+               cache_dir=CACHE_DIR, rebuild=False):
+    """
+    The token store for the given sources: memory-mapped from the cache
+    when a store for the current source hash exists, else parsed (and
+    saved unless P6_TOKEN_STORE_CACHE=0). Memoised per process.
+    """
+    if not os.path.isfile(trans_path):
+        raise SystemExit(f"[ERR] Missing transliteration: {trans_path}")
+    key = source_key(trans_path, sections_path)
+    if not rebuild and key in _OPEN:
+        return _OPEN[key]
+
+    use_cache = os.environ.get("P6_TOKEN_STORE_CACHE", "1") != "0"
+    store_dir = os.path.join(cache_dir, key[:16])
+    if use_cache and not rebuild and os.path.isfile(os.path.join(store_dir, "sections.txt")):
+        store = read_store(store_dir, key)
+    else:
+        arrays, vocab, folios, sections = build_columns(trans_path, sections_path)
+        if use_cache:
+            if rebuild and os.path.isdir(store_dir):
+                shutil.rmtree(store_dir)
+            save_store(arrays, vocab, folios, sections, store_dir)
+            store = read_store(store_dir, key)
+        else:
+            store = TokenStore(arrays, vocab, folios, sections, key=key)
+    _OPEN[key] = store
+    return store
+
+
+def load_tokens(path=None):
+    """
+    Canonical running tokens. path=None or either copy of
+    p6_voynich_tokens.txt reads the store; any other path is read as one
+    token per line, keeping the last whitespace field (so "<fNNr.L> token"
+    and "idx token" lines work too).
+    """
+    if path is None or os.path.abspath(path) in CANONICAL_TOKEN_FILES:
+        return list(open_store().tokens())
+    tokens = []
+    with open(path, encoding="utf-8") as f:
+        for ln in f:
+            t = ln.strip()
+            if t:
+                tokens.append(t.split()[-1])
+    return tokens
+
+
+if __name__ == "__main__":
+    import sys
+    s = open_store(rebuild="--rebuild" in sys.argv[1:])
+    print(f"[OK] {len(s):,} tokens, {len(s.vocab):,} types, "
+          f"{len(s.folios)} folios, {len(s.sections)} sections -> {s.path}")
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
-import os, json
+import os, sys, json, argparse
 from collections import Counter
 
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p6_token_store import load_tokens as store_load_tokens  # noqa: E402
+from affix_miner import AffixIndex, KINDS  # noqa: E402
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TOKENS = os.path.join(ROOT, "p6_voynich_tokens.txt")
 RULEBOOK = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
@@ -10,13 +16,14 @@ os.makedirs(OUT_DIR, exist_ok=True)
 
 OUT_UNCOVERED = os.path.join(OUT_DIR, "p70_uncovered_tokens.txt")
 OUT_STATS = os.path.join(OUT_DIR, "p70_uncovered_patterns.tsv")
+OUT_RANKING = os.path.join(OUT_DIR, "p70_candidate_ranking.tsv")
 
-MIN_FREQ = 30          # minimum frequency to report a pattern
-MAX_LEN = 3            # max prefix/suffix length to test
+MIN_FREQ = 30          # minimum frequency (uncovered tokens) to report a pattern
+MAX_LEN = 0            # max pattern length to report (0 = any length)
+MIN_PATTERN_LEN = 2    # shortest pattern considered for promotion
 
 def load_tokens(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return [ln.strip() for ln in f if ln.strip()]
+    return store_load_tokens(path)
 
 def load_rulebook_pairs(path):
     with open(path, "r", encoding="utf-8") as f:
@@ -32,6 +39,7 @@ def load_rulebook_pairs(path):
     prefixes = set()
     suffixes = set()
     pairs = set()
+    chargrams = set()
 
     for r in rules:
         if not isinstance(r, dict):
@@ -55,36 +63,66 @@ def load_rulebook_pairs(path):
         if kind == "suffix" and pat:
             suffixes.add(pat)
             pairs.add(("", pat))
+        if kind == "chargram" and pat:
+            chargrams.add(pat)
 
     print(f"[INFO] Loaded {len(prefixes)} prefixes, {len(suffixes)} suffixes, {len(pairs)} (pre,suf) combos from Phase69")
-    return prefixes, suffixes, pairs
+    return prefixes, suffixes, pairs, chargrams
 
 def covered_by_rulebook(token, prefixes, suffixes, pairs):
-    # Any known prefix?
-    has_pre = any(token.startswith(p) for p in prefixes)
-    # Any known suffix?
-    has_suf = any(token.endswith(s) for s in suffixes)
-    # Any known (pre,suf) combo?
-    if pairs:
-        for pre, suf in pairs:
-            if pre and suf:
-                if token.startswith(pre) and token.endswith(suf):
-                    return True
-            elif pre and token.startswith(pre):
-                return True
-            elif suf and token.endswith(suf):
-                return True
-    # Fallback: if either side hits, count as covered
-    return has_pre or has_suf
+    # Every (pre,suf) combo contributes its parts to prefixes / suffixes, so a
+    # token is covered iff one of its own prefixes or suffixes is a known one.
+    for k in range(1, len(token) + 1):
+        if token[:k] in prefixes or token[-k:] in suffixes:
+            return True
+    return False
+
+def mine_patterns(type_counts, covered, rule_sets, min_freq=MIN_FREQ, max_len=MAX_LEN):
+    """
+    Prefixes / suffixes / chargrams of any length carried by >= min_freq
+    uncovered tokens (of length >= 2), from one suffix-array index over the
+    type inventory. Each row also has the pattern's corpus-wide token
+    count, the tokens already covered by the rulebook and whether the
+    pattern itself is a Phase69 rule of that kind.
+    """
+    idx = AffixIndex(type_counts)
+    counts = idx.counts
+    is_cov = np.array([t in covered for t in idx.types])
+    w_uncov = np.where(~is_cov & (idx.lengths >= 2), counts, 0.0)
+    extra = {"corpus_tokens": counts, "covered_tokens": np.where(is_cov, counts, 0.0)}
+
+    rows = []
+    for kind in KINDS:
+        part = idx.mine(kind, min_freq, weights=w_uncov, extra=extra, max_len=max_len or None)
+        for r in part:
+            r["in_rulebook"] = r["pattern"] in rule_sets[kind]
+            r["rulebook_overlap"] = r["covered_tokens"] / r["corpus_tokens"] if r["corpus_tokens"] else 0.0
+        part.sort(key=lambda r: (-r["tokens"], -r["length"], r["pattern"]))
+        rows.extend(part)
+    return rows
+
+def rank_candidates(rows, min_len=MIN_PATTERN_LEN):
+    """
+    Promotion candidates: closed patterns (longest string for their set of
+    types) not already in the rulebook, ranked by uncovered tokens gained,
+    then by how little of their corpus footprint the rulebook already covers.
+    """
+    cand = [r for r in rows if r["closed"] and not r["in_rulebook"] and r["length"] >= min_len]
+    cand.sort(key=lambda r: (-r["tokens"], r["rulebook_overlap"], -r["length"], r["kind"], r["pattern"]))
+    return cand
 
 def main():
+    ap = argparse.ArgumentParser(description="Mine frequent affixes / chargrams among rulebook-uncovered tokens")
+    ap.add_argument("--min-freq", type=int, default=MIN_FREQ)
+    ap.add_argument("--max-len", type=int, default=MAX_LEN, help="0 = any length")
+    args = ap.parse_args()
+
     tokens = load_tokens(TOKENS)
-    prefixes, suffixes, pairs = load_rulebook_pairs(RULEBOOK)
+    prefixes, suffixes, pairs, chargrams = load_rulebook_pairs(RULEBOOK)
 
-    uncovered = []
-    for t in tokens:
-        if not covered_by_rulebook(t, prefixes, suffixes, pairs):
-            uncovered.append(t)
+    type_counts = Counter(tokens)
+    covered = {t for t in type_counts if covered_by_rulebook(t, prefixes, suffixes, pairs)}
+    uncovered = [t for t in tokens if t not in covered]
 
     total = len(tokens)
     u_total = len(uncovered)
@@ -97,35 +135,35 @@ def main():
         for t in uncovered:
             f.write(t + "\n")
 
-    # Now mine frequent prefixes/suffixes among uncovered
-    pre_counts = Counter()
-    suf_counts = Counter()
-
-    for t in uncovered:
-        L = len(t)
-        if L < 2:
-            continue
-        for k in range(1, min(MAX_LEN, L) + 1):
-            pre_counts[t[:k]] += 1
-            suf_counts[t[-k:]] += 1
-
-    # Filter & sort
-    pre_items = [(p, c) for p, c in pre_counts.items() if c >= MIN_FREQ]
-    suf_items = [(s, c) for s, c in suf_counts.items() if c >= MIN_FREQ]
-
-    pre_items.sort(key=lambda x: -x[1])
-    suf_items.sort(key=lambda x: -x[1])
+    # Frequent prefixes / suffixes / chargrams among uncovered tokens, any length
+    rule_sets = {"prefix": prefixes, "suffix": suffixes, "chargram": chargrams}
+    rows = mine_patterns(type_counts, covered, rule_sets, args.min_freq, args.max_len)
 
     with open(OUT_STATS, "w", encoding="utf-8") as out:
-        out.write("#pattern_type\tpattern\tcount\n")
-        for p, c in pre_items:
-            out.write(f"prefix\t{p}\t{c}\n")
-        for s, c in suf_items:
-            out.write(f"suffix\t{s}\t{c}\n")
-
+        out.write("#pattern_type\tpattern\tcount\tlength\tn_types\tcorpus_tokens\t"
+                  "covered_tokens\trulebook_overlap\tin_rulebook\n")
+        for r in rows:
+            out.write(f"{r['kind']}\t{r['pattern']}\t{r['tokens']:.0f}\t{r['length']}\t{r['n_types']}\t"
+                      f"{r['corpus_tokens']:.0f}\t{r['covered_tokens']:.0f}\t"
+                      f"{r['rulebook_overlap']:.4f}\t{int(r['in_rulebook'])}\n")
+
+    ranking = rank_candidates(rows)
+    with open(OUT_RANKING, "w", encoding="utf-8") as out:
+        out.write("rank\tkind\tpattern\tuncovered_tokens\tcorpus_tokens\tn_types\trulebook_overlap\n")
+        for i, r in enumerate(ranking, 1):
+            out.write(f"{i}\t{r['kind']}\t{r['pattern']}\t{r['tokens']:.0f}\t{r['corpus_tokens']:.0f}\t"
+                      f"{r['n_types']}\t{r['rulebook_overlap']:.4f}\n")
+
+    by_kind = Counter(r["kind"] for r in rows)
+    print(f"[INFO] Frequent patterns: " + ", ".join(f"{k} {by_kind[k]}" for k in KINDS))
     print(f"[OK] Wrote uncovered token list → {OUT_UNCOVERED}")
     print(f"[OK] Wrote frequent patterns → {OUT_STATS}")
-    print("[NOTE] Next step: manually inspect these patterns and, if plausible, promote to Phase70 rules.")
+    print(f"[OK] Wrote {len(ranking)} ranked promotion candidates → {OUT_RANKING}")
+    if ranking:
+        print("[INFO] Top 10 candidates:")
+        for r in ranking[:10]:
+            print(f"  {r['kind']:8s} {r['pattern']:10s} uncovered={r['tokens']:6.0f} "
+                  f"corpus={r['corpus_tokens']:6.0f} overlap={r['rulebook_overlap']:.2f}")
 
 if __name__ == "__main__":
     main()
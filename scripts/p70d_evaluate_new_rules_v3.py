@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
 import json
 import os
-import csv
+import sys
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from affix_miner import AffixIndex  # noqa: E402
+from p69_rule_matcher import PREFIX, SUFFIX, CONTAINS  # noqa: E402
+from p70_mine_uncovered_patterns import covered_by_rulebook  # noqa: E402
+from rule_coverage import CoverageIndex, RuleSet, bitset, greedy_select  # noqa: E402
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
-CLUSTERS_TSV = os.path.join(ROOT, "Phase70", "out", "p70b_clusters.tsv")
 TOKENS_TXT = os.path.join(ROOT, "p6_voynich_tokens.txt")
 OUT_TSV = os.path.join(ROOT, "Phase70", "out", "p70d_candidates.tsv")
+GREEDY_TSV = os.path.join(ROOT, "Phase70", "out", "p70d_greedy_selection.tsv")
 
 MIN_CLUSTER_COUNT = 30
 MIN_CORPUS_HITS = 50
 MIN_PATTERN_LEN = 2
+TARGET_COVERAGE = 0.90
 
 def load_tokens(path):
     if not os.path.isfile(path):
@@ -35,6 +46,7 @@ def load_phase69_patterns(path):
     pre_set = set()
     suf_set = set()
     pre_suf_pairs = set()
+    chargrams = set()
 
     for r in rules:
         if not isinstance(r, dict):
@@ -52,6 +64,9 @@ def load_phase69_patterns(path):
             suf_set.add(pat)
             pre_suf_pairs.add(("", pat))
 
+        elif kind == "chargram":
+            chargrams.add(pat)
+
         elif kind in ("affix", "boundary"):
             pre = r.get("pre", "")
             suf = r.get("suf", "")
@@ -63,32 +78,75 @@ def load_phase69_patterns(path):
                     suf_set.add(suf)
 
     print(f"[INFO] Loaded {len(pre_suf_pairs)} existing (pre,suf) combos from Phase69.")
-    return pre_set, suf_set, pre_suf_pairs
+    return pre_set, suf_set, pre_suf_pairs, chargrams
+
+def evaluate_candidates(tokens, pre_set, suf_set, existing_pairs, chargram_set):
+    """
+    Prefix / suffix / chargram candidates straight from a suffix-array index
+    over the type inventory: corpus_hits = tokens carrying the pattern,
+    cluster_count = uncovered types carrying it, uncovered_hits = uncovered
+    tokens carrying it. Combos pair frequent prefixes with frequent
+    suffixes; their joint counts are one sparse product of the
+    type x prefix and type x suffix incidence matrices.
+    """
+    type_counts = Counter(tokens)
+    idx = AffixIndex(type_counts)
+    w = idx.counts
+    unc = np.array([not covered_by_rulebook(t, pre_set, suf_set, existing_pairs) for t in idx.types])
+    extra = {"uncovered_hits": np.where(unc, w, 0.0), "cluster_count": unc.astype(np.float64)}
 
-def load_clusters(path):
-    if not os.path.isfile(path):
-        print(f"[WARN] Cluster file not found: {path}")
-        return []
-
-    rows = []
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter="\t")
-        header = next(reader, None)
-        for parts in reader:
-            if not parts or len(parts) < 5:
-                continue
-            section, pre, suf, ccount, chits = parts[:5]
-            if pre == "pre" and suf == "suf":
-                continue
-            try:
-                ccount = int(ccount)
-                chits = int(chits)
-            except ValueError:
+    candidates = []
+    frequent = {}
+    for kind, known in (("prefix", pre_set), ("suffix", suf_set), ("chargram", chargram_set)):
+        rows = idx.mine(kind, MIN_CORPUS_HITS, extra=extra, min_len=MIN_PATTERN_LEN)
+        frequent[kind] = rows
+        for r in rows:
+            if not r["closed"] or r["pattern"] in known or r["cluster_count"] < MIN_CLUSTER_COUNT:
                 continue
-            rows.append((section.strip(), pre.strip(), suf.strip(), ccount, chits))
-
-    print(f"[INFO] Loaded {len(rows)} cluster rows from {path}.")
-    return rows
+            pre = r["pattern"] if kind == "prefix" else ""
+            suf = r["pattern"] if kind == "suffix" else ""
+            candidates.append((kind, pre, suf, r["pattern"], int(r["cluster_count"]),
+                               int(r["tokens"]), int(r["uncovered_hits"])))
+
+    # Candidate combos: joint (prefix, suffix) counts over all types at once
+    P = idx.row_incidence("prefix", frequent["prefix"])
+    S = idx.row_incidence("suffix", frequent["suffix"])
+    hits = (P.T @ sparse.diags(w) @ S).toarray()
+    unc_hits = (P.T @ sparse.diags(extra["uncovered_hits"]) @ S).toarray()
+    unc_types = (P.T @ sparse.diags(extra["cluster_count"]) @ S).toarray()
+    for i, j in zip(*np.nonzero((hits >= MIN_CORPUS_HITS) & (unc_types >= MIN_CLUSTER_COUNT))):
+        pre = frequent["prefix"][i]["pattern"]
+        suf = frequent["suffix"][j]["pattern"]
+        if (pre, suf) in existing_pairs:
+            continue
+        candidates.append(("combo", pre, suf, f"{pre}...{suf}", int(unc_types[i, j]),
+                           int(hits[i, j]), int(unc_hits[i, j])))
+    return candidates
+
+def candidate_conditions(row):
+    kind, pre, suf, pattern = row[:4]
+    if kind == "chargram":
+        return ((CONTAINS, pattern),)
+    conds = []
+    if pre:
+        conds.append((PREFIX, pre))
+    if suf:
+        conds.append((SUFFIX, suf))
+    return tuple(conds)
+
+def select_candidates(tokens, candidates, pre_set, suf_set, existing_pairs, target=TARGET_COVERAGE):
+    """
+    Greedy forward selection over the candidates on top of the tokens the
+    rulebook already covers, until `target` of all corpus tokens is covered
+    or no candidate adds anything. Returns (base coverage, steps).
+    """
+    index = CoverageIndex(Counter(tokens), [candidate_conditions(c) for c in candidates],
+                          names=[f"{c[0]}:{c[3]}" for c in candidates])
+    covered = [i for i, t in enumerate(index.types)
+               if covered_by_rulebook(t, pre_set, suf_set, existing_pairs)]
+    base = RuleSet(index, base=bitset(covered, index.n_types))
+    _, steps = greedy_select(index, range(len(candidates)), target=target, base=base)
+    return base.coverage(), steps
 
 def main():
     os.makedirs(os.path.join(ROOT, "Phase70", "out"), exist_ok=True)
@@ -96,38 +154,40 @@ def main():
     tokens = load_tokens(TOKENS_TXT)
     print(f"[INFO] Loaded {len(tokens)} tokens.")
 
-    pre_set, suf_set, existing_pairs = load_phase69_patterns(RULEBOOK_JSON)
-    clusters = load_clusters(CLUSTERS_TSV)
-
-    candidates = []
-    for section, pre, suf, ccount, chits in clusters:
-        if pre and len(pre) >= MIN_PATTERN_LEN and chits >= MIN_CORPUS_HITS:
-            if pre not in pre_set:
-                candidates.append(("prefix", pre, "", ccount, chits))
-        if suf and len(suf) >= MIN_PATTERN_LEN and chits >= MIN_CORPUS_HITS:
-            if suf not in suf_set:
-                candidates.append(("suffix", "", suf, ccount, chits))
-        if pre and suf and len(pre) >= MIN_PATTERN_LEN and len(suf) >= MIN_PATTERN_LEN:
-            if (pre, suf) not in existing_pairs and chits >= MIN_CORPUS_HITS:
-                candidates.append(("combo", pre, suf, ccount, chits))
+    pre_set, suf_set, existing_pairs, chargrams = load_phase69_patterns(RULEBOOK_JSON)
+    candidates = evaluate_candidates(tokens, pre_set, suf_set, existing_pairs, chargrams)
 
     seen = set()
     uniq = []
-    for kind, pre, suf, ccount, chits in candidates:
-        key = (kind, pre, suf)
+    for row in candidates:
+        key = row[:4]
         if key in seen:
             continue
         seen.add(key)
-        uniq.append((kind, pre, suf, ccount, chits))
+        uniq.append(row)
 
     with open(OUT_TSV, "w", encoding="utf-8") as out:
-        out.write("kind\tpre\tsuf\tcluster_count\tcorpus_hits\n")
-        for kind, pre, suf, ccount, chits in sorted(
-            uniq, key=lambda r: (-r[4], r[0], r[1], r[2])
+        out.write("kind\tpre\tsuf\tpattern\tcluster_count\tcorpus_hits\tuncovered_hits\n")
+        for kind, pre, suf, pattern, ccount, chits, uhits in sorted(
+            uniq, key=lambda r: (-r[5], r[0], r[1], r[2], r[3])
         ):
-            out.write(f"{kind}\t{pre}\t{suf}\t{ccount}\t{chits}\n")
-
-    print(f"[OK] Suggested {len(uniq)} candidate patterns → {OUT_TSV}")
+            out.write(f"{kind}\t{pre}\t{suf}\t{pattern}\t{ccount}\t{chits}\t{uhits}\n")
+
+    by_kind = Counter(r[0] for r in uniq)
+    print(f"[OK] Suggested {len(uniq)} candidate patterns ("
+          + ", ".join(f"{k} {c}" for k, c in sorted(by_kind.items())) + f") → {OUT_TSV}")
+
+    base, steps = select_candidates(tokens, uniq, pre_set, suf_set, existing_pairs)
+    with open(GREEDY_TSV, "w", encoding="utf-8") as out:
+        out.write("step\tcandidate\tgain_tokens\tgain_types\tcovered_tokens\tcoverage\n")
+        out.write(f"0\t(rulebook)\t0\t0\t{base['tokens']}\t{base['frac_tokens']:.6f}\n")
+        for st in steps:
+            out.write(f"{st['step']}\t{st['name']}\t{st['gain_tokens']}\t{st['gain_types']}\t"
+                      f"{st['tokens']}\t{st['frac_tokens']:.6f}\n")
+    final = steps[-1]["frac_tokens"] if steps else base["frac_tokens"]
+    print(f"[OK] Greedy selection: {len(steps)} candidates lift coverage "
+          f"{100 * base['frac_tokens']:.2f} % → {100 * final:.2f} % "
+          f"(target {100 * TARGET_COVERAGE:.0f} %) → {GREEDY_TSV}")
 
 if __name__ == "__main__":
     main()
@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
-import math
-from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import RuleMatcher, compile_p71_rule  # noqa: E402
+from p6_token_store import open_store  # noqa: E402
+from p73_pmi_engine import merge_columns, pmi_edges  # noqa: E402
 
 # -------------
 # Config
 # -------------
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOK_PATHS = [
-    os.path.join(ROOT, "corpora", "p6_voynich_tokens.txt"),
-    os.path.join(ROOT, "p6_voynich_tokens.txt"),
-]
 RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
 OUT_DIR = os.path.join(ROOT, "Phase72", "out")
 OUT_PATH = os.path.join(OUT_DIR, "p72_rule_pmi_network.tsv")
@@ -25,13 +27,10 @@ MIN_PMI = 0.5
 # -------------
 
 def load_tokens():
-    for p in TOK_PATHS:
-        if os.path.isfile(p):
-            with open(p, "r", encoding="utf-8") as f:
-                toks = [ln.strip() for ln in f if ln.strip()]
-            print(f"[INFO] Loaded {len(toks)} tokens from {p}")
-            return toks
-    raise SystemExit("[ERR] No canonical token file found.")
+    store = open_store()
+    toks = list(store.tokens())
+    print(f"[INFO] Loaded {len(toks)} tokens from token store {store.path or '(in memory)'}")
+    return toks
 
 def load_rulebook():
     if not os.path.isfile(RULEBOOK_JSON):
@@ -57,29 +56,6 @@ def rule_label(r):
     core = pat or (pre + "*" + suf if (pre or suf) else "")
     return rid or f"{kind}:{core}:{base}"
 
-def match_rule_on_token(r, tok):
-    kind = r.get("kind", "")
-    pre = r.get("pre", "") or ""
-    suf = r.get("suf", "") or ""
-    pat = r.get("pattern", "") or ""
-
-    if kind == "prefix" and pre:
-        return tok.startswith(pre)
-    if kind == "suffix" and suf:
-        return tok.endswith(suf)
-    if kind == "pair":
-        if pre and suf:
-            return tok.startswith(pre) and tok.endswith(suf)
-        elif pre:
-            return tok.startswith(pre)
-        elif suf:
-            return tok.endswith(suf)
-        return False
-    if kind == "chargram" and pat:
-        return pat in tok
-
-    return False
-
 # -------------
 # Main
 # -------------
@@ -97,46 +73,28 @@ def main():
         labels.append(lbl)
         rule_defs.append(r)
 
-    freq = defaultdict(int)
-    cofreq = defaultdict(int)
-
     N = len(tokens)
 
-    # For each token, find which rules fire; update counts + cooc
-    for tok in tokens:
-        active = []
-        for lbl, r in zip(labels, rule_defs):
-            if match_rule_on_token(r, tok):
-                active.append(lbl)
-        # Update frequencies
-        for lbl in active:
-            freq[lbl] += 1
-        # Update cooccurrence
-        if len(active) > 1:
-            # unique pairs
-            uniq = sorted(set(active))
-            for i in range(len(uniq)):
-                for j in range(i+1, len(uniq)):
-                    cofreq[(uniq[i], uniq[j])] += 1
-
-    used_labels = {lbl for lbl, c in freq.items() if c > 0}
+    # Token x rule incidence in one compiled pass, rules sharing a label
+    # merged; co-occurrence and PMI come from one sparse X^T X.
+    matcher = RuleMatcher([compile_p71_rule(r) for r in rule_defs])
+    X, uniq_labels = merge_columns(matcher.incidence(tokens), labels)
+    freq = np.asarray(X.sum(axis=0)).ravel()
+
+    used_labels = {lbl for lbl, c in zip(uniq_labels, freq) if c > 0}
     print(f"[INFO] {len(used_labels)} rules fired at least once.")
 
+    edges = pmi_edges(X, uniq_labels, n=N, freq=freq,
+                      min_cooc=MIN_COOCC, min_pmi=MIN_PMI)
+    edges.sort(key=lambda e: -e["cooc"])
+
     # Compute PMI edges
     with open(OUT_PATH, "w", encoding="utf-8") as out:
         out.write("#rule_i\trule_j\tfreq_i\tfreq_j\tcooc\tPMI_bits\n")
-        kept = 0
-        for (ri, rj), c in sorted(cofreq.items(), key=lambda x: -x[1]):
-            if c < MIN_COOCC:
-                continue
-            fi = freq[ri]
-            fj = freq[rj]
-            if fi == 0 or fj == 0:
-                continue
-            pmi = math.log2((c * N) / (fi * fj))
-            if pmi >= MIN_PMI:
-                out.write(f"{ri}\t{rj}\t{fi}\t{fj}\t{c}\t{pmi:.4f}\n")
-                kept += 1
+        for e in edges:
+            out.write(f"{e['rule_i']}\t{e['rule_j']}\t{e['freq_i']}\t{e['freq_j']}\t"
+                      f"{e['cooc']}\t{e['PMI_bits']:.4f}\n")
+        kept = len(edges)
 
     print(f"[OK] Wrote {kept} PMI edges → {OUT_PATH}")
     print(f"[INFO] Thresholds: MIN_COOCC={MIN_COOCC}, MIN_PMI={MIN_PMI}")
@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import RuleMatcher, compile_p71_rule  # noqa: E402
+from p6_token_store import open_store  # noqa: E402
+
 # -------------
 # Config
 # -------------
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-TOK_PATHS = [
-    os.path.join(ROOT, "corpora", "p6_voynich_tokens.txt"),
-    os.path.join(ROOT, "p6_voynich_tokens.txt"),
-]
 RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
 OUT_DIR = os.path.join(ROOT, "Phase71", "out")
 OUT_PATH = os.path.join(OUT_DIR, "p71_rule_clusters.tsv")
@@ -23,13 +24,10 @@ JACCARD_THRESHOLD = 0.20  # can be tuned; keep explicit
 # -------------
 
 def load_tokens():
-    for p in TOK_PATHS:
-        if os.path.isfile(p):
-            with open(p, "r", encoding="utf-8") as f:
-                toks = [ln.strip() for ln in f if ln.strip()]
-            print(f"[INFO] Loaded {len(toks)} tokens from {p}")
-            return toks
-    raise SystemExit("[ERR] No canonical token file found.")
+    store = open_store()
+    toks = list(store.tokens())
+    print(f"[INFO] Loaded {len(toks)} tokens from token store {store.path or '(in memory)'}")
+    return toks
 
 def load_rulebook():
     if not os.path.isfile(RULEBOOK_JSON):
@@ -56,43 +54,17 @@ def rule_label(r):
     core = pat or (pre + "*" + suf if (pre or suf) else "")
     return rid or f"{kind}:{core}:{base}"
 
-def match_rule_on_token(r, tok):
-    """Deterministic, conservative matching based only on fields we see in p69_rules_final.json."""
-    kind = r.get("kind", "")
-    pre = r.get("pre", "") or ""
-    suf = r.get("suf", "") or ""
-    pat = r.get("pattern", "") or ""
-
-    if kind == "prefix" and pre:
-        return tok.startswith(pre)
-    if kind == "suffix" and suf:
-        return tok.endswith(suf)
-    if kind == "pair":
-        # Seen in file as a combined prefix/suffix condition
-        if pre and suf:
-            return tok.startswith(pre) and tok.endswith(suf)
-        elif pre:
-            return tok.startswith(pre)
-        elif suf:
-            return tok.endswith(suf)
-        return False
-    if kind == "chargram" and pat:
-        # Local pattern; we don't enforce side here
-        return pat in tok
-
-    # For any other or malformed kinds, we do nothing.
-    return False
-
 def build_rule_hits(tokens, rules):
+    # One compiled pass over the tokens; columns of the incidence matrix
+    # are the per-rule hit sets.
+    matcher = RuleMatcher([compile_p71_rule(r) for r in rules])
+    X = matcher.incidence(tokens).tocsc()
     rule_hits = {}
     for idx, r in enumerate(rules):
         label = rule_label(r)
-        hit_indices = []
-        for ti, tok in enumerate(tokens):
-            if match_rule_on_token(r, tok):
-                hit_indices.append(ti)
-        if hit_indices:
-            rule_hits[label] = set(hit_indices)
+        hit_indices = X.indices[X.indptr[idx]:X.indptr[idx + 1]]
+        if len(hit_indices):
+            rule_hits[label] = set(hit_indices.tolist())
     print(f"[INFO] {len(rule_hits)} / {len(rules)} rules matched at least one token.")
     return rule_hits
 
@@ -8,10 +8,13 @@ import os
 import sys
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_type_segmenter import TypeSegmenter, rulebook_hash  # noqa: E402
+from p6_token_store import load_tokens  # noqa: E402
+
 # Correct and explicit BASE
 BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
 
-TOKENS_PATH = os.path.join(BASE, "corpora", "p6_voynich_tokens.txt")
 IN_DIR      = os.path.join(BASE, "Phase70", "in")
 OUT_DIR     = os.path.join(BASE, "Phase70", "out")
 PREF_PATH   = os.path.join(IN_DIR, "p70_prefixes.txt")
@@ -70,14 +73,17 @@ def main():
     token_segments = []
     type_counter   = Counter()
 
-    with open(TOKENS_PATH, "r", encoding="utf-8") as f:
-        for tok_id, line in enumerate(f, start=1):
-            token = line.strip()
-            if not token:
-                continue
-            pfx, stem, sfx = segment_token(token, prefixes, suffixes)
-            token_segments.append((tok_id, token, pfx, stem, sfx))
-            type_counter[(pfx, stem, sfx)] += 1
+    # canonical tokens from the shared store (one per line, ids from 1)
+    numbered = list(enumerate(load_tokens(), start=1))
+
+    seg = TypeSegmenter("p71_schemeC",
+                        lambda t: segment_token(t, prefixes, suffixes),
+                        rulebook_hash("p71_schemeC", prefixes, suffixes))
+    segments = seg.segment(token for _, token in numbered)
+
+    for (tok_id, token), (pfx, stem, sfx) in zip(numbered, segments):
+        token_segments.append((tok_id, token, pfx, stem, sfx))
+        type_counter[(pfx, stem, sfx)] += 1
 
     # write token-level file
     tok_out = os.path.join(OUT_DIR, "p71_schemeC_tokens.tsv")
@@ -20,13 +20,23 @@ Outputs:
   - Phase72/out/p72_vm_semantic_field_summary.tsv
       cluster_id, n_stems, total_count, mean_left_frac, mean_right_frac,
       mean_unknown_frac, mean_axis_diff, mean_rule_hits, mean_log_count
+
+  - Phase72/out/p72_vm_semantic_k_sweep.tsv   (only with --sweep 2-50)
+      k, inertia, silhouette, n_iter, best_start
+
+Clustering runs in scripts/kmeans_engine.py (k-means++ restarts plus the
+old deterministic start; --minibatch for large vocabularies).
 """
 
 import os
 import sys
 import csv
 import math
-from collections import defaultdict
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import kmeans_engine  # noqa: E402
+from kmeans_engine import feature_matrix, k_sweep, minibatch_kmeans, parse_ks  # noqa: E402
 
 BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
 
@@ -34,11 +44,14 @@ P71_PATH      = os.path.join(BASE, "Phase71", "out", "p71_vm_structural_vectors.
 OUT_DIR       = os.path.join(BASE, "Phase72", "out")
 FIELDS_PATH   = os.path.join(OUT_DIR, "p72_vm_semantic_fields.tsv")
 SUMMARY_PATH  = os.path.join(OUT_DIR, "p72_vm_semantic_field_summary.tsv")
+SWEEP_PATH    = os.path.join(OUT_DIR, "p72_vm_semantic_k_sweep.tsv")
 
 # Hyperparameters (can tweak here)
 MIN_COUNT = 20   # minimum token frequency to include in clustering
 K_CLUSTERS = 5   # number of clusters
 MAX_ITERS  = 50  # max k-means iterations
+N_INIT     = 10  # k-means++ restarts (besides the deterministic start)
+SEED       = 0
 
 
 def load_structural_vectors(path):
@@ -153,12 +166,17 @@ def zscore_features(rows, feature_names):
     return rows, stats
 
 
-def kmeans(rows, feature_names, k, max_iters):
+def kmeans(rows, feature_names, k, max_iters, n_init=N_INIT, seed=SEED, n_jobs=1,
+           minibatch=False, batch_size=1024):
     """
-    Simple deterministic k-means on z-scored features.
+    k-means on z-scored features via kmeans_engine.
     - rows: list of dicts, each with 'z_*' features
     - feature_names: original names; we use 'z_'+name
-    Initial centers: first k rows (sorted by descending count, then token).
+    Starts: the old deterministic one (first k rows sorted by descending
+    count, then token) plus n_init k-means++ starts; lowest inertia wins.
+    With minibatch=True only mini-batch k-means++ starts are used.
+    Cluster ids are renumbered by first appearance in (count desc, token)
+    order, so cluster 0 holds the most frequent stem.
     Returns:
       - assignments: list of cluster_id per row index [0..k-1]
       - centers: list of dicts with center coordinates in z-space
@@ -168,68 +186,42 @@ def kmeans(rows, feature_names, k, max_iters):
         print(f"[WARN] n={n} < k={k}, reducing k to {n}", file=sys.stderr)
         k = n
 
-    # Sort rows deterministically by count desc, then token
+    X = feature_matrix(rows, feature_names, prefix="z_")
     rows_sorted_idx = sorted(range(n), key=lambda i: (-rows[i]["count"], rows[i]["token"]))
-    # Initial centers: first k rows
-    centers = []
-    for ci in range(k):
-        idx = rows_sorted_idx[ci]
-        c = {}
-        for feat in feature_names:
-            zname = "z_" + feat
-            c[zname] = rows[idx][zname]
-        centers.append(c)
 
-    assignments = [0] * n
-
-    def dist2(row, center):
-        d = 0.0
-        for feat in feature_names:
-            zname = "z_" + feat
-            dv = row[zname] - center[zname]
-            d += dv * dv
-        return d
-
-    for it in range(max_iters):
-        changed = False
-
-        # Assignment step
-        for i, r in enumerate(rows):
-            best_c = None
-            best_d = None
-            for ci, center in enumerate(centers):
-                d = dist2(r, center)
-                if best_d is None or d < best_d:
-                    best_d = d
-                    best_c = ci
-            if assignments[i] != best_c:
-                assignments[i] = best_c
-                changed = True
-
-        # Recompute centers
-        cluster_sums = [defaultdict(float) for _ in range(k)]
-        cluster_counts = [0] * k
-        for i, r in enumerate(rows):
-            ci = assignments[i]
-            cluster_counts[ci] += 1
-            for feat in feature_names:
-                zname = "z_" + feat
-                cluster_sums[ci][zname] += r[zname]
+    if minibatch:
+        res = minibatch_kmeans(X, k, batch_size=batch_size, max_iters=max(max_iters, 100),
+                               n_init=n_init, seed=seed, n_jobs=n_jobs)
+    else:
+        res = kmeans_engine.kmeans(X, k, n_init=n_init, max_iters=max_iters, seed=seed,
+                                   n_jobs=n_jobs, init_centers=[X[rows_sorted_idx[:k]]])
+    start = "deterministic" if (res.start == 0 and not minibatch) else f"k-means++ #{res.start}"
+    print(f"[INFO] k-means k={k}: inertia={res.inertia:.3f}, iters={res.n_iter}, "
+          f"best start={start}", file=sys.stderr)
+
+    relabel = {}
+    for i in rows_sorted_idx:
+        relabel.setdefault(int(res.labels[i]), len(relabel))
+    for ci in range(k):
+        relabel.setdefault(ci, len(relabel))
+    assignments = [relabel[int(c)] for c in res.labels]
 
-        for ci in range(k):
-            if cluster_counts[ci] == 0:
-                # Keep old center if empty
-                continue
-            for feat in feature_names:
-                zname = "z_" + feat
-                centers[ci][zname] = cluster_sums[ci][zname] / cluster_counts[ci]
+    centers = [None] * k
+    for ci in range(k):
+        centers[relabel[ci]] = {"z_" + feat: float(res.centers[ci, j])
+                                for j, feat in enumerate(feature_names)}
+    return assignments, centers
 
-        print(f"[INFO] k-means iter {it+1}, changed={changed}", file=sys.stderr)
-        if not changed:
-            print("[INFO] k-means converged.", file=sys.stderr)
-            break
 
-    return assignments, centers
+def write_sweep(rows, feature_names, ks, n_init, seed, n_jobs, minibatch, out_path):
+    X = feature_matrix(rows, feature_names, prefix="z_")
+    sweep = k_sweep(X, ks, n_init=n_init, max_iters=MAX_ITERS, seed=seed, n_jobs=n_jobs,
+                    minibatch=minibatch)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    kmeans_engine.write_sweep(sweep, tmp_path)
+    os.replace(tmp_path, out_path)
+    print(f"[OK] Wrote k-sweep ({len(sweep)} values of K) → {out_path}", file=sys.stderr)
 
 
 def write_fields(rows, assignments, centers, feature_names, out_path):
@@ -352,6 +344,22 @@ def write_summary(rows, assignments, feature_names, summary_path):
 
 
 def main():
+    ap = argparse.ArgumentParser(description="Structural clustering of VM stems (p72)")
+    ap.add_argument("--k", type=int, default=K_CLUSTERS, help="number of clusters")
+    ap.add_argument("--n-init", type=int, default=N_INIT, help="k-means++ restarts")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--jobs", type=int, default=1, help="restarts run in parallel")
+    ap.add_argument("--minibatch", action="store_true", help="mini-batch k-means")
+    ap.add_argument("--batch-size", type=int, default=1024)
+    ap.add_argument("--sweep", default=None,
+                    help=f"also sweep K (e.g. 2-50) -> {os.path.basename(SWEEP_PATH)}")
+    args = ap.parse_args()
+    if args.n_init < 0:
+        ap.error("--n-init must be >= 0")
+    if args.n_init < 1 and (args.minibatch or args.sweep):
+        ap.error("--n-init 0 (deterministic start only) cannot be combined with "
+                 "--minibatch or --sweep, which have no fixed start")
+
     feature_names = [
         "left_frac",
         "right_frac",
@@ -363,11 +371,16 @@ def main():
     rows = load_structural_vectors(P71_PATH)
     rows, stats = zscore_features(rows, feature_names)
 
-    assignments, centers = kmeans(rows, feature_names, K_CLUSTERS, MAX_ITERS)
+    assignments, centers = kmeans(rows, feature_names, args.k, MAX_ITERS,
+                                  n_init=args.n_init, seed=args.seed, n_jobs=args.jobs,
+                                  minibatch=args.minibatch, batch_size=args.batch_size)
 
     os.makedirs(OUT_DIR, exist_ok=True)
     write_fields(rows, assignments, centers, feature_names, FIELDS_PATH)
     write_summary(rows, assignments, feature_names, SUMMARY_PATH)
+    if args.sweep:
+        write_sweep(rows, feature_names, parse_ks(args.sweep), args.n_init, args.seed,
+                    args.jobs, args.minibatch, SWEEP_PATH)
 
 
 if __name__ == "__main__":
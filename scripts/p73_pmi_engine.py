@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Sparse co-occurrence and PMI engine for rule / family networks
+
+p71_build_pmi_network.py and p73_rule_pmi.py used to count pairs with
+itertools.combinations over every token's active set, keyed by tuples in
+a dict. Here the input is a sparse binary incidence matrix B (rows =
+tokens, columns = rules or families) and the whole co-occurrence table is
+one sparse product:
+
+    C = B^T B          C[i, j] = #rows where i and j both fire
+    f = colsum(B)      marginal counts
+
+For every pair i < j with C[i, j] >= min_cooc:
+
+    PMI  = log2(C[i, j] * N / (f_i * f_j))
+    NPMI = PMI / -log2(C[i, j] / N)          (1.0 when C[i, j] == N)
+    PPMI = max(PMI, 0)
+
+and the edge is kept when the chosen measure >= min_pmi.
+
+Edges are returned in order of first co-occurrence (the row where the
+pair first fires together), then by label, which is exactly the order a
+dict filled by the old token loop would yield, so the TSVs written by the
+callers are unchanged. That order is computed for the kept edges only,
+by one more sparse elementwise product.
+
+Usage (library):
+
+    from p73_pmi_engine import incidence_from_sets, pmi_edges
+    B, labels = incidence_from_sets(rule_sets)
+    for e in pmi_edges(B, labels, min_cooc=5, min_pmi=0.5):
+        e["rule_i"], e["rule_j"], e["cooc"], e["PMI_bits"], e["NPMI"], ...
+
+Requires numpy + scipy.
+"""
+
+import numpy as np
+from scipy import sparse
+
+MIN_COOCC = 5
+MIN_PMI = 0.5
+
+MEASURES = ("PMI_bits", "NPMI", "PPMI_bits")
+
+
+def incidence_from_sets(rowsets, labels=None):
+    """
+    Binary CSR incidence matrix from an iterable of label collections.
+    Columns follow `labels` if given, else the sorted label vocabulary
+    (so column order == label string order).
+    """
+    rowsets = [set(s) for s in rowsets]
+    if labels is None:
+        labels = sorted(set().union(*rowsets)) if rowsets else []
+    col = {lbl: j for j, lbl in enumerate(labels)}
+
+    indptr = [0]
+    indices = []
+    for s in rowsets:
+        indices.extend(sorted(col[lbl] for lbl in s))
+        indptr.append(len(indices))
+    B = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int64),
+         np.asarray(indices, dtype=np.int64),
+         np.asarray(indptr, dtype=np.int64)),
+        shape=(len(rowsets), len(labels)),
+    )
+    return B, list(labels)
+
+
+def merge_columns(X, col_labels):
+    """
+    Collapse columns that share a label (e.g. two rules with the same
+    rule_label). Returns (counts, labels): counts sums the merged columns,
+    labels is the sorted unique label list.
+    """
+    labels = sorted(set(col_labels))
+    pos = {lbl: j for j, lbl in enumerate(labels)}
+    agg = sparse.csr_matrix(
+        (np.ones(len(col_labels), dtype=np.int64),
+         (np.arange(len(col_labels)), [pos[l] for l in col_labels])),
+        shape=(len(col_labels), len(labels)),
+    )
+    return (sparse.csr_matrix(X, dtype=np.int64) @ agg).tocsr(), labels
+
+
+def cooccurrence(B):
+    """Upper-triangular (i < j) co-occurrence counts of a binary matrix, as COO."""
+    B = sparse.csr_matrix(B, dtype=np.int64)
+    C = (B.T @ B).tocsr()
+    return sparse.triu(C, k=1).tocoo()
+
+
+def pmi_edges(X, labels, n=None, min_cooc=MIN_COOCC, min_pmi=MIN_PMI,
+              measure="PMI_bits", freq=None):
+    """
+    PMI / NPMI / PPMI edges of a token x label incidence matrix.
+
+    X        sparse (rows x labels); any value > 0 counts as a hit
+    labels   column labels; column order must match label sort order
+             for pairs to be oriented (rule_i < rule_j) as before
+    n        number of rows N (default X.shape[0])
+    freq     marginal counts per column (default: column sums of the
+             binarised X; p71 passes raw sums to keep duplicate-rule
+             counting)
+    measure  which of MEASURES is compared against min_pmi
+
+    Returns a list of dicts with keys rule_i, rule_j, freq_i, freq_j,
+    cooc, PMI_bits, NPMI, PPMI_bits, in first-co-occurrence order.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"measure must be one of {MEASURES}")
+    X = sparse.csr_matrix(X)
+    B = (X > 0).astype(np.int64)
+    N = X.shape[0] if n is None else n
+    if freq is None:
+        freq = np.asarray(B.sum(axis=0)).ravel()
+    else:
+        freq = np.asarray(freq).ravel()
+
+    C = cooccurrence(B)
+    keep = C.data >= min_cooc
+    I, J, c = C.row[keep], C.col[keep], C.data[keep].astype(np.float64)
+    fi, fj = freq[I].astype(np.float64), freq[J].astype(np.float64)
+    ok = (fi > 0) & (fj > 0)
+    I, J, c, fi, fj = I[ok], J[ok], c[ok], fi[ok], fj[ok]
+
+    pmi = np.log2(c * N / (fi * fj))
+    h = -np.log2(c / N)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        npmi = np.where(h > 0, pmi / np.where(h > 0, h, 1.0), 1.0)
+    ppmi = np.maximum(pmi, 0.0)
+    scores = {"PMI_bits": pmi, "NPMI": npmi, "PPMI_bits": ppmi}
+
+    sel = scores[measure] >= min_pmi
+    I, J, c, fi, fj = I[sel], J[sel], c[sel], fi[sel], fj[sel]
+    pmi, npmi, ppmi = pmi[sel], npmi[sel], ppmi[sel]
+
+    first = first_cooccurrence(B, I, J)
+    order = np.lexsort((J, I, first))
+
+    edges = []
+    for k in order:
+        edges.append({
+            "rule_i": labels[I[k]],
+            "rule_j": labels[J[k]],
+            "freq_i": int(fi[k]),
+            "freq_j": int(fj[k]),
+            "cooc": int(c[k]),
+            "PMI_bits": float(pmi[k]),
+            "NPMI": float(npmi[k]),
+            "PPMI_bits": float(ppmi[k]),
+        })
+    return edges
+
+
+def first_cooccurrence(B, I, J):
+    """Row index where columns I[k] and J[k] first fire together."""
+    if len(I) == 0:
+        return np.zeros(0, dtype=np.int64)
+    B = sparse.csc_matrix(B)
+    P = B[:, I].multiply(B[:, J]).tocsc()
+    P.eliminate_zeros()
+    P.sort_indices()
+    return P.indices[P.indptr[:-1]].astype(np.int64)
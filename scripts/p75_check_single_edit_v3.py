@@ -2,59 +2,29 @@
 import os
 import sys
 import csv
+import argparse
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from edit_index import (  # noqa: E402
+    DeletionIndex,
+    cross_family_edges,
+    edit_distance,
+    family_edit_counts,
+    write_cross_family,
+    write_family_counts,
+)
+
 BASE = os.path.dirname(__file__)
 FAM_FILE = os.path.join(BASE, "..", "Phase75", "out", "p75_families_long.tsv")
+OUT_DIR = os.path.join(BASE, "..", "Phase75", "out")
+FAMILY_OUT = os.path.join(OUT_DIR, "p75_edit_family_counts.tsv")
+CROSS_OUT = os.path.join(OUT_DIR, "p75_edit_cross_family.tsv")
 
-def edit_distance(a: str, b: str, max_d: int = 2) -> int:
-    """
-    Standard Levenshtein distance with early cutoff at max_d.
-    We only ever care about d <= 2 for our summary.
-    """
-    la, lb = len(a), len(b)
-    # Quick bounds
-    if abs(la - lb) > max_d:
-        return max_d + 1
-    if a == b:
-        return 0
-
-    # DP with banded optimization
-    prev = list(range(lb + 1))
-    for i in range(1, la + 1):
-        cur = [i] + [0] * lb
-        # Only need to compute within a band of width max_d
-        j_start = max(1, i - max_d)
-        j_end = min(lb, i + max_d)
-        # Fill left of band with large values
-        for j in range(1, j_start):
-            cur[j] = max_d + 1
-        for j in range(j_start, j_end + 1):
-            cost = 0 if a[i - 1] == b[j - 1] else 1
-            cur[j] = min(
-                prev[j] + 1,        # deletion
-                cur[j - 1] + 1,     # insertion
-                prev[j - 1] + cost  # substitution
-            )
-        # Fill right of band with large values
-        for j in range(j_end + 1, lb + 1):
-            cur[j] = max_d + 1
-        prev = cur
-        # Early exit: if row minimum already > max_d
-        if min(prev) > max_d:
-            return max_d + 1
-    return prev[lb]
-
-def main():
-    print("=== p75: within-family edit-distance analysis (v3, long-format) ===")
-
-    if not os.path.isfile(FAM_FILE):
-        print(f"[ERR] Long-format family file not found: {FAM_FILE}")
-        sys.exit(1)
-
-    # Load families
+def load_families(path):
+    """family -> list of running tokens (one per row of the long file)."""
     fam2tokens = defaultdict(list)
-    with open(FAM_FILE, "r", encoding="utf-8") as f:
+    with open(path, "r", encoding="utf-8") as f:
         r = csv.DictReader(f, delimiter="\t")
         if "family" not in r.fieldnames or "token" not in r.fieldnames:
             print("[ERR] Expected columns 'family' and 'token' in p75_families_long.tsv")
@@ -64,26 +34,16 @@ def main():
             tok = row["token"].strip()
             if fam and tok:
                 fam2tokens[fam].append(tok)
+    return fam2tokens
 
-    # Keep only non-trivial families
-    fam2tokens = {f: toks for f, toks in fam2tokens.items() if len(toks) >= 2}
-    if not fam2tokens:
-        print("[ERR] No non-trivial families (len>=2) found.")
-        sys.exit(1)
-
-    print(f"[INFO] Non-trivial families: {len(fam2tokens)}")
-
-    total_pairs = 0
-    ed1_pairs = 0
-    ed_le2_pairs = 0
 
-    # For token-level metrics
+def dp_counts(fam2tokens):
+    """The original all-pairs DP loop; only used by --verify-dp."""
+    total_pairs = ed1_pairs = ed_le2_pairs = 0
     token_has_ed1 = set()
     token_has_ed_le2 = set()
-
     for fam, toks in fam2tokens.items():
         n = len(toks)
-        # small optimisation: work on index, not combinations import
         for i in range(n):
             ti = toks[i]
             for j in range(i + 1, n):
@@ -92,14 +52,55 @@ def main():
                 d = edit_distance(ti, tj, max_d=2)
                 if d == 1:
                     ed1_pairs += 1
-                    token_has_ed1.add(ti)
-                    token_has_ed1.add(tj)
-                    token_has_ed_le2.add(ti)
-                    token_has_ed_le2.add(tj)
+                    token_has_ed1.update((ti, tj))
+                    token_has_ed_le2.update((ti, tj))
                 elif d == 2:
                     ed_le2_pairs += 1
-                    token_has_ed_le2.add(ti)
-                    token_has_ed_le2.add(tj)
+                    token_has_ed_le2.update((ti, tj))
+    return total_pairs, ed1_pairs, ed_le2_pairs, token_has_ed1, token_has_ed_le2
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Within-family edit-distance analysis (v3)")
+    ap.add_argument("--verify-dp", action="store_true",
+                    help="also run the all-pairs DP and check the counts match")
+    args = ap.parse_args()
+
+    print("=== p75: within-family edit-distance analysis (v3, long-format) ===")
+
+    if not os.path.isfile(FAM_FILE):
+        print(f"[ERR] Long-format family file not found: {FAM_FILE}")
+        sys.exit(1)
+
+    fam2tokens = load_families(FAM_FILE)
+
+    # Keep only non-trivial families
+    fam2tokens = {f: toks for f, toks in fam2tokens.items() if len(toks) >= 2}
+    if not fam2tokens:
+        print("[ERR] No non-trivial families (len>=2) found.")
+        sys.exit(1)
+
+    print(f"[INFO] Non-trivial families: {len(fam2tokens)}")
+
+    # Distances come from one deletion index over all family types; each
+    # type pair is checked once with edit_distance() instead of every
+    # occurrence pair (same counts as the pairwise DP, see --verify-dp).
+    index = DeletionIndex({t for toks in fam2tokens.values() for t in toks}, max_d=2)
+    stats = family_edit_counts(fam2tokens, index)
+
+    total_pairs = sum(s["total_pairs"] for s in stats.values())
+    ed1_pairs = sum(s["ed1_pairs"] for s in stats.values())
+    ed_le2_pairs = sum(s["ed2_pairs"] for s in stats.values())
+    token_has_ed1 = set().union(*(s["ed1_types"] for s in stats.values()))
+    token_has_ed_le2 = set().union(*(s["ed_le2_types"] for s in stats.values()))
+
+    if args.verify_dp:
+        dp = dp_counts(fam2tokens)
+        ours = (total_pairs, ed1_pairs, ed_le2_pairs, token_has_ed1, token_has_ed_le2)
+        if dp != ours:
+            print("[ERR] Index counts differ from the pairwise DP.")
+            sys.exit(1)
+        print("[OK] Index counts identical to the pairwise DP.")
 
     if total_pairs == 0:
         print("[ERR] No pairs to compare; something is wrong upstream.")
@@ -124,6 +125,12 @@ def main():
           f"({pct_tokens_ed1:.2f} % of family tokens)")
     print(f"[RESULT] Tokens w/ ED≤2 nbr: {len(token_has_ed_le2)} / {len(all_family_tokens)} "
           f"({pct_tokens_ed_le2:.2f} % of family tokens)")
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    write_family_counts(FAMILY_OUT, stats)
+    write_cross_family(CROSS_OUT, cross_family_edges(fam2tokens, index))
+    print(f"[OK] Wrote per-family edit counts → {FAMILY_OUT}")
+    print(f"[OK] Wrote cross-family near-neighbour graph → {CROSS_OUT}")
     print("=== done ===")
 
 if __name__ == "__main__":
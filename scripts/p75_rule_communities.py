@@ -1,50 +1,40 @@
 #!/usr/bin/env python3
 import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from community_engine import METHODS, detect, read_edges, write_communities, write_summary  # noqa: E402
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INFILE = os.path.join(BASE, "Phase72", "out", "p72_rule_pmi_network.tsv")
 OUTDIR = os.path.join(BASE, "Phase75", "out")
-os.makedirs(OUTDIR, exist_ok=True)
 OUTFILE = os.path.join(OUTDIR, "p75_rule_communities.tsv")
+SUMMARY = os.path.join(OUTDIR, "p75_rule_communities_summary.tsv")
+
+# p72_rule_pmi_network.tsv: rule_i, rule_j, freq_i, freq_j, cooc, PMI_bits
+WEIGHT_COLS = {"pmi": 5, "cooc": 4, "none": None}
+
+ap = argparse.ArgumentParser(description="Rule communities on the p72 PMI network")
+ap.add_argument("--method", choices=METHODS, default="leiden")
+ap.add_argument("--weight", choices=sorted(WEIGHT_COLS), default="pmi")
+ap.add_argument("--resolution", type=float, default=1.0)
+ap.add_argument("--runs", type=int, default=20, help="seeded LPA runs for stability")
+ap.add_argument("--seed", type=int, default=0)
+args = ap.parse_args()
+
+if not os.path.isfile(INFILE):
+    raise SystemExit(f"[ERR] PMI network not found: {INFILE}")
+os.makedirs(OUTDIR, exist_ok=True)
+
+# a,b are like 'chargram:che:left'; use them as node ids
+g = read_edges(INFILE, 0, 1, WEIGHT_COLS[args.weight])
+res = detect(g, args.method, args.resolution, args.seed, args.runs)
 
-# Simple label propagation for undirected graph
-adj = {}
-with open(INFILE, "r", encoding="utf-8") as f:
-    for line in f:
-        if not line.strip() or line.startswith("#"):
-            continue
-        a,b,fi,fj,cooc,pmi = line.strip().split("\t")
-        # a,b are like 'chargram:che:left'; use them as node ids
-        adj.setdefault(a, set()).add(b)
-        adj.setdefault(b, set()).add(a)
-
-# init labels: each node its own
-labels = {n: n for n in adj.keys()}
-
-changed = True
-while changed:
-    changed = False
-    for n in adj:
-        if not adj[n]:
-            continue
-        # choose most common neighbour label
-        counts = {}
-        for nb in adj[n]:
-            lab = labels[nb]
-            counts[lab] = counts.get(lab, 0) + 1
-        best = max(counts.items(), key=lambda x: x[1])[0]
-        if best != labels[n]:
-            labels[n] = best
-            changed = True
-
-# compress labels to C1..Ck
-label_map = {}
-for lab in sorted(set(labels.values())):
-    label_map[lab] = f"C{len(label_map)+1}"
-
-with open(OUTFILE, "w", encoding="utf-8") as out:
-    out.write("rule_label\tcommunity\n")
-    for n in sorted(adj.keys()):
-        out.write(f"{n}\t{label_map[labels[n]]}\n")
+write_communities(OUTFILE, g, res, node_header="rule_label")
+write_summary(SUMMARY, g, res)
 
+print(f"[INFO] {g.n} rules, {g.n_edges} edges -> {res['n_communities']} communities "
+      f"({args.method}, Q={res['modularity']:.4f})")
 print(f"[OK] Wrote rule communities → {OUTFILE}")
+print(f"[OK] Wrote community summary → {SUMMARY}")
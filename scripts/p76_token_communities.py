@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import os
-from collections import defaultdict
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from community_engine import read_communities  # noqa: E402
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TOKRULE = os.path.join(BASE, "Phase74", "out", "p74_token_rules.tsv")
@@ -9,14 +12,8 @@ OUTDIR  = os.path.join(BASE, "Phase76", "out")
 os.makedirs(OUTDIR, exist_ok=True)
 OUTFILE = os.path.join(OUTDIR, "p76_token_communities.tsv")
 
-# load rule communities
-rule2com = {}
-with open(RULECOM, "r", encoding="utf-8") as f:
-    for line in f:
-        if not line.strip() or line.startswith("rule_label"):
-            continue
-        lab, com = line.strip().split("\t")
-        rule2com[lab] = com
+# load rule communities (rule_label, community, stability)
+rule2com = read_communities(RULECOM)
 
 def norm_rule_id(rid):
     # in p74 we used numeric rule ids; in p72 we used string labels.
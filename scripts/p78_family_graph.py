@@ -1,19 +1,29 @@
 #!/usr/bin/env python3
 import os
+import sys
 import csv
-from collections import defaultdict
+from collections import Counter, defaultdict
 from itertools import combinations
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from community_engine import detect, from_edges, write_communities  # noqa: E402
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 P75_FAMILIES = os.path.join(BASE, "Phase75", "out", "p75_families.tsv")
 P77_ANCHORS = os.path.join(BASE, "Phase77", "out", "p77_anchor_families.tsv")
 OUT_DIR = os.path.join(BASE, "Phase78", "out")
 EDGE_OUT = os.path.join(OUT_DIR, "p78_family_graph.tsv")
 SUMMARY_OUT = os.path.join(OUT_DIR, "p78_family_graph_summary.txt")
+COMMUNITY_OUT = os.path.join(OUT_DIR, "p78_family_communities.tsv")
 
 # Jaccard threshold for writing an edge
 MIN_JACCARD = 0.20
 
+# Community detection on the thresholded, Jaccard-weighted graph
+COMMUNITY_METHOD = "leiden"
+STABILITY_RUNS = 20
+SEED = 0
+
 
 def load_families(path):
     """
@@ -171,7 +181,19 @@ def main():
         ):
             w.writerow([fam_i, fam_j, f"{j:.3f}", sec_i, sec_j, same])
 
-    # 4) Summary stats
+    # 4) Communities over the written edges (isolated anchors stay singletons)
+    graph = from_edges(((fi, fj, j) for fi, fj, j, _, _, _ in edges), names=anchor_sigs)
+    comm = detect(graph, COMMUNITY_METHOD, seed=SEED, n_runs=STABILITY_RUNS)
+    write_communities(COMMUNITY_OUT, graph, comm, node_header="family",
+                      extra={"section": [anchors[sig]["section"] for sig in graph.names]})
+    comm_sections = defaultdict(Counter)
+    for sig, name in zip(graph.names, comm["names"]):
+        comm_sections[name][anchors[sig]["section"]] += 1
+    multi = [c for c in comm_sections.values() if sum(c.values()) > 1]
+    purity = (sum(max(c.values()) for c in multi) / sum(sum(c.values()) for c in multi)
+              if multi else 0.0)
+
+    # 5) Summary stats
     def mean(xs):
         return sum(xs) / len(xs) if xs else 0.0
 
@@ -184,6 +206,12 @@ def main():
                 f"mean J = {mean(within_vals):.3f}\n")
         f.write(f"Cross-section pairs  (J>0): {len(cross_vals)}, "
                 f"mean J = {mean(cross_vals):.3f}\n")
+        f.write("\n")
+        f.write(f"Communities ({COMMUNITY_METHOD}, Jaccard-weighted): {comm['n_communities']}, "
+                f"modularity Q = {comm['modularity']:.3f}\n")
+        f.write(f"Mean LPA stability ({STABILITY_RUNS} runs): "
+                f"{sum(comm['stability']) / max(graph.n, 1):.3f}\n")
+        f.write(f"Section purity of multi-family communities: {purity:.3f}\n")
         f.write("\nInterpretation:\n")
         f.write("- Families are nodes; edges link families sharing morphemes.\n")
         f.write("- Higher within-section mean Jaccard than cross-section implies\n")
@@ -191,6 +219,7 @@ def main():
         f.write("  with functionally specialized morphological subsystems.\n")
 
     print(f"[OK] Wrote family graph edges → {EDGE_OUT}")
+    print(f"[OK] Wrote family communities → {COMMUNITY_OUT}")
     print(f"[OK] Wrote summary → {SUMMARY_OUT}")
     print("=== Phase 78 complete ===")
 
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from community_engine import read_communities  # noqa: E402
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 P_TOKENS          = os.path.join(BASE, "p6_voynich_tokens.txt")
@@ -132,12 +136,8 @@ def main():
     rc_ok = exists(P_RULE_COMS, "Phase75 rule communities")
     if rc_ok:
         com_counts = {}
-        with open(P_RULE_COMS, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip() or line.startswith("rule_label"):
-                    continue
-                _, com = line.strip().split("\t")
-                com_counts[com] = com_counts.get(com, 0) + 1
+        for com in read_communities(P_RULE_COMS).values():
+            com_counts[com] = com_counts.get(com, 0) + 1
         print("[INFO] Rule communities:")
         for com, c in sorted(com_counts.items(), key=lambda x: x[0]):
             print(f"   {com}: {c} rules")
@@ -4,6 +4,9 @@ import json
 import sys
 from collections import defaultdict, Counter
 
+from p6_token_store import load_tokens as store_load_tokens
+from p6_token_alignment import open_alignment
+
 # -------- config --------
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -44,13 +47,7 @@ def load_tokens(path):
     if not os.path.isfile(path):
         print(f"[ERR] tokens file not found: {path}", file=sys.stderr)
         sys.exit(1)
-    toks = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            t = line.strip()
-            if t:
-                toks.append(t)
-    return toks
+    return store_load_tokens(path)
 
 
 def load_rulebook_chargrams(path):
@@ -109,86 +106,23 @@ def load_anchor_families(path):
     return anchors
 
 
-def rebuild_folio_token_map(trans_path):
-    """
-    Parse voynich_transliteration.txt into a flat list of tokens with folio IDs.
-    Uses the same basic segmentation logic as p6_build_voynich_tokens.py:
-      - ignore metadata lines starting with '<!' etc
-      - take lines with <fXXr.N> and split token sequences on spaces/dots
-      - drop empty fragments
-    Returns: list of (folio, token)
-    """
-    if not os.path.isfile(trans_path):
-        print(f"[ERR] Transliteration file not found: {trans_path}", file=sys.stderr)
-        sys.exit(1)
-
-    mapping = []
-    current_folio = None
-
-    with open(trans_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line:
-                continue
-
-            # folio line like "<f1r> ..."
-            if line.startswith("<f") and ">" in line and ".1" not in line:
-                # header line
-                tag = line.split(">")[0] + ">"
-                folio = tag.split(">")[0].strip("<>")
-                # e.g. "f1r"
-                if folio.startswith("f") and (folio.endswith("r") or folio.endswith("v")):
-                    current_folio = folio
-                continue
-
-            # text line like "<f1r.1,@P0>\tfachys.ykal..."
-            if line.startswith("<f") and ">" in line:
-                before, after = line.split(">", 1)
-                folio_tag = before.split(">")[0].strip("<>")
-                # normalize folio id from folio_tag
-                # folio_tag looks like f1r.1,@P0 ; extract f1r
-                base = folio_tag.split(".", 1)[0]
-                if base.startswith("f") and (base.endswith("r") or base.endswith("v")):
-                    current_folio = base
-                text = after.strip()
-            else:
-                # continuation: text only, assume same folio
-                text = line.strip()
-
-            if current_folio is None or not text:
-                continue
-
-            # strip any leading <%> or similar markers
-            text = text.replace("<%>", "").strip()
-            # split on spaces then dots (EVA-style)
-            for chunk in text.split():
-                for tok in chunk.split("."):
-                    tok = tok.strip()
-                    if tok and not tok.startswith("<") and not tok.endswith(">"):
-                        mapping.append((current_folio, tok))
-
-    print(f"[INFO] Rebuilt folio-token map from transliteration: {len(mapping)} tokens.")
-    return mapping
-
-
-def match_tokens_to_folios(corpus_tokens, folio_tokens):
+def match_tokens_to_folios(corpus_tokens, alignment):
     """
-    Align tokens from p6_voynich_tokens.txt with (folio, tok) sequence
-    from transliteration. We assume identical order and content.
+    Folio for every token of p6_voynich_tokens.txt from the shared alignment
+    index (p6_token_alignment: hapax-anchored banded alignment against the
+    transliteration loci), so a token missing on either side no longer
+    shifts every later folio. Unaligned tokens take the folio of the
+    nearest aligned token before them.
     """
-    if len(corpus_tokens) != len(folio_tokens):
-        print(f"[WARN] Token count mismatch: corpus={len(corpus_tokens)} vs translit={len(folio_tokens)}", file=sys.stderr)
-    n = min(len(corpus_tokens), len(folio_tokens))
-    mapping = []
-    mismatches = 0
-    for i in range(n):
-        t = corpus_tokens[i]
-        folio, t2 = folio_tokens[i]
-        if t != t2:
-            mismatches += 1
-        mapping.append((folio, t))
-    if mismatches:
-        print(f"[WARN] {mismatches} / {n} token mismatches in alignment (this may reflect minor normalization differences).", file=sys.stderr)
+    if len(corpus_tokens) != len(alignment):
+        print(f"[WARN] Token count mismatch: corpus={len(corpus_tokens)} vs alignment={len(alignment)}", file=sys.stderr)
+    n = min(len(corpus_tokens), len(alignment))
+    folios = alignment.folio_labels()
+    mapping = [(folios[i], corpus_tokens[i]) for i in range(n)]
+    s = alignment.stats
+    if s["sub"] or s["canonical_only"] or s["source_only"]:
+        print(f"[WARN] Alignment: {s['sub']} substitutions, {s['canonical_only']} unaligned corpus tokens, "
+              f"{s['source_only']} transliteration-only tokens (of {s['canonical_tokens']}).", file=sys.stderr)
     return mapping
 
 
@@ -247,8 +181,8 @@ def main():
     toks = load_tokens(TOK_FILE)
     print(f"[INFO] Loaded {len(toks)} tokens from {TOK_FILE}")
 
-    folio_tokens = rebuild_folio_token_map(TRANS_FILE)
-    folio_map = match_tokens_to_folios(toks, folio_tokens)
+    # folio per running token from the shared alignment index
+    folio_map = match_tokens_to_folios(toks, open_alignment(TOK_FILE, TRANS_FILE))
 
     patterns = load_rulebook_chargrams(RULEBOOK_JSON)
     if not patterns:
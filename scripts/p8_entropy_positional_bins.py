@@ -1,44 +1,21 @@
 #!/usr/bin/env python3
-import sys, math, collections, statistics, os
+import argparse, os
 
-NBINS = 5  # 0.0, 0.25, 0.5, 0.75, 1.0
-
-def read_tokens(path):
-    with open(path) as f:
-        return [t.strip() for t in f.read().split() if t.strip()]
+from positional_entropy import read_tokens, positional_profiles, edge_stats
 
-def entropy(counter):
-    total = sum(counter.values())
-    if total == 0:
-        return 0.0
-    return -sum((v/total) * math.log2(v/total) for v in counter.values() if v>0)
+NBINS = 5  # 0.0, 0.25, 0.5, 0.75, 1.0
 
-def main(path):
-    tokens = read_tokens(path)
+def main(path, nbins=NBINS, n_boot=0, seed=1337):
+    tokens = read_tokens(path, errors="strict")
     if not tokens:
         print(f"[ERR] no tokens in {path}")
         return
 
-    # one counter per bin
-    bins = [collections.Counter() for _ in range(NBINS)]
-
-    for tok in tokens:
-        L = len(tok)
-        if L == 0:
-            continue
-        if L == 1:
-            # degenerate: put single char in all bins equally
-            for b in range(NBINS):
-                bins[b][tok[0]] += 1
-            continue
-        for i, ch in enumerate(tok):
-            r = i / (L - 1)
-            b = min(int(round(r * (NBINS - 1))), NBINS - 1)
-            bins[b][ch] += 1
-
-    H = [entropy(bc) for bc in bins]
-    left, mid, right = H[0], H[NBINS//2], H[-1]
-    delta_edges = ((left + right) / 2.0) - mid
+    # relative position i/(L-1) rounded to the nearest bin; single-character
+    # tokens count once in every bin
+    prof = positional_profiles({path: tokens}, nbins, scheme="round", n_boot=n_boot, seed=seed)[path]
+    H = [float(h) for h in prof["H_char"]]
+    left, mid, right, delta_edges = edge_stats(H)
     rsym = 0.0
     if (left + right) > 0:
         rsym = (left - right) / (left + right)
@@ -46,20 +23,25 @@ def main(path):
     os.makedirs("out/paper8", exist_ok=True)
     out_tsv = "out/paper8/" + path.split("/")[-1].replace(".txt", "_bins.tsv")
     with open(out_tsv, "w") as o:
-        o.write("bin\tH1_bits\n")
+        o.write("bin\tfrac\tH1_bits\tH2_bigram_bits\tsd_H1\tn_chars\n")
         for i, h in enumerate(H):
-            frac = i / (NBINS - 1)
-            o.write(f"{i}\t{frac:.2f}\t{h:.6f}\n")
+            frac = i / (nbins - 1)
+            o.write(f"{i}\t{frac:.2f}\t{h:.6f}\t{prof['H_bigram'][i]:.6f}\t"
+                    f"{prof['sd_char'][i]:.6f}\t{int(prof['n_chars'][i])}\n")
 
     print(f"{path}:")
     print(f"  H_bins = {[round(x,3) for x in H]}")
+    print(f"  H2_bins= {[round(float(x),3) for x in prof['H_bigram']]}   (within-token bigrams)")
     print(f"  Δedges = {delta_edges:+.3f}   ( (L+R)/2 - mid )")
     print(f"  R_sym  = {rsym:+.3f}   (left vs right symmetry)")
     print(f"  tokens = {len(tokens)}")
     print(f"  [OK] wrote {out_tsv}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: p8_entropy_positional_bins.py <corpus.txt>")
-        sys.exit(1)
-    main(sys.argv[1])
+    ap = argparse.ArgumentParser(usage="p8_entropy_positional_bins.py <corpus.txt> [--bins N]")
+    ap.add_argument("corpus")
+    ap.add_argument("--bins", type=int, default=NBINS)
+    ap.add_argument("--boot", type=int, default=0, help="bootstrap replicates for sd_H1")
+    ap.add_argument("--seed", type=int, default=1337)
+    args = ap.parse_args()
+    main(args.corpus, args.bins, args.boot, args.seed)
@@ -31,6 +31,9 @@ import csv
 
 import pandas as pd
 
+from p69_rule_matcher import RuleMatcher, compile_side_rule
+from p6_token_store import load_tokens as store_load_tokens
+
 BASE = os.path.dirname(os.path.abspath(__file__))
 ROOT = os.path.abspath(os.path.join(BASE, ".."))
 
@@ -42,17 +45,8 @@ OUT_PATH = os.path.join(OUT_DIR, "p90_token_profiles.tsv")
 
 
 def load_tokens(path):
-    tokens = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            t = line.strip()
-            if not t:
-                continue
-            # allow for possible "idx<TAB>token" formats; keep last field
-            parts = t.split()
-            tok = parts[-1]
-            tokens.append(tok)
-    return tokens
+    # canonical path -> shared token store; other files keep the last field
+    return store_load_tokens(path)
 
 
 def load_rulebook(path):
@@ -93,22 +87,16 @@ def load_rulebook(path):
     return chargram_rules
 
 
-def match_rules_to_token(token, rules):
+def match_rules_to_token(token, rules, matcher=None):
     """Return list of rule_ids whose pattern matches token under side constraint."""
-    hits = []
-    for r in rules:
-        pat = r["pattern"]
-        side = r["side"]
-        if side == "left":
-            if token.startswith(pat):
-                hits.append(r["rule_id"])
-        elif side == "right":
-            if token.endswith(pat):
-                hits.append(r["rule_id"])
-        else:  # any
-            if pat in token:
-                hits.append(r["rule_id"])
-    return hits
+    if matcher is None:
+        matcher = build_matcher(rules)
+    return [rules[j]["rule_id"] for j in matcher.match(token)]
+
+
+def build_matcher(rules):
+    """Compile the chargram rules (pattern + side) into one RuleMatcher."""
+    return RuleMatcher([compile_side_rule(r["pattern"], r["side"]) for r in rules])
 
 
 def load_pmi_partners(path):
@@ -189,6 +177,7 @@ def main():
         print("[INFO] No PMI partners available (best_pmi_partner will be blank).")
 
     # 5. Build profiles
+    matcher = build_matcher(chargram_rules)
     out_rows = []
     tokens_with_hits = 0
 
@@ -198,7 +187,7 @@ def main():
         H1_local = math.log2(N / f)
 
         # find matching rules
-        hits = match_rules_to_token(tok, chargram_rules)
+        hits = match_rules_to_token(tok, chargram_rules, matcher)
         n_rules = len(hits)
 
         if n_rules > 0:
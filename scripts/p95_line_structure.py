@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import os
-import re
 import csv
 from collections import defaultdict, Counter
 from math import log2
 
+from p6_token_store import open_store
+from p6_token_alignment import open_alignment
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 ROOT = os.path.abspath(os.path.join(HERE, ".."))
 
@@ -21,13 +23,8 @@ os.makedirs(OUT_DIR, exist_ok=True)
 
 def load_tokens():
     """Load canonical token stream (one token per line)."""
-    tokens = []
-    with open(TOK_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            t = line.strip()
-            if t:
-                tokens.append(t)
-    print(f"[INFO] Loaded {len(tokens)} canonical tokens from {TOK_FILE}")
+    tokens = list(open_store().tokens())
+    print(f"[INFO] Loaded {len(tokens)} canonical tokens from token store")
     return tokens
 
 
@@ -58,64 +55,9 @@ def load_profiles():
     return profiles
 
 
-def normalise_token(t):
-    """
-    Normalise transliteration token to match p6_voynich_tokens.txt conventions.
-    Conservative: strip Voynich markup artefacts, trailing punctuation, '?' markers.
-    """
-    t = t.strip()
-    # Drop any inline markup tokens
-    if not t or "<" in t or ">" in t:
-        return ""
-
-    # Remove common uncertainty markers / punctuation used in some EVAs
-    t = t.replace("?", "").replace(",", "").replace(";", "")
-    return t
-
-
-def iterate_transliteration_lines():
-    """
-    Yield (folio_id, line_id, token_strings[]) from the transliteration file.
-
-    We only use lines with patterns like:
-      <f1r.1,*> <...>fachys.ykal.ar.ataiin.shol...
-    """
-    if not os.path.isfile(TRANS_FILE):
-        raise FileNotFoundError(f"Transliteration file not found: {TRANS_FILE}")
-
-    line_re = re.compile(r'^<f(\d+[rv])\.(\d+)[^>]*>\s*(.*)$')
-
-    with open(TRANS_FILE, "r", encoding="utf-8") as f:
-        for raw in f:
-            raw = raw.rstrip("\n")
-            m = line_re.match(raw)
-            if not m:
-                continue
-
-            folio = m.group(1)
-            line_no = m.group(2)
-            rest = m.group(3).strip()
-
-            # Remove any inline markup like <%> or <$>
-            rest = re.sub(r'<[^>]*>', '', rest)
-            if not rest:
-                continue
-
-            # Split tokens on '.' as in EVA-style segmented lines
-            parts = [p for p in rest.split('.') if p]
-            toks = []
-            for p in parts:
-                nt = normalise_token(p)
-                if nt:
-                    toks.append(nt)
-
-            if toks:
-                yield f"f{folio}", int(line_no), toks
-
-
 def align_lines_to_tokens(canonical_tokens):
     """
-    Align transliteration-derived line tokens to the canonical token stream.
+    Map the canonical token stream onto transliteration lines.
 
     Returns:
       lines: list of dicts:
@@ -127,41 +69,19 @@ def align_lines_to_tokens(canonical_tokens):
           "idxs": [int, ...]
         }
 
-    Assumes that transliteration and p6_voynich_tokens.txt are globally consistent.
-    If mismatches occur, they are reported; alignment proceeds greedily.
+    Uses the shared alignment index (p6_token_alignment): hapax-anchored,
+    banded global alignment of p6_voynich_tokens.txt against the
+    transliteration loci, so a dropped or split token only affects its own
+    neighbourhood instead of shifting every later line. Canonical tokens
+    with no source counterpart are left out of the line groups.
     """
-    lines = []
-    idx = 0
-    n = len(canonical_tokens)
-    mismatches = 0
-    total = 0
-
-    for folio, line_no, toks in iterate_transliteration_lines():
-        line_start = idx
-        idxs = []
-        for t in toks:
-            if idx >= n:
-                break
-            canon = canonical_tokens[idx]
-
-            total += 1
-            if canon == t:
-                idxs.append(idx)
-                idx += 1
-                continue
-
-            # Soft normalisation: in case of tiny discrepancies
-            c_norm = canon.replace("?", "").replace(",", "").replace(";", "")
-            t_norm = t
-            if c_norm == t_norm:
-                idxs.append(idx)
-                idx += 1
-            else:
-                # Record mismatch but still move on in lockstep
-                mismatches += 1
-                idxs.append(idx)
-                idx += 1
+    al = open_alignment(TOK_FILE, TRANS_FILE)
+    if len(al) != len(canonical_tokens):
+        print(f"[WARN] Alignment covers {len(al)} tokens, token stream has {len(canonical_tokens)}.")
 
+    lines = []
+    for folio, line_no, idxs in al.lines():
+        idxs = [i for i in idxs if i < len(canonical_tokens)]
         if idxs:
             lines.append({
                 "folio": folio,
@@ -171,9 +91,13 @@ def align_lines_to_tokens(canonical_tokens):
                 "idxs": idxs,
             })
 
-    if total > 0:
-        print(f"[INFO] Alignment done: {len(lines)} lines mapped.")
-        print(f"[INFO] Compared {total} token positions; mismatches: {mismatches} ({(mismatches/total)*100:.2f}%).")
+    s = al.stats
+    total = s["canonical_tokens"]
+    if lines:
+        print(f"[INFO] Alignment done: {len(lines)} lines mapped ({s['anchors']} hapax anchors).")
+        print(f"[INFO] Aligned {total} canonical tokens: substitutions {s['sub']}, "
+              f"unaligned {s['canonical_only']} ({(s['sub'] + s['canonical_only'])/total*100:.2f}%); "
+              f"source-only tokens {s['source_only']}.")
     else:
         print("[WARN] No usable transliteration lines found; no line metrics will be meaningful.")
 
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import sys
-import math
-import itertools
-from collections import Counter
+
+import numpy as np
+
+from p6_ngram_stats import NgramStats
+from positional_entropy import (N_PERM, edge_stats, positional_profiles, slope_p_values,
+                                write_profile)
 
 # ---------- CONFIG: which corpora to include ----------
 
@@ -21,6 +25,7 @@ OUTDIR = "Phase901/out"
 OUTFILE = os.path.join(OUTDIR, "p9_feature_table.tsv")
 
 MIN_TOKENS_WARN = 500  # below this, we warn but still print
+NBINS = 5
 
 
 # ---------- basic helpers ----------
@@ -34,129 +39,46 @@ def load_tokens(path):
                 tokens.append(t)
     return tokens
 
-def shannon_entropy_from_counts(counts):
-    total = sum(counts.values())
-    if total == 0:
-        return 0.0
-    h = 0.0
-    for c in counts.values():
-        p = c / total
-        h -= p * math.log2(p)
-    return h
-
 def compute_H1_MI1(tokens):
     """Character-level H1 and MI1 over concatenated tokens with spaces."""
-    # build stream including spaces as delimiters
-    stream = []
-    for t in tokens:
-        if t:
-            stream.extend(t)
-            stream.append(" ")  # simple boundary marker
-    if stream:
-        stream.pop()  # remove last boundary
-
-    # H1
-    c_counts = Counter(stream)
-    H1 = shannon_entropy_from_counts(c_counts)
-
-    # MI1
-    if len(stream) < 2:
-        return H1, 0.0
-    bigram_counts = Counter()
-    for a, b in zip(stream[:-1], stream[1:]):
-        bigram_counts[(a, b)] += 1
-
-    total_bigram = sum(bigram_counts.values())
-    if total_bigram == 0:
-        return H1, 0.0
-
-    # p(a), p(b)
-    # reuse c_counts / total_chars
-    total_chars = sum(c_counts.values())
-    pa = {ch: c_counts[ch] / total_chars for ch in c_counts}
-    pb = pa  # same marginals over same alphabet
-
-    mi = 0.0
-    for (a, b), c in bigram_counts.items():
-        p_ab = c / total_bigram
-        p_a = pa.get(a, 0.0)
-        p_b = pb.get(b, 0.0)
-        if p_ab > 0 and p_a > 0 and p_b > 0:
-            mi += p_ab * math.log2(p_ab / (p_a * p_b))
-
-    return H1, mi
-
-
-def compute_positional_bins(tokens):
-    """
-    Assign characters to 5 relative bins based on index/len:
-    b = min(4, floor(5 * i / L)).
-    Returns list of 5 entropies [H0..H4].
-    """
-    bins = [Counter() for _ in range(5)]
-    for t in tokens:
-        L = len(t)
-        if L <= 0:
-            continue
-        for i, ch in enumerate(t):
-            # skip spaces or weird stuff if any
-            if ch.isspace():
-                continue
-            b = int(5 * i / L)
-            if b > 4:
-                b = 4
-            bins[b][ch] += 1
-
-    H_bins = [shannon_entropy_from_counts(c) for c in bins]
-    return H_bins
+    # streamed counts; one space between tokens as boundary marker,
+    # MI1 with unigram marginals (see p6_ngram_stats.py)
+    st = NgramStats(max_k=1, separator=" ")
+    st.feed_tokens(t for t in tokens if t)
+    res = st.result(marginals="unigram")
+    return res["H1"], res["MI1"]
 
 
-def compute_slope_and_permutation_p(H_bins):
+def compute_slope_and_permutation_p(H_rows, n_perm=N_PERM, seed=None):
     """
-    Given 5-bin entropies, compute:
-    - slope: OLS of H vs [0,0.25,0.5,0.75,1.0]
-    - p_perm: exact two-sided permutation p-value based on |slope|
+    Given per-corpus bin entropies (one row per corpus), compute:
+    - slope: OLS of H vs [0, 1/(n-1), ..., 1]
+    - p_perm: two-sided permutation p-value based on |slope|; exact over
+      all n! orderings for small n, Monte Carlo above that
     """
-    if len(H_bins) != 5:
-        return 0.0, 1.0
-
-    xs = [0.0, 0.25, 0.5, 0.75, 1.0]
-    ys = H_bins
-
-    mean_x = sum(xs) / 5.0
-    mean_y = sum(ys) / 5.0
-
-    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
-    den = sum((x - mean_x) ** 2 for x in xs)
-    slope = num / den if den > 0 else 0.0
-
-    # permutation test over all 5! = 120 permutations
-    perms = list(itertools.permutations(ys))
-    more_extreme = 0
-    for p in perms:
-        m_y = sum(p) / 5.0
-        num_p = sum((x - mean_x) * (y - m_y) for x, y in zip(xs, p))
-        slope_p = num_p / den if den > 0 else 0.0
-        if abs(slope_p) >= abs(slope):
-            more_extreme += 1
-    p_perm = more_extreme / len(perms) if perms else 1.0
-
-    return slope, p_perm
+    return slope_p_values(H_rows, n_perm=n_perm, seed=seed)
 
 
 def compute_delta_edges_and_sym(H_bins):
-    if len(H_bins) != 5:
-        return 0.0, 0.0
-    H0, H1b, H2b, H3b, H4 = H_bins
-    delta_edges = ((H0 + H4) / 2.0) - H2b
-    r_sym = H0 - H4
+    _, _, _, delta_edges = edge_stats(H_bins)
+    r_sym = H_bins[0] - H_bins[-1]
     return delta_edges, r_sym
 
 
 # ---------- main ----------
 
 def main():
+    ap = argparse.ArgumentParser(description="Phase 9 feature table (H1, MI1, positional entropy)")
+    ap.add_argument("--bins", type=int, default=NBINS, help="relative-position bins per token")
+    ap.add_argument("--perm", type=int, default=N_PERM, help="Monte Carlo permutations when bins > 8")
+    ap.add_argument("--boot", type=int, default=200, help="bootstrap replicates for per-bin sd_H")
+    ap.add_argument("--seed", type=int, default=1337)
+    args = ap.parse_args()
+    if args.bins < 2:
+        raise SystemExit("[ERR] --bins must be >= 2")
+
     os.makedirs(OUTDIR, exist_ok=True)
+    nb = args.bins
 
     header = [
         "label",
@@ -164,43 +86,54 @@ def main():
         "H1",
         "MI1",
         "H0",
-        "H1_bin",
-        "H2_bin",
-        "H3_bin",
-        "H4_bin",
+        *[f"H{i}_bin" for i in range(1, nb)],
         "slope",
         "p_perm",
         "Delta_edges",
         "R_sym",
     ]
 
-    with open(OUTFILE, "w", encoding="utf-8") as f_out:
-        f_out.write("\t".join(header) + "\n")
+    corpora = {}
+    for label, path in CORPORA:
+        full_path = os.path.join(path) if not os.path.isabs(path) else path
+
+        if not os.path.isfile(full_path):
+            print(f"[WARN] {label}: file not found: {full_path}, skipping.")
+            continue
 
-        for label, path in CORPORA:
-            full_path = os.path.join(path) if not os.path.isabs(path) else path
+        tokens = load_tokens(full_path)
+        n = len(tokens)
 
-            if not os.path.isfile(full_path):
-                print(f"[WARN] {label}: file not found: {full_path}, skipping.")
-                continue
+        if n == 0:
+            print(f"[WARN] {label}: 0 tokens, skipping.")
+            continue
 
-            tokens = load_tokens(full_path)
-            n = len(tokens)
+        if n < MIN_TOKENS_WARN:
+            print(f"[WARN] {label}: only {n} tokens (<{MIN_TOKENS_WARN}), interpret with caution.")
+        corpora[label] = tokens
 
-            if n == 0:
-                print(f"[WARN] {label}: 0 tokens, skipping.")
-                continue
+    if not corpora:
+        raise SystemExit("[ERR] no corpora found")
 
-            if n < MIN_TOKENS_WARN:
-                print(f"[WARN] {label}: only {n} tokens (<{MIN_TOKENS_WARN}), interpret with caution.")
+    # per-bin entropies of every corpus in one pass; b = min(n-1, floor(n * i / L))
+    rng = np.random.default_rng(args.seed)
+    profiles = positional_profiles(corpora, nb, scheme="floor", n_boot=args.boot, seed=rng)
+    labels = list(profiles)
+    slopes, p_perms, p_method = compute_slope_and_permutation_p(
+        [profiles[c]["H_char"] for c in labels], n_perm=args.perm, seed=rng)
+    print(f"[INFO] {nb} bins; slope p-values: {p_method}")
 
+    with open(OUTFILE, "w", encoding="utf-8") as f_out:
+        f_out.write("\t".join(header) + "\n")
+
+        for i, label in enumerate(labels):
+            tokens = corpora[label]
+            n = len(tokens)
             H1, MI1 = compute_H1_MI1(tokens)
-            H_bins = compute_positional_bins(tokens)
-            slope, p_perm = compute_slope_and_permutation_p(H_bins)
+            H_bins = [float(h) for h in profiles[label]["H_char"]]
+            slope, p_perm = float(slopes[i]), float(p_perms[i])
             d_edges, r_sym = compute_delta_edges_and_sym(H_bins)
 
-            H0, H1b, H2b, H3b, H4 = H_bins
-
             print(
                 f"[INFO] {label:20s} n={n:6d} "
                 f"H1={H1:.6f} MI1={MI1:.6f} "
@@ -213,11 +146,7 @@ def main():
                 str(n),
                 f"{H1:.6f}",
                 f"{MI1:.6f}",
-                f"{H0:.6f}",
-                f"{H1b:.6f}",
-                f"{H2b:.6f}",
-                f"{H3b:.6f}",
-                f"{H4:.6f}",
+                *[f"{h:.6f}" for h in H_bins],
                 f"{slope:.6f}",
                 f"{p_perm:.6f}",
                 f"{d_edges:.6f}",
@@ -225,7 +154,11 @@ def main():
             ]
             f_out.write("\t".join(row) + "\n")
 
+            # per-bin profile (char + bigram entropy, bootstrap sd) for fig 7.2
+            write_profile(os.path.join(OUTDIR, f"p9_entropy_by_pos_{label}.tsv"), profiles[label])
+
     print(f"[OK] Wrote feature table → {OUTFILE}")
+    print(f"[OK] Wrote per-corpus entropy_by_pos tables → {OUTDIR}/p9_entropy_by_pos_<label>.tsv")
 
 
 if __name__ == "__main__":
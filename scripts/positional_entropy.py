@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Positional entropy profiles over integer-encoded characters (p8 / p9 / fig 7.2)
+
+p8_entropy_positional_bins.py and p9_build_feature_table.py each walked
+every character of every token into one Counter per bin (a fixed five
+bins), and p9 tested the entropy-vs-position slope by looping over all
+120 permutations in Python. Here all corpora are encoded together:
+
+    encode      one int32 alphabet code per character, plus its corpus,
+                token, position in the token and token length (positions
+                and lengths count the raw token, so whitespace inside a
+                line-token is skipped but still occupies a position, as p9
+                did); bigrams are adjacent character pairs inside a token,
+                treated as a sequence of length L-1
+    bins        any number of bins, two schemes:
+                  floor   b = min(n-1, floor(n * i / L))           (p9)
+                  round   b = round(i / (L-1) * (n-1)); one-character
+                          tokens count once in every bin           (p8)
+    counts      a single bincount over (corpus, bin, symbol) gives every
+                per-bin character and bigram distribution of every corpus
+    sd          token bootstrap without touching the text again: each
+                type's (bin x symbol) counts form one sparse row, resampled
+                type counts come from bootstrap_engine.count_matrix_chunks
+                and a replicate's counts are one sparse product
+    slope       OLS slope of H against x = i/(n-1) for every corpus at
+                once; two-sided permutation p-values use a precomputed
+                (n! x n) permutation matrix when n <= EXACT_MAX_BINS (the
+                exact test p9 ran for n = 5) and Monte Carlo permutations
+                (p = (1 + extreme) / (1 + R)) above that
+
+One table per corpus, with the position / mean_H / sd_H columns
+mk_fig7_2_entropy_by_pos.py plots (mean_H is the point estimate, sd_H the
+bootstrap sd), plus bigram entropies and unit counts per bin.
+
+Usage (library):
+
+    from positional_entropy import positional_profiles, slope_p_values
+    prof = positional_profiles({"voynich": toks, "latin": lat}, n_bins=7, n_boot=200, seed=1)
+    prof["voynich"]["H_char"], prof["voynich"]["sd_char"], prof["voynich"]["H_bigram"]
+    slopes, p, method = slope_p_values([prof[c]["H_char"] for c in prof])
+
+Usage (CLI):
+
+    python3 scripts/positional_entropy.py --corpus voynich=p6_voynich_tokens.txt \\
+        --corpus latin=corpora/latin_tokens.txt --bins 7 --out-dir out/positional_entropy
+
+Requires numpy + scipy.
+"""
+
+import argparse
+import os
+from itertools import permutations
+
+import numpy as np
+from scipy import sparse
+
+from bootstrap_engine import MAX_CELLS, count_matrix_chunks, entropy_bits
+
+SCHEMES = ("floor", "round")
+EXACT_MAX_BINS = 8          # 8! = 40320 permutations
+N_PERM = 100000
+TIE_TOL = 1e-12
+
+PROFILE_COLUMNS = ["position", "bin", "frac", "mean_H", "sd_H",
+                   "H_bigram", "sd_H_bigram", "n_chars", "n_bigrams"]
+
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+# -------------
+# Encoding
+# -------------
+
+def read_tokens(path, per_line=False, errors="ignore"):
+    """Whitespace tokens of a corpus, or whole stripped lines with per_line=True."""
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
+        if per_line:
+            return [t for t in (ln.strip() for ln in f) if t]
+        return f.read().split()
+
+
+def encode_corpora(corpora):
+    """
+    corpora: label -> token list. Returns a dict of per-character arrays
+    (code, corpus, token, pos, length) with whitespace characters dropped,
+    plus the shared alphabet, the labels and per-token corpus / type ids.
+    """
+    labels = list(corpora)
+    toks, tok_corpus, tok_type = [], [], []
+    types = {}
+    for ci, label in enumerate(labels):
+        for t in corpora[label]:
+            if t:
+                toks.append(t)
+                tok_corpus.append(ci)
+                tok_type.append(types.setdefault((ci, t), len(types)))
+    lengths = np.fromiter(map(len, toks), dtype=np.int64, count=len(toks))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(toks) else lengths
+    # code points of all tokens back to back, one uint32 per character
+    cp = np.frombuffer("".join(toks).encode("utf-32-le"), dtype=np.uint32)
+    token = np.repeat(np.arange(len(toks)), lengths)
+    pos = np.arange(len(cp)) - np.repeat(starts, lengths)
+    points, code = np.unique(cp, return_inverse=True)
+    space = np.array([chr(u).isspace() for u in points.tolist()], dtype=bool)
+    keep = ~space[code]
+    # drop whitespace symbols from the alphabet
+    remap = np.cumsum(~space) - 1
+    tok_corpus = np.array(tok_corpus, dtype=np.int32)
+    return {
+        "labels": labels,
+        "alphabet": [chr(u) for u in points[~space].tolist()],
+        "code": remap[code[keep]].astype(np.int32),
+        "corpus": tok_corpus[token[keep]],
+        "token": token[keep],
+        "pos": pos[keep].astype(np.int32),
+        "length": lengths[token[keep]].astype(np.int32),
+        "tok_corpus": tok_corpus,
+        "tok_type": np.array(tok_type, dtype=np.int64),
+        "n_types": len(types),
+    }
+
+
+def bigram_units(enc):
+    """
+    Adjacent character pairs inside a token (both non-whitespace): returns
+    (code, corpus, token, pos, length) for the bigram sequence, with pos the
+    index of the first character and length L - 1.
+    """
+    tok, pos = enc["token"], enc["pos"]
+    nxt = (tok[1:] == tok[:-1]) & (pos[1:] == pos[:-1] + 1)
+    first = np.flatnonzero(nxt)
+    K = len(enc["alphabet"])
+    pair = enc["code"][first].astype(np.int64) * K + enc["code"][first + 1]
+    _, code = np.unique(pair, return_inverse=True)
+    return {
+        "code": code.astype(np.int32),
+        "corpus": enc["corpus"][first],
+        "token": tok[first],
+        "pos": pos[first],
+        "length": enc["length"][first] - 1,
+    }
+
+
+# -------------
+# Binning and counts
+# -------------
+
+def bin_index(pos, length, n_bins, scheme="floor"):
+    """
+    (unit_idx, bin) for units at position pos of sequences of the given
+    length. 'round' places each unit of a length-1 sequence in every bin,
+    so unit_idx may repeat.
+    """
+    pos = np.asarray(pos, dtype=np.int64)
+    length = np.asarray(length, dtype=np.int64)
+    if scheme == "floor":
+        return np.arange(len(pos)), np.minimum((n_bins * pos) // np.maximum(length, 1), n_bins - 1)
+    if scheme != "round":
+        raise ValueError(f"unknown bin scheme: {scheme} (expected one of {SCHEMES})")
+    multi = length > 1
+    idx = np.flatnonzero(multi)
+    r = pos[idx] / (length[idx] - 1)
+    b = np.minimum(np.rint(r * (n_bins - 1)).astype(np.int64), n_bins - 1)
+    single = np.flatnonzero(length == 1)
+    idx = np.concatenate([idx, np.repeat(single, n_bins)])
+    b = np.concatenate([b, np.tile(np.arange(n_bins), len(single))])
+    return idx, b
+
+
+def bin_counts(units, n_corpora, n_bins, scheme="floor"):
+    """(corpora x bins x symbols) unit counts, from one bincount."""
+    K = int(units["code"].max()) + 1 if len(units["code"]) else 1
+    idx, b = bin_index(units["pos"], units["length"], n_bins, scheme)
+    flat = (units["corpus"][idx].astype(np.int64) * n_bins + b) * K + units["code"][idx]
+    return np.bincount(flat, minlength=n_corpora * n_bins * K).reshape(n_corpora, n_bins, K)
+
+
+def _type_bin_matrix(units, tok_type, tok_count_of_type, n_types, n_bins, scheme):
+    """Sparse (types x bins*K): the (bin, symbol) counts of one occurrence of each type."""
+    K = int(units["code"].max()) + 1 if len(units["code"]) else 1
+    idx, b = bin_index(units["pos"], units["length"], n_bins, scheme)
+    rows = tok_type[units["token"][idx]]
+    cols = b * K + units["code"][idx]
+    M = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_types, n_bins * K))
+    return sparse.diags(1.0 / np.maximum(tok_count_of_type, 1)) @ M, K
+
+
+def bootstrap_sd(enc, units_list, n_bins, scheme="floor", n_boot=200, seed=None):
+    """
+    Token-bootstrap sd of every per-bin entropy: for each units set (e.g.
+    characters, bigrams) a (corpora x bins) array.
+    """
+    rng = _rng(seed)
+    C = len(enc["labels"])
+    tok_type, tok_corpus = enc["tok_type"], enc["tok_corpus"]
+    n_types = enc["n_types"]
+    type_count = np.bincount(tok_type, minlength=n_types)
+    type_corpus = np.zeros(n_types, dtype=np.int64)
+    type_corpus[tok_type] = tok_corpus
+    mats = [_type_bin_matrix(u, tok_type, type_count, n_types, n_bins, scheme) for u in units_list]
+    out = [np.zeros((C, n_bins)) for _ in units_list]
+    if n_boot < 2:
+        return out
+    for ci in range(C):
+        sel = np.flatnonzero(type_corpus == ci)
+        if len(sel) == 0:
+            continue
+        codes = np.repeat(np.arange(len(sel)), type_count[sel])
+        subs = [(M[sel], K) for M, K in mats]
+        samples = [[] for _ in units_list]
+        chunk = max(1, MAX_CELLS // max(len(sel), max(n_bins * K for _, K in subs)))
+        for W in count_matrix_chunks(codes, n_boot, seed=rng, k=len(sel), chunk=chunk):
+            Ws = sparse.csr_matrix(W.astype(np.float64))
+            for u, (M, K) in enumerate(subs):
+                R = (Ws @ M).toarray().reshape(-1, K)
+                samples[u].append(entropy_bits(R).reshape(-1, n_bins))
+        for u in range(len(units_list)):
+            out[u][ci] = np.vstack(samples[u]).std(axis=0, ddof=1)
+    return out
+
+
+def positional_profiles(corpora, n_bins=5, scheme="floor", bigrams=True, n_boot=0, seed=None):
+    """
+    label -> {"H_char", "H_bigram", "n_chars", "n_bigrams", "sd_char",
+    "sd_bigram" (arrays over bins), "n_tokens"} for every corpus at once.
+    """
+    if n_bins < 2:
+        raise ValueError("need at least 2 bins")
+    enc = encode_corpora(corpora)
+    C = len(enc["labels"])
+    units = [enc]
+    if bigrams:
+        units.append(bigram_units(enc))
+    counts = [bin_counts(u, C, n_bins, scheme) for u in units]
+    H = [entropy_bits(c.reshape(C * n_bins, -1)).reshape(C, n_bins) for c in counts]
+    sd = bootstrap_sd(enc, units, n_bins, scheme, n_boot, seed) if n_boot else \
+        [np.zeros((C, n_bins)) for _ in units]
+    n_tok = np.bincount(enc["tok_corpus"], minlength=C)
+    out = {}
+    for ci, label in enumerate(enc["labels"]):
+        out[label] = {
+            "n_tokens": int(n_tok[ci]),
+            "H_char": H[0][ci],
+            "n_chars": counts[0][ci].sum(axis=1),
+            "sd_char": sd[0][ci],
+            "H_bigram": H[1][ci] if bigrams else np.zeros(n_bins),
+            "n_bigrams": counts[1][ci].sum(axis=1) if bigrams else np.zeros(n_bins, dtype=np.int64),
+            "sd_bigram": sd[1][ci] if bigrams else np.zeros(n_bins),
+        }
+    return out
+
+
+# -------------
+# Slope tests
+# -------------
+
+def bin_positions(n_bins):
+    return np.arange(n_bins) / (n_bins - 1)
+
+
+def slopes(H):
+    """OLS slope of each row of H against x = i/(n-1)."""
+    H = np.atleast_2d(np.asarray(H, dtype=np.float64))
+    x = bin_positions(H.shape[-1])
+    xc = x - x.mean()
+    return (H - H.mean(axis=-1, keepdims=True)) @ xc / (xc @ xc)
+
+
+_PERMS = {}
+
+
+def permutation_matrix(n):
+    """All n! orderings of range(n) as an (n! x n) int array (cached)."""
+    P = _PERMS.get(n)
+    if P is None:
+        P = _PERMS[n] = np.array(list(permutations(range(n))), dtype=np.int64)
+    return P
+
+
+def slope_p_values(H, exact_max=EXACT_MAX_BINS, n_perm=N_PERM, seed=None):
+    """
+    Two-sided permutation p-values of |slope| for each row of H. Returns
+    (slopes, p, method) with method 'exact' (all n! orderings, identity
+    included) or 'monte_carlo' ((1 + extreme) / (1 + n_perm)).
+    """
+    H = np.atleast_2d(np.asarray(H, dtype=np.float64))
+    C, n = H.shape
+    obs = np.abs(slopes(H)) - TIE_TOL
+    x = bin_positions(n)
+    xc = (x - x.mean()) / ((x - x.mean()) @ (x - x.mean()))
+    Hc = H - H.mean(axis=1, keepdims=True)
+
+    if n <= exact_max:
+        P = permutation_matrix(n)
+        extreme = np.zeros(C, dtype=np.int64)
+        rows = max(1, MAX_CELLS // n)
+        for s in range(0, len(P), rows):
+            S = Hc[:, P[s:s + rows]] @ xc          # (C x chunk)
+            extreme += (np.abs(S) >= obs[:, None]).sum(axis=1)
+        return slopes(H), extreme / len(P), "exact"
+
+    rng = _rng(seed)
+    extreme = np.zeros(C, dtype=np.int64)
+    rows = max(1, MAX_CELLS // (n * C))
+    done = 0
+    while done < n_perm:
+        b = min(rows, n_perm - done)
+        P = rng.permuted(np.tile(np.arange(n), (b, 1)), axis=1)
+        S = Hc[:, P] @ xc
+        extreme += (np.abs(S) >= obs[:, None]).sum(axis=1)
+        done += b
+    return slopes(H), (1 + extreme) / (1 + n_perm), "monte_carlo"
+
+
+def edge_stats(H):
+    """(left, mid, right, Delta_edges) of a bin profile; Delta = (L+R)/2 - mid."""
+    left, mid, right = H[0], H[len(H) // 2], H[-1]
+    return left, mid, right, (left + right) / 2.0 - mid
+
+
+# -------------
+# Output
+# -------------
+
+def write_profile(path, prof):
+    """One corpus: mk_fig7_2-ready per-bin table (position is 1-based)."""
+    n_bins = len(prof["H_char"])
+    x = bin_positions(n_bins)
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("\t".join(PROFILE_COLUMNS) + "\n")
+        for b in range(n_bins):
+            out.write(f"{b + 1}\t{b}\t{x[b]:.4f}\t{prof['H_char'][b]:.6f}\t{prof['sd_char'][b]:.6f}\t"
+                      f"{prof['H_bigram'][b]:.6f}\t{prof['sd_bigram'][b]:.6f}\t"
+                      f"{int(prof['n_chars'][b])}\t{int(prof['n_bigrams'][b])}\n")
+
+
+def write_summary(path, profiles, n_bins, scheme, p_method, slope, p, slope_bg, p_bg):
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("label\tn_tokens\tn_bins\tscheme\tslope\tp_perm\tslope_bigram\tp_perm_bigram\t"
+                  "p_method\tDelta_edges\tDelta_edges_bigram\n")
+        for i, (label, prof) in enumerate(profiles.items()):
+            de = edge_stats(prof["H_char"])[3]
+            de_bg = edge_stats(prof["H_bigram"])[3]
+            out.write(f"{label}\t{prof['n_tokens']}\t{n_bins}\t{scheme}\t{slope[i]:.6f}\t{p[i]:.6f}\t"
+                      f"{slope_bg[i]:.6f}\t{p_bg[i]:.6f}\t{p_method}\t{de:.6f}\t{de_bg:.6f}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-bin character / bigram entropy for several corpora")
+    ap.add_argument("--corpus", action="append", required=True, metavar="LABEL=PATH")
+    ap.add_argument("--bins", type=int, default=5)
+    ap.add_argument("--scheme", choices=SCHEMES, default="floor")
+    ap.add_argument("--per-line", action="store_true", help="one token per line (whole line)")
+    ap.add_argument("--boot", type=int, default=200, help="bootstrap replicates for sd_H (0 = off)")
+    ap.add_argument("--perm", type=int, default=N_PERM, help="Monte Carlo permutations above exact range")
+    ap.add_argument("--seed", type=int, default=1337)
+    ap.add_argument("--out-dir", required=True)
+    args = ap.parse_args()
+
+    corpora = {}
+    for spec in args.corpus:
+        label, sep, path = spec.partition("=")
+        if not sep or not os.path.isfile(path):
+            raise SystemExit(f"[ERR] Bad --corpus (LABEL=PATH, file must exist): {spec}")
+        corpora[label] = read_tokens(path, per_line=args.per_line)
+
+    rng = np.random.default_rng(args.seed)
+    prof = positional_profiles(corpora, args.bins, args.scheme, n_boot=args.boot, seed=rng)
+    labels = list(prof)
+    s, p, method = slope_p_values([prof[c]["H_char"] for c in labels], n_perm=args.perm, seed=rng)
+    s_bg, p_bg, _ = slope_p_values([prof[c]["H_bigram"] for c in labels], n_perm=args.perm, seed=rng)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for i, c in enumerate(labels):
+        path = os.path.join(args.out_dir, f"{c}_entropy_by_pos.tsv")
+        write_profile(path, prof[c])
+        print(f"[INFO] {c:20s} n={prof[c]['n_tokens']:7d} "
+              f"H={[round(h, 3) for h in prof[c]['H_char']]} slope={s[i]:+.3f} p={p[i]:.4f}")
+    summary = os.path.join(args.out_dir, "positional_entropy_summary.tsv")
+    write_summary(summary, prof, args.bins, args.scheme, method, s, p, s_bg, p_bg)
+    print(f"[OK] Wrote {len(labels)} profiles and {summary}")
+
+
+if __name__ == "__main__":
+    main()
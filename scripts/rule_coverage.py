@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+Incremental rulebook coverage / accuracy evaluator (one bitset per rule)
+
+p10_eval_p69_coverage_v2.py, p10_eval_rulebook_coverage.py and the
+p70d_evaluate_new_rules*.py scripts re-match every type against every rule
+and re-count the whole corpus for each rulebook variant they look at. Rule
+hits depend only on the type string, so they are computed once and kept:
+
+    hit bitmap   every rule is one Python int over the type ids (bit i set
+                 when the rule fires on type i), filled from one
+                 RuleMatcher.match() per type. The coverage of a rule set
+                 is the OR of its bitsets; "add X" is bits[X] & ~covered,
+                 "drop Y" is covered & ~others(Y).
+    weights      type frequencies are bit-sliced into masks W_b (the types
+                 whose count has bit b set), so the token weight of any
+                 bitset is sum_b popcount(bits & W_b) << b: a dozen
+                 popcounts over a ~7k-bit integer, no per-type loop.
+    drop deltas  RuleSet keeps prefix / suffix ORs over its members (rebuilt
+                 lazily after an edit), so others(Y) of any member is one OR.
+    greedy       greedy_select() is lazy forward selection: coverage gain
+                 is submodular, so a stale gain is an upper bound and most
+                 candidates are never re-scored after the first round.
+    accuracy     ItemScorer groups labelled items by (type, section) and
+                 keeps every group's left / right score under
+                 Phase69/p69_validate.py semantics (allow / deny sections,
+                 base_weight x w_by_section, ties -> right, no score -> no
+                 prediction). Adding or dropping a rule only re-scores the
+                 groups that rule fires on.
+
+Corpus coverage ignores allow / deny (running tokens carry no section),
+as p69_apply_rules_simple.py does; accuracy needs labelled items, e.g. the
+p58 segments (stem, section, axis1). open_item_scorer() caches the group x
+rule arrays under cache/item_scorer/, keyed by the items file and the rule
+dicts (P69_SCORE_CACHE=0 disables it).
+
+Usage (library):
+
+    from rule_coverage import CoverageIndex, RuleSet, greedy_select, load_rulebook
+    rules = load_rulebook("Phase69/out/p69_rules_final.json")
+    idx = CoverageIndex(type_counts, [compile_p69_rule(r) for r in rules])
+    rs = RuleSet(idx, range(len(rules)))
+    rs.coverage()                    # types / tokens covered
+    rs.gain(j), rs.loss(k)           # tokens gained adding j / lost dropping k
+    rs, steps = greedy_select(idx, candidates, target=0.80, base=rs)
+
+    sc = open_item_scorer("p58_segments.tsv", rules)    # cached under cache/item_scorer/
+    sc.set_active(range(len(rules)))
+    sc.metrics(); sc.what_if(add=[j], drop=[k]); sc.section_metrics()
+
+Usage (CLI):
+
+    python3 scripts/rule_coverage.py --rules Phase69/out/p69_rules_final.json \\
+        [--candidates more_rules.json --target 0.8] [--drop RULE_ID ...] \\
+        [--items p58_segments.tsv] [--out out/rule_coverage.tsv]
+
+Requires numpy + scipy.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from p69_rule_matcher import RuleMatcher, compile_p69_rule  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULEBOOK_JSON = os.path.join(ROOT, "Phase69", "out", "p69_rules_final.json")
+TOKENS_TXT = os.path.join(ROOT, "p6_voynich_tokens.txt")
+SCORER_CACHE_DIR = os.path.join(ROOT, "cache", "item_scorer")
+SCORER_CACHE_VERSION = 1
+
+
+# -------------
+# Inputs
+# -------------
+
+def load_rulebook(path):
+    """Rule dicts from a {"rules": [...]} or bare-list rulebook JSON."""
+    if not os.path.isfile(path):
+        raise SystemExit(f"[ERR] Rulebook JSON not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("rules"), list):
+        rules = data["rules"]
+    elif isinstance(data, list):
+        rules = data
+    else:
+        raise SystemExit(f"[ERR] Unexpected rulebook JSON structure: {path}")
+    return [r for r in rules if isinstance(r, dict)]
+
+
+def rule_name(r, ordinal=None):
+    rid = r.get("rule_id") or r.get("id")
+    if rid:
+        return rid
+    rid = f"{r.get('kind', '')}:{r.get('pattern', '')}"
+    return rid if ordinal is None else f"{rid}#{ordinal}"
+
+
+def side_from_axis1(x):
+    return "left" if x < 0 else ("right" if x > 0 else "")
+
+
+def read_items(path, token_col="stem", section_col="section", axis_col="axis1"):
+    """
+    Labelled items (token, section, truth side) from a segments TSV such as
+    Phase58/out/p58_segments.tsv; truth is the sign of axis1. Rows with an
+    unparsable axis value are skipped, as in p69_validate.load_segments.
+    """
+    if not os.path.isfile(path):
+        raise SystemExit(f"[ERR] Items file not found: {path}")
+    items = []
+    with open(path, encoding="utf-8") as f:
+        hdr = f.readline().rstrip("\n").split("\t")
+        idx = {h: i for i, h in enumerate(hdr)}
+        for k in (token_col, section_col, axis_col):
+            if k not in idx:
+                raise SystemExit(f"[ERR] {path} missing column {k}")
+        for line in f:
+            if not line.strip():
+                continue
+            p = line.rstrip("\n").split("\t")
+            try:
+                truth = side_from_axis1(float(p[idx[axis_col]]))
+                items.append((p[idx[token_col]], p[idx[section_col]], truth))
+            except (IndexError, ValueError):
+                continue
+    if not items:
+        raise SystemExit(f"[ERR] no items read from {path}")
+    return items
+
+
+# -------------
+# Bitsets
+# -------------
+
+def bitset(ids, n):
+    """Python int with bits `ids` set (ids < n)."""
+    v = np.zeros(n, dtype=bool)
+    v[np.asarray(ids, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(v, bitorder="little").tobytes(), "little")
+
+
+def bit_ids(bits, n):
+    """Sorted ids of the set bits of a bitset over n ids."""
+    raw = bits.to_bytes((n + 7) // 8, "little")
+    v = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")[:n]
+    return np.flatnonzero(v)
+
+
+class CoverageIndex:
+    """
+    Type x rule hit bitmap: bits[j] is rule j's bitset over the type ids,
+    counts the type frequencies (the weights of every coverage figure).
+    """
+
+    def __init__(self, type_counts, compiled_rules, names=None):
+        self.types = list(type_counts)
+        self.counts = np.array([type_counts[t] for t in self.types], dtype=np.int64)
+        self.total = int(self.counts.sum())
+        self.n_types = len(self.types)
+        matcher = RuleMatcher(list(compiled_rules))
+        self.n_rules = matcher.n_rules
+        self.names = list(names) if names is not None else [str(j) for j in range(self.n_rules)]
+
+        hit_ids = [[] for _ in range(self.n_rules)]
+        for i, t in enumerate(self.types):
+            for j in matcher.match(t):
+                hit_ids[j].append(i)
+        self.bits = [bitset(ids, self.n_types) for ids in hit_ids]
+
+        # weight slices: W[b] holds the types whose count has bit b set
+        top = int(self.counts.max()).bit_length() if self.n_types else 0
+        self._slices = [bitset(np.flatnonzero((self.counts >> b) & 1), self.n_types)
+                        for b in range(top)]
+
+    def weight(self, bits):
+        """Token weight (sum of type counts) of a bitset."""
+        return sum((bits & w).bit_count() << b for b, w in enumerate(self._slices))
+
+    def union(self, rules, base=0):
+        bits = base
+        for j in rules:
+            bits |= self.bits[j]
+        return bits
+
+    def support(self, j):
+        """(types, tokens) rule j fires on."""
+        return self.bits[j].bit_count(), self.weight(self.bits[j])
+
+    def coverage(self, bits):
+        tok = self.weight(bits)
+        typ = bits.bit_count()
+        return {
+            "types": typ, "n_types": self.n_types,
+            "tokens": tok, "n_tokens": self.total,
+            "frac_types": typ / self.n_types if self.n_types else 0.0,
+            "frac_tokens": tok / self.total if self.total else 0.0,
+        }
+
+    def types_of(self, bits):
+        return [self.types[i] for i in bit_ids(bits, self.n_types)]
+
+
+class RuleSet:
+    """
+    A mutable selection of rule ordinals over a CoverageIndex, plus an
+    optional `base` bitset of types covered by other means.
+    """
+
+    def __init__(self, index, rules=(), base=0):
+        self.index = index
+        self.base = base
+        self.rules = list(dict.fromkeys(rules))
+        self._set = set(self.rules)
+        self.covered = index.union(self.rules, base)
+        self._excl = None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __contains__(self, j):
+        return j in self._set
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def copy(self):
+        rs = RuleSet.__new__(RuleSet)
+        rs.index, rs.base, rs.covered = self.index, self.base, self.covered
+        rs.rules, rs._set = list(self.rules), set(self._set)
+        rs._excl = None
+        return rs
+
+    def _members(self):
+        if self._excl is None:
+            self._build()
+        return self._excl
+
+    def _build(self):
+        # others(rules[k]) = base | OR(rules[:k]) | OR(rules[k+1:])
+        bits = self.index.bits
+        n = len(self.rules)
+        pre = [self.base] * (n + 1)
+        for k, j in enumerate(self.rules):
+            pre[k + 1] = pre[k] | bits[j]
+        suf = 0
+        excl = {}
+        for k in range(n - 1, -1, -1):
+            excl[self.rules[k]] = pre[k] | suf
+            suf |= bits[self.rules[k]]
+        self._excl = excl
+
+    def others(self, j):
+        """Types still covered if member j were dropped."""
+        return self._members()[j]
+
+    def add(self, j):
+        if j in self:
+            return
+        self.rules.append(j)
+        self._set.add(j)
+        self.covered |= self.index.bits[j]
+        self._excl = None
+
+    def remove(self, j):
+        self.covered = self.others(j)
+        self.rules.remove(j)
+        self._set.discard(j)
+        self._excl = None
+
+    def gain(self, j):
+        """Tokens newly covered by adding rule j."""
+        return self.index.weight(self.index.bits[j] & ~self.covered)
+
+    def loss(self, j):
+        """Tokens no longer covered after dropping rule j (0 for non-members)."""
+        if j not in self:
+            return 0
+        return self.index.weight(self.covered & ~self.others(j))
+
+    def what_if(self, add=(), drop=()):
+        """Covered bitset after adding / dropping the given rules (self unchanged)."""
+        drop = set(drop)
+        if len(drop) == 1:
+            (j,) = drop
+            bits = self.others(j) if j in self else self.covered
+        elif drop:
+            bits = self.index.union([j for j in self.rules if j not in drop], self.base)
+        else:
+            bits = self.covered
+        return self.index.union(add, bits)
+
+    def coverage(self, bits=None):
+        return self.index.coverage(self.covered if bits is None else bits)
+
+
+def greedy_select(index, candidates, target=None, base=None, max_rules=None, min_gain=1):
+    """
+    Lazy greedy forward selection: repeatedly add the candidate with the
+    largest token gain over what is already covered until `target` (a
+    fraction of all tokens) is reached, `max_rules` were added, or no
+    candidate gains `min_gain` tokens. Ties go to the lower ordinal.
+    Returns (RuleSet, steps), one step dict per added rule.
+    """
+    rs = RuleSet(index) if base is None else base.copy()
+    covered = index.weight(rs.covered)
+    goal = None if target is None else math.ceil(target * index.total)
+    heap = [(-rs.gain(j), j) for j in dict.fromkeys(candidates) if j not in rs]
+    heapq.heapify(heap)
+    steps = []
+    while heap:
+        if goal is not None and covered >= goal:
+            break
+        if max_rules is not None and len(steps) >= max_rules:
+            break
+        _, j = heapq.heappop(heap)
+        item = (-rs.gain(j), j)
+        if heap and item > heap[0]:
+            heapq.heappush(heap, item)
+            continue
+        g = -item[0]
+        if g < min_gain:
+            break
+        new_types = (index.bits[j] & ~rs.covered).bit_count()
+        rs.add(j)
+        covered += g
+        steps.append({
+            "step": len(steps) + 1, "rule": j, "name": index.names[j],
+            "gain_tokens": g, "gain_types": new_types,
+            "tokens": covered, "frac_tokens": covered / index.total if index.total else 0.0,
+        })
+    return rs, steps
+
+
+# -------------
+# Accuracy over labelled items
+# -------------
+
+def section_allowed(sec, rule):
+    if rule.get("deny") and sec in rule["deny"]:
+        return False
+    if rule.get("allow") and sec not in rule["allow"]:
+        return False
+    return True
+
+
+def effective_weight(rule, sec):
+    eff = float(rule.get("base_weight", 0.0))
+    w = rule.get("w_by_section") or {}
+    if sec in w:
+        eff *= float(w[sec])
+    return eff
+
+
+class ItemScorer:
+    """
+    Labelled items (token, section, truth side) grouped by (token, section),
+    scored by a toggleable subset of p69-style rules (kind, pattern,
+    pred_side, base_weight, allow, deny, w_by_section).
+
+    EL / ER are group x rule effective weights toward left / right (CSR);
+    L / R the current group scores for the active rules. Scores of the
+    groups a rule touches are recomputed from their CSR rows, so toggling
+    rules in any order gives the same numbers as a fresh evaluation.
+    """
+
+    def __init__(self, items, rules, compiled=None, matcher=None):
+        self.rules = list(rules)
+        self.n_rules = len(self.rules)
+        if matcher is None:
+            if compiled is None:
+                compiled = [compile_p69_rule(r) for r in self.rules]
+            matcher = RuleMatcher(list(compiled))
+
+        groups = {}
+        nl, nr, nn = [], [], []
+        for tok, sec, truth in items:
+            g = groups.get((tok, sec))
+            if g is None:
+                g = groups[(tok, sec)] = len(groups)
+                nl.append(0)
+                nr.append(0)
+                nn.append(0)
+            nn[g] += 1
+            if truth == "left":
+                nl[g] += 1
+            elif truth == "right":
+                nr[g] += 1
+        self.groups = list(groups)
+        self.n_left = np.array(nl, dtype=np.int64)
+        self.n_right = np.array(nr, dtype=np.int64)
+        self.n_group = np.array(nn, dtype=np.int64)
+        self.n_items = int(self.n_group.sum())
+        self.sections = sorted({sec for _, sec in self.groups})
+        sec_ix = {s: i for i, s in enumerate(self.sections)}
+        self.sec_id = np.array([sec_ix[sec] for _, sec in self.groups], dtype=np.int64)
+
+        rows, cols, vl, vr = [], [], [], []
+        for g, (tok, sec) in enumerate(self.groups):
+            for j in matcher.match(tok):
+                r = self.rules[j]
+                if not section_allowed(sec, r):
+                    continue
+                eff = effective_weight(r, sec)
+                rows.append(g)
+                cols.append(j)
+                vl.append(eff if r.get("pred_side") == "left" else 0.0)
+                vr.append(eff if r.get("pred_side") == "right" else 0.0)
+        shape = (len(self.groups), self.n_rules)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        self.EL = sparse.csr_matrix((np.asarray(vl, dtype=np.float64), (rows, cols)), shape=shape)
+        self.ER = sparse.csr_matrix((np.asarray(vr, dtype=np.float64), (rows, cols)), shape=shape)
+        self._hits = sparse.csc_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        self._reset()
+
+    def _reset(self):
+        hits = self._hits
+        self.rule_groups = [hits.indices[hits.indptr[j]:hits.indptr[j + 1]].astype(np.int64)
+                            for j in range(self.n_rules)]
+        self.active = np.zeros(self.n_rules, dtype=np.float64)
+        self.L = np.zeros(len(self.groups))
+        self.R = np.zeros(len(self.groups))
+        self._pred, self._corr = self._contrib(self.L, self.R, slice(None))
+
+    def save(self, path):
+        """Write the group / rule arrays (not the active set) to an .npz file."""
+        np.savez(path, EL_data=self.EL.data, ER_data=self.ER.data,
+                 indices=self.EL.indices, indptr=self.EL.indptr,
+                 hit_indices=self._hits.indices, hit_indptr=self._hits.indptr,
+                 shape=np.array(self.EL.shape, dtype=np.int64),
+                 tokens=np.array([t for t, _ in self.groups], dtype=str),
+                 group_sec=np.array([s for _, s in self.groups], dtype=str),
+                 n_left=self.n_left, n_right=self.n_right, n_group=self.n_group)
+
+    @classmethod
+    def load(cls, path, rules=None):
+        with np.load(path) as z:
+            shape = tuple(int(x) for x in z["shape"])
+            sc = cls.__new__(cls)
+            sc.rules = list(rules) if rules is not None else None
+            sc.n_rules = shape[1]
+            sc.EL = sparse.csr_matrix((z["EL_data"], z["indices"], z["indptr"]), shape=shape)
+            sc.ER = sparse.csr_matrix((z["ER_data"], z["indices"], z["indptr"]), shape=shape)
+            sc._hits = sparse.csc_matrix((np.ones(len(z["hit_indices"])), z["hit_indices"],
+                                          z["hit_indptr"]), shape=shape)
+            sc.groups = list(zip(z["tokens"].tolist(), z["group_sec"].tolist()))
+            sc.n_left, sc.n_right, sc.n_group = z["n_left"], z["n_right"], z["n_group"]
+        sc.n_items = int(sc.n_group.sum())
+        sc.sections = sorted({sec for _, sec in sc.groups})
+        sec_ix = {s: i for i, s in enumerate(sc.sections)}
+        sc.sec_id = np.array([sec_ix[sec] for _, sec in sc.groups], dtype=np.int64)
+        sc._reset()
+        return sc
+
+    def _contrib(self, L, R, g):
+        """Per-group (n_pred, n_correct) for scores L, R of groups g."""
+        nl, nr = self.n_left[g], self.n_right[g]
+        has = (L != 0.0) | (R != 0.0)
+        pred = np.where(has, nl + nr, 0)
+        corr = np.where(has, np.where(L > R, nl, nr), 0)
+        return pred, corr
+
+    def _scores(self, g, active):
+        return self.EL[g] @ active, self.ER[g] @ active
+
+    def _touched(self, rules):
+        rules = list(rules)
+        if not rules:
+            return np.zeros(0, dtype=np.int64)
+        if len(rules) == 1:
+            return self.rule_groups[rules[0]]
+        return np.unique(np.concatenate([self.rule_groups[j] for j in rules]))
+
+    def set_active(self, rules):
+        active = np.zeros(self.n_rules, dtype=np.float64)
+        active[list(rules)] = 1.0
+        self.set_weights(active)
+
+    def set_weights(self, weights):
+        """
+        Scale every rule by weights[j] (0 = inactive); with a scorer built
+        from unit base_weights this scores any re-weighting of the rulebook.
+        """
+        self.active = np.asarray(weights, dtype=np.float64).copy()
+        self.L = self.EL @ self.active
+        self.R = self.ER @ self.active
+        self._pred, self._corr = self._contrib(self.L, self.R, slice(None))
+
+    def _toggle(self, add=(), drop=()):
+        active = self.active.copy()
+        active[list(add)] = 1.0
+        active[list(drop)] = 0.0
+        g = self._touched([*add, *drop])
+        L, R = self._scores(g, active)
+        pred, corr = self._contrib(L, R, g)
+        return active, g, L, R, pred, corr
+
+    def add(self, j):
+        self.active, g, self.L[g], self.R[g], self._pred[g], self._corr[g] = self._toggle(add=[j])
+
+    def remove(self, j):
+        self.active, g, self.L[g], self.R[g], self._pred[g], self._corr[g] = self._toggle(drop=[j])
+
+    def _metrics(self, n, n_pred, n_corr):
+        return {
+            "n_items": int(n), "n_pred": int(n_pred), "n_correct": int(n_corr),
+            "coverage": float(n_pred / n) if n else 0.0,
+            "acc_on_covered": float(n_corr / n_pred) if n_pred else 0.0,
+            "overall_accuracy": float(n_corr / n) if n else 0.0,
+        }
+
+    def metrics(self):
+        """coverage / acc_on_covered / overall_accuracy of the active rules."""
+        return self._metrics(self.n_items, self._pred.sum(), self._corr.sum())
+
+    def what_if(self, add=(), drop=()):
+        """metrics() after adding / dropping the given rules (self unchanged)."""
+        _, g, _, _, pred, corr = self._toggle(add, drop)
+        n_pred = self._pred.sum() - self._pred[g].sum() + pred.sum()
+        n_corr = self._corr.sum() - self._corr[g].sum() + corr.sum()
+        return self._metrics(self.n_items, n_pred, n_corr)
+
+    def section_metrics(self):
+        """section -> metrics() restricted to that section's items."""
+        k = len(self.sections)
+        n = np.bincount(self.sec_id, weights=self.n_group, minlength=k)
+        p = np.bincount(self.sec_id, weights=self._pred, minlength=k)
+        c = np.bincount(self.sec_id, weights=self._corr, minlength=k)
+        return {s: self._metrics(n[i], p[i], c[i]) for i, s in enumerate(self.sections)}
+
+
+def _scorer_key(items_path, rules):
+    h = hashlib.sha256(f"item_scorer:{SCORER_CACHE_VERSION}".encode())
+    h.update(b"\0")
+    with open(items_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(b"\0")
+    h.update(json.dumps(rules, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def open_item_scorer(items_path, rules, cache_dir=SCORER_CACHE_DIR, rebuild=False):
+    """
+    ItemScorer over read_items(items_path) and `rules`, cached under
+    cache/item_scorer/<sha>.npz keyed by the items bytes and the rule dicts
+    (P69_SCORE_CACHE=0 disables the cache).
+    """
+    rules = list(rules)
+    if os.environ.get("P69_SCORE_CACHE", "1") == "0":
+        return ItemScorer(read_items(items_path), rules)
+    if not os.path.isfile(items_path):
+        raise SystemExit(f"[ERR] Items file not found: {items_path}")
+    path = os.path.join(cache_dir, _scorer_key(items_path, rules)[:16] + ".npz")
+    if os.path.isfile(path) and not rebuild:
+        return ItemScorer.load(path, rules)
+    sc = ItemScorer(read_items(items_path), rules)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".tmp_", suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        sc.save(f)
+    os.replace(tmp, path)
+    return sc
+
+
+# -------------
+# CLI
+# -------------
+
+def write_rule_table(path, index, rs, rules):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("rule_id\tkind\tpattern\tin_set\tsupport_types\tsupport_tokens\tgain_or_loss_tokens\n")
+        for j, r in enumerate(rules):
+            typ, tok = index.support(j)
+            member = j in rs
+            delta = -rs.loss(j) if member else rs.gain(j)
+            f.write(f"{index.names[j]}\t{r.get('kind', '')}\t{r.get('pattern', '')}\t"
+                    f"{int(member)}\t{typ}\t{tok}\t{delta}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bitset rulebook coverage with add / drop deltas")
+    ap.add_argument("--rules", default=RULEBOOK_JSON)
+    ap.add_argument("--tokens", default=TOKENS_TXT, help="token file (whitespace separated)")
+    ap.add_argument("--candidates", help="rulebook JSON of candidate rules for greedy selection")
+    ap.add_argument("--target", type=float, help="greedy target token coverage (fraction)")
+    ap.add_argument("--max-rules", type=int)
+    ap.add_argument("--drop", nargs="*", default=[], help="rule ids to drop from the rulebook")
+    ap.add_argument("--items", help="labelled segments TSV (stem, section, axis1) for accuracy")
+    ap.add_argument("--out", help="per-rule TSV (support, gain / loss)")
+    args = ap.parse_args()
+
+    if not os.path.isfile(args.tokens):
+        raise SystemExit(f"[ERR] Tokens file not found: {args.tokens}")
+    with open(args.tokens, encoding="utf-8") as f:
+        counts = Counter(f.read().split())
+    rules = load_rulebook(args.rules)
+    n_base = len(rules)
+    if args.candidates:
+        rules = rules + load_rulebook(args.candidates)
+    names = [rule_name(r, j) for j, r in enumerate(rules)]
+    index = CoverageIndex(counts, [compile_p69_rule(r) for r in rules], names)
+    by_name = {n: j for j, n in enumerate(names)}
+    for rid in args.drop:
+        if rid not in by_name:
+            raise SystemExit(f"[ERR] unknown rule id: {rid}")
+
+    rs = RuleSet(index, range(n_base))
+    cov = rs.coverage()
+    print(f"[INFO] {index.n_types} types, {index.total} tokens, {n_base} rules"
+          + (f" + {len(rules) - n_base} candidates" if args.candidates else ""))
+    print(f"[RESULT] rulebook covers {cov['types']} types ({100 * cov['frac_types']:.2f} %), "
+          f"{cov['tokens']} tokens ({100 * cov['frac_tokens']:.2f} %)")
+    for rid in args.drop:
+        print(f"  drop {rid}: -{rs.loss(by_name[rid])} tokens")
+    if args.drop:
+        bits = rs.what_if(drop=[by_name[rid] for rid in args.drop])
+        print(f"[RESULT] without {len(args.drop)} rule(s): {index.weight(bits)} tokens "
+              f"({100 * index.coverage(bits)['frac_tokens']:.2f} %)")
+        dropped = set(args.drop)
+        rs = RuleSet(index, [j for j in rs if names[j] not in dropped])
+
+    if args.candidates or args.target is not None:
+        pool = range(n_base, len(rules)) if args.candidates else range(len(rules))
+        rs, steps = greedy_select(index, pool, target=args.target, base=rs,
+                                  max_rules=args.max_rules)
+        for s in steps:
+            print(f"  +{s['name']:<28s} +{s['gain_tokens']:>6d} tokens  -> {100 * s['frac_tokens']:.2f} %")
+        print(f"[RESULT] greedy added {len(steps)} rule(s): "
+              f"{100 * rs.coverage()['frac_tokens']:.2f} % tokens covered")
+
+    if args.items:
+        sc = ItemScorer(read_items(args.items), rules)
+        sc.set_active(list(rs))
+        m = sc.metrics()
+        print(f"[RESULT] items={m['n_items']} coverage={m['coverage']:.4f} "
+              f"acc_on_covered={m['acc_on_covered']:.4f} overall={m['overall_accuracy']:.4f}")
+        for sec, m in sc.section_metrics().items():
+            print(f"  {sec:<16s} n={m['n_items']:<5d} coverage={m['coverage']:.4f} "
+                  f"acc_on_covered={m['acc_on_covered']:.4f}")
+
+    if args.out:
+        write_rule_table(args.out, index, rs, rules)
+        print(f"[OK] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
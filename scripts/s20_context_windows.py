@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Streaming context windows and frame counts for core stems (S20 -> S21)
+
+s20_build_core_context_windows.py loaded every token into a list of dicts
+before writing left2/left1/right1/right2 windows, and
+s21_build_family_frames.py read the whole windows TSV back into a list to
+count left1|centre|right1 frames. Both hold the corpus (or all windows) in
+memory, which is what makes running the frame analysis over the Latin and
+Judeo-Arabic comparison corpora painful.
+
+Here everything is a generator over a bounded buffer:
+
+    iter_folio_tokens / iter_text_tokens   token records from p6_folio_tokens.tsv
+                                           or a plain text / one-token-per-line file
+    iter_windows(records, core, k)         a deque of 2k+1 records; yields one
+                                           window per core-stem centre with
+                                           left_k..left_1 and right_1..right_k
+                                           ("" beyond either end of the corpus,
+                                           exactly as S20 did)
+    frame_counts(windows, radius)          Counter keyed by (family, role_group,
+                                           "l_r|..|l_1|centre|r_1|..|r_r"),
+                                           empty neighbours as ∅ (S21)
+
+Memory is O(k) for the windows plus the counter itself. The windows TSV is
+optional: tee_windows() writes it while the windows stream on to the
+counter, so one pass gives both files. With k=2 and radius=1 the files are
+byte-identical to the old S20 and S21 outputs.
+
+Usage (library):
+
+    from s20_context_windows import load_core_stems, iter_folio_tokens, \\
+        iter_windows, frame_counts, write_frames
+    core = load_core_stems("PhaseS/out/s13_semantic_core_report.tsv")
+    wins = iter_windows(iter_folio_tokens("PhaseS/out/p6_folio_tokens.tsv"), core, k=3)
+    write_frames(frame_counts(wins, radius=2), "PhaseS/out/s21_family_frames_r2.tsv")
+
+Usage (CLI):
+
+    python3 scripts/s20_context_windows.py --core CORE.tsv --tokens corpora/latin_merged.txt \\
+        --text --k 2 --radius 1 --frames-out out/latin_frames.tsv
+"""
+
+import argparse
+import os
+import re
+from collections import Counter, deque, namedtuple
+
+Token = namedtuple("Token", "token folio line_id pos")
+Window = namedtuple("Window", "family role_group token folio line_id pos left right")
+
+EMPTY = "∅"
+TEXT_CHUNK_CHARS = 1 << 16
+_TAIL = re.compile(r"\S+\Z")               # token possibly cut by the chunk end
+_TOKEN_OR_NL = re.compile(r"\n|\S+")
+
+
+# -------------
+# Inputs
+# -------------
+
+def load_core_stems(core_path):
+    """token -> (semantic_family, role_group) from an s13-style report."""
+    core = {}
+    with open(core_path, "r", encoding="utf-8") as f:
+        header = None
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split("\t")
+            if header is None:
+                header = parts
+                col_idx = {c: i for i, c in enumerate(header)}
+                # required columns in s13
+                for c in ("token", "semantic_family", "role_group"):
+                    if c not in col_idx:
+                        raise RuntimeError(f"[S20] Core file missing required column: {c}")
+                continue
+            token = parts[col_idx["token"]]
+            family = parts[col_idx["semantic_family"]]
+            role_group = parts[col_idx["role_group"]]
+            core[token] = (family, role_group)
+    return core
+
+
+def iter_folio_tokens(tokens_path):
+    """
+    Token records from p6_folio_tokens.tsv
+    (token, folio, header_blob, line_idx, pos_idx; penultimate column is
+    the line id, last the position). Lines with < 3 columns are skipped.
+    """
+    with open(tokens_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            parts = line.split("\t")
+            if len(parts) < 3:
+                continue
+            if len(parts) >= 4:
+                line_id, pos = parts[-2].strip(), parts[-1].strip()
+            else:
+                line_id, pos = "", ""
+            yield Token(parts[0].strip(), parts[1].strip(), line_id, pos)
+
+
+def iter_text_tokens(path, errors="replace", chunk_chars=TEXT_CHUNK_CHARS):
+    """
+    Whitespace tokens of a plain-text corpus, read in fixed-size chunks; a
+    token cut by a chunk boundary is carried into the next chunk, so a
+    corpus stored as one long line is never held whole. folio = file name,
+    line_id = physical line number (blank lines count), pos = position in
+    that line.
+    """
+    name = os.path.basename(path)
+    ln_no, pos, carry = 1, 0, ""
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
+        while True:
+            block = f.read(chunk_chars)
+            text = carry + block
+            carry = ""
+            if block:
+                tail = _TAIL.search(text)
+                if tail:
+                    carry, text = text[tail.start():], text[:tail.start()]
+            for m in _TOKEN_OR_NL.finditer(text):
+                tok = m.group()
+                if tok == "\n":
+                    ln_no += 1
+                    pos = 0
+                else:
+                    pos += 1
+                    yield Token(tok, name, str(ln_no), str(pos))
+            if not block:
+                break
+
+
+# -------------
+# Windows and frames
+# -------------
+
+def window_columns(k):
+    return [f"left{d}" for d in range(k, 0, -1)] + [f"right{d}" for d in range(1, k + 1)]
+
+
+def iter_windows(records, core, k=2):
+    """
+    Yield a Window for every record whose token is a core stem, with
+    left = (left_k, ..., left_1) and right = (right_1, ..., right_k).
+    """
+    if k < 0:
+        raise ValueError("window radius must be >= 0")
+    buf = deque(maxlen=2 * k + 1)     # buf[k] is the centre once full
+
+    def emit(centre_idx):
+        rec = buf[centre_idx]
+        hit = core.get(rec.token)
+        if hit is None:
+            return None
+        left = tuple(buf[centre_idx - d].token if centre_idx - d >= 0 else ""
+                     for d in range(k, 0, -1))
+        right = tuple(buf[centre_idx + d].token if centre_idx + d < len(buf) else ""
+                      for d in range(1, k + 1))
+        return Window(hit[0], hit[1], rec.token, rec.folio, rec.line_id, rec.pos, left, right)
+
+    seen = 0
+    for rec in records:
+        buf.append(rec)
+        seen += 1
+        if seen > k:
+            # centre is k records behind the newest one
+            w = emit(len(buf) - 1 - k)
+            if w:
+                yield w
+    # the last k records never had k right neighbours
+    for back in range(min(k, seen) - 1, -1, -1):
+        w = emit(len(buf) - 1 - back)
+        if w:
+            yield w
+
+
+def frame_pattern(w, radius=1):
+    k = len(w.right)
+    if radius > k:
+        raise ValueError(f"frame radius {radius} > window radius {k}")
+    left = w.left[k - radius:]
+    right = w.right[:radius]
+    return "|".join([*(t.strip() or EMPTY for t in left), w.token,
+                     *(t.strip() or EMPTY for t in right)])
+
+
+def frame_counts(windows, radius=1, counts=None):
+    """Counter[(family, role_group, pattern)] over a window stream."""
+    counts = Counter() if counts is None else counts
+    for w in windows:
+        counts[(w.family, w.role_group, frame_pattern(w, radius))] += 1
+    return counts
+
+
+# -------------
+# Outputs
+# -------------
+
+def tee_windows(windows, path, k):
+    """Write windows to an S20-format TSV while passing them through."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("\t".join(["family", "role_group", "token", "folio", "line_id", "pos"]
+                            + window_columns(k)) + "\n")
+        for w in windows:
+            out.write("\t".join([w.family, w.role_group, w.token, w.folio, w.line_id,
+                                 w.pos, *w.left, *w.right]) + "\n")
+            yield w
+
+
+def write_windows(windows, path, k):
+    n = 0
+    for _ in tee_windows(windows, path, k):
+        n += 1
+    return n
+
+
+def write_frames(counts, path):
+    """S21 frames TSV: by family, then count desc, then pattern."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("family\trole_group\tpattern\tcount\n")
+        for (family, role_group, pattern), cnt in sorted(
+            counts.items(), key=lambda x: (x[0][0], -x[1], x[0][2])
+        ):
+            out.write(f"{family}\t{role_group}\t{pattern}\t{cnt}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming core-stem windows and frame counts")
+    ap.add_argument("--core", required=True, help="s13-style core report (token, semantic_family, role_group)")
+    ap.add_argument("--tokens", required=True, help="p6_folio_tokens.tsv, or a text corpus with --text")
+    ap.add_argument("--text", action="store_true", help="tokens file is plain text (whitespace tokens)")
+    ap.add_argument("--k", type=int, default=2, help="window radius")
+    ap.add_argument("--radius", type=int, default=1, help="frame radius (<= k)")
+    ap.add_argument("--windows-out", help="optional S20-format windows TSV")
+    ap.add_argument("--frames-out", help="S21-format frames TSV")
+    args = ap.parse_args()
+
+    if args.radius > args.k:
+        raise SystemExit("[ERR] --radius must be <= --k")
+    core = load_core_stems(args.core)
+    records = iter_text_tokens(args.tokens) if args.text else iter_folio_tokens(args.tokens)
+    wins = iter_windows(records, core, args.k)
+    if args.windows_out:
+        wins = tee_windows(wins, args.windows_out, args.k)
+    counts = frame_counts(wins, args.radius)
+    print(f"[INFO] {sum(counts.values())} windows, {len(counts)} distinct frames")
+    if args.frames_out:
+        write_frames(counts, args.frames_out)
+        print(f"[OK] Wrote {args.frames_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,45 @@
 #!/usr/bin/env python3
 import os
 import sys
-from collections import defaultdict
 
-def load_windows(path):
-    if not os.path.exists(path):
-        raise RuntimeError(f"[S21] Windows file not found: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        header = None
-        col_idx = {}
-        rows = []
-        for line in f:
-            line = line.rstrip("\n")
-            if not line:
-                continue
-            parts = line.split("\t")
-            if header is None:
-                header = parts
-                col_idx = {c: i for i, c in enumerate(header)}
-                # required columns from S20
-                for c in ("family", "role_group", "token", "left1", "right1"):
-                    if c not in col_idx:
-                        raise RuntimeError(f"[S21] Missing required column: {c}")
-                continue
-            rows.append(parts)
-    return header, col_idx, rows
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from s20_context_windows import (  # noqa: E402
+    frame_counts,
+    iter_folio_tokens,
+    iter_windows,
+    load_core_stems,
+    write_frames,
+)
 
-def norm(tok):
-    tok = tok.strip()
-    return tok if tok else "∅"
 
 def main():
     base = os.environ.get("BASE", os.getcwd())
-    windows_path = os.path.join(base, "PhaseS/out/s20_core_context_windows.tsv")
+    core_path = os.path.join(base, "PhaseS/out/s13_semantic_core_report.tsv")
+    tokens_path = os.environ.get("TOKENS_PATH", os.path.join(base, "PhaseS/out/p6_folio_tokens.tsv"))
     out_frames = os.path.join(base, "PhaseS/out/s21_family_frames.tsv")
+    # frame radius: 1 -> left1|centre|right1
+    radius = int(os.environ.get("S21_RADIUS", "1"))
 
-    print(f"[S21] BASE         = {base}")
-    print(f"[S21] WINDOWS_PATH = {windows_path}")
-    print(f"[S21] OUT_FRAMES   = {out_frames}")
-    print(f"[S21] Loading context windows from {windows_path}")
+    print(f"[S21] BASE        = {base}")
+    print(f"[S21] CORE_PATH   = {core_path}")
+    print(f"[S21] TOKENS_PATH = {tokens_path}")
+    print(f"[S21] OUT_FRAMES  = {out_frames}")
 
-    header, col_idx, rows = load_windows(windows_path)
+    if not os.path.exists(core_path):
+        raise RuntimeError(f"[S21] Core file not found: {core_path}")
+    if not os.path.exists(tokens_path):
+        raise RuntimeError(f"[S21] Tokens file not found: {tokens_path}")
 
-    # Aggregate frames by (family, role_group, pattern)
-    frame_counts = defaultdict(int)
-
-    for parts in rows:
-        family = parts[col_idx["family"]]
-        role_group = parts[col_idx["role_group"]]
-        center = parts[col_idx["token"]]
-        left1 = parts[col_idx["left1"]]
-        right1 = parts[col_idx["right1"]]
-
-        pattern = f"{norm(left1)}|{center}|{norm(right1)}"
-        key = (family, role_group, pattern)
-        frame_counts[key] += 1
+    # Aggregate frames by (family, role_group, pattern) straight from the
+    # token stream: windows of radius `radius` are counted as they are
+    # built, the S20 windows TSV is never read back
+    core = load_core_stems(core_path)
+    frame_counts_ = frame_counts(iter_windows(iter_folio_tokens(tokens_path), core, radius), radius)
 
     os.makedirs(os.path.dirname(out_frames), exist_ok=True)
-    with open(out_frames, "w", encoding="utf-8") as out:
-        out.write("family\trole_group\tpattern\tcount\n")
-        for (family, role_group, pattern), cnt in sorted(
-            frame_counts.items(),
-            key=lambda x: (x[0][0], -x[1], x[0][2])
-        ):
-            out.write(f"{family}\t{role_group}\t{pattern}\t{cnt}\n")
+    write_frames(frame_counts_, out_frames)
 
-    print(f"[S21] Total distinct frames: {len(frame_counts)}")
+    print(f"[S21] Total distinct frames: {len(frame_counts_)}")
 
 if __name__ == "__main__":
     main()
@@ -7,20 +7,24 @@ BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 OUTD="$BASE/PhaseS/out"
 SCRIPTD="$BASE/scripts"
 
-WINDOWS_PATH="$OUTD/s20_core_context_windows.tsv"
+CORE_PATH="$OUTD/s13_semantic_core_report.tsv"
+TOKENS_PATH="${TOKENS_PATH:-$OUTD/p6_folio_tokens.tsv}"
 OUT_FRAMES="$OUTD/s21_family_frames.tsv"
 
-echo "[S21] BASE         = $BASE"
-echo "[S21] WINDOWS_PATH = $WINDOWS_PATH"
-echo "[S21] OUT_FRAMES   = $OUT_FRAMES"
+echo "[S21] BASE        = $BASE"
+echo "[S21] CORE_PATH   = $CORE_PATH"
+echo "[S21] TOKENS_PATH = $TOKENS_PATH"
+echo "[S21] OUT_FRAMES  = $OUT_FRAMES"
 
-if [ ! -f "$WINDOWS_PATH" ]; then
-  echo "[S21][ERR] Windows file not found: $WINDOWS_PATH" >&2
-  exit 1
-fi
+for f in "$CORE_PATH" "$TOKENS_PATH"; do
+  if [ ! -f "$f" ]; then
+    echo "[S21][ERR] Input file not found: $f" >&2
+    exit 1
+  fi
+done
 
-python3 "$SCRIPTD/s21_build_family_frames.py" \
-  "$WINDOWS_PATH" \
+# frames are counted straight from the token stream (no S20 windows TSV)
+BASE="$BASE" TOKENS_PATH="$TOKENS_PATH" python3 "$SCRIPTD/s21_build_family_frames.py"
 
 
 echo "[S21] Wrote → $OUT_FRAMES"
@@ -8,19 +8,42 @@ Output:
   - s27_template_null.tsv (TSV with null expectations and z-scores)
   - s27_template_null.txt (human-readable summary)
 
-This uses a simple balls-into-bins simulation per family:
+Balls-into-bins null per family:
   - n_patterns bins  (distinct_patterns)
   - total_instances balls (total_instances)
-to estimate expected number of bins with count >= 2 and >= 5
-under a random assignment.
+expected number of bins with count >= 2 and >= 5 under a uniform random
+assignment, and its sd.
+
+Modes (--mode):
+  exact  (default) analytic occupancy moments. Each bin count is
+         Binomial(M, 1/N), so E[#bins >= t] = N q_t with q_t = P(X >= t);
+         the variance adds N(N-1) Cov over bin pairs, whose joint law is
+         Multinomial(M; 1/N, 1/N, 1 - 2/N) (a double sum over a, b < t).
+  mc     vectorized Monte Carlo: each batch of simulations is one
+         multinomial draw matrix (sims x bins). Reports the Monte Carlo
+         standard error of each mean and its deviation from the exact
+         value in SE units; --target-se keeps drawing batches (up to
+         10 x --n-sims) until both SEs are below the target.
+  sim    the original one-ball-at-a-time loop with random (slow; kept to
+         reproduce older outputs).
+
+Usage:
+  s27_build_template_null.py <s23_frame_stats.tsv> <out_tsv> <out_txt>
+      [--mode exact|mc|sim] [--n-sims 2000] [--seed 27] [--target-se X]
 """
 
+import argparse
 import sys
 import csv
 import math
 import random
 from collections import namedtuple
 
+import numpy as np
+
+THRESHOLDS = (2, 5)
+MAX_CELLS = 1 << 22
+
 Stats = namedtuple(
     "Stats",
     [
@@ -119,6 +142,112 @@ def simulate_null(n_bins, n_balls, n_sims=2000):
     }
 
 
+# -------------
+# Exact occupancy moments
+# -------------
+
+def _log_pow(x, k):
+    """k * log(x), with 0 ** 0 == 1."""
+    if k == 0:
+        return 0.0
+    if x <= 0.0:
+        return -math.inf
+    return k * math.log(x)
+
+
+def _occupancy_moments(n_bins, n_balls, t):
+    """(mean, sd) of the number of bins holding >= t balls."""
+    N, M = n_bins, n_balls
+    if N <= 0 or M < t:
+        return 0.0, 0.0
+    p = 1.0 / N
+    lg_m = math.lgamma(M + 1)
+
+    # P(X < t), X ~ Binomial(M, p)
+    lt = 0.0
+    for a in range(t):
+        lt += math.exp(lg_m - math.lgamma(a + 1) - math.lgamma(M - a + 1)
+                       + _log_pow(p, a) + _log_pow(1.0 - p, M - a))
+    q = 1.0 - lt
+    mean = N * q
+    var = N * q * (1.0 - q)
+
+    if N >= 2:
+        # P(X_i < t, X_j < t) for two distinct bins
+        rest = 1.0 - 2.0 * p
+        both_lt = 0.0
+        for a in range(t):
+            for b in range(t):
+                if a + b > M:
+                    continue
+                both_lt += math.exp(lg_m - math.lgamma(a + 1) - math.lgamma(b + 1)
+                                    - math.lgamma(M - a - b + 1)
+                                    + _log_pow(p, a + b) + _log_pow(rest, M - a - b))
+        cov = both_lt - lt * lt
+        var += N * (N - 1) * cov
+    return mean, math.sqrt(max(var, 0.0))
+
+
+def exact_null(n_bins, n_balls):
+    """Analytic mean/sd of bins with count >= 2 and >= 5."""
+    out = {"n_sims": 0}
+    for t in THRESHOLDS:
+        m, sd = _occupancy_moments(n_bins, n_balls, t)
+        out[f"mean_ge{t}"] = m
+        out[f"sd_ge{t}"] = sd
+    return out
+
+
+# -------------
+# Vectorized Monte Carlo
+# -------------
+
+def mc_null(n_bins, n_balls, n_sims=2000, seed=27, target_se=None):
+    """
+    Monte Carlo mean/sd from multinomial draw matrices, with the standard
+    error of each mean (se_ge*) and its deviation from the exact mean in
+    SE units (dev_ge*).
+    """
+    rng = np.random.default_rng([seed, n_bins, n_balls])
+    ex = exact_null(n_bins, n_balls)
+    if n_bins <= 0:
+        out = dict(ex, n_sims=n_sims)
+        for t in THRESHOLDS:
+            out[f"se_ge{t}"] = out[f"dev_ge{t}"] = 0.0
+        return out
+
+    rows = max(1, MAX_CELLS // n_bins)
+    probs = np.full(n_bins, 1.0 / n_bins)
+    s1 = {t: 0.0 for t in THRESHOLDS}
+    s2 = {t: 0.0 for t in THRESHOLDS}
+    done = 0
+    limit = n_sims if target_se is None else 10 * n_sims
+    while done < limit:
+        b = min(rows, limit - done)
+        counts = rng.multinomial(n_balls, probs, size=b)
+        for t in THRESHOLDS:
+            v = (counts >= t).sum(axis=1).astype(np.float64)
+            s1[t] += v.sum()
+            s2[t] += (v * v).sum()
+        done += b
+        if done >= n_sims and target_se is not None:
+            ses = [math.sqrt(max(s2[t] / done - (s1[t] / done) ** 2, 0.0) / done)
+                   for t in THRESHOLDS]
+            if max(ses) <= target_se:
+                break
+
+    out = {"n_sims": done}
+    for t in THRESHOLDS:
+        m = s1[t] / done
+        sd = math.sqrt(max(s2[t] / done - m * m, 0.0))
+        se = sd / math.sqrt(done)
+        out[f"mean_ge{t}"] = m
+        out[f"sd_ge{t}"] = sd
+        out[f"se_ge{t}"] = se
+        out[f"dev_ge{t}"] = (m - ex[f"mean_ge{t}"]) / se if se > 0 else 0.0
+    return out
+
+
 def z_score(real, mean, sd):
     if sd <= 0:
         return None
@@ -126,30 +255,41 @@ def z_score(real, mean, sd):
 
 
 def main():
-    if len(sys.argv) != 4:
-        sys.stderr.write(
-            "[S27] Usage: s27_build_template_null.py "
-            "<s23_frame_stats.tsv> <out_tsv> <out_txt>\n"
-        )
-        sys.exit(1)
+    ap = argparse.ArgumentParser(description="S27 null model for recurrent templates")
+    ap.add_argument("in_stats", help="s23_frame_stats.tsv")
+    ap.add_argument("out_tsv")
+    ap.add_argument("out_txt")
+    ap.add_argument("--mode", choices=("exact", "mc", "sim"), default="exact")
+    ap.add_argument("--n-sims", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=27, help="mc mode seed")
+    ap.add_argument("--target-se", type=float, default=None,
+                    help="mc mode: draw until both mean SEs are below this")
+    args = ap.parse_args()
 
-    in_stats_path = sys.argv[1]
-    out_tsv_path = sys.argv[2]
-    out_txt_path = sys.argv[3]
+    in_stats_path = args.in_stats
+    out_tsv_path = args.out_tsv
+    out_txt_path = args.out_txt
 
     stats = load_stats(in_stats_path)
 
     # Run null-model per family
     results = []
     for st in stats:
-        sys.stderr.write(
-            f"[S27] Simulating null for {st.family} "
-            f"(patterns={st.distinct_patterns}, frames={st.total_instances})\n"
-        )
-        nm = simulate_null(st.distinct_patterns, st.total_instances, n_sims=2000)
+        if args.mode == "sim":
+            sys.stderr.write(
+                f"[S27] Simulating null for {st.family} "
+                f"(patterns={st.distinct_patterns}, frames={st.total_instances})\n"
+            )
+            nm = simulate_null(st.distinct_patterns, st.total_instances, n_sims=args.n_sims)
+        elif args.mode == "mc":
+            nm = mc_null(st.distinct_patterns, st.total_instances, n_sims=args.n_sims,
+                         seed=args.seed, target_se=args.target_se)
+        else:
+            nm = exact_null(st.distinct_patterns, st.total_instances)
         z_ge2 = z_score(st.real_ge2, nm["mean_ge2"], nm["sd_ge2"])
         z_ge5 = z_score(st.real_ge5, nm["mean_ge5"], nm["sd_ge5"])
         results.append((st, nm, z_ge2, z_ge5))
+    sys.stderr.write(f"[S27] Null model ({args.mode}) for {len(results)} families\n")
 
     # Write TSV
     with open(out_tsv_path, "w", encoding="utf-8", newline="") as f:
@@ -168,6 +308,11 @@ def main():
                 "null_sd_ge5",
                 "z_ge2",
                 "z_ge5",
+                "null_mode",
+                "mc_se_mean_ge2",
+                "mc_se_mean_ge5",
+                "mc_dev_exact_ge2",
+                "mc_dev_exact_ge5",
             ]
         )
         for st, nm, z_ge2, z_ge5 in results:
@@ -185,22 +330,31 @@ def main():
                     f"{nm['sd_ge5']:.6f}",
                     "" if z_ge2 is None else f"{z_ge2:.3f}",
                     "" if z_ge5 is None else f"{z_ge5:.3f}",
+                    args.mode,
+                    f"{nm['se_ge2']:.6f}" if "se_ge2" in nm else "",
+                    f"{nm['se_ge5']:.6f}" if "se_ge5" in nm else "",
+                    f"{nm['dev_ge2']:.3f}" if "dev_ge2" in nm else "",
+                    f"{nm['dev_ge5']:.3f}" if "dev_ge5" in nm else "",
                 ]
             )
 
     # Write TXT summary
     with open(out_txt_path, "w", encoding="utf-8") as f:
         f.write("S27 template null-model summary\n")
-        f.write("========================================\n\n")
+        f.write("========================================\n")
+        f.write(f"Null mode: {args.mode}\n\n")
         for st, nm, z_ge2, z_ge5 in results:
             f.write(f"Family: {st.family}\n")
             f.write(f"  Distinct patterns (N)         : {st.distinct_patterns}\n")
             f.write(f"  Total frame instances (M)     : {st.total_instances}\n")
             f.write(f"  Real recurrent templates ≥2   : {st.real_ge2}\n")
             f.write(f"  Real recurrent templates ≥5   : {st.real_ge5}\n")
-            f.write(
-                f"  Null-model sims               : {nm['n_sims']}\n"
-            )
+            if args.mode == "exact":
+                f.write("  Null-model sims               : exact (analytic)\n")
+            else:
+                f.write(
+                    f"  Null-model sims               : {nm['n_sims']}\n"
+                )
             f.write(
                 "  Null expectation (count ≥2)   : "
                 f"{nm['mean_ge2']:.2f} ± {nm['sd_ge2']:.2f}\n"
@@ -209,6 +363,15 @@ def main():
                 "  Null expectation (count ≥5)   : "
                 f"{nm['mean_ge5']:.2f} ± {nm['sd_ge5']:.2f}\n"
             )
+            if "se_ge2" in nm:
+                f.write(
+                    "  MC standard error (≥2 / ≥5)   : "
+                    f"{nm['se_ge2']:.3f} / {nm['se_ge5']:.3f}\n"
+                )
+                f.write(
+                    "  MC - exact, in SE (≥2 / ≥5)   : "
+                    f"{nm['dev_ge2']:+.2f} / {nm['dev_ge5']:+.2f}\n"
+                )
             if z_ge2 is not None:
                 f.write(f"  z-score (≥2)                  : {z_ge2:.2f}\n")
             if z_ge5 is not None:
@@ -2,6 +2,7 @@
 set -euo pipefail
 
 # Simple, Termux-safe runner for the S27 null-model rung
+# S27_MODE=exact (default) | mc | sim selects the null computation
 BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 
 IN_STATS="$BASE/PhaseS/out/s23_frame_stats.tsv"
@@ -24,6 +25,6 @@ if [ ! -f "$PY_SCRIPT" ]; then
   exit 1
 fi
 
-python3 "$PY_SCRIPT" "$IN_STATS" "$OUT_TSV" "$OUT_TXT"
+python3 "$PY_SCRIPT" "$IN_STATS" "$OUT_TSV" "$OUT_TXT" --mode "${S27_MODE:-exact}"
 
 echo "[S27] Done."
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Indexed valency query engine for folio C-packs (S41 / S41b / S42)
+
+s41_scan_folio_valency.sh and s41b_scan_folio_valency_suffix.sh are awk
+scans of one folio C-pack each; s42_master_currier_AB.sh loops them over
+every Currier A and B folio, re-reading s40/s39 and re-running awk
+(plus s00, s42, s42c for each folio), so the rule tables are parsed
+hundreds of times and every triple is checked against every suffix pair.
+
+Here the rule tables are loaded once into hash indexes:
+
+    TripleIndex   (agent, process, patient) -> S40 overlay row
+    SuffixIndex   agent_suffix -> [(pair order, patient_suffix, id, class)]
+                  a triple only probes the suffixes of its own first token
+
+and all folio packs are scanned in one pass, in memory, straight from the
+master transliteration (C-packs are still written to PhaseS/in/ for the
+other tools). Per-folio outputs keep the S41/S41b/S42 formats and the
+merged/compared files keep the S42c/S42b formats:
+
+    PhaseS/out/s41b_valency_suffix_hits_<folio>.tsv
+    PhaseS/out/s42_valency_suffix_summary_<folio>.tsv
+    PhaseS/out/s42_valency_suffix_summary_ALL_{A,B}_merged.tsv
+    PhaseS/out/s42b_compare_ALL_B_vs_ALL_A.tsv
+
+plus the Currier-labelled hit list S43 reads and an A/B contingency table:
+
+    PhaseS/out/s41b_suffix_pairs_with_currier.tsv
+        folio  agent_suffix  patient_suffix  currier
+    PhaseS/out/s41_currier_contingency.tsv
+        agent_suffix patient_suffix valency_id valency_class
+        hits_A hits_B total_hits folios_A folios_B
+
+Rows of summaries come out in first-seen order (the awk versions used
+hash order). The S40 overlay file is read as the TSV its header says it is.
+
+Usage:
+
+    python3 scripts/s41_valency_query.py triples PhaseS/in/f21r_C.txt ...
+    python3 scripts/s41_valency_query.py suffix PhaseS/in/f21r_C.txt ... \\
+        --ladder PhaseS/out/s39_valency_ladder.tsv
+    python3 scripts/s41_valency_query.py currier     # what s42_master runs
+"""
+
+import argparse
+import os
+import re
+import sys
+from collections import OrderedDict
+
+BASE = os.environ.get("BASE", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OUTD = os.path.join(BASE, "PhaseS", "out")
+IND = os.path.join(BASE, "PhaseS", "in")
+MASTER = os.path.join(BASE, "corpora", "voynich_transliteration.txt")
+S39_LADDER = os.path.join(OUTD, "s39_valency_ladder.tsv")
+S40_OVERLAYS = os.path.join(OUTD, "s40_clause_valency_overlays.tsv")
+A_LIST = os.path.join(BASE, "PhaseS", "config", "currierA_folios.list")
+B_LIST = os.path.join(BASE, "PhaseS", "config", "currierB_folios.list")
+
+S41B_HEADER = ["folio", "line_idx", "triple_idx", "tok1", "tok2", "tok3",
+               "agent_suffix", "patient_suffix", "valency_id", "valency_class"]
+S42_HEADER = ["folio", "agent_suffix", "patient_suffix", "valency_id", "valency_class", "hits"]
+S42C_HEADER = ["agent_suffix", "patient_suffix", "valency_id", "valency_class",
+               "total_hits", "n_folios"]
+
+
+# -------------
+# Rule indexes
+# -------------
+
+class TripleIndex:
+    """S40 overlays keyed by (agent_token, process_token, patient_token)."""
+
+    def __init__(self, path=S40_OVERLAYS):
+        self.meta = {}
+        with open(path, encoding="utf-8") as f:
+            next(f, None)
+            for ln in f:
+                c = ln.rstrip("\n").split("\t")
+                if len(c) < 14:
+                    continue
+                notes = c[16] if len(c) >= 17 else ""
+                # later rows win, as in the awk map
+                self.meta[(c[3], c[4], c[5])] = (c[0], c[2], c[6], c[7], c[12], c[13],
+                                                 c[14] if len(c) > 14 else "",
+                                                 c[15] if len(c) > 15 else "", notes)
+
+    def get(self, a, m, p):
+        return self.meta.get((a, m, p))
+
+
+class SuffixIndex:
+    """S39 suffix pairs, indexed by agent suffix."""
+
+    def __init__(self, path=S39_LADDER):
+        self.pairs = []                       # (a_suf, p_suf, rule, class)
+        self.by_agent = {}                    # a_suf -> [(k, p_suf)]
+        seen = set()
+        header = None
+        with open(path, encoding="utf-8") as f:
+            for ln in f:
+                line = ln.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.split("\t")
+                if header is None:
+                    header = {}
+                    for i, h in enumerate(fields):
+                        if h in ("agent_suffix", "patient_suffix"):
+                            header[h] = i
+                        elif h in ("valency_id", "rule_id"):
+                            header["rule"] = i
+                        elif h in ("valency_class", "class", "role"):
+                            header["class"] = i
+                    if "agent_suffix" not in header or "patient_suffix" not in header:
+                        raise SystemExit("[err] s39 header must contain agent_suffix and patient_suffix")
+                    continue
+                a_suf = _field(fields, header["agent_suffix"]).strip()
+                p_suf = _field(fields, header["patient_suffix"]).strip()
+                if not a_suf or not p_suf or (a_suf, p_suf) in seen:
+                    continue
+                seen.add((a_suf, p_suf))
+                k = len(self.pairs)
+                self.pairs.append((a_suf, p_suf,
+                                   _field(fields, header["rule"]) if "rule" in header else "",
+                                   _field(fields, header["class"]) if "class" in header else ""))
+                self.by_agent.setdefault(a_suf, []).append((k, p_suf))
+        if not self.pairs:
+            print("[warn] no suffix pairs loaded from s39", file=sys.stderr)
+        else:
+            print(f"[info] loaded {len(self.pairs)} suffix pairs from {path}", file=sys.stderr)
+
+    def matches(self, a, p):
+        """Pairs (in ladder order) with a.endswith(agent) and p.endswith(patient)."""
+        hits = []
+        by_agent = self.by_agent
+        for i in range(len(a)):
+            cand = by_agent.get(a[i:])
+            if cand:
+                hits.extend(k for k, p_suf in cand if p.endswith(p_suf))
+        hits.sort()
+        return [self.pairs[k] for k in hits]
+
+
+def _field(fields, i):
+    return fields[i] if i < len(fields) else ""
+
+
+# -------------
+# Folio packs
+# -------------
+
+_PACK_ID = re.compile(r"^<([^>]+)>\s*(.*)$")
+_FOLIO_TAG = re.compile(r"^<([^.>]+)\.")
+
+
+def read_pack(path):
+    with open(path, encoding="utf-8") as f:
+        return [ln.rstrip("\n") for ln in f]
+
+
+def packs_from_master(path, folios):
+    """folio -> list of its master lines (the s00 C-pack), one pass over the file."""
+    wanted = set(folios)
+    packs = {f: [] for f in folios}
+    with open(path, encoding="utf-8") as f:
+        for ln in f:
+            m = _FOLIO_TAG.match(ln)
+            if m and m.group(1) in wanted:
+                packs[m.group(1)].append(ln.rstrip("\n"))
+    return packs
+
+
+def write_pack(lines, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for ln in lines:
+            f.write(ln + "\n")
+    os.replace(tmp, path)
+
+
+def folio_tag(path):
+    """f21r_C.txt -> f21r, as s41b derives it."""
+    name = os.path.basename(path)
+    if name.endswith("_C.txt"):
+        return name[:-len("_C.txt")]
+    return name[:-4] if name.endswith(".txt") else name
+
+
+# -------------
+# Scans
+# -------------
+
+def scan_triples(lines, index):
+    """S41 rows: exact (agent, process, patient) matches against S40."""
+    rows = []
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        pid, text = "", line
+        m = _PACK_ID.match(line)
+        if m:
+            pid, text = m.group(1), m.group(2)
+        text = re.sub(r"[.,!\-=]", " ", text)
+        text = re.sub(r"\{[^}]*\}", " ", text)
+        t = re.split(r"\s+", text)
+        for i in range(len(t) - 2):
+            a, v, p = t[i], t[i + 1], t[i + 2]
+            if not a or not v or not p:
+                continue
+            meta = index.get(a, v, p)
+            if meta:
+                rows.append([pid, i + 1, a, v, p, *meta])
+    return rows
+
+
+def scan_suffix(lines, index, folio):
+    """S41b rows: triples whose outer tokens end in an S39 suffix pair."""
+    rows = []
+    line_idx = 0
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        raw = re.sub(r"<[^>]+>", "", line).replace(".", " ")
+        t = raw.split()
+        if len(t) < 3:
+            continue
+        line_idx += 1
+        for i in range(len(t) - 2):
+            a, v, p = t[i], t[i + 1], t[i + 2]
+            for a_suf, p_suf, rule, cls in index.matches(a, p):
+                rows.append([folio, line_idx, i + 1, a, v, p, a_suf, p_suf, rule, cls])
+    return rows
+
+
+def summarise(rows):
+    """S42: hits per (folio, agent_suffix, patient_suffix, valency_id, valency_class)."""
+    count = OrderedDict()
+    for r in rows:
+        if not r[0] or not r[6] or not r[7]:
+            continue
+        key = (r[0], r[6], r[7], r[8], r[9])
+        count[key] = count.get(key, 0) + 1
+    return [list(k) + [n] for k, n in count.items()]
+
+
+def merge(summaries):
+    """S42c: total hits and distinct folios per (suffixes, id, class)."""
+    total, folios = OrderedDict(), {}
+    for rows in summaries:
+        for folio, a_suf, p_suf, vid, vclass, hits in rows:
+            if not a_suf or not p_suf or not vid or not vclass:
+                continue
+            key = (a_suf, p_suf, vid, vclass)
+            total[key] = total.get(key, 0) + hits
+            if folio:
+                folios.setdefault(key, set()).add(folio)
+    return [list(k) + [n, len(folios.get(k, ()))] for k, n in total.items()]
+
+
+def compare(rows_a, rows_b):
+    """S42b: hits in A, in B, total and B - A per key (first-seen order)."""
+    hits_a, hits_b, seen = {}, {}, OrderedDict()
+    for rows, hits in ((rows_a, hits_a), (rows_b, hits_b)):
+        for r in rows:
+            key = tuple(r[:4])
+            hits[key] = hits.get(key, 0) + r[4]
+            seen[key] = True
+    out = []
+    for key in seen:
+        ha, hb = hits_a.get(key, 0), hits_b.get(key, 0)
+        out.append(list(key) + [ha, hb, ha + hb, hb - ha])
+    return out
+
+
+def currier_contingency(hits_by_folio, currier):
+    """Per suffix-pair rule: hits and distinct folios in Currier A and B."""
+    table = OrderedDict()
+    for folio, rows in hits_by_folio.items():
+        for group in currier.get(folio, ()):
+            for r in rows:
+                key = (r[6], r[7], r[8], r[9])
+                ent = table.setdefault(key, {"A": 0, "B": 0, "fA": set(), "fB": set()})
+                ent[group] += 1
+                ent["f" + group].add(folio)
+    return [list(k) + [e["A"], e["B"], e["A"] + e["B"], len(e["fA"]), len(e["fB"])]
+            for k, e in table.items()]
+
+
+# -------------
+# Output
+# -------------
+
+def write_tsv(path, header, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        if header:
+            f.write("\t".join(header) + "\n")
+        for r in rows:
+            f.write("\t".join(map(str, r)) + "\n")
+    os.replace(tmp, path)
+
+
+def read_list(path):
+    with open(path, encoding="utf-8") as f:
+        return [ln.split()[0] for ln in f if ln.split()]
+
+
+def run_currier(args):
+    for p, what in ((args.master, "master transliteration"), (args.ladder, "s39 valency ladder"),
+                    (args.a_list, "Currier A list"), (args.b_list, "Currier B list")):
+        if not os.path.isfile(p):
+            raise SystemExit(f"[err] {what} not found: {p}")
+    os.makedirs(args.outd, exist_ok=True)
+    os.makedirs(args.ind, exist_ok=True)
+
+    a_folios, b_folios = read_list(args.a_list), read_list(args.b_list)
+    currier = {}
+    for group, fols in (("A", a_folios), ("B", b_folios)):
+        for f in fols:
+            currier.setdefault(f, [])
+            if group not in currier[f]:
+                currier[f].append(group)
+    folios = list(currier)
+
+    index = SuffixIndex(args.ladder)
+    packs = packs_from_master(args.master, folios)
+
+    hits, summaries = OrderedDict(), {}
+    for folio in folios:
+        lines = packs[folio]
+        if not lines:
+            print(f"[warn] no lines found for folio {folio} in {args.master}", file=sys.stderr)
+            continue
+        write_pack(lines, os.path.join(args.ind, f"{folio}_C.txt"))
+        rows = scan_suffix(lines, index, folio)
+        hits[folio] = rows
+        summaries[folio] = summarise(rows)
+        write_tsv(os.path.join(args.outd, f"s41b_valency_suffix_hits_{folio}.tsv"), S41B_HEADER, rows)
+        write_tsv(os.path.join(args.outd, f"s42_valency_suffix_summary_{folio}.tsv"),
+                  S42_HEADER, summaries[folio])
+    print(f"[s41q] scanned {len(hits)} folios, {sum(map(len, hits.values()))} suffix hits")
+
+    merged = {}
+    for group, fols in (("A", a_folios), ("B", b_folios)):
+        merged[group] = merge(summaries[f] for f in fols if f in summaries)
+        write_tsv(os.path.join(args.outd, f"s42_valency_suffix_summary_ALL_{group}_merged.tsv"),
+                  S42C_HEADER, merged[group])
+
+    label_b = "s42_valency_suffix_summary_ALL_B_merged"
+    label_a = "s42_valency_suffix_summary_ALL_A_merged"
+    write_tsv(os.path.join(args.outd, "s42b_compare_ALL_B_vs_ALL_A.tsv"),
+              ["agent_suffix", "patient_suffix", "valency_id", "valency_class",
+               "hits_" + label_b, "hits_" + label_a, "total_hits",
+               "delta_" + label_a + "_minus_" + label_b],
+              compare(merged["B"], merged["A"]))
+
+    pairs = [[folio, r[6], r[7], g] for folio, rows in hits.items()
+             for g in currier[folio] for r in rows]
+    write_tsv(os.path.join(args.outd, "s41b_suffix_pairs_with_currier.tsv"),
+              ["folio", "agent_suffix", "patient_suffix", "currier"], pairs)
+    write_tsv(os.path.join(args.outd, "s41_currier_contingency.tsv"),
+              ["agent_suffix", "patient_suffix", "valency_id", "valency_class",
+               "hits_A", "hits_B", "total_hits", "folios_A", "folios_B"],
+              currier_contingency(hits, currier))
+    print(f"[s41q] wrote merged A/B summaries, comparison and Currier table to {args.outd}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Indexed S41/S41b/S42 valency scans")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("triples", help="S41: exact S40 triple hits per folio pack")
+    t.add_argument("packs", nargs="+")
+    t.add_argument("--s40", default=S40_OVERLAYS)
+    t.add_argument("--outd", default=OUTD)
+
+    s = sub.add_parser("suffix", help="S41b: suffix-pair hits per folio pack")
+    s.add_argument("packs", nargs="+")
+    s.add_argument("--ladder", default=S39_LADDER)
+    s.add_argument("--outd", default=OUTD)
+
+    c = sub.add_parser("currier", help="all Currier A/B folios in one pass (S41b+S42+S42c+S42b)")
+    c.add_argument("--master", default=MASTER)
+    c.add_argument("--ladder", default=S39_LADDER)
+    c.add_argument("--a-list", default=A_LIST)
+    c.add_argument("--b-list", default=B_LIST)
+    c.add_argument("--outd", default=OUTD)
+    c.add_argument("--ind", default=IND)
+
+    args = ap.parse_args()
+    if args.cmd == "currier":
+        run_currier(args)
+        return
+
+    for p in args.packs:
+        if not os.path.isfile(p) or os.path.getsize(p) == 0:
+            raise SystemExit(f"[err] missing or empty folio file: {p}")
+    os.makedirs(args.outd, exist_ok=True)
+    if args.cmd == "triples":
+        if not os.path.isfile(args.s40) or os.path.getsize(args.s40) == 0:
+            raise SystemExit(f"[s41] ERROR: missing or empty S40 file: {args.s40}")
+        index = TripleIndex(args.s40)
+        for p in args.packs:
+            name = os.path.basename(p)
+            name = name[:-4] if name.endswith(".txt") else name
+            out = os.path.join(args.outd, f"s41_valency_hits_{name}.tsv")
+            write_tsv(out, None, scan_triples(read_pack(p), index))
+            print(f"[s41] Wrote valency hits to: {out}", file=sys.stderr)
+    else:
+        if not os.path.isfile(args.ladder):
+            raise SystemExit(f"[err] s39 ladder file not found: {args.ladder}")
+        index = SuffixIndex(args.ladder)
+        for p in args.packs:
+            folio = folio_tag(p)
+            out = os.path.join(args.outd, f"s41b_valency_suffix_hits_{folio}.tsv")
+            write_tsv(out, S41B_HEADER, scan_suffix(read_pack(p), index, folio))
+            print(f"[s41b] Wrote suffix-level valency hits to: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 
 set -eu
 
-BASE="$HOME/Voynich/Voynich_Reproducible_Core"
+BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 IN="$BASE/PhaseS/out"
 TMP="$BASE/PhaseS/tmp"
 OUT="$BASE/PhaseS/out"
@@ -3,7 +3,7 @@ import csv
 from collections import defaultdict
 import os
 
-BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
+BASE = os.environ.get("BASE", os.path.expanduser("~/Voynich/Voynich_Reproducible_Core"))
 OUTD = os.path.join(BASE, "PhaseS", "out")
 METAD = os.path.join(BASE, "metadata")
 section_map_path = os.path.join(METAD, "folio_sections.tsv")
@@ -2,7 +2,7 @@
 import os
 import csv
 
-BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
+BASE = os.environ.get("BASE", os.path.expanduser("~/Voynich/Voynich_Reproducible_Core"))
 OUTD = os.path.join(BASE, "PhaseS", "out")
 
 # Input paths
@@ -2,7 +2,7 @@
 import os
 import csv
 
-BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
+BASE = os.environ.get("BASE", os.path.expanduser("~/Voynich/Voynich_Reproducible_Core"))
 OUTD = os.path.join(BASE, "PhaseS", "out")
 
 s35_roles_path = os.path.join(OUTD, "s35_clause_roles.tsv")
@@ -3,7 +3,7 @@ import os
 import csv
 from collections import defaultdict, Counter
 
-BASE = os.path.expanduser("~/Voynich/Voynich_Reproducible_Core")
+BASE = os.environ.get("BASE", os.path.expanduser("~/Voynich/Voynich_Reproducible_Core"))
 OUTD = os.path.join(BASE, "PhaseS", "out")
 
 s47_path = os.path.join(OUTD, "s47_clause_semantic_skeletons.tsv")
@@ -1,7 +1,7 @@
 #!/data/data/com.termux/files/usr/bin/sh
 set -eu
 
-BASE="$HOME/Voynich/Voynich_Reproducible_Core"
+BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 OUTD="$BASE/PhaseS/out"
 TMP="$BASE/PhaseS/tmp"
 SECMAP="$BASE/metadata/folio_sections.tsv"
@@ -2,7 +2,7 @@
 set -euo pipefail
 
 # Hard-pin BASE to the reproducible core
-BASE="$HOME/Voynich/Voynich_Reproducible_Core"
+BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 
 P6="$BASE/PhaseS/out/p6_folio_tokens.tsv"
 S46="$BASE/PhaseS/out/s46_stem_semantic_envelopes.tsv"
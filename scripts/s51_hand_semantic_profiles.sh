@@ -3,7 +3,7 @@
 
 set -e
 
-BASE="$HOME/Voynich/Voynich_Reproducible_Core"
+BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 OUTD="$BASE/PhaseS/out"
 
 REGM="$OUTD/s50_folio_register_matrix.tsv"
@@ -29,7 +29,7 @@ python3 << 'PYEOF'
 import os
 import pandas as pd
 
-BASE = os.path.join(os.environ["HOME"], "Voynich", "Voynich_Reproducible_Core")
+BASE = os.environ.get("BASE", os.path.join(os.environ["HOME"], "Voynich", "Voynich_Reproducible_Core"))
 OUTD = os.path.join(BASE, "PhaseS", "out")
 
 regm_path  = os.path.join(OUTD, "s50_folio_register_matrix.tsv")
@@ -5,7 +5,7 @@
 set -eu
 
 # ***** FIXED BASE DIRECTORY *****
-BASE="$HOME/Voynich/Voynich_Reproducible_Core"
+BASE="${BASE:-$HOME/Voynich/Voynich_Reproducible_Core}"
 export BASE
 # ********************************
 
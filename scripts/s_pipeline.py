@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Incremental DAG executor for the PhaseS chain (s20 -> s56)
+
+The S-series wrappers are run by hand, one after another, and every run
+redoes everything even when only one late step changed. Most of the chain
+is not a chain at all: s22, s23, s24, s25, s26 and s32 all read only
+s21_family_frames.tsv, s50 fans out into s51..s56, and so on.
+
+Each step below declares the wrapper it runs and the files it reads and
+writes (bare names live in PhaseS/out/, anything with a '/' is relative
+to the repo root). From that the executor
+
+    - builds the DAG from output producers (inputs nobody produces are
+      external and must already exist),
+    - hashes the wrapper, every scripts/*.py|*.sh it mentions or imports
+      (followed recursively), and the inputs with sha256, as in
+      metadata/manifest.tsv, plus the values of the environment knobs
+      those scripts read (e.g. S27_MODE, S20_RADIUS),
+    - skips a step whose script/input hashes match the last successful run
+      and whose outputs are still the files it wrote; a step that reruns
+      but writes byte-identical outputs therefore leaves its downstream
+      steps untouched (early cutoff),
+    - runs every ready step in parallel (--jobs), with BASE set to the repo
+      root and the log in PhaseS/out/logs/<step>.log; steps downstream of
+      a failure are reported as blocked.
+
+State is kept in PhaseS/out/s_pipeline_manifest.tsv, one row per hashed
+file or env knob (step, role, sha256, relative_path, size, mtime_ns). A file whose
+size and mtime_ns match its row is not re-read.
+
+Left out on purpose: s20_patch_tokens_and_loader.sh, s35_fix_clause_counts.sh
+and s36_fix_clause_catalogue.sh (one-off in-place patches), s36_list_* (prints
+only), s41*/s42*/s42b/s42c per-folio helpers (driven by s42_master_currier_AB)
+and s50b/s50c (alternative writers of s50_hand_currier_summary.tsv).
+
+Usage:
+
+    python3 scripts/s_pipeline.py                 # bring everything up to date
+    python3 scripts/s_pipeline.py s39 s56 -j 4    # targets and their ancestors
+    python3 scripts/s_pipeline.py --dry-run       # show what would run
+    python3 scripts/s_pipeline.py --force s24     # rerun s24 even if unchanged
+    python3 scripts/s_pipeline.py --list
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_REL = "scripts"
+OUT_REL = "PhaseS/out"
+STATE_REL = f"{OUT_REL}/s_pipeline_manifest.tsv"
+LOG_REL = f"{OUT_REL}/logs"
+STATE_HEADER = ("step", "role", "sha256", "relative_path", "size", "mtime_ns")
+
+Step = namedtuple("Step", "name script inputs outputs")
+
+# -------------
+# Step declarations
+# -------------
+
+STEPS = [
+    Step("s20", "s20_run_core_context_windows.sh",
+         ["s13_semantic_core_report.tsv", "p6_folio_tokens.tsv"],
+         ["s20_core_context_windows.tsv"]),
+    Step("s21", "s21_run_fsmily_frames.sh",
+         ["s13_semantic_core_report.tsv", "p6_folio_tokens.tsv"],
+         ["s21_family_frames.tsv"]),
+    Step("s22", "s22_run_frame_summary.sh",
+         ["s21_family_frames.tsv"],
+         ["s22_frame_summary.tsv", "s22_frame_summary.txt"]),
+    Step("s23", "s23_run_frame_stats.sh",
+         ["s21_family_frames.tsv"],
+         ["s23_frame_stats.tsv", "s23_frame_stats.txt"]),
+    Step("s24", "s24_run_frame_js.sh",
+         ["s21_family_frames.tsv"],
+         ["s24_frame_js.tsv", "s24_frame_js.txt"]),
+    Step("s25", "s25_run_frame_overlap.sh",
+         ["s21_family_frames.tsv"],
+         ["s25_frame_overlap.tsv", "s25_frame_overlap.txt"]),
+    Step("s26", "s26_run_template_rung.sh",
+         ["s21_family_frames.tsv"],
+         ["s26_recurrent_templates.tsv", "s26_recurrent_templates.txt"]),
+    Step("s27", "s27_run_template_null.sh",
+         ["s23_frame_stats.tsv"],
+         ["s27_template_null.tsv", "s27_template_null.txt"]),
+    Step("s28", "s28_run_clause_skeletons.sh",
+         ["s26_recurrent_templates.tsv", "s9b_stem_semantic_families.tsv"],
+         ["s28_clause_skeletons.tsv", "s28_clause_skeleton_summary.tsv",
+          "s28_clause_skeleton_summary.txt"]),
+    Step("s29_profiles", "s29_run_slot_profiles.sh",
+         ["s26_recurrent_templates.tsv"],
+         ["s29_slot_profiles.tsv", "s29_slot_profiles.txt"]),
+    Step("s29_suffix", "s29_run_slot_suffix.sh",
+         ["s29_slot_profiles.tsv"],
+         ["s29_slot_profiles_with_suffix.tsv"]),
+    Step("s30", "s30_run_slot_summary.sh",
+         ["s29_slot_profiles.tsv"],
+         ["s30_slot_summary.tsv", "s30_slot_summary.txt"]),
+    Step("s31", "s31_run_slot_bootstrap.sh",
+         ["s29_slot_profiles.tsv"],
+         ["s31_slot_bootstrap.tsv", "s31_slot_bootstrap.txt"]),
+    Step("s32", "s32_run_slot_dependencies.sh",
+         ["s21_family_frames.tsv"],
+         ["s32_slot_dependencies.tsv", "s32_slot_dependencies.txt"]),
+    Step("s33", "s33_run_slot_morphology.sh",
+         ["s13_semantic_core_report.tsv", "s29_slot_profiles_with_suffix.tsv"],
+         ["s33_slot_morphology.tsv", "s33_slot_morphology.txt",
+          "s33_slot_morph_summary.tsv"]),
+    Step("s34_templates", "s34_run_clause_templates.sh",
+         ["s26_recurrent_templates.tsv"],
+         ["s34_clause_templates.tsv", "s34_clause_templates.txt"]),
+    Step("s34_roles", "s34_run_positional_roles.sh",
+         ["s31_slot_bootstrap.tsv"],
+         ["s34_positional_roles.tsv", "s34_positional_roles.txt"]),
+    Step("s35", "s35_run_clause_roles.sh",
+         ["s34_clause_templates.tsv", "s34_positional_roles.tsv"],
+         ["s35_clause_role_patterns.tsv", "s35_clause_role_patterns.txt"]),
+    Step("s36", "s36_export_clause_catalogue.sh",
+         ["s35_clause_role_patterns.tsv"],
+         ["s36_clause_role_catalogue.tsv"]),
+    Step("s37", "s37_run_agent_patient_pairs.sh",
+         ["s29_slot_profiles_with_suffix.tsv", "s36_clause_role_catalogue.tsv"],
+         ["s37_agent_patient_pairs.tsv", "s37_agent_patient_suffix_pairs.tsv",
+          "s37_agent_patient_summary.txt"]),
+    Step("s38", "s38_build_valency_table.sh",
+         ["s37_agent_patient_suffix_pairs.tsv"],
+         ["s38_valency_table.tsv"]),
+    Step("s39", "s39_run_valency_ladder.sh",
+         ["s38_valency_table.tsv"],
+         ["s39_valency_ladder.tsv", "s39_valency_ladder.txt"]),
+    Step("s40", "s40_apply_valency_to_clauses.sh",
+         ["s37_agent_patient_pairs.tsv", "s39_valency_ladder.tsv"],
+         ["s40_clause_valency_overlays.tsv"]),
+    Step("s42", "s42_master_currier_AB.sh",
+         ["corpora/voynich_transliteration.txt", "s39_valency_ladder.tsv",
+          "PhaseS/config/currierA_folios.list", "PhaseS/config/currierB_folios.list"],
+         ["s42_valency_suffix_summary_ALL_A_merged.tsv",
+          "s42_valency_suffix_summary_ALL_B_merged.tsv",
+          "s42b_compare_ALL_B_vs_ALL_A.tsv",
+          "s41b_suffix_pairs_with_currier.tsv", "s41_currier_contingency.tsv"]),
+    Step("s43", "s43_run.sh",
+         ["s41b_suffix_pairs_with_currier.tsv"],
+         ["s43_global_valency_chi_square.txt"]),
+    Step("s45", "s45_section_currier_counts.py",
+         ["currier_map.tsv", "metadata/folio_sections.tsv"],
+         ["s45_section_currier_counts.tsv"]),
+    Step("s46", "s46_stem_semantic_envelopes.sh",
+         ["s12_semantic_core_stems.tsv", "s34_positional_roles.tsv",
+          "s35_clause_roles.tsv"],
+         ["s46_stem_semantic_envelopes.tsv"]),
+    Step("s47", "s47_clause_semantic_skeletons.sh",
+         ["s35_clause_roles.tsv", "s46_stem_semantic_envelopes.tsv"],
+         ["s47_clause_semantic_skeletons.tsv"]),
+    Step("s48", "s48_diglossia_tests.sh",
+         ["s47_clause_semantic_skeletons.tsv"],
+         ["s48_section_diglossia_stats.tsv", "s48_prediction_tests.txt"]),
+    Step("s49_hands", "s49_extract_folio_hands.py",
+         ["corpora/voynich_transliteration.txt"],
+         ["s49_folio_hands.tsv"]),
+    Step("s49", "s49_hand_register_summary.sh",
+         ["metadata/folio_sections.tsv", "s49_folio_hands.tsv"],
+         ["s49_hand_section_summary.tsv", "s49_hand_currier_summary.tsv"]),
+    Step("s49b", "s49b_hand_currier_section_summary.sh",
+         ["s49_folio_hands.tsv", "currier_map.tsv", "metadata/folio_sections.tsv"],
+         ["s49b_hand_currier_section_summary.tsv"]),
+    Step("s49c", "s49c_folio_semantic_profiles.sh",
+         ["p6_folio_tokens.tsv", "s46_stem_semantic_envelopes.tsv"],
+         ["s49c_folio_semantic_profiles.tsv"]),
+    Step("s50", "s50_register_heatmap.sh",
+         ["s49c_folio_semantic_profiles.tsv", "currier_map.tsv"],
+         ["s50_folio_register_matrix.tsv", "s50_transition_points.tsv",
+          "s50_register_blocks.tsv", "s50_register_heatmap.txt"]),
+    Step("s50_hands", "s50_hand_register_matrix.sh",
+         ["hand_map.tsv", "s50_folio_register_matrix.tsv"],
+         ["s50_hand_register_matrix.tsv", "s50_hand_register_summary.tsv",
+          "s50_hand_currier_summary.tsv"]),
+    Step("s51", "s51_hand_semantic_profiles.sh",
+         ["hand_map.tsv", "s50_folio_register_matrix.tsv"],
+         ["s51_hand_semantic_profiles.tsv"]),
+    Step("s52", "s52_block_boundaries.sh",
+         ["s50_folio_register_matrix.tsv", "hand_map.tsv"],
+         ["s52_folio_sequence.tsv", "s52_blocks.tsv", "s52_transitions.tsv"]),
+    Step("s53_meta", "s53_meta.sh",
+         ["s50_folio_register_matrix.tsv"],
+         ["s53_meta_baseline_contingency.tsv", "s53_meta_expected_frequencies.tsv",
+          "s53_meta_threshold_sweep.tsv", "s53_meta_mixed_contingency.tsv",
+          "s53_meta_randomization_baseline.tsv", "s53_meta_report.txt"]),
+    Step("s53_tests", "s53_register_semantic_tests.sh",
+         ["s50_folio_register_matrix.tsv"],
+         ["s53_register_semantic_summary.tsv", "s53_register_semantic_tests.txt"]),
+    Step("s54", "s54_semantic_batch2.sh",
+         ["s46_stem_semantic_envelopes.tsv", "s51_hand_semantic_profiles.tsv"],
+         ["s54_section_semantic_profiles.tsv", "s54_section_semantic_contingency.tsv",
+          "s54_hand_semantic_profiles_copy.tsv", "s54_section_expected_frequencies.tsv",
+          "s54_semantic_batch2_report.txt"]),
+    Step("s55", "s55_stem_register_overlap.sh",
+         ["p6_folio_tokens.tsv", "s50_folio_register_matrix.tsv"],
+         ["s55_stem_register_counts.tsv", "s55_stem_overlap_summary.tsv",
+          "s55_stem_overlap_report.txt"]),
+    Step("s56", "s56_stem_register_divergence.sh",
+         ["p6_folio_tokens.tsv", "s50_folio_register_matrix.tsv",
+          "s46_stem_semantic_envelopes.tsv"],
+         ["s56_shared_stem_semantic_profiles.tsv", "s56_shared_stem_semantic_summary.tsv",
+          "s56_stem_register_divergence_report.txt"]),
+]
+
+
+def rel_path(name):
+    """Bare names live in PhaseS/out/; anything with a '/' is repo-relative."""
+    return name if "/" in name else f"{OUT_REL}/{name}"
+
+
+# -------------
+# Hashing and state
+# -------------
+
+_SCRIPT_REF = re.compile(r"([A-Za-z0-9_.-]+\.(?:py|sh))\b")
+_MODULE_REF = re.compile(r"^\s*(?:from|import)\s+([A-Za-z_]\w*)", re.M)
+_ENV_REF = re.compile(r"""os\.(?:environ\.get\(|environ\[|getenv\()\s*["']([A-Za-z_]\w*)["']"""
+                      r"""|\$\{([A-Za-z_]\w*):?[-=]""")
+PINNED_ENV = {"BASE"}     # set by the executor itself
+
+
+def _read_text(root, rel):
+    try:
+        with open(os.path.join(root, rel), encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def script_files(step, root=ROOT):
+    """
+    The wrapper plus every scripts/*.py|*.sh (or module) it reaches: shell
+    files contribute the scripts they name and any heredoc imports, Python
+    files the sibling modules they import, followed file by file until no
+    new file turns up.
+    """
+    main = f"{SCRIPTS_REL}/{step.script}"
+    found, queue = set(), [main]
+    while queue:
+        rel = queue.pop()
+        if rel in found:
+            continue
+        found.add(rel)
+        text = _read_text(root, rel)
+        if text is None:
+            continue
+        names = [m + ".py" for m in _MODULE_REF.findall(text)]
+        if not rel.endswith(".py"):
+            names += _SCRIPT_REF.findall(text)
+        for name in names:
+            ref = f"{SCRIPTS_REL}/{name}"
+            if ref not in found and os.path.isfile(os.path.join(root, ref)):
+                queue.append(ref)
+    return sorted(found)
+
+
+def env_knobs(files, root=ROOT):
+    """Environment variables the step's files read (os.environ / getenv, ${VAR:-default})."""
+    names = set()
+    for rel in files:
+        text = _read_text(root, rel)
+        if text:
+            for py, sh in _ENV_REF.findall(text):
+                names.add(py or sh)
+    return sorted(names - PINNED_ENV)
+
+
+def env_digest(name, environ=None):
+    val = (os.environ if environ is None else environ).get(name)
+    return "unset" if val is None else hashlib.sha256(val.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Hasher:
+    """sha256 per relative path, reusing a known digest when size/mtime match."""
+
+    def __init__(self, root, known=None):
+        self.root = root
+        self.known = dict(known or {})     # rel -> (size, mtime_ns, sha)
+        self.lock = threading.Lock()
+
+    def stat(self, rel):
+        try:
+            st = os.stat(os.path.join(self.root, rel))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def sha(self, rel):
+        """(sha, size, mtime_ns), or None when the file is missing."""
+        st = self.stat(rel)
+        if st is None:
+            return None
+        with self.lock:
+            hit = self.known.get(rel)
+        if hit and hit[:2] == st:
+            return hit[2], st[0], st[1]
+        digest = sha256_file(os.path.join(self.root, rel))
+        with self.lock:
+            self.known[rel] = (st[0], st[1], digest)
+        return digest, st[0], st[1]
+
+
+def load_state(path):
+    """step -> {(role, rel): (sha, size, mtime_ns)} from the state manifest."""
+    state = {}
+    if not os.path.isfile(path):
+        return state
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        if tuple(header) != STATE_HEADER:
+            print(f"[INFO] Ignoring state file with unexpected header: {path}")
+            return state
+        for ln in f:
+            parts = ln.rstrip("\n").split("\t")
+            if len(parts) != len(STATE_HEADER):
+                continue
+            step, role, digest, rel, size, mtime = parts
+            state.setdefault(step, {})[(role, rel)] = (digest, int(size), int(mtime))
+    return state
+
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\t".join(STATE_HEADER) + "\n")
+        for step in sorted(state):
+            for (role, rel), (digest, size, mtime) in sorted(state[step].items()):
+                f.write(f"{step}\t{role}\t{digest}\t{rel}\t{size}\t{mtime}\n")
+    os.replace(tmp, path)
+
+
+def known_digests(state):
+    known = {}
+    for rows in state.values():
+        for (role, rel), (digest, size, mtime) in rows.items():
+            if role != "env":
+                known[rel] = (size, mtime, digest)
+    return known
+
+
+# -------------
+# Graph
+# -------------
+
+def build_graph(steps):
+    """(by_name, deps, external inputs); rejects duplicate producers and cycles."""
+    by_name, producer = {}, {}
+    for st in steps:
+        if st.name in by_name:
+            raise SystemExit(f"[ERR] Duplicate step name: {st.name}")
+        by_name[st.name] = st
+        for o in st.outputs:
+            rel = rel_path(o)
+            if rel in producer:
+                raise SystemExit(f"[ERR] {rel} is written by both {producer[rel]} and {st.name}")
+            producer[rel] = st.name
+    deps, external = {}, set()
+    for st in steps:
+        deps[st.name] = set()
+        for i in st.inputs:
+            rel = rel_path(i)
+            if rel in producer:
+                deps[st.name].add(producer[rel])
+            else:
+                external.add(rel)
+    topo_order(deps)
+    return by_name, deps, external
+
+
+def topo_order(deps):
+    indeg = {n: len(d) for n, d in deps.items()}
+    children = {n: [] for n in deps}
+    for n, d in deps.items():
+        for p in d:
+            children[p].append(n)
+    ready = sorted(n for n, k in indeg.items() if k == 0)
+    order = []
+    while ready:
+        n = ready.pop(0)
+        order.append(n)
+        for c in children[n]:
+            indeg[c] -= 1
+            if indeg[c] == 0:
+                ready.append(c)
+        ready.sort()
+    if len(order) != len(deps):
+        cyc = sorted(n for n, k in indeg.items() if k > 0)
+        raise SystemExit(f"[ERR] Dependency cycle among: {', '.join(cyc)}")
+    return order
+
+
+def with_ancestors(targets, deps):
+    seen, stack = set(), list(targets)
+    while stack:
+        n = stack.pop()
+        if n in seen:
+            continue
+        seen.add(n)
+        stack.extend(deps[n])
+    return seen
+
+
+# -------------
+# Execution
+# -------------
+
+class Pipeline:
+    def __init__(self, steps=STEPS, root=ROOT, jobs=1, force=(), verbose=True):
+        self.root = root
+        self.by_name, self.deps, self.external = build_graph(steps)
+        self.state_path = os.path.join(root, STATE_REL)
+        self.state = load_state(self.state_path)
+        self.hasher = Hasher(root, known_digests(self.state))
+        self.jobs = max(1, jobs)
+        self.force = set(force)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+
+    def log(self, msg):
+        if self.verbose:
+            print(msg, flush=True)
+
+    def signature(self, step):
+        """
+        {(role, rel): (sha, size, mtime)} for scripts, inputs and the env
+        knobs the scripts read (role "env", rel = variable name, sha of its
+        value); plus the files that are missing.
+        """
+        sig, missing = {}, []
+        files = script_files(step, self.root)
+        for role, rels in (("script", files),
+                           ("input", [rel_path(i) for i in step.inputs])):
+            for rel in rels:
+                h = self.hasher.sha(rel)
+                if h is None:
+                    missing.append(rel)
+                else:
+                    sig[(role, rel)] = h
+        for name in env_knobs(files, self.root):
+            sig[("env", name)] = (env_digest(name), 0, 0)
+        return sig, missing
+
+    def stale_reason(self, step, sig):
+        """None when the recorded run still holds, else why the step must run."""
+        if step.name in self.force:
+            return "forced"
+        rec = self.state.get(step.name)
+        if not rec:
+            return "never run"
+        for key, (digest, _, _) in sig.items():
+            old = rec.get(key)
+            if old is None or old[0] != digest:
+                return f"{key[0]} changed: {key[1]}"
+        if {k for k in rec if k[0] != "output"} != set(sig):
+            return "declared scripts/inputs changed"
+        for o in step.outputs:
+            rel = rel_path(o)
+            old = rec.get(("output", rel))
+            now = self.hasher.sha(rel)
+            if now is None:
+                return f"output missing: {rel}"
+            if old is None or old[0] != now[0]:
+                return f"output modified: {rel}"
+        return None
+
+    def run_step(self, step):
+        """Decide and (maybe) run one step; returns (status, detail)."""
+        sig, missing = self.signature(step)
+        if missing:
+            return "failed", "missing " + ", ".join(missing)
+        reason = self.stale_reason(step, sig)
+        if reason is None:
+            return "skipped", "up to date"
+
+        script = os.path.join(self.root, SCRIPTS_REL, step.script)
+        cmd = [sys.executable, script] if step.script.endswith(".py") else ["bash", script]
+        env = dict(os.environ, BASE=self.root)
+        log_dir = os.path.join(self.root, LOG_REL)
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, f"{step.name}.log")
+        self.log(f"[INFO] {step.name}: running ({reason})")
+        t0 = time.time()
+        with open(log_path, "w", encoding="utf-8") as logf:
+            rc = subprocess.call(cmd, cwd=self.root, env=env,
+                                 stdout=logf, stderr=subprocess.STDOUT)
+        dt = time.time() - t0
+        if rc != 0:
+            return "failed", f"exit {rc} after {dt:.1f}s, see {LOG_REL}/{step.name}.log"
+
+        rec, absent = dict(sig), []
+        for o in step.outputs:
+            rel = rel_path(o)
+            h = self.hasher.sha(rel)
+            if h is None:
+                absent.append(rel)
+            else:
+                rec[("output", rel)] = h
+        if absent:
+            return "failed", "did not write " + ", ".join(absent)
+        with self.lock:
+            prev = self.state.get(step.name, {})
+            same = all(prev.get(k, (None,))[0] == v[0]
+                       for k, v in rec.items() if k[0] == "output")
+            self.state[step.name] = rec
+            save_state(self.state_path, self.state)
+        return "ran", f"{dt:.1f}s" + (", outputs unchanged" if same and prev else "")
+
+    def plan(self, targets=None):
+        names = set(self.by_name) if not targets else with_ancestors(targets, self.deps)
+        return [n for n in topo_order(self.deps) if n in names]
+
+    def check_external(self, names):
+        needed = {rel_path(i) for n in names for i in self.by_name[n].inputs} & self.external
+        return sorted(rel for rel in needed if self.hasher.stat(rel) is None)
+
+    def dry_run(self, targets=None):
+        """Predict each step's status without running anything."""
+        out = {}
+        for n in self.plan(targets):
+            step = self.by_name[n]
+            up = [d for d in self.deps[n] if out[d][0] != "skip"]
+            if up:
+                out[n] = ("run?", "after " + ", ".join(sorted(up)))
+                continue
+            sig, missing = self.signature(step)
+            if missing:
+                out[n] = ("missing", ", ".join(missing))
+                continue
+            reason = self.stale_reason(step, sig)
+            out[n] = ("skip", "up to date") if reason is None else ("run", reason)
+        return out
+
+    def run(self, targets=None):
+        names = self.plan(targets)
+        status = {}
+        pending = list(names)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for n in list(pending):
+                    bad = [d for d in self.deps[n] if status.get(d, ("",))[0] in ("failed", "blocked")]
+                    if bad:
+                        status[n] = ("blocked", "upstream " + ", ".join(sorted(bad)))
+                        self.log(f"[ERR] {n}: blocked by {', '.join(sorted(bad))}")
+                        pending.remove(n)
+                    elif all(d in status for d in self.deps[n]) and len(running) < self.jobs:
+                        running[pool.submit(self.run_step, self.by_name[n])] = n
+                        pending.remove(n)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    n = running.pop(fut)
+                    try:
+                        status[n] = fut.result()
+                    except Exception as e:   # keep the other branches going
+                        status[n] = ("failed", repr(e))
+                    tag = "[ERR]" if status[n][0] == "failed" else "[OK]"
+                    self.log(f"{tag} {n}: {status[n][0]} ({status[n][1]})")
+        return status
+
+
+# -------------
+# CLI
+# -------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Incremental runner for the PhaseS s20-s56 steps")
+    ap.add_argument("targets", nargs="*", help="step names (default: all); ancestors are included")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--force", action="store_true", help="rerun the named targets (all steps if none)")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--list", action="store_true", help="print steps with inputs and outputs")
+    args = ap.parse_args()
+
+    by_name, deps, external = build_graph(STEPS)
+    unknown = [t for t in args.targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"[ERR] Unknown step(s): {', '.join(unknown)}")
+
+    if args.list:
+        for n in topo_order(deps):
+            st = by_name[n]
+            print(f"{n}\t{st.script}\tafter={','.join(sorted(deps[n])) or '-'}")
+            print(f"\tin:  {' '.join(st.inputs)}")
+            print(f"\tout: {' '.join(st.outputs)}")
+        return
+
+    force = (args.targets or list(by_name)) if args.force else ()
+    pipe = Pipeline(jobs=args.jobs, force=force)
+    names = pipe.plan(args.targets)
+
+    if args.dry_run:
+        for n, (what, why) in pipe.dry_run(args.targets).items():
+            print(f"{n:<14}{what:<9}{why}")
+        return
+
+    missing = pipe.check_external(names)
+    for rel in missing:
+        print(f"[ERR] Missing external input: {rel}")
+
+    status = pipe.run(args.targets)
+    counts = {}
+    for what, _ in status.values():
+        counts[what] = counts.get(what, 0) + 1
+    print("[INFO] " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    if any(what in ("failed", "blocked") for what, _ in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
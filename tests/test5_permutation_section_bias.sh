@@ -20,7 +20,7 @@ if [ ! -f "$CAND" ]; then
 fi
 
 python3 - << "PY"
-import os, sys, random
+import os, sys
 import pandas as pd
 
 BASE = os.environ.get("BASE", os.path.join(os.environ.get("HOME",""), "Voynich", "Voynich_Reproducible_Core"))
@@ -50,8 +50,16 @@ sections_all = df["section"].tolist()
 n_all = len(sections_all)
 print(f"[Test5(py)] Candidate tokens: {n_all}", file=sys.stderr)
 
+# Vectorized draws with sequential early stopping (p113_permutation_engine):
+# non-significant stems stop after STOP_AFTER exceedances, so N_PERM can be
+# 10^5-10^6 per stem.
+sys.path.insert(0, os.path.join(BASE, "scripts"))
+from p113_permutation_engine import purity_test
+
 rows = []
-n_perm = 2000  # decent compromise for Termux
+n_perm = int(os.environ.get("N_PERM", "100000"))
+stop_after = int(os.environ.get("STOP_AFTER", "100"))
+seed = int(os.environ.get("SEED", "5"))
 
 for stem in stems:
     sub = df[df["stem"] == stem]
@@ -60,25 +68,11 @@ for stem in stems:
         rows.append((stem, 0.0, 1.0, 0))
         continue
 
-    # observed purity (dominant section fraction)
-    counts = sub["section"].value_counts()
-    dom_count = counts.iloc[0]
-    obs_purity = dom_count / n
-
-    # permutation: draw n random sections from global pool
-    worse_or_equal = 0
-    for _ in range(n_perm):
-        sample = random.choices(sections_all, k=n)
-        s_counts = {}
-        for sec in sample:
-            s_counts[sec] = s_counts.get(sec, 0) + 1
-        max_sample = max(s_counts.values())
-        perm_purity = max_sample / n
-        if perm_purity >= obs_purity:
-            worse_or_equal += 1
-
-    p_value = (worse_or_equal + 1) / (n_perm + 1)
-    rows.append((stem, obs_purity, p_value, n))
+    # observed purity (dominant section fraction) vs n random sections
+    # drawn from the global pool
+    res = purity_test(sub["section"].tolist(), sections_all, n_perm=n_perm,
+                      seed=seed, replace=True, stop_after=stop_after)
+    rows.append((stem, res["observed"], res["p_value"], n))
 
 out = pd.DataFrame(rows, columns=["stem","obs_purity","perm_p_value","n_tokens"])
 out.to_csv(out_path, sep="\t", index=False)